@@ -1,7 +1,8 @@
-import os
-import datetime
 import sqlite3
+from functools import partial
+from typing import Callable
 
+from database_backup import backupDatabase, backupDirectoryFor
 from logger import get_logger
 
 
@@ -10,16 +11,39 @@ logger = get_logger(__name__)
 
 class DatabaseMigrator:
 
-    CURRENT_SCHEMA_VERSION = 3
+    CURRENT_SCHEMA_VERSION = 7
+
+    # Rows copied per commit by migrations that rebuild a table
+    MIGRATION_BATCH_SIZE = 5000
+
+    # Pages copied per step by the backup taken before migrating
+    MIGRATION_BACKUP_PAGES_PER_STEP = 1024
+
+    # Directory the backup taken before migrating is written to, by default
+    # the backups directory next to the database so it is rotated with the
+    # BackupService's backups
+    MIGRATION_BACKUP_DIRECTORY = None
 
     SCHEMA_VERSIONS = {
         1: "Initial schema version",  # Initial version, no schema version table is created yet.
         2: "Add schema version tracking and change to credits datatype to hundreths of a credit (integer)",
         3: "Fix Patrons.TotalCredits DEFAULT 0 for databases migrated with old migration_2",
+        4: "Add covering indexes for patron, transaction and card ID lookups",
+        5: "Add StoreStats table with incrementally maintained store statistics",
+        6: "Add PatronSnackCounts table for ranking a patron's most purchased snacks",
+        7: "Store dates as INTEGER microseconds since epoch instead of text",
     }
 
     @staticmethod
     def get_stored_database_version(cursor: sqlite3.Cursor) -> int:
+        """
+        The schema version, read from PRAGMA user_version. Databases written
+        before the version moved there keep it in the settings table.
+        """
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version > 0:
+            logger.debug("Found stored schema version: %d", version)
+            return version
         try:
             cursor.execute("SELECT value FROM settings WHERE name = 'schema_version'")
             result = cursor.fetchone()
@@ -28,17 +52,38 @@ class DatabaseMigrator:
                     "Schema version not found in settings table."
                 )
             version = int(result[0])
-            logger.debug("Found stored schema version: %d", version)
+            logger.debug("Found stored schema version in settings: %d", version)
             return version
         except sqlite3.OperationalError:
             # If the settings table doesn't exist, we assume it's version 1.
             logger.debug("No schema version found in database, defaulting to version 1")
             return 1
 
+    @staticmethod
+    def set_stored_database_version(cursor: sqlite3.Cursor, version: int):
+        """
+        Store the schema version in PRAGMA user_version, and in the settings
+        table for older versions of the app. Does not commit.
+        """
+        assert isinstance(version, int)
+        # PRAGMA does not take parameters
+        cursor.execute(f"PRAGMA user_version = {version}")
+        cursor.execute(
+            "INSERT OR REPLACE INTO settings (name, value) VALUES ('schema_version', ?)",
+            (str(version),),
+        )
+
     @staticmethod
     def needs_migration(cursor: sqlite3.Cursor) -> bool:
         stored_version = DatabaseMigrator.get_stored_database_version(cursor)
 
+        if stored_version >= DatabaseMigrator.CURRENT_SCHEMA_VERSION:
+            logger.debug(
+                "Database already at current version %d, no migration needed",
+                stored_version,
+            )
+            return False
+
         # If database has no data tables, we can consider it as new and not needing migration
         if (
             cursor.execute(
@@ -49,13 +94,6 @@ class DatabaseMigrator:
             logger.debug("No data tables found, migration not needed")
             return False
 
-        if stored_version >= DatabaseMigrator.CURRENT_SCHEMA_VERSION:
-            logger.debug(
-                "Database already at current version %d, no migration needed",
-                stored_version,
-            )
-            return False
-
         logger.info(
             "Migration needed: v%d -> v%d (%s)",
             stored_version,
@@ -68,20 +106,49 @@ class DatabaseMigrator:
 
     @staticmethod
     def create_backup(connection: sqlite3.Connection):
-        backup_path = f"database_backup_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.db"
+        """
+        Back up the database to MIGRATION_BACKUP_DIRECTORY before migrating,
+        copying MIGRATION_BACKUP_PAGES_PER_STEP pages per step.
+        """
+        backup_directory = DatabaseMigrator.MIGRATION_BACKUP_DIRECTORY
+        if backup_directory is None:
+            # The file of the main database, the first one listed
+            database_path = connection.execute("PRAGMA database_list").fetchone()[2]
+            backup_directory = backupDirectoryFor(database_path)
+
+        def log_progress(copied, total):
+            logger.debug("Database backup: %d of %d pages copied", copied, total)
+
         try:
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
-            target = sqlite3.connect(backup_path)
-            connection.backup(target=target, pages=0, progress=None)
-            target.close()
+            backup_path = backupDatabase(
+                connection,
+                backup_directory,
+                pagesPerStep=DatabaseMigrator.MIGRATION_BACKUP_PAGES_PER_STEP,
+                # The migration waits for the backup and nothing else
+                # writes before it is done, so there is no one to pause for
+                stepPause=0,
+                progress=log_progress,
+            )
             logger.info("Database backup created as %s", backup_path)
         except Exception as e:
             logger.error("Failed to create database backup: %s", e, exc_info=True)
             raise
 
     @staticmethod
-    def migrate_database(connection, cursor):
+    def migrate_database(
+        connection,
+        cursor,
+        progress: Callable[[int, str, int, int], None] = None,
+    ):
+        """
+        Run every migration after the stored version, committing the new
+        version after each one.
+
+        Args:
+            progress: Called with (version, table, copied rows, total rows)
+                when a migration starts, with table None and no rows, and
+                after every batch a migration copies.
+        """
         current_version = DatabaseMigrator.get_stored_database_version(cursor)
         logger.info(
             "Starting database migration from v%d to v%d (%s)",
@@ -104,8 +171,13 @@ class DatabaseMigrator:
                     version,
                     description,
                 )
+                version_progress = None
+                if progress is not None:
+                    progress(version, None, 0, 0)
+                    version_progress = partial(progress, version)
+
                 try:
-                    method(connection, cursor)
+                    method(connection, cursor, progress=version_progress)
                 except Exception as e:
                     logger.critical(
                         "Migration v%d FAILED: %s",
@@ -114,20 +186,28 @@ class DatabaseMigrator:
                         exc_info=True,
                     )
                     raise
-                cursor.execute(
-                    "UPDATE settings SET value = ? WHERE name = 'schema_version'",
-                    (version,),
-                )
+                DatabaseMigrator.set_stored_database_version(cursor, version)
                 connection.commit()
                 logger.info("Migration v%d completed successfully", version)
 
+        cursor.execute("DROP TABLE IF EXISTS MigrationCheckpoints")
+        connection.commit()
         logger.info(
             "Migration complete: database now at version %d",
             DatabaseMigrator.CURRENT_SCHEMA_VERSION,
         )
 
     @staticmethod
-    def migration_2(connection, cursor):
+    def migration_2(connection, cursor, progress=None):
+        """
+        Add schema version tracking and store credits in hundreths of a
+        credit (INTEGER) instead of REAL.
+
+        Every table with a credit column is rebuilt once, converting all of
+        its credit columns in the same pass and copying the rows in batches.
+        Tables whose credit columns are already INTEGER are skipped, so an
+        interrupted migration picks up where it stopped.
+        """
         # Create the settings table if it doesn't exist and set schema_version to 1 if it's not set
         cursor.execute(
             """
@@ -142,81 +222,127 @@ class DatabaseMigrator:
             INSERT OR IGNORE INTO settings (name, value) VALUES ('schema_version', '1')
         """
         )
+        connection.commit()
 
-        # Change TotalCredits from REAL to INTEGER for Patrons (hundreths of a credit)
-        cursor.execute("ALTER TABLE Patrons ADD COLUMN TotalCredits_temp INTEGER")
-        cursor.execute(
-            "UPDATE Patrons SET TotalCredits_temp = CAST(TotalCredits * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE Patrons DROP COLUMN TotalCredits")
-        cursor.execute(
-            "ALTER TABLE Patrons RENAME COLUMN TotalCredits_temp TO TotalCredits"
-        )
-
-        # Change PricePerItem from REAL to INTEGER for Snacks (hundreths of a credit)
-        cursor.execute("ALTER TABLE Snacks ADD COLUMN PricePerItem_temp INTEGER")
-        cursor.execute(
-            "UPDATE Snacks SET PricePerItem_temp = CAST(PricePerItem * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE Snacks DROP COLUMN PricePerItem")
-        cursor.execute(
-            "ALTER TABLE Snacks RENAME COLUMN PricePerItem_temp TO PricePerItem"
-        )
-
-        # Change Value from REAL to INTEGER for AddedSnacks (hundreths of a credit)
-        cursor.execute("ALTER TABLE AddedSnacks ADD COLUMN Value_temp INTEGER")
-        cursor.execute(
-            "UPDATE AddedSnacks SET Value_temp = CAST(Value * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE AddedSnacks DROP COLUMN Value")
-        cursor.execute("ALTER TABLE AddedSnacks RENAME COLUMN Value_temp TO Value")
-
-        # Change Value from REAL to INTEGER for LostSnacks (hundreths of a credit)
-        cursor.execute("ALTER TABLE LostSnacks ADD COLUMN Value_temp INTEGER")
-        cursor.execute(
-            "UPDATE LostSnacks SET Value_temp = CAST(Value * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE LostSnacks DROP COLUMN Value")
-        cursor.execute("ALTER TABLE LostSnacks RENAME COLUMN Value_temp TO Value")
-
-        # Change AmountBeforeTransaction and AmountAfterTransaction from REAL to INTEGER for Transactions (hundreths of a credit)
-        cursor.execute(
-            "ALTER TABLE Transactions ADD COLUMN AmountBeforeTransaction_temp INTEGER"
-        )
-        cursor.execute(
-            "UPDATE Transactions SET AmountBeforeTransaction_temp = CAST(AmountBeforeTransaction * 100 AS INTEGER)"
-        )
-        cursor.execute(
-            "ALTER TABLE Transactions ADD COLUMN AmountAfterTransaction_temp INTEGER"
-        )
-        cursor.execute(
-            "UPDATE Transactions SET AmountAfterTransaction_temp = CAST(AmountAfterTransaction * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE Transactions DROP COLUMN AmountBeforeTransaction")
-        cursor.execute("ALTER TABLE Transactions DROP COLUMN AmountAfterTransaction")
-        cursor.execute(
-            "ALTER TABLE Transactions RENAME COLUMN AmountBeforeTransaction_temp TO AmountBeforeTransaction"
-        )
-        cursor.execute(
-            "ALTER TABLE Transactions RENAME COLUMN AmountAfterTransaction_temp TO AmountAfterTransaction"
-        )
-
-        # Change Amount from REAL to INTEGER for TransactionItems (hundreths of a credit)
-        cursor.execute(
-            "ALTER TABLE TransactionItems ADD COLUMN PricePerItem_temp INTEGER"
-        )
-        cursor.execute(
-            "UPDATE TransactionItems SET PricePerItem_temp = CAST(PricePerItem * 100 AS INTEGER)"
-        )
-        cursor.execute("ALTER TABLE TransactionItems DROP COLUMN PricePerItem")
-        cursor.execute(
-            "ALTER TABLE TransactionItems RENAME COLUMN PricePerItem_temp TO PricePerItem"
-        )
+        def to_hundreths(column: str) -> str:
+            # REAL credits like 2238.2 are stored as 2238.1999..., truncating
+            # them without rounding would lose a hundreth
+            return f"CAST(ROUND({column} * 100) AS INTEGER)"
 
-        connection.commit()
+        rebuilds = [
+            (
+                "Patrons",
+                "TotalCredits",
+                "CREATE TABLE Patrons_new ("
+                "PatronID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "FirstName TEXT NOT NULL, LastName TEXT NOT NULL, "
+                "EmployeeID TEXT NOT NULL, "
+                "TotalCredits INTEGER NOT NULL DEFAULT 0)",
+                [
+                    "PatronID",
+                    "FirstName",
+                    "LastName",
+                    "EmployeeID",
+                    f"IFNULL({to_hundreths('TotalCredits')}, 0)",
+                ],
+            ),
+            (
+                "Snacks",
+                "PricePerItem",
+                "CREATE TABLE Snacks_new ("
+                "ItemID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "ItemName TEXT NOT NULL, Quantity INTEGER NOT NULL, "
+                "ImageID TEXT NOT NULL, PricePerItem INTEGER NOT NULL)",
+                [
+                    "ItemID",
+                    "ItemName",
+                    "Quantity",
+                    "ImageID",
+                    to_hundreths("PricePerItem"),
+                ],
+            ),
+            (
+                "AddedSnacks",
+                "Value",
+                "CREATE TABLE AddedSnacks_new ("
+                "AddedID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "SnackName TEXT NOT NULL, AddedDate TEXT NOT NULL, "
+                "Quantity INTEGER NOT NULL, Value INTEGER NOT NULL)",
+                [
+                    "AddedID",
+                    "SnackName",
+                    "AddedDate",
+                    "Quantity",
+                    to_hundreths("Value"),
+                ],
+            ),
+            (
+                "LostSnacks",
+                "Value",
+                "CREATE TABLE LostSnacks_new ("
+                "LostID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "SnackName TEXT NOT NULL, Reason INTEGER NOT NULL, "
+                "LostDate TEXT NOT NULL, Quantity INTEGER NOT NULL, "
+                "Value INTEGER NOT NULL)",
+                [
+                    "LostID",
+                    "SnackName",
+                    "Reason",
+                    "LostDate",
+                    "Quantity",
+                    to_hundreths("Value"),
+                ],
+            ),
+            (
+                "Transactions",
+                "AmountBeforeTransaction",
+                "CREATE TABLE Transactions_new ("
+                "TransactionID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "TransactionType TEXT NOT NULL, PatronID INTEGER NOT NULL, "
+                "TransactionDate TEXT NOT NULL, "
+                "AmountBeforeTransaction INTEGER NOT NULL, "
+                "AmountAfterTransaction INTEGER NOT NULL, "
+                "FOREIGN KEY(PatronID) REFERENCES Patrons(PatronID))",
+                [
+                    "TransactionID",
+                    "TransactionType",
+                    "PatronID",
+                    "TransactionDate",
+                    to_hundreths("AmountBeforeTransaction"),
+                    to_hundreths("AmountAfterTransaction"),
+                ],
+            ),
+            (
+                "TransactionItems",
+                "PricePerItem",
+                "CREATE TABLE TransactionItems_new ("
+                "TransactionItemId INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "TransactionID INTEGER NOT NULL, ItemName TEXT NOT NULL, "
+                "Quantity INTEGER NOT NULL, PricePerItem INTEGER NOT NULL, "
+                "FOREIGN KEY(TransactionID) REFERENCES Transactions(TransactionID))",
+                [
+                    "TransactionItemId",
+                    "TransactionID",
+                    "ItemName",
+                    "Quantity",
+                    to_hundreths("PricePerItem"),
+                ],
+            ),
+        ]
+        for table, credit_column, create_sql, select_columns in rebuilds:
+            if (
+                DatabaseMigrator._get_column_type(cursor, table, credit_column)
+                == "INTEGER"
+            ):
+                continue
+            DatabaseMigrator._rebuild_table_in_batches(
+                connection, cursor, table, create_sql, select_columns, progress
+            )
 
     @staticmethod
-    def migration_3(connection, cursor):
+    def migration_3(
+        connection, cursor, progress=None
+    ):  # pylint: disable=unused-argument
         """
         Fix Patrons.TotalCredits to have DEFAULT 0.
 
@@ -259,3 +385,326 @@ class DatabaseMigrator:
             raise
         finally:
             cursor.execute("PRAGMA foreign_keys = ON")
+
+    @staticmethod
+    def migration_4(
+        connection, cursor, progress=None
+    ):  # pylint: disable=unused-argument
+        """
+        Add covering indexes for the hot DatabaseConnector lookups.
+
+        Transactions are looked up by PatronID (history, statistics, removal),
+        TransactionItems by TransactionID and Patrons by EmployeeID (RFID
+        card login). Without indexes each of these is a full table scan.
+        """
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_patron_date "
+            "ON Transactions (PatronID, TransactionDate)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transaction_items_transaction "
+            "ON TransactionItems (TransactionID, ItemName, Quantity, PricePerItem)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_patrons_employee_id "
+            "ON Patrons (EmployeeID)"
+        )
+        connection.commit()
+
+    @staticmethod
+    def migration_5(
+        connection, cursor, progress=None
+    ):  # pylint: disable=unused-argument
+        """
+        Add the single row StoreStats table and backfill it from the raw tables.
+
+        From this version on DatabaseConnector keeps the counters up to date
+        on every write, so the store statistics screen no longer has to walk
+        every patron's transactions.
+        """
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS StoreStats ("
+            "StatsID INTEGER PRIMARY KEY CHECK (StatsID = 1), "
+            "SoldCount INTEGER NOT NULL DEFAULT 0, "
+            "StoreRevenue INTEGER NOT NULL DEFAULT 0, "
+            "GamblingRevenue INTEGER NOT NULL DEFAULT 0, "
+            "GamblingReturns INTEGER NOT NULL DEFAULT 0, "
+            "AddedCount INTEGER NOT NULL DEFAULT 0, "
+            "AddedValue INTEGER NOT NULL DEFAULT 0, "
+            "LostCount INTEGER NOT NULL DEFAULT 0, "
+            "LostValue INTEGER NOT NULL DEFAULT 0)"
+        )
+        cursor.execute("DELETE FROM StoreStats")
+        cursor.execute(
+            """
+            INSERT INTO StoreStats (
+                StatsID, SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns,
+                AddedCount, AddedValue, LostCount, LostValue
+            )
+            SELECT 1,
+                (SELECT IFNULL(SUM(i.Quantity), 0) FROM TransactionItems i
+                    JOIN Transactions t ON t.TransactionID = i.TransactionID
+                    WHERE t.TransactionType = 'PURCHASE'),
+                (SELECT IFNULL(SUM(AmountBeforeTransaction - AmountAfterTransaction), 0)
+                    FROM Transactions WHERE TransactionType = 'PURCHASE'),
+                (SELECT IFNULL(SUM(AmountBeforeTransaction - AmountAfterTransaction), 0)
+                    FROM Transactions WHERE TransactionType = 'GAMBLE'),
+                (SELECT IFNULL(SUM(i.PricePerItem), 0) FROM TransactionItems i
+                    JOIN Transactions t ON t.TransactionID = i.TransactionID
+                    WHERE t.TransactionType = 'GAMBLE'),
+                (SELECT IFNULL(SUM(Quantity), 0) FROM AddedSnacks),
+                (SELECT IFNULL(SUM(Value), 0) FROM AddedSnacks),
+                (SELECT IFNULL(SUM(Quantity), 0) FROM LostSnacks),
+                (SELECT IFNULL(SUM(Value), 0) FROM LostSnacks)
+            """
+        )
+        connection.commit()
+
+    @staticmethod
+    def migration_6(
+        connection, cursor, progress=None
+    ):  # pylint: disable=unused-argument
+        """
+        Add the PatronSnackCounts table and backfill it from the transaction history.
+
+        getMostPurchasedSnacksByPatron reads the ranking from this table
+        instead of aggregating over all of a patron's TransactionItems.
+        """
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS PatronSnackCounts ("
+            "PatronID INTEGER NOT NULL, "
+            "ItemName TEXT NOT NULL, "
+            "TotalQuantity INTEGER NOT NULL, "
+            "LastPurchased TEXT NOT NULL, "
+            "PRIMARY KEY (PatronID, ItemName))"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_patron_snack_counts_rank "
+            "ON PatronSnackCounts "
+            "(PatronID, TotalQuantity DESC, LastPurchased DESC, ItemName)"
+        )
+        cursor.execute("DELETE FROM PatronSnackCounts")
+        cursor.execute(
+            """
+            INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased)
+            SELECT t.PatronID, i.ItemName, SUM(i.Quantity), MAX(t.TransactionDate)
+            FROM TransactionItems i
+            JOIN Transactions t ON t.TransactionID = i.TransactionID
+            GROUP BY t.PatronID, i.ItemName
+            """
+        )
+        connection.commit()
+
+    @staticmethod
+    def _text_date_to_epoch_microseconds(column: str) -> str:
+        """
+        SQL expression converting a "%Y-%m-%d %H:%M:%S.%f" text date to
+        microseconds since 1970-01-01. Dates without a fractional part (the
+        sqlite3 datetime adapter drops it when the microsecond is 0) get 0.
+        """
+        return (
+            f"CAST(strftime('%s', {column}) AS INTEGER) * 1000000 + "
+            f"CAST(substr(substr({column}, 21) || '000000', 1, 6) AS INTEGER)"
+        )
+
+    @staticmethod
+    def _get_checkpoint(cursor, table: str):
+        """The last rowid copied by an interrupted rebuild of table, or None."""
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS MigrationCheckpoints ("
+            "TableName TEXT PRIMARY KEY, LastRowid INTEGER NOT NULL)"
+        )
+        cursor.execute(
+            "SELECT LastRowid FROM MigrationCheckpoints WHERE TableName = ?", (table,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (f"{table}_new",),
+        )
+        return row[0] if cursor.fetchone() is not None else None
+
+    @staticmethod
+    def _rebuild_table_in_batches(
+        connection,
+        cursor,
+        table: str,
+        create_sql: str,
+        select_columns: list,
+        progress: Callable[[str, int, int], None] = None,
+    ):
+        """
+        Rebuild table from create_sql, copying its rows in rowid ranges of
+        MIGRATION_BATCH_SIZE.
+
+        create_sql must create "<table>_new". select_columns are the SQL
+        expressions selected from the old table, in the column order of the
+        new table. Every batch is committed on its own, together with the
+        last copied rowid in MigrationCheckpoints, so the journal stays small
+        and an interrupted rebuild resumes after the last committed batch.
+        The old table is only swapped out once all rows are copied.
+
+        Args:
+            progress: Called with (table, copied rows, total rows) after
+                every batch.
+        """
+        new_table = f"{table}_new"
+        last_rowid = DatabaseMigrator._get_checkpoint(cursor, table)
+        if last_rowid is None:
+            last_rowid = -1
+            cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+            cursor.execute(create_sql)
+            cursor.execute(
+                "INSERT OR REPLACE INTO MigrationCheckpoints (TableName, LastRowid) "
+                "VALUES (?, ?)",
+                (table, last_rowid),
+            )
+            connection.commit()
+        else:
+            logger.info("Resuming rebuild of %s after rowid %d", table, last_rowid)
+
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        total = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE rowid <= ?", (last_rowid,))
+        copied = cursor.fetchone()[0]
+        while True:
+            cursor.execute(
+                f"SELECT MAX(r), COUNT(*) FROM (SELECT rowid AS r FROM {table} "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                (last_rowid, DatabaseMigrator.MIGRATION_BATCH_SIZE),
+            )
+            batch_last_rowid, batch_count = cursor.fetchone()
+            if batch_count == 0:
+                break
+            cursor.execute(
+                f"INSERT INTO {new_table} SELECT {', '.join(select_columns)} "
+                f"FROM {table} WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+                (last_rowid, batch_last_rowid),
+            )
+            cursor.execute(
+                "UPDATE MigrationCheckpoints SET LastRowid = ? WHERE TableName = ?",
+                (batch_last_rowid, table),
+            )
+            connection.commit()
+            last_rowid = batch_last_rowid
+            copied += batch_count
+            logger.debug("Copied %d of %d rows of %s", copied, total, table)
+            if progress is not None:
+                progress(table, copied, total)
+
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        try:
+            cursor.execute("BEGIN")
+            cursor.execute(f"DROP TABLE {table}")
+            cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+            cursor.execute(
+                "DELETE FROM MigrationCheckpoints WHERE TableName = ?", (table,)
+            )
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            cursor.execute("PRAGMA foreign_keys = ON")
+
+    @staticmethod
+    def _get_column_type(cursor, table: str, column: str) -> str:
+        cursor.execute(f"PRAGMA table_info('{table}')")
+        for col in cursor.fetchall():
+            if col[1] == column:
+                return col[2].upper()
+        return None
+
+    @staticmethod
+    def migration_7(connection, cursor, progress=None):
+        """
+        Convert TransactionDate, AddedDate, LostDate and LastPurchased from
+        text to INTEGER microseconds since 1970-01-01.
+
+        Decoding an integer is much cheaper than parsing a date string for
+        every history row, and date range filters become index range scans.
+        SQLite cannot change the type of a column, so the four tables are
+        rebuilt, copying their rows in batches. Tables that already store
+        INTEGER dates are skipped.
+        """
+        to_epoch = DatabaseMigrator._text_date_to_epoch_microseconds
+
+        rebuilds = [
+            (
+                "Transactions",
+                "TransactionDate",
+                "CREATE TABLE Transactions_new ("
+                "TransactionID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "TransactionType TEXT NOT NULL, PatronID INTEGER NOT NULL, "
+                "TransactionDate INTEGER NOT NULL, "
+                "AmountBeforeTransaction INTEGER NOT NULL, "
+                "AmountAfterTransaction INTEGER NOT NULL, "
+                "FOREIGN KEY(PatronID) REFERENCES Patrons(PatronID))",
+                [
+                    "TransactionID",
+                    "TransactionType",
+                    "PatronID",
+                    to_epoch("TransactionDate"),
+                    "AmountBeforeTransaction",
+                    "AmountAfterTransaction",
+                ],
+            ),
+            (
+                "AddedSnacks",
+                "AddedDate",
+                "CREATE TABLE AddedSnacks_new ("
+                "AddedID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "SnackName TEXT NOT NULL, AddedDate INTEGER NOT NULL, "
+                "Quantity INTEGER NOT NULL, Value INTEGER NOT NULL)",
+                ["AddedID", "SnackName", to_epoch("AddedDate"), "Quantity", "Value"],
+            ),
+            (
+                "LostSnacks",
+                "LostDate",
+                "CREATE TABLE LostSnacks_new ("
+                "LostID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "SnackName TEXT NOT NULL, Reason INTEGER NOT NULL, "
+                "LostDate INTEGER NOT NULL, Quantity INTEGER NOT NULL, "
+                "Value INTEGER NOT NULL)",
+                [
+                    "LostID",
+                    "SnackName",
+                    "Reason",
+                    to_epoch("LostDate"),
+                    "Quantity",
+                    "Value",
+                ],
+            ),
+            (
+                "PatronSnackCounts",
+                "LastPurchased",
+                "CREATE TABLE PatronSnackCounts_new ("
+                "PatronID INTEGER NOT NULL, ItemName TEXT NOT NULL, "
+                "TotalQuantity INTEGER NOT NULL, LastPurchased INTEGER NOT NULL, "
+                "PRIMARY KEY (PatronID, ItemName))",
+                ["PatronID", "ItemName", "TotalQuantity", to_epoch("LastPurchased")],
+            ),
+        ]
+        for table, date_column, create_sql, select_columns in rebuilds:
+            if (
+                DatabaseMigrator._get_column_type(cursor, table, date_column)
+                == "INTEGER"
+            ):
+                continue
+            DatabaseMigrator._rebuild_table_in_batches(
+                connection, cursor, table, create_sql, select_columns, progress
+            )
+
+        # Dropping the old tables dropped their indexes as well
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_patron_date "
+            "ON Transactions (PatronID, TransactionDate)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_patron_snack_counts_rank "
+            "ON PatronSnackCounts "
+            "(PatronID, TotalQuantity DESC, LastPurchased DESC, ItemName)"
+        )
+        connection.commit()
@@ -1,62 +1,263 @@
+"""
+The RFID card reader of the kiosk, as one service running for the whole
+session.
+
+Provides:
+- RFIDReader: Reads cards on a thread of its own and routes each card to the
+  callback of the screen currently shown.
+- AdaptivePollInterval: Poll interval that is short right after activity and
+  backs off while the reader is idle.
+- MFRC522CardReader: The MFRC522 reader of the Pi, polled or woken by its IRQ
+  pin.
+- MockCardReader: Reader without hardware, cards are presented from code.
+- mock_gpio(): Whether to use the MockCardReader.
+
+Screens do not start and stop the reader. They are routes: addRoute(name,
+callback) makes callback receive the cards read while the screen called
+name is shown, and the screen manager calls setActiveRoute on every screen
+change. While the shown screen has no route the reader thread sleeps and
+the reader is not polled at all.
+
+Set RFID_IRQ_PIN to the board pin wired to the IRQ of the MFRC522 to have
+it wake the reader thread instead of polling it.
+"""
+
 import os
 import platform
+import queue
 import threading
+from time import monotonic, perf_counter
+from typing import Callable, Optional
 
-from kivy.clock import Clock
+from database_writer import scheduleOnClock
 from logger import get_logger
+from metrics import LatencyStats
 
 
 logger = get_logger(__name__)
 
+IRQ_PIN_ENV = "RFID_IRQ_PIN"
+
+
+# Values of MOCK_RFID_READER that turn the mock reader on, case insensitive
+MOCK_RFID_READER_VALUES = {"1", "y", "yes", "on", "true"}
+
 
-# TODO make better
 def mock_gpio() -> bool:
+    """
+    Whether there is no MFRC522 to read: on Windows, on GitHub Actions and
+    when MOCK_RFID_READER asks for the mock reader.
+    """
     if platform.system() == "Windows":
         return True
 
-    if os.getenv("MOCK_RFID_READER") in [
-        "1",
-        "y",
-        "yes",
-        "Y",
-        "YES",
-        "on",
-        "ON",
-        "true",
-        "True",
-        "TRUE",
-    ]:
-        return True
-
-    if os.getenv("GITHUB_ACTIONS") == "true":
+    if os.getenv("MOCK_RFID_READER", "").lower() in MOCK_RFID_READER_VALUES:
         return True
 
-    return False
+    return os.getenv("GITHUB_ACTIONS") == "true"
 
 
 if mock_gpio():
-    # Fake class for emulation
-    class SimpleMFRC522:
-        def read_id_no_block(self):
-            pass
-
-    class GPIO:
-        @staticmethod
-        def cleanup():
-            logger.debug("GPIO cleanup called")
-
+    # Only the MockCardReader is used, MFRC522CardReader is never created
+    SimpleMFRC522 = GPIO = None
 else:
     from mfrc522 import SimpleMFRC522
     from RPi import GPIO
 
 
-class RFIDReader:
-    def __init__(self):
+class AdaptivePollInterval:
+    """
+    The time to wait between two polls of the reader. It is fast for
+    fastFor seconds after the last activity, then grows by backoff per poll
+    up to slow.
+    """
+
+    def __init__(
+        self,
+        fast: float = 0.05,
+        slow: float = 0.25,
+        fastFor: float = 10.0,
+        backoff: float = 1.25,
+        clock: Callable[[], float] = monotonic,
+    ):
+        assert 0 < fast <= slow
+        assert backoff >= 1.0
+        self.fast = fast
+        self.slow = slow
+        self.fastFor = fastFor
+        self.backoff = backoff
+        self.clock = clock
+        self.current = fast
+        self._lastActivity = clock()
+
+    def activity(self):
+        """A card was read or someone is using the kiosk, poll fast again."""
+        self._lastActivity = self.clock()
+        self.current = self.fast
+
+    def next(self) -> float:
+        if self.clock() - self._lastActivity >= self.fastFor:
+            self.current = min(self.slow, self.current * self.backoff)
+        return self.current
+
+
+class MFRC522CardReader:
+    """
+    The MFRC522 on the SPI bus. Without irqPin the card reads are polled.
+    With irqPin the reader sends a card request and the IRQ line going low
+    tells a card answered it, so the thread sleeps until a card is near.
+    """
+
+    # MFRC522 registers and commands, see the MFRC522 data sheet
+    COM_I_EN_REG = 0x02
+    COM_IRQ_REG = 0x04
+    FIFO_DATA_REG = 0x09
+    COMMAND_REG = 0x01
+    BIT_FRAMING_REG = 0x0D
+    PCD_TRANSCEIVE = 0x0C
+    PICC_REQIDL = 0x26
+
+    def __init__(self, irqPin: int = None):
+        self.reader = SimpleMFRC522()
+        self.irqPin = irqPin
+        self._irq = threading.Event()
+        if irqPin is not None:
+            GPIO.setup(irqPin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.add_event_detect(
+                irqPin, GPIO.FALLING, callback=lambda _pin: self._irq.set()
+            )
+
+    def read_id_no_block(self) -> Optional[str]:
+        cardId = self.reader.read_id_no_block()
+        return None if cardId is None else str(cardId)
+
+    def wait_for_card(self, timeout: float) -> bool:
+        """Request a card and wait up to timeout for one to answer."""
+        device = self.reader.READER
+        self._irq.clear()
+        # Clear the interrupts, then interrupt (active low) on received data
+        device.Write_MFRC522(self.COM_IRQ_REG, 0x00)
+        device.Write_MFRC522(self.COM_I_EN_REG, 0xA0)
+        device.Write_MFRC522(self.FIFO_DATA_REG, self.PICC_REQIDL)
+        device.Write_MFRC522(self.COMMAND_REG, self.PCD_TRANSCEIVE)
+        # Send the 7 bit request frame
+        device.Write_MFRC522(self.BIT_FRAMING_REG, 0x87)
+        answered = self._irq.wait(timeout)
+        device.MFRC522_Init()
+        return answered
+
+    def close(self):
+        if self.irqPin is not None:
+            GPIO.remove_event_detect(self.irqPin)
+        GPIO.cleanup()
+
+
+class MockCardReader:
+    """A reader for machines without one, present(cardId) taps a card."""
+
+    def __init__(self, irqPin: int = None):
+        self.irqPin = irqPin
+        self._cards: queue.SimpleQueue[str] = queue.SimpleQueue()
+        self._irq = threading.Event()
+
+    def present(self, cardId: str):
+        """Tap cardId on the reader, it is read by the next poll."""
+        self._cards.put(str(cardId))
+        self._irq.set()
+
+    def read_id_no_block(self) -> Optional[str]:
+        try:
+            return self._cards.get_nowait()
+        except queue.Empty:
+            self._irq.clear()
+            return None
+
+    def wait_for_card(self, timeout: float) -> bool:
+        return self._irq.wait(timeout)
+
+    def close(self):
+        logger.debug("GPIO cleanup called")
+
+
+def _irqPinFromEnvironment() -> Optional[int]:
+    value = os.getenv(IRQ_PIN_ENV)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.error("Ignoring %s=%r, expected a board pin number", IRQ_PIN_ENV, value)
+        return None
+
+
+class RFIDReader:  # pylint: disable=too-many-instance-attributes
+    """
+    Reads cards on a thread for as long as the app runs and hands each card
+    to the callback of the active route, on the main thread. A card is
+    handed over once, until the route changes or clearLastReadId() is
+    called.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        pollInterval: AdaptivePollInterval = None,
+        dispatch: Callable[[Callable[[], None]], None] = scheduleOnClock,
+    ):
+        """
+        Args:
+            backend: The card reader, by default the MFRC522, or a
+                MockCardReader when mock_gpio() is true. Created by start().
+            dispatch: Runs a callback on the main thread.
+        """
+        self.backend = backend
+        self.pollInterval = pollInterval or AdaptivePollInterval()
+        self.dispatch = dispatch
         self.reader_thread = None
         self.running = threading.Event()
         self.last_read_id = None
-        self.callback = None
+        # route -> callback(cardId), only used from the main thread
+        self._routes: dict[str, Callable[[str], None]] = {}
+        self._activeRoute: str = None
+        # Set while the active route takes cards, the reader thread waits
+        # for it otherwise
+        self._routed = threading.Event()
         self._lock = threading.Lock()
+        # From a card being read to its route's callback being called
+        self.readToCallbackStats = LatencyStats()
+        self._polls = 0
+        self._pollsSince = monotonic()
+
+    def addRoute(self, route: str, callback: Callable[[str], None]):
+        """Have callback(cardId) receive the cards read while route is active."""
+        assert route not in self._routes, f"Route {route} already added"
+        self._routes[route] = callback
+        if route == self._activeRoute:
+            self.setActiveRoute(route)
+
+    def removeRoute(self, route: str):
+        self._routes.pop(route, None)
+        if route == self._activeRoute:
+            self.setActiveRoute(route)
+
+    def setActiveRoute(self, route: str):
+        """Route the cards read from now on to route, usually a screen name."""
+        self._activeRoute = route
+        self.clearLastReadId()
+        if route in self._routes:
+            self.pollInterval.activity()
+            self._routed.set()
+        else:
+            self._routed.clear()
+
+    @property
+    def callback(self) -> Optional[Callable[[str], None]]:
+        """The callback of the active route, if it has one."""
+        return self._routes.get(self._activeRoute)
+
+    def activity(self):
+        """Someone is using the kiosk and may tap a card, poll fast."""
+        self.pollInterval.activity()
 
     def triggerFakeRead(self, card_id="12345678"):
         """Trigger a fake RFID read."""
@@ -76,53 +277,97 @@ class RFIDReader:
             self.callback(card_id)
             self.last_read_id = card_id
 
-    def start(self, callback_function):
-        """Start the RFID reader in a separate thread."""
-        self.callback = callback_function
-
-        def reader_task():
-            reader = SimpleMFRC522()
-            try:
-                while not self.running.is_set():
-                    card_id = reader.read_id_no_block()
-                    if card_id is not None and not isinstance(card_id, str):
-                        card_id = str(card_id)
-                    if (
-                        card_id is not None
-                        and card_id != self.last_read_id
-                        and self.callback
-                    ):
-                        Clock.schedule_once(lambda dt: self.callback(card_id), 0)
-                        self.last_read_id = card_id
-                    self.running.wait(0.1)  # Add a small sleep to reduce CPU load
-            except RuntimeError as e:
-                logger.error("RFID runtime error: %s", e, exc_info=True)
-            except IOError as e:
-                logger.error("RFID I/O error: %s", e, exc_info=True)
-            finally:
-                if platform.system() != "Windows":
-                    GPIO.cleanup()
-
-        logger.info("RFID reader thread starting...")
-        self.clearLastReadId()
+    def start(self):
+        """Start reading cards, once for the whole session."""
+        if self.reader_thread is not None and self.reader_thread.is_alive():
+            return
+        if self.backend is None:
+            irqPin = _irqPinFromEnvironment()
+            self.backend = (
+                MockCardReader(irqPin) if mock_gpio() else MFRC522CardReader(irqPin)
+            )
         self.running.clear()
         self.reader_thread = threading.Thread(
-            target=reader_task, daemon=True, name="RFID reader thread"
+            target=self._readCards, daemon=True, name="RFID reader thread"
         )
         self.reader_thread.start()
-        logger.info("RFID reader thread started")
+        logger.info(
+            "RFID reader started (%s, %s)",
+            type(self.backend).__name__,
+            "IRQ" if self.backend.irqPin is not None else "polling",
+        )
 
     def stop(self):
-        """Stop the RFID reader."""
-        logger.info("Stopping RFID reader...")
+        """Stop reading cards and release the reader."""
         self.running.set()
-        if self.reader_thread and self.reader_thread.is_alive():
+        # Wake the thread if it waits for a route
+        self._routed.set()
+        if self.reader_thread is not None and self.reader_thread.is_alive():
             self.reader_thread.join()
-        if platform.system() != "Windows":
-            GPIO.cleanup()
-        self.clearLastReadId()
-        self.callback = None
-        logger.info("RFID reader stopped")
+        self.reader_thread = None
+        logger.info("RFID reader stopped: %s", self.getStats())
 
     def clearLastReadId(self):
         self.last_read_id = None
+
+    def getStats(self) -> dict:
+        """
+        The reader's polling rate since the previous call and the read to
+        callback latency of every card so far.
+        """
+        now = monotonic()
+        elapsed = now - self._pollsSince
+        polls, self._polls, self._pollsSince = self._polls, 0, now
+        return {
+            "mode": (
+                "irq"
+                if getattr(self.backend, "irqPin", None) is not None
+                else "polling"
+            ),
+            "poll_interval_ms": self.pollInterval.current * 1000,
+            "polls_per_second": polls / elapsed if elapsed > 0 else 0.0,
+            "read_to_callback": self.readToCallbackStats.as_dict(),
+        }
+
+    def _readCards(self):
+        useIrq = self.backend.irqPin is not None
+        try:
+            while not self.running.is_set():
+                self._routed.wait()
+                if self.running.is_set():
+                    break
+                interval = self.pollInterval.next()
+                if useIrq and not self.backend.wait_for_card(interval):
+                    continue
+                self._polls += 1
+                cardId = self.backend.read_id_no_block()
+                if cardId is not None and cardId != self.last_read_id:
+                    readAt = perf_counter()
+                    self.pollInterval.activity()
+                    self.dispatch(
+                        lambda cardId=cardId, readAt=readAt: self._deliver(
+                            cardId, readAt
+                        )
+                    )
+                if not useIrq:
+                    self.running.wait(interval)
+        except RuntimeError as e:
+            logger.error("RFID runtime error: %s", e, exc_info=True)
+        except IOError as e:
+            logger.error("RFID I/O error: %s", e, exc_info=True)
+        finally:
+            self.backend.close()
+
+    def _deliver(self, cardId: str, readAt: float):
+        with self._lock:
+            callback = self.callback
+            if callback is None or cardId == self.last_read_id:
+                return
+            self.last_read_id = cardId
+            self.readToCallbackStats.record(perf_counter() - readAt)
+            logger.debug(
+                "Card routed to %s %.1f ms after being read",
+                self._activeRoute,
+                self.readToCallbackStats.last_seconds * 1000,
+            )
+            callback(cardId)
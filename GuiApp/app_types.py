@@ -1,5 +1,6 @@
-from decimal import ROUND_HALF_UP, Decimal
-from datetime import datetime
+import operator
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from datetime import datetime, timedelta
 from enum import Enum
 
 
@@ -8,6 +9,8 @@ class TransactionType(Enum):
     TOP_UP = "TOP_UP"
     EDIT = "EDIT"
     GAMBLE = "GAMBLE"
+    # Sums up a patron's archived transactions, see transaction_archive
+    CARRY_FORWARD = "CARRY_FORWARD"
 
 
 class LostSnackReason(Enum):
@@ -32,6 +35,17 @@ class LogLevel(Enum):
         return self.name
 
 
+class StorageProfile(Enum):
+    """SQLite storage profiles with a display name for the UI."""
+
+    SD_CARD_SAFE = "sd-card-safe"
+    DURABLE = "durable"
+    IN_MEMORY_TEST = "in-memory-test"
+
+    def display_name(self):
+        return self.name.replace("_", " ").title()
+
+
 def transactionTypeToPresentableString(transactionType: TransactionType) -> str:
     if transactionType == TransactionType.PURCHASE:
         return "Purchase"
@@ -41,110 +55,303 @@ def transactionTypeToPresentableString(transactionType: TransactionType) -> str:
         return "Edit"
     if transactionType == TransactionType.GAMBLE:
         return "Gamble"
+    if transactionType == TransactionType.CARRY_FORWARD:
+        return "Carried forward"
     return "Unknown"
 
 
+# Dates are stored as INTEGER microseconds since this epoch. The datetimes
+# are naive local time, so the epoch is naive as well.
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def toEpochMicroseconds(date: datetime) -> int:
+    return (date - EPOCH) // MICROSECOND
+
+
+def fromEpochMicroseconds(microseconds: int) -> datetime:
+    """
+    Decode a date stored by toEpochMicroseconds.
+
+    A single timedelta addition, much cheaper than parsing a date string
+    for every history row.
+    """
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
 TWODECIMALS = Decimal("0.00")
 
 
-class Credits(Decimal):
-    """A custom Decimal that always stays at 2 decimal places."""
+def _divide_round_half_up(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded to an integer like ROUND_HALF_UP."""
+    quotient, remainder = divmod(abs(numerator), abs(denominator))
+    if 2 * remainder >= abs(denominator):
+        quotient += 1
+    if (numerator < 0) != (denominator < 0):
+        return -quotient
+    return quotient
+
+
+class Credits:
+    """
+    An amount of credits with exactly 2 decimal places.
+
+    Stored as an integer number of hundredths, so adding, subtracting and
+    multiplying by integers is exact integer arithmetic without any rounding.
+    Values are created from anything Decimal accepts and rounded ROUND_HALF_UP,
+    mixing in floats or Decimals falls back to Decimal arithmetic.
+    """
+
+    __slots__ = ("_hundredths",)
 
     def __new__(cls, value):
-        quantized = Decimal(value).quantize(TWODECIMALS, rounding=ROUND_HALF_UP)
-        return super().__new__(cls, str(quantized))
+        self = super().__new__(cls)
+        if isinstance(value, Credits):
+            self._hundredths = value._hundredths
+        elif isinstance(value, int):
+            self._hundredths = value * 100
+        else:
+            quantized = Decimal(value).quantize(TWODECIMALS, rounding=ROUND_HALF_UP)
+            if not quantized.is_finite():
+                raise InvalidOperation(f"Credits must be finite, got {value!r}")
+            self._hundredths = int(quantized.scaleb(2))
+        return self
+
+    @classmethod
+    def from_hundredths(cls, hundredths: int) -> "Credits":
+        self = object.__new__(cls)
+        self._hundredths = 0 if hundredths is None else hundredths
+        return self
+
+    def to_hundredths(self) -> int:
+        return self._hundredths
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self._hundredths).scaleb(-2)
+
+    def __reduce__(self):
+        return (Credits.from_hundredths, (self._hundredths,))
 
-    def _as_credits(self, value):
-        return Credits(value)
+    @staticmethod
+    def _as_hundredths(value):
+        """The hundredths of an exact value, or None if value is not exact."""
+        if isinstance(value, Credits):
+            return value.to_hundredths()
+        if isinstance(value, int):
+            return value * 100
+        return None
 
     def __add__(self, other):
-        return self._as_credits(Decimal(self) + Decimal(other))
+        if isinstance(other, Credits):
+            return Credits.from_hundredths(self._hundredths + other._hundredths)
+        hundredths = self._as_hundredths(other)
+        if hundredths is None:
+            return Credits(self.to_decimal() + Decimal(other))
+        return Credits.from_hundredths(self._hundredths + hundredths)
 
     def __radd__(self, other):
-        return self._as_credits(Decimal(other) + Decimal(self))
+        return self.__add__(other)
 
     def __sub__(self, other):
-        return self._as_credits(Decimal(self) - Decimal(other))
+        if isinstance(other, Credits):
+            return Credits.from_hundredths(self._hundredths - other._hundredths)
+        hundredths = self._as_hundredths(other)
+        if hundredths is None:
+            return Credits(self.to_decimal() - Decimal(other))
+        return Credits.from_hundredths(self._hundredths - hundredths)
 
     def __rsub__(self, other):
-        return self._as_credits(Decimal(other) - Decimal(self))
+        return -self.__sub__(other)
 
     def __mul__(self, other):
-        return self._as_credits(Decimal(self) * Decimal(other))
+        if isinstance(other, Credits):
+            return Credits.from_hundredths(
+                _divide_round_half_up(self._hundredths * other._hundredths, 100)
+            )
+        if isinstance(other, int):
+            return Credits.from_hundredths(self._hundredths * other)
+        return Credits(self.to_decimal() * Decimal(other))
 
     def __rmul__(self, other):
-        return self._as_credits(Decimal(other) * Decimal(self))
+        return self.__mul__(other)
 
     def __truediv__(self, other):
-        result = (Decimal(self) / Decimal(other)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        if isinstance(other, Credits):
+            return Credits.from_hundredths(
+                _divide_round_half_up(self._hundredths * 100, other._hundredths)
+            )
+        if isinstance(other, int):
+            return Credits.from_hundredths(
+                _divide_round_half_up(self._hundredths, other)
+            )
+        return Credits(self.to_decimal() / Decimal(other))
 
     def __rtruediv__(self, other):
-        result = (Decimal(other) / Decimal(self)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        if isinstance(other, int):
+            return Credits.from_hundredths(
+                _divide_round_half_up(other * 10000, self._hundredths)
+            )
+        return Credits(Decimal(other) / self.to_decimal())
 
-    def __neg__(self):
-        return self._as_credits(-Decimal(self))
-
-    def __pos__(self):
-        return self._as_credits(+Decimal(self))
+    # Floor division and modulo keep Decimal semantics (truncating towards
+    # zero), they are rarely used so they simply go through Decimal
 
-    def __abs__(self):
-        return self._as_credits(abs(Decimal(self)))
+    def _to_decimal_operand(self, value) -> Decimal:
+        if isinstance(value, Credits):
+            return value.to_decimal()
+        return Decimal(value)
 
     def __floordiv__(self, other):
-        result = (Decimal(self) // Decimal(other)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        return Credits(self.to_decimal() // self._to_decimal_operand(other))
 
     def __rfloordiv__(self, other):
-        result = (Decimal(other) // Decimal(self)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        return Credits(self._to_decimal_operand(other) // self.to_decimal())
 
     def __mod__(self, other):
-        result = (Decimal(self) % Decimal(other)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        return Credits(self.to_decimal() % self._to_decimal_operand(other))
 
     def __rmod__(self, other):
-        result = (Decimal(other) % Decimal(self)).quantize(
-            TWODECIMALS, rounding=ROUND_HALF_UP
-        )
-        return Credits(result)
+        return Credits(self._to_decimal_operand(other) % self.to_decimal())
 
-    def to_hundredths(self) -> int:
-        return int((Decimal(self) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    def __neg__(self):
+        return Credits.from_hundredths(-self._hundredths)
 
-    @classmethod
-    def from_hundredths(cls, hundredths: int) -> "Credits":
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Credits.from_hundredths(abs(self._hundredths))
+
+    def _compare(self, other, compare):
+        hundredths = self._as_hundredths(other)
         if hundredths is None:
-            return cls("0.00")
-        return cls(hundredths / 100)
+            return compare(self.to_decimal(), other)
+        return compare(self._hundredths, hundredths)
+
+    # Comparing two Credits is the common case, check for it first
+
+    def __eq__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths == other._hundredths
+        return self._compare(other, operator.eq)
+
+    def __ne__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths != other._hundredths
+        return self._compare(other, operator.ne)
+
+    def __lt__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths < other._hundredths
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths <= other._hundredths
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths > other._hundredths
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        if isinstance(other, Credits):
+            return self._hundredths >= other._hundredths
+        return self._compare(other, operator.ge)
+
+    def __hash__(self):
+        # Equal to the hash of the equal Decimal, int or float
+        return hash(self.to_decimal())
+
+    def __bool__(self):
+        return self._hundredths != 0
+
+    def __int__(self):
+        return int(self.to_decimal())
+
+    def __float__(self):
+        return self._hundredths / 100
+
+    def __round__(self, ndigits=None):
+        return round(self.to_decimal(), ndigits)
+
+    def __str__(self):
+        # Old style formatting is measurably faster than an f-string here
+        # pylint: disable=consider-using-f-string
+        if self._hundredths < 0:
+            return "-%d.%02d" % divmod(-self._hundredths, 100)
+        return "%d.%02d" % divmod(self._hundredths, 100)
+
+    def __repr__(self):
+        return f"Credits('{self}')"
+
+    def __format__(self, format_spec):
+        # The format used all over the UI, formatted like __str__ without
+        # going through Decimal
+        # pylint: disable=consider-using-f-string
+        if format_spec == ".2f" or not format_spec:
+            if self._hundredths < 0:
+                return "-%d.%02d" % divmod(-self._hundredths, 100)
+            return "%d.%02d" % divmod(self._hundredths, 100)
+        return format(self.to_decimal(), format_spec)
+
+
+# The record constructors check their argument types. Production turns the
+# checks off with set_record_validation(False), the tests keep them on.
+_validateRecords = True
+
+
+def set_record_validation(enabled: bool):
+    """Turn the type checks in the UserData, SnackData and HistoryData
+    constructors on or off. The from_row constructors never validate."""
+    global _validateRecords  # pylint: disable=global-statement
+    _validateRecords = enabled
+
+
+def is_record_validation_enabled() -> bool:
+    return _validateRecords
 
 
 class UserData:
+    __slots__ = ("patronId", "firstName", "lastName", "employeeID", "totalCredits")
+
     def __init__(self, patronId, firstName, lastName, employeeID, totalCredits):
-        assert isinstance(patronId, int)
-        assert isinstance(firstName, str)
-        assert isinstance(lastName, str)
-        assert isinstance(employeeID, str)
-        assert isinstance(totalCredits, Credits)
+        if _validateRecords:
+            assert isinstance(patronId, int)
+            assert isinstance(firstName, str)
+            assert isinstance(lastName, str)
+            assert isinstance(employeeID, str)
+            assert isinstance(totalCredits, Credits)
         self.patronId: int = patronId
         self.firstName: str = firstName
         self.lastName: str = lastName
         self.employeeID: str = employeeID
         self.totalCredits: Credits = totalCredits
 
+    @classmethod
+    def from_row(cls, row: tuple) -> "UserData":
+        """
+        Build a UserData from a trusted row of the Patrons table,
+        (PatronID, FirstName, LastName, EmployeeID, TotalCredits), without
+        validating it.
+        """
+        userData = cls.__new__(cls)
+        (
+            userData.patronId,
+            userData.firstName,
+            userData.lastName,
+            userData.employeeID,
+            totalCredits,
+        ) = row
+        userData.totalCredits = Credits.from_hundredths(totalCredits)
+        return userData
+
 
 class SnackData:
+    __slots__ = ("snackId", "snackName", "quantity", "imageID", "pricePerItem")
+
     def __init__(
         self,
         snackId: int,
@@ -153,19 +360,51 @@ class SnackData:
         imageID: str,
         pricePerItem: Credits,
     ):
-        assert isinstance(snackId, int)
-        assert isinstance(snackName, str)
-        assert isinstance(quantity, int)
-        assert isinstance(imageID, str)
-        assert isinstance(pricePerItem, Credits)
+        if _validateRecords:
+            assert isinstance(snackId, int)
+            assert isinstance(snackName, str)
+            assert isinstance(quantity, int)
+            assert isinstance(imageID, str)
+            assert isinstance(pricePerItem, Credits)
         self.snackId: int = snackId
         self.snackName: str = snackName
         self.quantity: int = quantity
         self.imageID: str = imageID
         self.pricePerItem: Credits = pricePerItem
 
+    @classmethod
+    def from_row(cls, row: tuple) -> "SnackData":
+        """
+        Build a SnackData from a trusted row of the Snacks table,
+        (ItemID, ItemName, Quantity, ImageID, PricePerItem), without
+        validating it.
+        """
+        snackData = cls.__new__(cls)
+        (
+            snackData.snackId,
+            snackData.snackName,
+            snackData.quantity,
+            snackData.imageID,
+            pricePerItem,
+        ) = row
+        snackData.pricePerItem = Credits.from_hundredths(pricePerItem)
+        return snackData
+
+
+# TransactionType(value) goes through the Enum machinery, a dict is faster
+_TRANSACTION_TYPES_BY_VALUE = {t.value: t for t in TransactionType}
+
 
 class HistoryData:
+    __slots__ = (
+        "transactionId",
+        "transactionType",
+        "transactionDate",
+        "amountBeforeTransaction",
+        "amountAfterTransaction",
+        "transactionItems",
+    )
+
     def __init__(
         self,
         transactionId: int,
@@ -175,15 +414,69 @@ class HistoryData:
         amountAfterTransaction: Credits,
         transactionItems: list[SnackData],
     ):
-        assert isinstance(transactionId, int)
-        assert isinstance(transactionType, TransactionType)
-        assert isinstance(transactionDate, datetime)
-        assert isinstance(amountBeforeTransaction, Credits)
-        assert isinstance(amountAfterTransaction, Credits)
-        assert isinstance(transactionItems, list)
+        if _validateRecords:
+            assert isinstance(transactionId, int)
+            assert isinstance(transactionType, TransactionType)
+            assert isinstance(transactionDate, datetime)
+            assert isinstance(amountBeforeTransaction, Credits)
+            assert isinstance(amountAfterTransaction, Credits)
+            assert isinstance(transactionItems, list)
         self.transactionId: int = transactionId
         self.transactionType: TransactionType = transactionType
         self.transactionDate: datetime = transactionDate
         self.amountBeforeTransaction: Credits = amountBeforeTransaction
         self.amountAfterTransaction: Credits = amountAfterTransaction
         self.transactionItems: list[SnackData] = transactionItems
+
+    @classmethod
+    def from_row(
+        cls, row: tuple, transactionItems: list[SnackData] = None
+    ) -> "HistoryData":
+        """
+        Build a HistoryData from a trusted row of the Transactions table,
+        (TransactionID, TransactionType, TransactionDate,
+        AmountBeforeTransaction, AmountAfterTransaction), without validating
+        it. Any columns after those five are ignored.
+
+        transactionItems defaults to a new empty list.
+        """
+        historyData = cls.__new__(cls)
+        historyData.transactionId = row[0]
+        historyData.transactionType = _TRANSACTION_TYPES_BY_VALUE[row[1]]
+        historyData.transactionDate = fromEpochMicroseconds(row[2])
+        historyData.amountBeforeTransaction = Credits.from_hundredths(row[3])
+        historyData.amountAfterTransaction = Credits.from_hundredths(row[4])
+        historyData.transactionItems = (
+            [] if transactionItems is None else transactionItems
+        )
+        return historyData
+
+
+class StoreStatsData:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        soldCount: int,
+        storeRevenue: Credits,
+        gamblingRevenue: Credits,
+        gamblingReturns: Credits,
+        addedCount: int,
+        addedValue: Credits,
+        lostCount: int,
+        lostValue: Credits,
+    ):
+        assert isinstance(soldCount, int)
+        assert isinstance(storeRevenue, Credits)
+        assert isinstance(gamblingRevenue, Credits)
+        assert isinstance(gamblingReturns, Credits)
+        assert isinstance(addedCount, int)
+        assert isinstance(addedValue, Credits)
+        assert isinstance(lostCount, int)
+        assert isinstance(lostValue, Credits)
+        self.soldCount: int = soldCount
+        self.storeRevenue: Credits = storeRevenue
+        self.gamblingRevenue: Credits = gamblingRevenue
+        self.gamblingReturns: Credits = gamblingReturns
+        self.addedCount: int = addedCount
+        self.addedValue: Credits = addedValue
+        self.lostCount: int = lostCount
+        self.lostValue: Credits = lostValue
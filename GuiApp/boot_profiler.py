@@ -0,0 +1,145 @@
+"""
+Instrumentation of the boot, from main.py being imported to the first frame.
+
+Provides:
+- BootTimeline: Named boot phases with monotonic timestamps, logged as a
+  timeline once the first frame is drawn.
+- ImportTimer: Times the imports of the heavy packages (kivy, qrcode, PIL,
+  the widgets) while installed as the import hook.
+- bootTimeline: The timeline of this process, started when this module is
+  first imported. main.py imports it before anything else.
+
+Setting SNACKATTACK_BOOT_PROFILE to a file path also runs the boot under
+cProfile and writes the pstats to that file at the first frame:
+
+    SNACKATTACK_BOOT_PROFILE=boot.pstats python GuiApp/main.py
+    python -m pstats boot.pstats
+"""
+
+import builtins
+import cProfile
+import os
+import sys
+from time import perf_counter
+
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+BOOT_PROFILE_ENV = "SNACKATTACK_BOOT_PROFILE"
+HEAVY_PACKAGES = ("kivy", "qrcode", "PIL", "widgets")
+
+
+class ImportTimer:
+    """
+    Replaces builtins.__import__ to add up the time spent importing each of
+    packages, dependencies included. An import from within another timed
+    import counts towards the outer one only.
+    """
+
+    def __init__(self, packages=HEAVY_PACKAGES):
+        self.packages = frozenset(packages)
+        # package -> seconds
+        self.seconds: dict[str, float] = {}
+        self._original = None
+        self._timing = False
+
+    def install(self):
+        assert self._original is None, "Import timer already installed"
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, *args, **kwargs):
+        package = name.partition(".")[0]
+        if self._timing or package not in self.packages or name in sys.modules:
+            return self._original(name, *args, **kwargs)
+        self._timing = True
+        started = perf_counter()
+        try:
+            return self._original(name, *args, **kwargs)
+        finally:
+            self._timing = False
+            self.seconds[package] = (
+                self.seconds.get(package, 0.0) + perf_counter() - started
+            )
+
+
+class BootTimeline:
+    """
+    The boot as a list of phases. mark(name) ends the phase called name,
+    which started where the previous one ended, and finish() logs them all.
+    Marks after finish() are ignored, so code running again later, like a
+    second app in the tests, does not add to the boot.
+    """
+
+    def __init__(self, profilePath: str = None):
+        self.started = perf_counter()
+        self.finished = False
+        # (phase, seconds from start to the end of the phase)
+        self.phases: list[tuple[str, float]] = []
+        self.importTimer = ImportTimer()
+        self.importTimer.install()
+        self.profilePath = profilePath
+        self._profiler = None
+        if profilePath:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def mark(self, phase: str):
+        if not self.finished:
+            self.phases.append((phase, perf_counter() - self.started))
+
+    def finish(self, phase: str = "first frame"):
+        """End the last phase and the boot, and log the timeline."""
+        if self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        self.importTimer.uninstall()
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profilePath)
+            logger.info("Boot profile written to %s", self.profilePath)
+        logger.info("%s", self.summary())
+
+    def as_dict(self) -> dict:
+        previous = 0.0
+        phases = []
+        for phase, end in self.phases:
+            phases.append(
+                {"phase": phase, "at_ms": end * 1000, "ms": (end - previous) * 1000}
+            )
+            previous = end
+        return {
+            "total_ms": previous * 1000,
+            "phases": phases,
+            "imports_ms": {
+                package: seconds * 1000
+                for package, seconds in self.importTimer.seconds.items()
+            },
+        }
+
+    def summary(self) -> str:
+        report = self.as_dict()
+        lines = [f"Boot timeline, {report['total_ms']:.0f} ms in total:"]
+        for phase in report["phases"]:
+            lines.append(
+                f"  {phase['phase']:<24}{phase['ms']:>8.1f} ms"
+                f"   (at {phase['at_ms']:.1f} ms)"
+            )
+        if report["imports_ms"]:
+            imports = sorted(report["imports_ms"].items(), key=lambda item: -item[1])
+            lines.append(
+                "  imports: "
+                + ", ".join(f"{package} {ms:.1f} ms" for package, ms in imports)
+            )
+        return "\n".join(lines)
+
+
+bootTimeline = BootTimeline(profilePath=os.environ.get(BOOT_PROFILE_ENV) or None)
@@ -0,0 +1,483 @@
+"""
+Bulk CSV import and export for the DatabaseConnector.
+
+Provides:
+- BulkImportError: A CSV row that failed validation.
+- ImportReport: How many rows an import inserted and updated.
+- importPatrons(), importSnacks(), importRestocks(): Upsert CSV rows with
+  chunked executemany, without committing.
+- streamRows(): Stream the rows of a query with fetchmany.
+- writeCsv(): Write a header and a stream of rows as CSV.
+- The *_EXPORT queries and headers used by the DatabaseConnector exports.
+
+The import functions only write through the cursor they are given. The
+DatabaseConnector runs a whole import in one transaction and rolls it back
+if any row is invalid, so an import either lands completely or not at all.
+"""
+
+import csv
+import sqlite3
+from datetime import datetime
+from decimal import InvalidOperation
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+from app_types import (
+    Credits,
+    TransactionType,
+    fromEpochMicroseconds,
+    toEpochMicroseconds,
+)
+
+
+# Rows per executemany and per fetchmany
+CHUNK_SIZE = 500
+
+# The ImageID of a snack without an image, like the add snack screen uses
+NO_IMAGE_ID = "None"
+
+
+class BulkImportError(Exception):
+    """Raised for a CSV row that fails validation, nothing is imported."""
+
+    def __init__(self, lineNumber: int, message: str):
+        super().__init__(f"Line {lineNumber}: {message}")
+        self.lineNumber = lineNumber
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted: int = 0
+        self.updated: int = 0
+
+    @property
+    def rows(self) -> int:
+        return self.inserted + self.updated
+
+    def as_dict(self) -> dict:
+        return {"rows": self.rows, "inserted": self.inserted, "updated": self.updated}
+
+
+def _readCsvRows(
+    csvFile: TextIO, requiredColumns: tuple, optionalColumns: tuple = ()
+) -> Iterator[tuple[int, dict]]:
+    """
+    Stream the rows of csvFile as (line number, row). Columns other than
+    requiredColumns and optionalColumns are ignored, missing optional
+    columns and empty cells are None.
+    """
+    reader = csv.DictReader(csvFile)
+    header = reader.fieldnames or []
+    missing = [column for column in requiredColumns if column not in header]
+    if missing:
+        raise BulkImportError(1, f"Missing column(s) {', '.join(missing)}")
+    for row in reader:
+        values = {}
+        for column in requiredColumns + optionalColumns:
+            value = (row.get(column) or "").strip()
+            values[column] = value if value else None
+        yield reader.line_num, values
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _requireText(lineNumber: int, row: dict, column: str) -> str:
+    if row[column] is None:
+        raise BulkImportError(lineNumber, f"{column} is empty")
+    return row[column]
+
+
+def _parseQuantity(lineNumber: int, row: dict, column: str, minimum: int) -> int:
+    try:
+        quantity = int(_requireText(lineNumber, row, column))
+    except ValueError as e:
+        raise BulkImportError(
+            lineNumber, f"{column} '{row[column]}' is not a whole number"
+        ) from e
+    if quantity < minimum:
+        raise BulkImportError(lineNumber, f"{column} must be at least {minimum}")
+    return quantity
+
+
+def _parseCredits(lineNumber: int, row: dict, column: str) -> Credits:
+    """Parse an amount of credits, None if the cell is empty."""
+    if row[column] is None:
+        return None
+    try:
+        amount = Credits(row[column])
+    except (InvalidOperation, ValueError) as e:
+        raise BulkImportError(
+            lineNumber, f"{column} '{row[column]}' is not an amount of credits"
+        ) from e
+    if amount < 0:
+        raise BulkImportError(lineNumber, f"{column} cannot be negative")
+    return amount
+
+
+def _lastRowPerKey(chunk: list[tuple], keyIndex: int) -> list[tuple]:
+    """Keep the last row of every key, a later row overrides an earlier one."""
+    return list({row[keyIndex]: row for row in chunk}.values())
+
+
+def _lowestIdsByKey(cursor: sqlite3.Cursor, query: str) -> dict:
+    """
+    Map key to the lowest ID for a query selecting (ID, key). Keys are not
+    unique in the tables, like the rest of the app the lowest ID wins.
+    """
+    idsByKey = {}
+    for rowId, key in cursor.execute(query).fetchall():
+        if key not in idsByKey or rowId < idsByKey[key]:
+            idsByKey[key] = rowId
+    return idsByKey
+
+
+def _maxId(cursor: sqlite3.Cursor, idColumn: str, table: str) -> int:
+    return cursor.execute(f"SELECT IFNULL(MAX({idColumn}), 0) FROM {table}").fetchone()[
+        0
+    ]
+
+
+def _creditsByPatronId(cursor: sqlite3.Cursor, patronIds: list[int]) -> dict:
+    placeholders = ", ".join("?" * len(patronIds))
+    return dict(
+        cursor.execute(
+            f"SELECT PatronID, TotalCredits FROM Patrons "
+            f"WHERE PatronID IN ({placeholders})",
+            patronIds,
+        ).fetchall()
+    )
+
+
+def _recordCreditEdits(
+    cursor: sqlite3.Cursor, edits: list[tuple[int, int, int]], editDate: datetime
+):
+    """
+    Record an EDIT transaction, like the edit user screen does, for every
+    (PatronID, credits before, credits after) whose credits changed.
+    """
+    cursor.executemany(
+        """
+        INSERT INTO Transactions (TransactionType, PatronID, TransactionDate,
+            AmountBeforeTransaction, AmountAfterTransaction)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (TransactionType.EDIT.value, patronId, editDate, before, after)
+            for patronId, before, after in edits
+            if after is not None and after != before
+        ],
+    )
+
+
+def importPatrons(
+    cursor: sqlite3.Cursor,
+    csvFile: TextIO,
+    editDate: datetime,
+    chunkSize: int = CHUNK_SIZE,
+) -> ImportReport:
+    """
+    Upsert patrons from a CSV with the columns FirstName, LastName,
+    EmployeeID and optionally TotalCredits, keyed on EmployeeID.
+
+    An existing patron gets the new names, and the new TotalCredits if the
+    cell is not empty. A new patron starts with TotalCredits or 0. Every
+    change of a patron's credits is recorded as an EDIT transaction at
+    editDate.
+    """
+    report = ImportReport()
+    patronIds = _lowestIdsByKey(cursor, "SELECT PatronID, EmployeeID FROM Patrons")
+
+    def parse(lineNumber: int, row: dict) -> tuple:
+        totalCredits = _parseCredits(lineNumber, row, "TotalCredits")
+        return (
+            _requireText(lineNumber, row, "FirstName"),
+            _requireText(lineNumber, row, "LastName"),
+            _requireText(lineNumber, row, "EmployeeID"),
+            None if totalCredits is None else totalCredits.to_hundredths(),
+        )
+
+    rows = _readCsvRows(
+        csvFile, ("FirstName", "LastName", "EmployeeID"), ("TotalCredits",)
+    )
+    for chunk in _chunks((parse(*row) for row in rows), chunkSize):
+        chunk = _lastRowPerKey(chunk, keyIndex=2)
+        updates = [row for row in chunk if row[2] in patronIds]
+        inserts = [row for row in chunk if row[2] not in patronIds]
+        creditsBefore = _creditsByPatronId(
+            cursor, [patronIds[row[2]] for row in updates]
+        )
+        cursor.executemany(
+            """
+            UPDATE Patrons SET FirstName = ?, LastName = ?,
+                TotalCredits = IFNULL(?, TotalCredits)
+            WHERE PatronID = ?
+            """,
+            [
+                (firstName, lastName, totalCredits, patronIds[employeeID])
+                for firstName, lastName, employeeID, totalCredits in updates
+            ],
+        )
+        lastPatronId = _maxId(cursor, "PatronID", "Patrons")
+        cursor.executemany(
+            """
+            INSERT INTO Patrons (FirstName, LastName, EmployeeID, TotalCredits)
+            VALUES (?, ?, ?, IFNULL(?, 0))
+            """,
+            inserts,
+        )
+        if inserts:
+            # Later chunks update the patrons this chunk inserted
+            patronIds.update(
+                _lowestIdsByKey(
+                    cursor,
+                    f"SELECT PatronID, EmployeeID FROM Patrons "
+                    f"WHERE PatronID > {lastPatronId}",
+                )
+            )
+        _recordCreditEdits(
+            cursor,
+            [
+                (
+                    patronIds[employeeID],
+                    creditsBefore.get(patronIds[employeeID], 0),
+                    totalCredits,
+                )
+                for _, _, employeeID, totalCredits in updates + inserts
+            ],
+            toEpochMicroseconds(editDate),
+        )
+        report.updated += len(updates)
+        report.inserted += len(inserts)
+    return report
+
+
+def _upsertSnackChunk(
+    cursor: sqlite3.Cursor,
+    chunk: list[tuple],
+    snackIds: dict,
+    isRestock: bool,
+    report: ImportReport,
+):
+    """
+    Upsert rows of (ItemName, Quantity, ImageID, PricePerItem) keyed on
+    ItemName. A restock adds Quantity to the stock of the snack, otherwise
+    Quantity replaces it. An empty ImageID or PricePerItem keeps the
+    existing one. snackIds is updated with the inserted snacks.
+    """
+    updates = [row for row in chunk if row[0] in snackIds]
+    inserts = {}
+    for itemName, quantity, imageID, pricePerItem in chunk:
+        if itemName in snackIds:
+            continue
+        if itemName in inserts:
+            # Only restocks repeat a snack within a chunk, they add up
+            quantity += inserts[itemName][1]
+        inserts[itemName] = (itemName, quantity, imageID, pricePerItem)
+    quantityUpdate = "Quantity + ?" if isRestock else "?"
+    lastItemId = _maxId(cursor, "ItemID", "Snacks")
+    cursor.executemany(
+        f"""
+        UPDATE Snacks SET Quantity = {quantityUpdate},
+            ImageID = IFNULL(?, ImageID),
+            PricePerItem = IFNULL(?, PricePerItem)
+        WHERE ItemID = ?
+        """,
+        [
+            (quantity, imageID, pricePerItem, snackIds[itemName])
+            for itemName, quantity, imageID, pricePerItem in updates
+        ],
+    )
+    cursor.executemany(
+        """
+        INSERT INTO Snacks (ItemName, Quantity, ImageID, PricePerItem)
+        VALUES (?, ?, IFNULL(?, ?), ?)
+        """,
+        [
+            (itemName, quantity, imageID, NO_IMAGE_ID, pricePerItem)
+            for itemName, quantity, imageID, pricePerItem in inserts.values()
+        ],
+    )
+    if inserts:
+        snackIds.update(
+            _lowestIdsByKey(
+                cursor,
+                f"SELECT ItemID, ItemName FROM Snacks WHERE ItemID > {lastItemId}",
+            )
+        )
+    report.updated += len(updates)
+    report.inserted += len(inserts)
+
+
+def _parseSnack(lineNumber: int, row: dict, minimumQuantity: int, knownSnacks: set):
+    """
+    Parse the snack columns of a row. knownSnacks are the snacks that do not
+    need a PricePerItem, the snack of the row is added to it.
+    """
+    itemName = _requireText(lineNumber, row, "ItemName")
+    pricePerItem = _parseCredits(lineNumber, row, "PricePerItem")
+    if pricePerItem is None and itemName not in knownSnacks:
+        raise BulkImportError(
+            lineNumber, f"PricePerItem of the new snack {itemName} is empty"
+        )
+    knownSnacks.add(itemName)
+    return (
+        itemName,
+        _parseQuantity(lineNumber, row, "Quantity", minimumQuantity),
+        row["ImageID"],
+        None if pricePerItem is None else pricePerItem.to_hundredths(),
+    )
+
+
+def importSnacks(
+    cursor: sqlite3.Cursor, csvFile: TextIO, chunkSize: int = CHUNK_SIZE
+) -> ImportReport:
+    """
+    Upsert snacks from a CSV with the columns ItemName, Quantity and
+    optionally ImageID and PricePerItem, keyed on ItemName. PricePerItem
+    is required for new snacks.
+    """
+    report = ImportReport()
+    snackIds = _lowestIdsByKey(cursor, "SELECT ItemID, ItemName FROM Snacks")
+    knownSnacks = set(snackIds)
+    rows = _readCsvRows(csvFile, ("ItemName", "Quantity"), ("ImageID", "PricePerItem"))
+    snacks = (_parseSnack(*row, 0, knownSnacks) for row in rows)
+    for chunk in _chunks(snacks, chunkSize):
+        # A later row of the same snack overrides an earlier one
+        chunk = _lastRowPerKey(chunk, keyIndex=0)
+        _upsertSnackChunk(cursor, chunk, snackIds, False, report)
+    return report
+
+
+def importRestocks(
+    cursor: sqlite3.Cursor,
+    csvFile: TextIO,
+    addedDate: datetime,
+    chunkSize: int = CHUNK_SIZE,
+) -> tuple[ImportReport, int, Credits]:
+    """
+    Restock snacks from a CSV with the columns ItemName, Quantity, Value
+    (the total paid) and optionally ImageID and PricePerItem, keyed on
+    ItemName. Like add_added_snack, every row is recorded in AddedSnacks.
+    PricePerItem is required for new snacks.
+
+    Returns:
+        The report and the total quantity and value added, for StoreStats.
+    """
+    report = ImportReport()
+    snackIds = _lowestIdsByKey(cursor, "SELECT ItemID, ItemName FROM Snacks")
+    knownSnacks = set(snackIds)
+    addedCount = 0
+    addedValue = 0
+
+    def parse(lineNumber: int, row: dict) -> tuple:
+        snack = _parseSnack(lineNumber, row, 1, knownSnacks)
+        value = _parseCredits(lineNumber, row, "Value")
+        if value is None:
+            raise BulkImportError(lineNumber, "Value is empty")
+        added = (snack[0], toEpochMicroseconds(addedDate), snack[1])
+        return snack, added + (value.to_hundredths(),)
+
+    rows = _readCsvRows(
+        csvFile, ("ItemName", "Quantity", "Value"), ("ImageID", "PricePerItem")
+    )
+    for chunk in _chunks((parse(*row) for row in rows), chunkSize):
+        _upsertSnackChunk(cursor, [snack for snack, _ in chunk], snackIds, True, report)
+        cursor.executemany(
+            """
+            INSERT INTO AddedSnacks (SnackName, AddedDate, Quantity, Value)
+            VALUES (?, ?, ?, ?)
+            """,
+            [added for _, added in chunk],
+        )
+        addedCount += sum(added[2] for _, added in chunk)
+        addedValue += sum(added[3] for _, added in chunk)
+    return report, addedCount, Credits.from_hundredths(addedValue)
+
+
+def streamRows(
+    cursor: sqlite3.Cursor, query: str, chunkSize: int = CHUNK_SIZE
+) -> Iterator[tuple]:
+    """Stream the rows of query, at most chunkSize rows are held at once."""
+    cursor.execute(query)
+    while True:
+        rows = cursor.fetchmany(chunkSize)
+        if not rows:
+            return
+        yield from rows
+
+
+def writeCsv(csvFile: TextIO, header: tuple, rows: Iterable[tuple]) -> int:
+    """Write header and rows to csvFile. Returns the number of rows."""
+    writer = csv.writer(csvFile)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def formatCredits(hundredths: int) -> str:
+    return str(Credits.from_hundredths(hundredths))
+
+
+def formatDate(microseconds: int) -> str:
+    return fromEpochMicroseconds(microseconds).isoformat(sep=" ")
+
+
+# (query, header, formatter per column) of every export. The exports use
+# the import column names, so an exported file can be imported again.
+PATRONS_EXPORT = (
+    "SELECT PatronID, FirstName, LastName, EmployeeID, TotalCredits "
+    "FROM Patrons ORDER BY PatronID",
+    ("PatronID", "FirstName", "LastName", "EmployeeID", "TotalCredits"),
+    (None, None, None, None, formatCredits),
+)
+SNACKS_EXPORT = (
+    "SELECT ItemID, ItemName, Quantity, ImageID, PricePerItem "
+    "FROM Snacks ORDER BY ItemID",
+    ("ItemID", "ItemName", "Quantity", "ImageID", "PricePerItem"),
+    (None, None, None, None, formatCredits),
+)
+TRANSACTIONS_EXPORT = (
+    "SELECT TransactionID, TransactionType, PatronID, TransactionDate, "
+    "AmountBeforeTransaction, AmountAfterTransaction "
+    "FROM Transactions ORDER BY TransactionID",
+    (
+        "TransactionID",
+        "TransactionType",
+        "PatronID",
+        "TransactionDate",
+        "AmountBeforeTransaction",
+        "AmountAfterTransaction",
+    ),
+    (None, None, None, formatDate, formatCredits, formatCredits),
+)
+TRANSACTION_ITEMS_EXPORT = (
+    "SELECT TransactionItemId, TransactionID, ItemName, Quantity, PricePerItem "
+    "FROM TransactionItems ORDER BY TransactionItemId",
+    ("TransactionItemId", "TransactionID", "ItemName", "Quantity", "PricePerItem"),
+    (None, None, None, None, formatCredits),
+)
+
+
+def exportCsv(
+    cursor: sqlite3.Cursor, csvFile: TextIO, export: tuple, chunkSize: int = CHUNK_SIZE
+) -> int:
+    """Stream one of the *_EXPORT queries to csvFile. Returns the row count."""
+    query, header, formatters = export
+    rows = (
+        tuple(
+            value if formatter is None or value is None else formatter(value)
+            for value, formatter in zip(row, formatters)
+        )
+        for row in streamRows(cursor, query, chunkSize)
+    )
+    return writeCsv(csvFile, header, rows)
@@ -0,0 +1,98 @@
+"""
+In-memory card ID to patron resolver for the DatabaseConnector.
+
+Provides:
+- CardResolver: Every patron keyed by PatronID with an index from card ID
+  (EmployeeID) to PatronID.
+
+The DatabaseConnector loads the resolver once when it opens the database and
+updates it after every committed write to the Patrons table, so resolving an
+RFID card never has to query SQLite.
+"""
+
+from bisect import insort
+
+from app_types import Credits, UserData
+
+
+def copyPatron(patron: UserData) -> UserData:
+    return UserData(
+        patron.patronId,
+        patron.firstName,
+        patron.lastName,
+        patron.employeeID,
+        patron.totalCredits,
+    )
+
+
+class CardResolver:
+    """
+    UserData keyed by PatronID, with an index from card ID to PatronID.
+
+    Card IDs are not unique in the Patrons table. Like the query it replaces,
+    a card shared by several patrons resolves to the one with the lowest
+    PatronID. The resolver only hands out copies of its UserData.
+    """
+
+    def __init__(self):
+        self._patronsById: dict[int, UserData] = {}
+        # The PatronIDs of every card in ascending order, the first one wins
+        self._patronIdsByCardId: dict[str, list[int]] = {}
+        # The reverse of the index, so a patron's old card is found in O(1)
+        self._cardIdsByPatronId: dict[int, str] = {}
+
+    def load(self, patrons: list[UserData]):
+        """Replace the resolver with every row of the Patrons table."""
+        self._patronsById = {}
+        self._patronIdsByCardId = {}
+        self._cardIdsByPatronId = {}
+        for patron in sorted(patrons, key=lambda p: p.patronId):
+            self._patronsById[patron.patronId] = copyPatron(patron)
+            self._patronIdsByCardId.setdefault(patron.employeeID, []).append(
+                patron.patronId
+            )
+            self._cardIdsByPatronId[patron.patronId] = patron.employeeID
+
+    def resolve(self, cardId: str) -> UserData:
+        """Get a copy of the patron with cardId, or None if there is none."""
+        patronId = self.getPatronId(cardId)
+        if patronId is None:
+            return None
+        return copyPatron(self._patronsById[patronId])
+
+    def getPatronId(self, cardId: str) -> int:
+        patronIds = self._patronIdsByCardId.get(cardId)
+        return patronIds[0] if patronIds else None
+
+    def put(self, patron: UserData):
+        self._patronsById[patron.patronId] = copyPatron(patron)
+        oldCardId = self._cardIdsByPatronId.get(patron.patronId)
+        if oldCardId == patron.employeeID:
+            return
+        if oldCardId is not None:
+            self._unindexCard(oldCardId, patron.patronId)
+        insort(
+            self._patronIdsByCardId.setdefault(patron.employeeID, []),
+            patron.patronId,
+        )
+        self._cardIdsByPatronId[patron.patronId] = patron.employeeID
+
+    def remove(self, patronId: int):
+        self._patronsById.pop(patronId, None)
+        cardId = self._cardIdsByPatronId.pop(patronId, None)
+        if cardId is not None:
+            self._unindexCard(cardId, patronId)
+
+    def setCredits(self, patronId: int, totalCredits: Credits):
+        patron = self._patronsById.get(patronId)
+        if patron is not None:
+            patron.totalCredits = totalCredits
+
+    def _unindexCard(self, cardId: str, patronId: int):
+        patronIds = self._patronIdsByCardId[cardId]
+        patronIds.remove(patronId)
+        if not patronIds:
+            del self._patronIdsByCardId[cardId]
+
+    def __len__(self) -> int:
+        return len(self._patronsById)
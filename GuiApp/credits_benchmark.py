@@ -0,0 +1,96 @@
+"""
+Micro-benchmark of the Credits money type.
+
+Compares the integer-hundredths Credits in app_types with DecimalCredits,
+the Decimal subclass Credits used to be, on the operations the UI runs in
+loops (building values from the database, summing prices, formatting).
+
+Run from the repository root:
+    python GuiApp/credits_benchmark.py
+"""
+
+import argparse
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+from app_types import TWODECIMALS, Credits
+
+
+# Kept as it was in app_types
+# pylint: disable=arguments-differ,signature-differs
+class DecimalCredits(Decimal):
+    """The previous Decimal based Credits, kept as the benchmark baseline."""
+
+    def __new__(cls, value):
+        quantized = Decimal(value).quantize(TWODECIMALS, rounding=ROUND_HALF_UP)
+        return super().__new__(cls, str(quantized))
+
+    def _as_credits(self, value):
+        return DecimalCredits(value)
+
+    def __add__(self, other):
+        return self._as_credits(Decimal(self) + Decimal(other))
+
+    def __radd__(self, other):
+        return self._as_credits(Decimal(other) + Decimal(self))
+
+    def __sub__(self, other):
+        return self._as_credits(Decimal(self) - Decimal(other))
+
+    def __mul__(self, other):
+        return self._as_credits(Decimal(self) * Decimal(other))
+
+    def to_hundredths(self) -> int:
+        return int((Decimal(self) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+    @classmethod
+    def from_hundredths(cls, hundredths: int) -> "DecimalCredits":
+        if hundredths is None:
+            return cls("0.00")
+        return cls(hundredths / 100)
+
+
+def _cases(creditsType):
+    prices = [creditsType.from_hundredths(h) for h in range(125, 1125)]
+    price = creditsType("12.50")
+    return {
+        "from_hundredths": lambda: creditsType.from_hundredths(1234),
+        "to_hundredths": price.to_hundredths,
+        "add": lambda: price + price,
+        "subtract": lambda: price - price,
+        "multiply by int": lambda: price * 3,
+        "sum 1000 prices": lambda: sum(prices, creditsType("0.00")),
+        "format .2f": lambda: f"{price:.2f}",
+        "compare": lambda: price < prices[-1],
+    }
+
+
+def run(number: int) -> list[tuple[str, float, float]]:
+    """Time every case, returns (case, old µs per op, new µs per op)."""
+    oldCases = _cases(DecimalCredits)
+    newCases = _cases(Credits)
+    results = []
+    for name, oldCase in oldCases.items():
+        oldSeconds = min(timeit.repeat(oldCase, number=number, repeat=5))
+        newSeconds = min(timeit.repeat(newCases[name], number=number, repeat=5))
+        results.append((name, oldSeconds / number * 1e6, newSeconds / number * 1e6))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--number", type=int, default=2000, help="Calls per timing (default 2000)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'case':<18}{'Decimal µs':>12}{'int µs':>12}{'speedup':>10}")
+    for name, oldMicroseconds, newMicroseconds in run(args.number):
+        print(
+            f"{name:<18}{oldMicroseconds:>12.3f}{newMicroseconds:>12.3f}"
+            f"{oldMicroseconds / newMicroseconds:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,354 @@
+import os
 import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from typing import Callable, TextIO
 
+import bulk_io
+from bulk_io import ImportReport
+from card_resolver import CardResolver
+from database_writer import DatabaseWriter
 from DatabaseMigrator import DatabaseMigrator
 from logger import get_logger
+from snack_catalog import SnackCatalog
+from storage_profiles import (
+    CommitStats,
+    apply_storage_profile,
+    read_active_pragmas,
+)
+from transaction_archive import (
+    ARCHIVE_SCHEMA,
+    ArchiveReport,
+    attachArchive,
+    clearArchive,
+    copyTransactionsToArchive,
+    removeArchivedTransactions,
+    replaceWithCarryForwards,
+    transactionSources,
+)
 from app_types import (
     Credits,
     HistoryData,
     LostSnackReason,
     SnackData,
+    StorageProfile,
+    StoreStatsData,
     TransactionType,
     UserData,
+    toEpochMicroseconds,
 )
 
 
-# Disable too-many-public-methods for database class
-# pylint: disable=too-many-public-methods
+# Disable too-many-public-methods and too-many-instance-attributes for database class
+# pylint: disable=too-many-public-methods,too-many-instance-attributes
+# pylint: disable=too-many-lines
 
 
 logger = get_logger(__name__)
 
 
+class CheckoutError(Exception):
+    """Base exception for a checkout or gamble that was rolled back."""
+
+
+class InsufficientStockError(CheckoutError):
+    """Raised when a snack does not have enough stock left."""
+
+
+class InsufficientCreditsError(CheckoutError):
+    """Raised when the patron cannot afford the fee."""
+
+
 class DatabaseConnector:
-    def __init__(self, database_path: str = "database.db"):
+    def __init__(
+        self,
+        database_path: str = "database.db",
+        storage_profile: StorageProfile = StorageProfile.DURABLE,
+        async_writes: bool = False,
+        archive_path: str = None,
+        migration_progress: Callable[[int, str, int, int], None] = None,
+    ):
+        """
+        Args:
+            async_writes: Run the writes submitted with submitWrite, like
+                checkoutAsync, on a DatabaseWriter thread with group commit
+                instead of on the calling thread.
+            archive_path: The database archiveTransactions moves old
+                transactions to. Defaults to <database>_archive.db next to
+                the database, in-memory databases have no archive.
+            migration_progress: Passed on to DatabaseMigrator.migrate_database
+                when the database needs a migration.
+        """
+        assert isinstance(storage_profile, StorageProfile)
+        assert isinstance(async_writes, bool)
+        assert not (
+            async_writes and database_path == ":memory:"
+        ), "The writer thread cannot share an in-memory database"
+        self.database_path = database_path
+        if archive_path is None and database_path != ":memory:":
+            archive_path = os.path.splitext(database_path)[0] + "_archive.db"
+        self.archive_path = archive_path
+        self.isArchiveAttached = False
+        self.isClosed = False
+        self.writer: DatabaseWriter = None
+        # Set while a submitted write runs on the writer thread, or a read
+        # run with readAsync on the reader thread
+        self._writerThread = threading.local()
+        # Runs readAsync, started by the first read
+        self._reader: ThreadPoolExecutor = None
+        # The reader thread's connection
+        self._readerThread = threading.local()
         self.connection = sqlite3.connect(database_path)
-        self.cursor = self.connection.cursor()
+        self._cursor = self.connection.cursor()
+        self.commit_stats = CommitStats()
+        self.snack_catalog = SnackCatalog()
+        self.card_resolver = CardResolver()
+        self.storage_profile = storage_profile
+        self.storage_profile_config = apply_storage_profile(
+            self.connection, storage_profile
+        )
+        logger.info(
+            "Database opened with storage profile '%s': %s",
+            storage_profile.value,
+            read_active_pragmas(self.connection),
+        )
         if DatabaseMigrator.needs_migration(cursor=self.cursor):
             logger.info("Database migration needed. Migrating database...")
             DatabaseMigrator.migrate_database(
-                connection=self.connection, cursor=self.cursor
+                connection=self.connection,
+                cursor=self.cursor,
+                progress=migration_progress,
             )
         self.createAllTables()
+        self.card_resolver.load(self.getAllPatrons())
+        if self.archive_path is not None and os.path.exists(self.archive_path):
+            self._attachArchive()
+        if async_writes:
+            self.writer = DatabaseWriter(database_path, storage_profile)
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """
+        The cursor of the calling thread.
+
+        A write submitted with submitWrite gets the writer thread's cursor,
+        a read run with readAsync the reader thread's. Everyone else gets the
+        main connection's cursor, once their queued writes are committed so
+        reads see the caller's own writes.
+        """
+        writerCursor = getattr(self._writerThread, "cursor", None)
+        if writerCursor is not None:
+            return writerCursor
+        self.flushWrites()
+        return self._cursor
+
+    def flushWrites(self):
+        """
+        Wait until the writes queued with submitWrite are committed and run
+        their apply callbacks, so the in-memory caches are up to date. Their
+        on_done callbacks are still left to the Clock.
+
+        Called by every read on the main thread, it returns right away when
+        no write is queued. Does nothing on the writer and reader threads.
+        """
+        onMainThread = getattr(self._writerThread, "cursor", None) is None
+        if self.writer is not None and onMainThread:
+            self.writer.flush()
 
     def close(self):
+        if self.isClosed:
+            return
+        self.isClosed = True
+        if self.writer is not None:
+            self.writer.close()
+        if self._reader is not None:
+            self._reader.submit(self._closeReaderConnection)
+            self._reader.shutdown(wait=True)
+        logger.info(
+            "Closing database (storage profile '%s'): %s",
+            self.storage_profile.value,
+            self.commit_stats.as_dict(),
+        )
+        if self.storage_profile_config.checkpoint_on_close:
+            self.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        # A cursor left with a statement keeps the database files open after
+        # the connection is closed, until the cursor is garbage collected
+        self._cursor.close()
         self.connection.close()
 
+    def _commit(self):
+        self.commit_stats.time_commit(self.connection)
+
+    def _attachArchive(self):
+        if self.isArchiveAttached:
+            return
+        # ATTACH cannot run inside a transaction
+        if self.connection.in_transaction:
+            self._commit()
+        attachArchive(self.cursor, self.archive_path)
+        apply_storage_profile(self.connection, self.storage_profile, ARCHIVE_SCHEMA)
+        self.isArchiveAttached = True
+
+    def set_storage_profile(self, storage_profile: StorageProfile) -> bool:
+        """
+        Switch the storage profile of the open connection.
+
+        Returns:
+            False if SQLite kept the old journal mode, e.g. when another
+            program has the database open while leaving WAL. The rest of the
+            profile is applied either way.
+        """
+        assert isinstance(storage_profile, StorageProfile)
+        # Leaving WAL needs the only connection to the database. The writer
+        # is reopened with the new profile, the reader reconnects by itself.
+        if self.writer is not None:
+            self.writer.close()
+        if self._reader is not None:
+            self._reader.submit(self._closeReaderConnection).result()
+        self._commit()
+        self.storage_profile = storage_profile
+        self.storage_profile_config = apply_storage_profile(
+            self.connection, storage_profile
+        )
+        if self.isArchiveAttached:
+            apply_storage_profile(self.connection, storage_profile, ARCHIVE_SCHEMA)
+        if self.writer is not None:
+            self.writer = DatabaseWriter(self.database_path, storage_profile)
+        self.commit_stats = CommitStats()
+        pragmas = read_active_pragmas(self.connection)
+        if pragmas["journal_mode"].upper() != self.storage_profile_config.journal_mode:
+            logger.warning(
+                "Storage profile changed to '%s' but SQLite kept journal_mode=%s: %s",
+                storage_profile.value,
+                pragmas["journal_mode"],
+                pragmas,
+            )
+            return False
+        logger.info(
+            "Storage profile changed to '%s': %s", storage_profile.value, pragmas
+        )
+        return True
+
+    def get_storage_report(self) -> dict:
+        """
+        Report the active storage profile, the pragmas SQLite is actually using
+        and the commit latency measured since the profile was applied.
+        """
+        report = {
+            "profile": self.storage_profile.value,
+            "pragmas": read_active_pragmas(self.connection),
+            **self.commit_stats.as_dict(),
+        }
+        if self.writer is not None:
+            report["writer"] = self.writer.get_report()
+        return report
+
+    def submitWrite(
+        self,
+        work: Callable[[], object],
+        apply: Callable[[object], None] = None,
+        on_done: Callable[[Future], None] = None,
+    ) -> Future:
+        """
+        Run work() as one unit of work and commit it.
+
+        work must only write through self.cursor and must not commit. Once
+        the write is committed, apply(result) updates the in-memory caches
+        and on_done(future) is called, both on the main thread. If work
+        raises, nothing it wrote is kept, apply is skipped and the future
+        holds the exception.
+
+        With async_writes work runs on the writer thread and is group
+        committed with the writes submitted around it, on_done is called
+        from the Kivy Clock. Without it everything, including on_done,
+        runs before submitWrite returns.
+
+        Returns:
+            The future of work's result.
+        """
+        if self.writer is not None:
+            return self.writer.submit(
+                lambda cursor: self._runOnWriterThread(work, cursor), apply, on_done
+            )
+
+        future = Future()
+        try:
+            result = work()
+        except Exception as e:  # pylint: disable=broad-except
+            self.connection.rollback()
+            future.set_exception(e)
+        else:
+            self._commit()
+            future.set_result(result)
+            if apply is not None:
+                apply(result)
+        if on_done is not None:
+            on_done(future)
+        return future
+
+    def _runOnWriterThread(self, work: Callable[[], object], cursor: sqlite3.Cursor):
+        self._writerThread.cursor = cursor
+        try:
+            return work()
+        finally:
+            self._writerThread.cursor = None
+
+    def readAsync(self, work: Callable[[], object]) -> Future:
+        """
+        Run work() on the reader thread, which has a connection of its own,
+        so a long read does not block the calling thread.
+
+        work must only read, through self.cursor, and must not use the
+        in-memory caches, they belong to the main thread. It sees the writes
+        committed when it starts. An in-memory database cannot be shared
+        with another connection, its reads run before readAsync returns.
+
+        Returns:
+            The future of work's result, completed on the reader thread.
+        """
+        if self.database_path == ":memory:":
+            future = Future()
+            try:
+                future.set_result(work())
+            except Exception as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+            return future
+
+        if self._reader is None:
+            self._reader = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="DatabaseReader"
+            )
+        return self._reader.submit(self._runOnReaderThread, work)
+
+    def _runOnReaderThread(self, work: Callable[[], object]):
+        connection = getattr(self._readerThread, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.database_path)
+            self._readerThread.connection = connection
+            self._readerThread.isArchiveAttached = False
+        cursor = connection.cursor()
+        if self.isArchiveAttached and not self._readerThread.isArchiveAttached:
+            attachArchive(cursor, self.archive_path)
+            self._readerThread.isArchiveAttached = True
+        self._writerThread.cursor = cursor
+        try:
+            return work()
+        finally:
+            self._writerThread.cursor = None
+            # Do not hold a read transaction open between reads
+            connection.rollback()
+
+    def _closeReaderConnection(self):
+        connection = getattr(self._readerThread, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._readerThread.connection = None
+
+    def get_snack_catalog_report(self) -> dict:
+        """Report the size and the hit/miss counters of the snack catalog."""
+        return self.snack_catalog.as_dict()
+
     def createAllTables(self):
 
         create_queries = [
@@ -68,7 +383,7 @@ class DatabaseConnector:
             # Table of all the transactions that have occurred
             # TransactionType is one of TransactionType enum
             # PatronID references Patrons.PatronID
-            # TransactionDate is stored as a string in the format "%Y-%m-%d %H:%M:%S.%f"
+            # TransactionDate is stored as microseconds since EPOCH (integer)
             # AmountBeforeTransaction is the amount of credits the patron had before the transaction in hundreths of a credit (integer)
             # AmountAfterTransaction is the amount of credits the patron had after the transaction in hundreths of a credit (integer)
             """
@@ -76,7 +391,7 @@ class DatabaseConnector:
                 TransactionID INTEGER PRIMARY KEY AUTOINCREMENT,
                 TransactionType TEXT NOT NULL,
                 PatronID INTEGER NOT NULL, 
-                TransactionDate TEXT NOT NULL, 
+                TransactionDate INTEGER NOT NULL, 
                 AmountBeforeTransaction INTEGER NOT NULL, 
                 AmountAfterTransaction INTEGER NOT NULL,
                 FOREIGN KEY(PatronID) REFERENCES Patrons(PatronID)
@@ -99,14 +414,14 @@ class DatabaseConnector:
             """,
             # Table of all added snacks to restock inventory
             # SnackName references Snacks.ItemName
-            # AddedDate is stored as a string in the format "%Y-%m-%d %H:%M:%S.%f"
+            # AddedDate is stored as microseconds since EPOCH (integer)
             # Quantity is the number of snacks added
             # Value is the total value of the added snacks in hundreths of a credit (integer)
             """
             CREATE TABLE IF NOT EXISTS AddedSnacks (
                 AddedID INTEGER PRIMARY KEY AUTOINCREMENT,
                 SnackName TEXT NOT NULL,
-                AddedDate TEXT NOT NULL,
+                AddedDate INTEGER NOT NULL,
                 Quantity INTEGER NOT NULL,
                 Value INTEGER NOT NULL
             );
@@ -114,7 +429,7 @@ class DatabaseConnector:
             # Table of all snacks cosidered stolen or lost
             # SnackName references Snacks.ItemName
             # Reason references LostSnackReason enum
-            # LostDate is stored as a string in the format "%Y-%m-%d %H:%M:%S.%f"
+            # LostDate is stored as microseconds since EPOCH (integer)
             # Quantity is the number of snacks lost
             # Value is the total value of the lost snacks in hundreths of a credit (integer)
             """
@@ -122,7 +437,7 @@ class DatabaseConnector:
                 LostID INTEGER PRIMARY KEY AUTOINCREMENT,
                 SnackName TEXT NOT NULL,
                 Reason INTEGER NOT NULL,
-                LostDate TEXT NOT NULL,
+                LostDate INTEGER NOT NULL,
                 Quantity INTEGER NOT NULL,
                 Value INTEGER NOT NULL
             );
@@ -134,29 +449,224 @@ class DatabaseConnector:
                 value TEXT NOT NULL
             );
             """,
+            # Single row of store statistics, kept up to date on every write
+            # GamblingReturns is the value of the snacks won by gambling
+            # Values are stored in hundredths of a credit, like everywhere else
+            """
+            CREATE TABLE IF NOT EXISTS StoreStats (
+                StatsID INTEGER PRIMARY KEY CHECK (StatsID = 1),
+                SoldCount INTEGER NOT NULL DEFAULT 0,
+                StoreRevenue INTEGER NOT NULL DEFAULT 0,
+                GamblingRevenue INTEGER NOT NULL DEFAULT 0,
+                GamblingReturns INTEGER NOT NULL DEFAULT 0,
+                AddedCount INTEGER NOT NULL DEFAULT 0,
+                AddedValue INTEGER NOT NULL DEFAULT 0,
+                LostCount INTEGER NOT NULL DEFAULT 0,
+                LostValue INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            "INSERT OR IGNORE INTO StoreStats (StatsID) VALUES (1);",
+            # Index for looking up a patron's transactions, ordered by date
+            """
+            CREATE INDEX IF NOT EXISTS idx_transactions_patron_date
+            ON Transactions (PatronID, TransactionDate);
+            """,
+            # Covering index for looking up the items of a transaction
+            """
+            CREATE INDEX IF NOT EXISTS idx_transaction_items_transaction
+            ON TransactionItems (TransactionID, ItemName, Quantity, PricePerItem);
+            """,
+            # Index for resolving an RFID card ID to a patron
+            """
+            CREATE INDEX IF NOT EXISTS idx_patrons_employee_id
+            ON Patrons (EmployeeID);
+            """,
+            # How many of each snack a patron has bought or won, kept up to date
+            # by addPurchaseTransaction and addGambleTransaction
+            """
+            CREATE TABLE IF NOT EXISTS PatronSnackCounts (
+                PatronID INTEGER NOT NULL,
+                ItemName TEXT NOT NULL,
+                TotalQuantity INTEGER NOT NULL,
+                LastPurchased INTEGER NOT NULL,
+                PRIMARY KEY (PatronID, ItemName)
+            );
+            """,
+            # Index for reading a patron's most purchased snacks in order
+            """
+            CREATE INDEX IF NOT EXISTS idx_patron_snack_counts_rank
+            ON PatronSnackCounts (PatronID, TotalQuantity DESC, LastPurchased DESC, ItemName);
+            """,
         ]
 
         for query in create_queries:
             self.cursor.execute(query)
 
-        self.connection.commit()
+        self._commit()
+
+        # New databases, and databases that still keep their version in the
+        # settings table only, get the current version in PRAGMA user_version
+        self.cursor.execute("PRAGMA user_version")
+        if self.cursor.fetchone()[0] != DatabaseMigrator.CURRENT_SCHEMA_VERSION:
+            DatabaseMigrator.set_stored_database_version(
+                self.cursor, DatabaseMigrator.CURRENT_SCHEMA_VERSION
+            )
+            self._commit()
+
+    def _addToStoreStats(self, **deltas: int):
+        """
+        Add deltas to the StoreStats counters without committing, so the
+        update lands in the same transaction as the write it accounts for.
+        """
+        assignments = ", ".join(f"{column} = {column} + ?" for column in deltas)
+        self.cursor.execute(
+            f"UPDATE StoreStats SET {assignments} WHERE StatsID = 1",
+            tuple(deltas.values()),
+        )
+
+    def _resetStoreStats(self, *columns: str):
+        assignments = ", ".join(f"{column} = 0" for column in columns)
+        self.cursor.execute(f"UPDATE StoreStats SET {assignments} WHERE StatsID = 1")
+
+    def _getTransactionStatsTotals(self, whereClause: str, parameters: tuple):
+        """
+        Sum up the StoreStats transaction counters for the transactions
+        matching whereClause, archived transactions included.
+
+        Returns:
+            (SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns)
+        """
+        transactions, items = transactionSources(self.isArchiveAttached)
+        self.cursor.execute(
+            f"""
+            SELECT
+                IFNULL(SUM(CASE WHEN t.TransactionType = 'PURCHASE'
+                    THEN t.AmountBeforeTransaction - t.AmountAfterTransaction END), 0),
+                IFNULL(SUM(CASE WHEN t.TransactionType = 'GAMBLE'
+                    THEN t.AmountBeforeTransaction - t.AmountAfterTransaction END), 0)
+            FROM {transactions} t
+            WHERE {whereClause}
+            """,
+            parameters,
+        )
+        storeRevenue, gamblingRevenue = self.cursor.fetchone()
+        self.cursor.execute(
+            f"""
+            SELECT
+                IFNULL(SUM(CASE WHEN t.TransactionType = 'PURCHASE'
+                    THEN i.Quantity END), 0),
+                IFNULL(SUM(CASE WHEN t.TransactionType = 'GAMBLE'
+                    THEN i.PricePerItem END), 0)
+            FROM {transactions} t
+            JOIN {items} i ON i.TransactionID = t.TransactionID
+            WHERE {whereClause}
+            """,
+            parameters,
+        )
+        soldCount, gamblingReturns = self.cursor.fetchone()
+        return soldCount, storeRevenue, gamblingRevenue, gamblingReturns
+
+    def _addToPatronSnackCounts(
+        self,
+        patronID: int,
+        transactionItems: list[SnackData],
+        transactionDate: datetime,
+    ):
+        """
+        Add the items of a purchase or gamble to the patron's snack counts,
+        without committing.
+        """
+        self.cursor.executemany(
+            """
+            INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (PatronID, ItemName) DO UPDATE SET
+                TotalQuantity = TotalQuantity + excluded.TotalQuantity,
+                LastPurchased = MAX(LastPurchased, excluded.LastPurchased)
+            """,
+            [
+                (
+                    patronID,
+                    item.snackName,
+                    item.quantity,
+                    toEpochMicroseconds(transactionDate),
+                )
+                for item in transactionItems
+            ],
+        )
+
+    def getStoreStats(self) -> StoreStatsData:
+        self.cursor.execute(
+            """
+            SELECT SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns,
+                AddedCount, AddedValue, LostCount, LostValue
+            FROM StoreStats WHERE StatsID = 1
+            """
+        )
+        sqlResult = self.cursor.fetchone()
+        return StoreStatsData(
+            soldCount=sqlResult[0],
+            storeRevenue=Credits.from_hundredths(sqlResult[1]),
+            gamblingRevenue=Credits.from_hundredths(sqlResult[2]),
+            gamblingReturns=Credits.from_hundredths(sqlResult[3]),
+            addedCount=sqlResult[4],
+            addedValue=Credits.from_hundredths(sqlResult[5]),
+            lostCount=sqlResult[6],
+            lostValue=Credits.from_hundredths(sqlResult[7]),
+        )
 
-        if DatabaseMigrator.get_stored_database_version(self.cursor) == 1:
-            self.cursor.execute(
-                "INSERT OR IGNORE INTO settings (name, value) VALUES ('schema_version', ?)",
-                (DatabaseMigrator.CURRENT_SCHEMA_VERSION,),
+    def rebuildStoreStats(self):
+        """
+        Recompute all StoreStats counters from the raw Transactions,
+        TransactionItems, AddedSnacks and LostSnacks tables.
+        """
+        (
+            soldCount,
+            storeRevenue,
+            gamblingRevenue,
+            gamblingReturns,
+        ) = self._getTransactionStatsTotals("1 = 1", ())
+        self.cursor.execute(
+            "SELECT IFNULL(SUM(Quantity), 0), IFNULL(SUM(Value), 0) FROM AddedSnacks"
+        )
+        addedCount, addedValue = self.cursor.fetchone()
+        self.cursor.execute(
+            "SELECT IFNULL(SUM(Quantity), 0), IFNULL(SUM(Value), 0) FROM LostSnacks"
+        )
+        lostCount, lostValue = self.cursor.fetchone()
+        self.cursor.execute(
+            """
+            INSERT OR REPLACE INTO StoreStats (
+                StatsID, SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns,
+                AddedCount, AddedValue, LostCount, LostValue
             )
-            self.connection.commit()
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                soldCount,
+                storeRevenue,
+                gamblingRevenue,
+                gamblingReturns,
+                addedCount,
+                addedValue,
+                lostCount,
+                lostValue,
+            ),
+        )
+        self._commit()
+        logger.info("Store statistics rebuilt from raw tables")
 
     def clear_lost_snacks(self):
         """Remove all rows from LostSnacks."""
         self.cursor.execute("DELETE FROM LostSnacks")
-        self.connection.commit()
+        self._resetStoreStats("LostCount", "LostValue")
+        self._commit()
 
     def clear_added_snacks(self):
         """Remove all rows from AddedSnacks."""
         self.cursor.execute("DELETE FROM AddedSnacks")
-        self.connection.commit()
+        self._resetStoreStats("AddedCount", "AddedValue")
+        self._commit()
 
     def clear_transactions(self):
         """
@@ -165,7 +675,40 @@ class DatabaseConnector:
         """
         self.cursor.execute("DELETE FROM TransactionItems")
         self.cursor.execute("DELETE FROM Transactions")
-        self.connection.commit()
+        self.cursor.execute("DELETE FROM PatronSnackCounts")
+        if self.isArchiveAttached:
+            clearArchive(self.cursor)
+        self._resetStoreStats(
+            "SoldCount", "StoreRevenue", "GamblingRevenue", "GamblingReturns"
+        )
+        self._commit()
+
+    def archiveTransactions(self, before: datetime) -> ArchiveReport:
+        """
+        Move the transactions before the given date to the archive database,
+        leaving a carry forward transaction per patron. Store statistics and
+        the full history, see getTransactions, still include them.
+        """
+        assert isinstance(before, datetime)
+        assert self.archive_path is not None, "In-memory databases have no archive"
+
+        self._attachArchive()
+        beforeMicroseconds = toEpochMicroseconds(before)
+        # The archive copy is committed before the hot rows are deleted, a
+        # crash in between is undone by archiving again
+        try:
+            transactionCount, transactionItemCount = copyTransactionsToArchive(
+                self.cursor, beforeMicroseconds
+            )
+            self._commit()
+            patronCount = replaceWithCarryForwards(self.cursor, beforeMicroseconds)
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        self._commit()
+        report = ArchiveReport(transactionCount, transactionItemCount, patronCount)
+        logger.info("Archived transactions before %s: %s", before, report.as_dict())
+        return report
 
     def add_lost_snack(
         self,
@@ -181,7 +724,6 @@ class DatabaseConnector:
         assert reason in LostSnackReason
 
         lost_date = datetime.now()
-        lost_date_str = lost_date.strftime("%Y-%m-%d %H:%M:%S.%f")
         self.cursor.execute(
             """
             INSERT INTO LostSnacks (SnackName, Reason, LostDate, Quantity, Value)
@@ -190,13 +732,15 @@ class DatabaseConnector:
             (
                 snack_name,
                 reason.value,
-                lost_date_str,
+                toEpochMicroseconds(lost_date),
                 quantity,
                 total_value.to_hundredths(),
             ),
         )
-        self.connection.commit()
-        return self.cursor.lastrowid
+        lostID = self.cursor.lastrowid
+        self._addToStoreStats(LostCount=quantity, LostValue=total_value.to_hundredths())
+        self._commit()
+        return lostID
 
     def add_added_snack(
         self,
@@ -209,7 +753,6 @@ class DatabaseConnector:
         assert isinstance(value, Credits)
 
         added_date = datetime.now()
-        added_date_str = added_date.strftime("%Y-%m-%d %H:%M:%S.%f")
         self.cursor.execute(
             """
             INSERT INTO AddedSnacks (SnackName, AddedDate, Quantity, Value)
@@ -217,13 +760,15 @@ class DatabaseConnector:
             """,
             (
                 snack_name,
-                added_date_str,
+                toEpochMicroseconds(added_date),
                 quantity,
                 value.to_hundredths(),
             ),
         )
-        self.connection.commit()
-        return self.cursor.lastrowid
+        addedID = self.cursor.lastrowid
+        self._addToStoreStats(AddedCount=quantity, AddedValue=value.to_hundredths())
+        self._commit()
+        return addedID
 
     def get_value_of_added_snacks(self) -> Credits:
         self.cursor.execute("SELECT SUM(Value) FROM AddedSnacks")
@@ -257,47 +802,115 @@ class DatabaseConnector:
             return 0
         return int(total_snacks)
 
-    def addGambleTransaction(
+    def _insertTransaction(
         self,
+        transactionType: TransactionType,
         patronID: int,
         amountBeforeTransaction: Credits,
         amountAfterTransaction: Credits,
         transactionDate: datetime,
-        transactionItem: SnackData,
-    ):
-        assert isinstance(patronID, int)
-        assert isinstance(amountBeforeTransaction, Credits)
-        assert isinstance(amountAfterTransaction, Credits)
-        assert isinstance(transactionDate, datetime)
-        assert isinstance(transactionItem, SnackData)
-
+        transactionItems: list[SnackData],
+    ) -> int:
+        """Insert a transaction and its items without committing."""
         self.cursor.execute(
             """
             INSERT INTO Transactions (TransactionType, PatronID, TransactionDate, AmountBeforeTransaction, AmountAfterTransaction)
             VALUES (?, ?, ?, ?, ?)
             """,
             (
-                TransactionType.GAMBLE.value,
+                transactionType.value,
                 patronID,
-                transactionDate,
+                toEpochMicroseconds(transactionDate),
                 amountBeforeTransaction.to_hundredths(),
                 amountAfterTransaction.to_hundredths(),
             ),
         )
         transactionID = self.cursor.lastrowid
-        self.cursor.execute(
+        self.cursor.executemany(
             """
             INSERT INTO TransactionItems (TransactionID, ItemName, Quantity, PricePerItem)
             VALUES (?, ?, ?, ?)
             """,
-            (
-                transactionID,
-                transactionItem.snackName,
-                transactionItem.quantity,
-                transactionItem.pricePerItem.to_hundredths(),
-            ),
+            [
+                (
+                    transactionID,
+                    transactionItem.snackName,
+                    transactionItem.quantity,
+                    transactionItem.pricePerItem.to_hundredths(),
+                )
+                for transactionItem in transactionItems
+            ],
+        )
+        return transactionID
+
+    def _recordGamble(
+        self,
+        patronID: int,
+        amountBeforeTransaction: Credits,
+        amountAfterTransaction: Credits,
+        transactionDate: datetime,
+        transactionItem: SnackData,
+    ):
+        self._insertTransaction(
+            TransactionType.GAMBLE,
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            [transactionItem],
+        )
+        self._addToPatronSnackCounts(patronID, [transactionItem], transactionDate)
+        self._addToStoreStats(
+            GamblingRevenue=amountBeforeTransaction.to_hundredths()
+            - amountAfterTransaction.to_hundredths(),
+            GamblingReturns=transactionItem.pricePerItem.to_hundredths(),
+        )
+
+    def _recordPurchase(
+        self,
+        patronID: int,
+        amountBeforeTransaction: Credits,
+        amountAfterTransaction: Credits,
+        transactionDate: datetime,
+        transactionItems: list[SnackData],
+    ):
+        self._insertTransaction(
+            TransactionType.PURCHASE,
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            transactionItems,
+        )
+        self._addToPatronSnackCounts(patronID, transactionItems, transactionDate)
+        self._addToStoreStats(
+            SoldCount=sum(item.quantity for item in transactionItems),
+            StoreRevenue=amountBeforeTransaction.to_hundredths()
+            - amountAfterTransaction.to_hundredths(),
+        )
+
+    def addGambleTransaction(
+        self,
+        patronID: int,
+        amountBeforeTransaction: Credits,
+        amountAfterTransaction: Credits,
+        transactionDate: datetime,
+        transactionItem: SnackData,
+    ):
+        assert isinstance(patronID, int)
+        assert isinstance(amountBeforeTransaction, Credits)
+        assert isinstance(amountAfterTransaction, Credits)
+        assert isinstance(transactionDate, datetime)
+        assert isinstance(transactionItem, SnackData)
+
+        self._recordGamble(
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            transactionItem,
         )
-        self.connection.commit()
+        self._commit()
 
     def addPurchaseTransaction(
         self,
@@ -313,34 +926,224 @@ class DatabaseConnector:
         assert isinstance(transactionDate, datetime)
         assert isinstance(transactionItems, list)
 
+        self._recordPurchase(
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            transactionItems,
+        )
+        self._commit()
+
+    def _chargePatron(self, patronID: int, fee: Credits) -> Credits:
+        """
+        Subtract fee from the patron's credits without committing.
+
+        Returns:
+            The patron's new balance.
+        """
         self.cursor.execute(
             """
-            INSERT INTO Transactions (TransactionType, PatronID, TransactionDate, AmountBeforeTransaction, AmountAfterTransaction)
-            VALUES (?, ?, ?, ?, ?)
+            UPDATE Patrons SET TotalCredits = TotalCredits - ?
+            WHERE PatronID = ? AND TotalCredits >= ?
             """,
-            (
-                TransactionType.PURCHASE.value,
-                patronID,
-                transactionDate,
-                amountBeforeTransaction.to_hundredths(),
-                amountAfterTransaction.to_hundredths(),
-            ),
+            (fee.to_hundredths(), patronID, fee.to_hundredths()),
         )
-        transactionID = self.cursor.lastrowid
-        for transactionItem in transactionItems:
-            self.cursor.execute(
-                """
-                INSERT INTO TransactionItems (TransactionID, ItemName, Quantity, PricePerItem)
-                VALUES (?, ?, ?, ?)
-                """,
-                (
-                    transactionID,
-                    transactionItem.snackName,
-                    transactionItem.quantity,
-                    transactionItem.pricePerItem.to_hundredths(),
-                ),
+        if self.cursor.rowcount != 1:
+            raise InsufficientCreditsError(
+                f"Patron {patronID} does not exist or cannot afford {fee:.2f} credits"
+            )
+        self.cursor.execute(
+            "SELECT TotalCredits FROM Patrons WHERE PatronID = ?", (patronID,)
+        )
+        return Credits.from_hundredths(self.cursor.fetchone()[0])
+
+    def _takeFromStock(self, snacks: list[SnackData]):
+        """
+        Subtract the quantities of snacks from the inventory without committing.
+        Snacks that sell out are removed from the inventory.
+        """
+        self.cursor.executemany(
+            "UPDATE Snacks SET Quantity = Quantity - ? WHERE ItemID = ? AND Quantity >= ?",
+            [(snack.quantity, snack.snackId, snack.quantity) for snack in snacks],
+        )
+        # Every ItemID matches at most one row, so a short count means a snack
+        # is missing or does not have enough stock left
+        if self.cursor.rowcount != len(snacks):
+            raise InsufficientStockError(
+                "Not enough stock left for "
+                + ", ".join(f"{snack.snackName}x{snack.quantity}" for snack in snacks)
+            )
+        self.cursor.executemany(
+            "DELETE FROM Snacks WHERE ItemID = ? AND Quantity = 0",
+            [(snack.snackId,) for snack in snacks],
+        )
+
+    def _takeFromCatalogStock(self, snacks: list[SnackData]):
+        """Apply a committed _takeFromStock to the snack catalog."""
+        for snack in snacks:
+            newQuantity = self.snack_catalog.subtractQuantity(
+                snack.snackId, snack.quantity
             )
-        self.connection.commit()
+            if newQuantity == 0:
+                self.snack_catalog.remove(snack.snackId)
+
+    def checkout(
+        self,
+        patron_id: int,
+        cart: list[SnackData],
+        fee: Credits,
+        timestamp: datetime,
+    ) -> Credits:
+        """
+        Buy the snacks in cart for fee credits as a single unit of work.
+
+        The stock, the patron's credits and the ledger are written in one
+        transaction with a single commit. If a snack is out of stock or the
+        patron cannot afford fee, nothing is written.
+
+        Raises:
+            InsufficientStockError: A snack in cart does not have enough stock.
+            InsufficientCreditsError: The patron cannot afford fee.
+
+        Returns:
+            The patron's new balance.
+        """
+        assert isinstance(patron_id, int)
+        assert isinstance(cart, list)
+        assert isinstance(fee, Credits)
+        assert isinstance(timestamp, datetime)
+
+        try:
+            newBalance = self._checkoutWork(patron_id, cart, fee, timestamp)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self._commit()
+        self._applyCheckout(patron_id, cart, newBalance)
+        return newBalance
+
+    def checkoutAsync(
+        self,
+        patron_id: int,
+        cart: list[SnackData],
+        fee: Credits,
+        timestamp: datetime,
+        on_done: Callable[[Future], None] = None,
+    ) -> Future:
+        """
+        checkout() through submitWrite, so with async_writes the commit does
+        not block the calling thread.
+
+        Returns:
+            The future of the patron's new balance, or of the CheckoutError
+            that rolled the purchase back.
+        """
+        assert isinstance(patron_id, int)
+        assert isinstance(cart, list)
+        assert isinstance(fee, Credits)
+        assert isinstance(timestamp, datetime)
+
+        return self.submitWrite(
+            lambda: self._checkoutWork(patron_id, cart, fee, timestamp),
+            apply=lambda newBalance: self._applyCheckout(patron_id, cart, newBalance),
+            on_done=on_done,
+        )
+
+    def _checkoutWork(
+        self, patron_id: int, cart: list[SnackData], fee: Credits, timestamp: datetime
+    ) -> Credits:
+        """The writes of checkout(), without committing."""
+        newBalance = self._chargePatron(patron_id, fee)
+        self._takeFromStock(cart)
+        self._recordPurchase(patron_id, newBalance + fee, newBalance, timestamp, cart)
+        return newBalance
+
+    def _applyCheckout(
+        self, patron_id: int, cart: list[SnackData], newBalance: Credits
+    ):
+        """Apply a committed checkout to the in-memory caches."""
+        self._takeFromCatalogStock(cart)
+        self.card_resolver.setCredits(patron_id, newBalance)
+
+    def gamble(
+        self,
+        patron_id: int,
+        won_snack: SnackData,
+        fee: Credits,
+        timestamp: datetime,
+    ) -> Credits:
+        """
+        Pay fee credits for a spin and take one won_snack from the inventory
+        as a single unit of work, see checkout().
+
+        Returns:
+            The patron's new balance.
+        """
+        assert isinstance(patron_id, int)
+        assert isinstance(won_snack, SnackData)
+        assert isinstance(fee, Credits)
+        assert isinstance(timestamp, datetime)
+
+        wonItem = self._wonItem(won_snack)
+        try:
+            newBalance = self._gambleWork(patron_id, wonItem, fee, timestamp)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self._commit()
+        self._applyCheckout(patron_id, [wonItem], newBalance)
+        return newBalance
+
+    def gambleAsync(
+        self,
+        patron_id: int,
+        won_snack: SnackData,
+        fee: Credits,
+        timestamp: datetime,
+        on_done: Callable[[Future], None] = None,
+    ) -> Future:
+        """
+        gamble() through submitWrite, so with async_writes the commit does
+        not block the calling thread.
+
+        Returns:
+            The future of the patron's new balance, or of the CheckoutError
+            that rolled the gamble back.
+        """
+        assert isinstance(patron_id, int)
+        assert isinstance(won_snack, SnackData)
+        assert isinstance(fee, Credits)
+        assert isinstance(timestamp, datetime)
+
+        wonItem = self._wonItem(won_snack)
+        return self.submitWrite(
+            lambda: self._gambleWork(patron_id, wonItem, fee, timestamp),
+            apply=lambda newBalance: self._applyCheckout(
+                patron_id, [wonItem], newBalance
+            ),
+            on_done=on_done,
+        )
+
+    @staticmethod
+    def _wonItem(won_snack: SnackData) -> SnackData:
+        """The single item taken from the inventory for won_snack."""
+        return SnackData(
+            won_snack.snackId,
+            won_snack.snackName,
+            1,
+            won_snack.imageID,
+            won_snack.pricePerItem,
+        )
+
+    def _gambleWork(
+        self, patron_id: int, wonItem: SnackData, fee: Credits, timestamp: datetime
+    ) -> Credits:
+        """The writes of gamble(), without committing."""
+        newBalance = self._chargePatron(patron_id, fee)
+        self._takeFromStock([wonItem])
+        self._recordGamble(patron_id, newBalance + fee, newBalance, timestamp, wonItem)
+        return newBalance
 
     def addTopUpTransaction(
         self,
@@ -354,20 +1157,15 @@ class DatabaseConnector:
         assert isinstance(amountAfterTransaction, Credits)
         assert isinstance(transactionDate, datetime)
 
-        self.cursor.execute(
-            """
-            INSERT INTO Transactions (TransactionType, PatronID, TransactionDate, AmountBeforeTransaction, AmountAfterTransaction)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                TransactionType.TOP_UP.value,
-                patronID,
-                transactionDate,
-                amountBeforeTransaction.to_hundredths(),
-                amountAfterTransaction.to_hundredths(),
-            ),
+        self._insertTransaction(
+            TransactionType.TOP_UP,
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            [],
         )
-        self.connection.commit()
+        self._commit()
 
     def addEditTransaction(
         self,
@@ -381,20 +1179,15 @@ class DatabaseConnector:
         assert isinstance(amountAfterTransaction, Credits)
         assert isinstance(transactionDate, datetime)
 
-        self.cursor.execute(
-            """
-            INSERT INTO Transactions (TransactionType, PatronID, TransactionDate, AmountBeforeTransaction, AmountAfterTransaction)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                TransactionType.EDIT.value,
-                patronID,
-                transactionDate,
-                amountBeforeTransaction.to_hundredths(),
-                amountAfterTransaction.to_hundredths(),
-            ),
+        self._insertTransaction(
+            TransactionType.EDIT,
+            patronID,
+            amountBeforeTransaction,
+            amountAfterTransaction,
+            transactionDate,
+            [],
         )
-        self.connection.commit()
+        self._commit()
 
     def getTransactionItems(self, transactionID: int) -> list[SnackData]:
         assert isinstance(transactionID, int)
@@ -417,55 +1210,143 @@ class DatabaseConnector:
         self.cursor.execute(
             f"DELETE FROM TransactionItems WHERE TransactionID = {transactionID}"
         )
-        self.connection.commit()
+        self._commit()
 
-    def getTransactions(self, patronID: int) -> list[HistoryData]:
+    def _loadTransactions(
+        self, whereClause: str, parameters: tuple, includeArchive: bool = False
+    ):
+        """
+        Load transactions together with their items in a single query.
+
+        Transactions and TransactionItems are LEFT JOINed so transactions
+        without items (top-ups, edits) are included, and the rows are grouped
+        into HistoryData objects in one pass. With includeArchive the
+        archived transactions are loaded instead of the carry forward rows.
+        """
+        transactions, items = transactionSources(
+            includeArchive and self.isArchiveAttached
+        )
+        self.cursor.execute(
+            f"""
+            SELECT t.TransactionID, t.TransactionType, t.TransactionDate,
+                t.AmountBeforeTransaction, t.AmountAfterTransaction,
+                i.ItemName, i.Quantity, i.PricePerItem
+            FROM {transactions} t
+            LEFT JOIN {items} i ON i.TransactionID = t.TransactionID
+            WHERE {whereClause}
+            ORDER BY t.TransactionID
+            """,
+            parameters,
+        )
+        transactions: dict[int, HistoryData] = {}
+        for row in self.cursor.fetchall():
+            transactionID = row[0]
+            transaction = transactions.get(transactionID)
+            if transaction is None:
+                transaction = HistoryData.from_row(row)
+                transactions[transactionID] = transaction
+            if row[5] is not None:
+                transaction.transactionItems.append(
+                    SnackData.from_row((-1, row[5], row[6], "", row[7]))
+                )
+        return list(transactions.values())
+
+    def getTransactions(
+        self, patronID: int, include_archive: bool = False
+    ) -> list[HistoryData]:
+        """
+        Get a patron's transactions. By default only the hot transactions,
+        where archived ones are summed up by a carry forward transaction,
+        with include_archive the full history.
+        """
         assert isinstance(patronID, int)
 
-        self.cursor.execute(f"SELECT * FROM Transactions WHERE PatronID = {patronID}")
-        sqlResult = self.cursor.fetchall()
-        transactionList = []
-        for transactionEntry in sqlResult:
-            transactionID = transactionEntry[0]
-            transactionType = TransactionType(transactionEntry[1])
-            transactionDate = transactionEntry[3]
-            amountBeforeTransaction = Credits.from_hundredths(transactionEntry[4])
-            amountAfterTransaction = Credits.from_hundredths(transactionEntry[5])
-            transactionItems = self.getTransactionItems(transactionID)
-            parsedDatetime = datetime.strptime(transactionDate, "%Y-%m-%d %H:%M:%S.%f")
-            transactionData = HistoryData(
-                transactionID,
-                transactionType,
-                parsedDatetime,
-                amountBeforeTransaction,
-                amountAfterTransaction,
-                transactionItems,
-            )
-            transactionList.append(transactionData)
-        return transactionList
+        return self._loadTransactions(
+            "t.PatronID = ?", (patronID,), includeArchive=include_archive
+        )
 
-    def getTransaction(self, transactionID: int) -> HistoryData:
-        assert isinstance(transactionID, int)
+    def getTransactionsBetween(
+        self,
+        patronID: int,
+        startDate: datetime,
+        endDate: datetime,
+        include_archive: bool = False,
+    ) -> list[HistoryData]:
+        """
+        Get a patron's transactions from startDate up to, but not including,
+        endDate. Served as a range scan over idx_transactions_patron_date.
+        """
+        assert isinstance(patronID, int)
+        assert isinstance(startDate, datetime)
+        assert isinstance(endDate, datetime)
 
-        self.cursor.execute(
-            f"SELECT * FROM Transactions WHERE TransactionID = {transactionID}"
+        return self._loadTransactions(
+            "t.PatronID = ? AND t.TransactionDate >= ? AND t.TransactionDate < ?",
+            (patronID, toEpochMicroseconds(startDate), toEpochMicroseconds(endDate)),
+            includeArchive=include_archive,
         )
-        sqlResult = self.cursor.fetchone()
-        transactionID = sqlResult[0]
-        transactionType = TransactionType(sqlResult[1])
-        transactionDate = sqlResult[3]
-        amountBeforeTransaction = Credits.from_hundredths(sqlResult[4])
-        amountAfterTransaction = Credits.from_hundredths(sqlResult[5])
-        transactionItems = self.getTransactionItems(transactionID)
-        parsedDatetime = datetime.strptime(transactionDate, "%Y-%m-%d %H:%M:%S.%f")
-        return HistoryData(
-            transactionID,
-            transactionType,
-            parsedDatetime,
-            amountBeforeTransaction,
-            amountAfterTransaction,
-            transactionItems,
+
+    def iterTransactionsPage(
+        self, patron_id: int, before_cursor: tuple = None, limit: int = 50
+    ) -> tuple[list[HistoryData], tuple]:
+        """
+        Get one page of a patron's transactions, most recent first.
+
+        Only the transaction headers are loaded, transactionItems is always
+        empty. Use getTransaction to load the items of a single transaction.
+
+        Pages are keyset paginated on (TransactionDate, TransactionID) and
+        read straight out of idx_transactions_patron_date, so every page
+        costs the same no matter how deep into the history it is.
+
+        Args:
+            before_cursor: The cursor returned with the previous page, or None
+                to get the first page.
+            limit: The maximum number of transactions in the page.
+
+        Returns:
+            The page and the cursor of the next page. The cursor is None when
+            there are no more transactions.
+        """
+        assert isinstance(patron_id, int)
+        assert before_cursor is None or isinstance(before_cursor, tuple)
+        assert isinstance(limit, int) and limit > 0
+
+        whereClause = "PatronID = ?"
+        parameters = (patron_id,)
+        if before_cursor is not None:
+            whereClause += " AND (TransactionDate, TransactionID) < (?, ?)"
+            parameters += before_cursor
+
+        # Fetch one row more than needed to know if there is a next page
+        self.cursor.execute(
+            f"""
+            SELECT TransactionID, TransactionType, TransactionDate,
+                AmountBeforeTransaction, AmountAfterTransaction
+            FROM Transactions
+            WHERE {whereClause}
+            ORDER BY TransactionDate DESC, TransactionID DESC
+            LIMIT ?
+            """,
+            parameters + (limit + 1,),
         )
+        rows = self.cursor.fetchall()
+
+        nextCursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            nextCursor = (rows[-1][2], rows[-1][0])
+
+        page = [HistoryData.from_row(row) for row in rows]
+        return page, nextCursor
+
+    def getTransaction(self, transactionID: int) -> HistoryData:
+        assert isinstance(transactionID, int)
+
+        transactions = self._loadTransactions("t.TransactionID = ?", (transactionID,))
+        if not transactions:
+            return None
+        return transactions[0]
 
     def getTransactionIds(self, patronID: int):
         assert isinstance(patronID, int)
@@ -479,33 +1360,73 @@ class DatabaseConnector:
             transactionIds.append(transactionEntry[0])
         return transactionIds
 
-    def getMostPurchasedSnacksByPatron(self, patronId: int) -> list[str]:
+    def getMostPurchasedSnacksByPatron(
+        self, patronId: int, limit: int = -1
+    ) -> list[str]:
+        """
+        Get the names of the snacks a patron bought or won, most purchased first.
+        Ties are broken by the most recently purchased snack.
+
+        Args:
+            limit: Only return the top limit snacks (-1 returns all of them).
+        """
+        assert isinstance(patronId, int)
+        assert isinstance(limit, int)
+
+        self.cursor.execute(
+            """
+            SELECT ItemName
+            FROM PatronSnackCounts
+            WHERE PatronID = ?
+            ORDER BY TotalQuantity DESC, LastPurchased DESC
+            LIMIT ?
+            """,
+            (patronId, limit),
+        )
+        return [entry[0] for entry in self.cursor.fetchall()]
+
+    def getPatronSpending(self, patronId: int) -> tuple[Credits, int, int]:
+        """
+        Sum up what a patron spent on purchases and gambles over the full
+        history, archived transactions included, in a single query.
+
+        Returns:
+            (credits spent, snacks purchased, snacks won), where snacks
+            purchased counts the items of the purchases and snacks won the
+            gambles.
+        """
         assert isinstance(patronId, int)
 
+        transactions, items = transactionSources(self.isArchiveAttached)
         self.cursor.execute(
             f"""
-            SELECT ItemName, SUM(Quantity) as TotalQuantity
-            FROM TransactionItems
-            WHERE TransactionID IN (
-                SELECT TransactionID
-                FROM Transactions
-                WHERE PatronID = {patronId}
+            SELECT
+                IFNULL(SUM(AmountBeforeTransaction - AmountAfterTransaction), 0),
+                IFNULL(SUM(CASE WHEN TransactionType = 'PURCHASE'
+                    THEN ItemCount END), 0),
+                COUNT(CASE WHEN TransactionType = 'GAMBLE' THEN 1 END)
+            FROM (
+                SELECT t.TransactionType, t.AmountBeforeTransaction,
+                    t.AmountAfterTransaction, COUNT(i.TransactionID) AS ItemCount
+                FROM {transactions} t
+                LEFT JOIN {items} i ON i.TransactionID = t.TransactionID
+                WHERE t.PatronID = ? AND t.TransactionType IN ('PURCHASE', 'GAMBLE')
+                GROUP BY t.TransactionID
             )
-            GROUP BY ItemName
-            ORDER BY TotalQuantity DESC
-            """
+            """,
+            (patronId,),
         )
-        sqlResult = self.cursor.fetchall()
-        mostPurchasedSnacks = []
-        for entry in sqlResult:
-            mostPurchasedSnacks.append(entry[0])
-        return mostPurchasedSnacks
+        creditsSpent, snacksPurchased, snacksWon = self.cursor.fetchone()
+        return Credits.from_hundredths(creditsSpent), snacksPurchased, snacksWon
 
     def removeTransactions(self, patronID: int):
         assert isinstance(patronID, int)
 
         self.cursor.execute(f"DELETE FROM Transactions WHERE PatronID = {patronID}")
-        self.connection.commit()
+        self.cursor.execute(
+            "DELETE FROM PatronSnackCounts WHERE PatronID = ?", (patronID,)
+        )
+        self._commit()
 
     def addPatron(self, first_name: str, last_name: str, employee_id: str):
         assert isinstance(first_name, str)
@@ -519,21 +1440,15 @@ class DatabaseConnector:
             """,
             (first_name, last_name, employee_id),
         )
-        self.connection.commit()
+        patronId = self.cursor.lastrowid
+        self._commit()
+        self.card_resolver.put(
+            UserData(patronId, first_name, last_name, employee_id, Credits("0.00"))
+        )
 
     def getAllPatrons(self) -> list[UserData]:
         self.cursor.execute("SELECT * FROM Patrons")
-        sqlResult = self.cursor.fetchall()
-        userDataList = []
-        for userEntry in sqlResult:
-            patronId = userEntry[0]
-            firstName = userEntry[1]
-            lastName = userEntry[2]
-            employeeID = userEntry[3]
-            totalCredits = Credits.from_hundredths(userEntry[4])
-            userData = UserData(patronId, firstName, lastName, employeeID, totalCredits)
-            userDataList.append(userData)
-        return userDataList
+        return [UserData.from_row(row) for row in self.cursor.fetchall()]
 
     def getPatronData(self, patronID: int) -> UserData:
         assert isinstance(patronID, int)
@@ -544,12 +1459,7 @@ class DatabaseConnector:
         if sqlResult is None:
             return None
 
-        patronId = sqlResult[0]
-        firstName = sqlResult[1]
-        lastName = sqlResult[2]
-        employeeID = sqlResult[3]
-        totalCredits = Credits.from_hundredths(sqlResult[4])
-        return UserData(patronId, firstName, lastName, employeeID, totalCredits)
+        return UserData.from_row(sqlResult)
 
     def updatePatronData(self, patronId: int, newUserData: UserData):
         assert isinstance(patronId, int)
@@ -558,7 +1468,19 @@ class DatabaseConnector:
         self.cursor.execute(
             f"UPDATE Patrons Set FirstName = '{newUserData.firstName}', LastName = '{newUserData.lastName}', EmployeeID = '{newUserData.employeeID}', TotalCredits = {newUserData.totalCredits.to_hundredths()} WHERE PatronID = {patronId}"
         )
-        self.connection.commit()
+        updated = self.cursor.rowcount == 1
+        self._commit()
+
+        if updated:
+            self.card_resolver.put(
+                UserData(
+                    patronId,
+                    newUserData.firstName,
+                    newUserData.lastName,
+                    newUserData.employeeID,
+                    newUserData.totalCredits,
+                )
+            )
 
     def updateSnackData(self, snackId: int, newSnackData: SnackData):
         assert isinstance(snackId, int)
@@ -567,13 +1489,43 @@ class DatabaseConnector:
         self.cursor.execute(
             f"UPDATE Snacks Set ItemName = '{newSnackData.snackName}', Quantity = {newSnackData.quantity}, ImageID = '{newSnackData.imageID}', PricePerItem = {newSnackData.pricePerItem.to_hundredths()} WHERE ItemID = {snackId}"
         )
-        self.connection.commit()
+        updated = self.cursor.rowcount == 1
+        self._commit()
+
+        if updated:
+            self.snack_catalog.put(
+                SnackData(
+                    snackId,
+                    newSnackData.snackName,
+                    newSnackData.quantity,
+                    newSnackData.imageID,
+                    newSnackData.pricePerItem,
+                )
+            )
+        else:
+            self.snack_catalog.remove(snackId)
 
     def removePatron(self, patronId: int):
         assert isinstance(patronId, int)
 
+        # The patron's transactions are removed below, take them out of the stats
+        (
+            soldCount,
+            storeRevenue,
+            gamblingRevenue,
+            gamblingReturns,
+        ) = self._getTransactionStatsTotals("t.PatronID = ?", (patronId,))
+        self._addToStoreStats(
+            SoldCount=-soldCount,
+            StoreRevenue=-storeRevenue,
+            GamblingRevenue=-gamblingRevenue,
+            GamblingReturns=-gamblingReturns,
+        )
         self.cursor.execute(f"DELETE from Patrons WHERE PatronID = {patronId}")
-        self.connection.commit()
+        if self.isArchiveAttached:
+            removeArchivedTransactions(self.cursor, patronId)
+        self._commit()
+        self.card_resolver.remove(patronId)
 
         patronsTransactionIds = self.getTransactionIds(patronId)
         for transactionId in patronsTransactionIds:
@@ -584,7 +1536,8 @@ class DatabaseConnector:
         assert isinstance(snackId, int)
 
         self.cursor.execute(f"DELETE from Snacks WHERE ItemID = {snackId}")
-        self.connection.commit()
+        self._commit()
+        self.snack_catalog.remove(snackId)
 
     def subtractPatronCredits(self, patronID: int, creditsToSubtract: Credits):
         assert isinstance(patronID, int)
@@ -596,7 +1549,8 @@ class DatabaseConnector:
         self.cursor.execute(
             f"UPDATE Patrons Set TotalCredits = {newCreditsAmount.to_hundredths()} WHERE PatronID = {patronID}"
         )
-        self.connection.commit()
+        self._commit()
+        self.card_resolver.setCredits(patronID, newCreditsAmount)
 
     def addSnack(
         self, itemName: str, quantity: int, imageID: str, pricePerItem: Credits
@@ -613,29 +1567,53 @@ class DatabaseConnector:
             """,
             (itemName, quantity, imageID, pricePerItem.to_hundredths()),
         )
-        self.connection.commit()
+        snackId = self.cursor.lastrowid
+        self._commit()
+        # A snack the catalog has not loaded yet still reads through on a miss
+        self.snack_catalog.put(
+            SnackData(snackId, itemName, quantity, imageID, pricePerItem)
+        )
 
     def getSnack(self, snackId: int) -> SnackData:
+        """
+        Get a snack, or None if it does not exist.
+        Served from the snack catalog, SQLite is only read on a miss.
+        """
         assert isinstance(snackId, int)
+        self.flushWrites()
 
-        self.cursor.execute(f"SELECT * FROM Snacks WHERE ItemID = {snackId}")
+        if self.snack_catalog.has(snackId) or self.snack_catalog.isComplete:
+            self.snack_catalog.hits += 1
+            return self.snack_catalog.get(snackId)
+
+        self.snack_catalog.misses += 1
+        self.cursor.execute("SELECT * FROM Snacks WHERE ItemID = ?", (snackId,))
         sqlResult = self.cursor.fetchone()
 
         if sqlResult is None:
             return None
 
-        snackId = sqlResult[0]
-        snackName = sqlResult[1]
-        quantity = sqlResult[2]
-        imageId = sqlResult[3]
-        pricePerItem = sqlResult[4]
-        return SnackData(
-            snackId=snackId,
-            snackName=snackName,
-            quantity=quantity,
-            imageID=imageId,
-            pricePerItem=Credits.from_hundredths(pricePerItem),
-        )
+        snack = SnackData.from_row(sqlResult)
+        self.snack_catalog.put(snack)
+        return snack
+
+    def getSnackByName(self, snackName: str) -> SnackData:
+        """
+        Get a snack by its name, or None if it does not exist.
+        Looked up in the name index of the snack catalog.
+        """
+        assert isinstance(snackName, str)
+        self.flushWrites()
+
+        if not self.snack_catalog.isComplete:
+            self.getAllSnacks()
+        else:
+            self.snack_catalog.hits += 1
+
+        snackId = self.snack_catalog.getIdByName(snackName)
+        if snackId is None:
+            return None
+        return self.snack_catalog.get(snackId)
 
     def subtractSnackQuantity(self, snackId: int, quantity: int):
         assert isinstance(snackId, int)
@@ -647,26 +1625,21 @@ class DatabaseConnector:
         self.cursor.execute(
             f"UPDATE Snacks Set Quantity = {newQuantity} WHERE ItemID = {snackId}"
         )
-        self.connection.commit()
+        self._commit()
+        self.snack_catalog.subtractQuantity(snackId, quantity)
 
     def getAllSnacks(self) -> list[SnackData]:
+        self.flushWrites()
+        if self.snack_catalog.isComplete:
+            self.snack_catalog.hits += 1
+            return self.snack_catalog.getAll()
+
+        self.snack_catalog.misses += 1
         self.cursor.execute("SELECT * FROM Snacks")
-        sqlResult = self.cursor.fetchall()
-        snackDataList = []
-        for snackEntry in sqlResult:
-            snackId = snackEntry[0]
-            snackName = snackEntry[1]
-            quantity = snackEntry[2]
-            imageId = snackEntry[3]
-            pricePerItem = snackEntry[4]
-            snackData = SnackData(
-                snackId=snackId,
-                snackName=snackName,
-                quantity=quantity,
-                imageID=imageId,
-                pricePerItem=Credits.from_hundredths(pricePerItem),
-            )
-            snackDataList.append(snackData)
+        snackDataList = [
+            SnackData.from_row(snackEntry) for snackEntry in self.cursor.fetchall()
+        ]
+        self.snack_catalog.replaceAll(snackDataList)
         return snackDataList
 
     def addCredits(self, userId: int, amount: Credits):
@@ -686,15 +1659,136 @@ class DatabaseConnector:
             WHERE PatronID = {userId}
             """
         )
-        self.connection.commit()
+        self._commit()
+        self.card_resolver.setCredits(userId, newTotalCredits)
+
+    def _runImport(self, importRows: Callable[[], object]):
+        """
+        Run a bulk import in one transaction with a single commit, rolled
+        back completely if any row is invalid.
+        """
+        try:
+            result = importRows()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self._commit()
+        return result
+
+    def importPatrons(
+        self,
+        csvFile: TextIO,
+        edit_date: datetime = None,
+        chunk_size: int = bulk_io.CHUNK_SIZE,
+    ) -> ImportReport:
+        """
+        Upsert patrons from a CSV keyed on EmployeeID and record every change
+        of credits as an edit, see bulk_io.importPatrons.
+
+        Raises:
+            BulkImportError: A row is invalid, nothing is imported.
+        """
+        editDate = datetime.now() if edit_date is None else edit_date
+        report = self._runImport(
+            lambda: bulk_io.importPatrons(self.cursor, csvFile, editDate, chunk_size)
+        )
+        self.card_resolver.load(self.getAllPatrons())
+        logger.info("Patrons imported: %s", report.as_dict())
+        return report
+
+    def importSnacks(
+        self, csvFile: TextIO, chunk_size: int = bulk_io.CHUNK_SIZE
+    ) -> ImportReport:
+        """
+        Upsert snacks from a CSV keyed on ItemName, see bulk_io.importSnacks.
+
+        Raises:
+            BulkImportError: A row is invalid, nothing is imported.
+        """
+        report = self._runImport(
+            lambda: bulk_io.importSnacks(self.cursor, csvFile, chunk_size)
+        )
+        self.snack_catalog.clear()
+        logger.info("Snacks imported: %s", report.as_dict())
+        return report
+
+    def importRestocks(
+        self,
+        csvFile: TextIO,
+        added_date: datetime = None,
+        chunk_size: int = bulk_io.CHUNK_SIZE,
+    ) -> ImportReport:
+        """
+        Restock snacks from a CSV keyed on ItemName and record every row as
+        an added snack, see bulk_io.importRestocks.
+
+        Raises:
+            BulkImportError: A row is invalid, nothing is imported.
+        """
+        addedDate = datetime.now() if added_date is None else added_date
+
+        def importRows():
+            report, addedCount, addedValue = bulk_io.importRestocks(
+                self.cursor, csvFile, addedDate, chunk_size
+            )
+            self._addToStoreStats(
+                AddedCount=addedCount, AddedValue=addedValue.to_hundredths()
+            )
+            return report
+
+        report = self._runImport(importRows)
+        self.snack_catalog.clear()
+        logger.info("Restocks imported: %s", report.as_dict())
+        return report
+
+    def _export(self, csvFile: TextIO, export: tuple, chunk_size: int) -> int:
+        self.flushWrites()
+        # A cursor of its own, so the export can stream while others query
+        return bulk_io.exportCsv(self.connection.cursor(), csvFile, export, chunk_size)
+
+    def exportPatrons(
+        self, csvFile: TextIO, chunk_size: int = bulk_io.CHUNK_SIZE
+    ) -> int:
+        """Stream every patron to csvFile. Returns the number of rows."""
+        return self._export(csvFile, bulk_io.PATRONS_EXPORT, chunk_size)
+
+    def exportSnacks(
+        self, csvFile: TextIO, chunk_size: int = bulk_io.CHUNK_SIZE
+    ) -> int:
+        """Stream every snack to csvFile. Returns the number of rows."""
+        return self._export(csvFile, bulk_io.SNACKS_EXPORT, chunk_size)
+
+    def exportTransactions(
+        self, csvFile: TextIO, chunk_size: int = bulk_io.CHUNK_SIZE
+    ) -> int:
+        """
+        Stream the whole Transactions table to csvFile, chunk_size rows at
+        a time. Returns the number of rows.
+        """
+        return self._export(csvFile, bulk_io.TRANSACTIONS_EXPORT, chunk_size)
+
+    def exportTransactionItems(
+        self, csvFile: TextIO, chunk_size: int = bulk_io.CHUNK_SIZE
+    ) -> int:
+        """
+        Stream the whole TransactionItems table to csvFile, chunk_size rows
+        at a time. Returns the number of rows.
+        """
+        return self._export(csvFile, bulk_io.TRANSACTION_ITEMS_EXPORT, chunk_size)
 
     def getPatronIdByCardId(self, cardId: str) -> int:
+        """Resolve a card ID to a PatronID with the card resolver, no SQL."""
         assert isinstance(cardId, str)
+        self.flushWrites()
 
-        self.cursor.execute(
-            f"SELECT PatronID FROM Patrons WHERE EmployeeID = '{cardId}'"
-        )
-        sqlResult = self.cursor.fetchone()
-        if sqlResult:
-            return sqlResult[0]
-        return None
+        return self.card_resolver.getPatronId(cardId)
+
+    def resolveCard(self, cardId: str) -> UserData:
+        """
+        Get the patron a card belongs to, or None if the card is unknown.
+        Resolved from memory with the card resolver, no SQL.
+        """
+        assert isinstance(cardId, str)
+        self.flushWrites()
+
+        return self.card_resolver.resolve(cardId)
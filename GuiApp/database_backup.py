@@ -0,0 +1,338 @@
+"""
+Online backups of the database with the SQLite backup API.
+
+Provides:
+- BACKUP_PREFIX: The file name prefix of every backup.
+- backupDirectoryFor(): The directory the backups of a database go to.
+- backupDatabase(): Copy an open database to a timestamped backup file in
+  steps of a few pages.
+- archiveBackupPath(): The path of the archive database's backup taken
+  along with a backup.
+- rotateBackups(): Remove all but the newest backups in a directory.
+- BackupService: A thread running requested and scheduled backups.
+
+connection.backup(pages=0) copies the whole database in one call and keeps
+the source locked until it is done. Copying a few pages per step instead,
+with a short sleep in between, lets writers in between the steps. If
+another connection writes to the database during a backup SQLite restarts
+the copy at the next step, so a finished backup is always consistent.
+
+Backups are written to a .partial file first and renamed once complete, so
+a crash never leaves a half written file that looks like a backup.
+
+The archive database old transactions are moved to is backed up along with
+the database, next to its backup with an _archive suffix, and rotated with
+it.
+"""
+
+import datetime
+import glob
+import gzip
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import Future
+from time import monotonic, sleep
+from typing import Callable
+
+from database_writer import scheduleOnClock
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+BACKUP_PREFIX = "database_backup_"
+ARCHIVE_BACKUP_SUFFIX = "_archive"
+BACKUP_DIRECTORY_NAME = "backups"
+
+# Queued to wake up the service thread, to stop it or to reschedule
+_STOP = object()
+_RESCHEDULE = object()
+
+
+def backupDirectoryFor(databasePath: str) -> str:
+    """The backups directory next to the database at databasePath."""
+    return os.path.join(os.path.dirname(databasePath), BACKUP_DIRECTORY_NAME)
+
+
+def backupFileName(now: datetime.datetime) -> str:
+    return f"{BACKUP_PREFIX}{now.strftime('%Y-%m-%d_%H-%M-%S')}.db"
+
+
+def backupDatabase(
+    source: sqlite3.Connection,
+    backupDirectory: str = ".",
+    pagesPerStep: int = 256,
+    stepPause: float = 0.005,
+    compress: bool = False,
+    progress: Callable[[int, int], None] = None,
+    backupPath: str = None,
+) -> str:
+    """
+    Copy source to a new backup file in backupDirectory, pagesPerStep pages
+    at a time with stepPause seconds in between. A gzip compressed backup
+    gets a .gz suffix.
+
+    Args:
+        progress: Called with (copied pages, total pages) after every step.
+        backupPath: Back up to this path instead of a new timestamped file
+            in backupDirectory.
+
+    Returns:
+        The path of the finished backup.
+    """
+    assert isinstance(pagesPerStep, int) and pagesPerStep > 0
+    if backupPath is None:
+        backupPath = _newBackupPath(backupDirectory)
+    os.makedirs(os.path.dirname(backupPath) or ".", exist_ok=True)
+    partialPath = backupPath + ".partial"
+    if os.path.exists(partialPath):
+        os.remove(partialPath)
+
+    def onStep(_status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+        # SQLite only sleeps on its own when a step finds the source busy
+        if remaining > 0 and stepPause > 0:
+            sleep(stepPause)
+
+    target = sqlite3.connect(partialPath)
+    try:
+        source.backup(target, pages=pagesPerStep, progress=onStep)
+    finally:
+        target.close()
+
+    if compress:
+        backupPath += ".gz"
+        with open(partialPath, "rb") as uncompressed, gzip.open(
+            backupPath, "wb"
+        ) as compressed:
+            shutil.copyfileobj(uncompressed, compressed)
+        os.remove(partialPath)
+    else:
+        os.replace(partialPath, backupPath)
+    return backupPath
+
+
+def _newBackupPath(backupDirectory: str) -> str:
+    name = backupFileName(datetime.datetime.now())
+    backupPath = os.path.join(backupDirectory, name)
+    # Never overwrite a backup taken earlier in the same second
+    duplicate = 0
+    while os.path.exists(backupPath) or os.path.exists(backupPath + ".gz"):
+        duplicate += 1
+        backupPath = os.path.join(
+            backupDirectory, f"{name[: -len('.db')]}_{duplicate}.db"
+        )
+    return backupPath
+
+
+def archiveBackupPath(backupPath: str) -> str:
+    """
+    The uncompressed path the archive database is backed up to along with
+    the backup at backupPath.
+    """
+    if backupPath.endswith(".gz"):
+        backupPath = backupPath[: -len(".gz")]
+    return f"{backupPath[: -len('.db')]}{ARCHIVE_BACKUP_SUFFIX}.db"
+
+
+def rotateBackups(backupDirectory: str, retention: int) -> list[str]:
+    """
+    Remove all but the newest retention backups in backupDirectory, with
+    the archive backups taken along with them.
+
+    Returns:
+        The removed paths.
+    """
+    assert isinstance(retention, int) and retention > 0
+    backups = glob.glob(os.path.join(backupDirectory, f"{BACKUP_PREFIX}*.db"))
+    backups += glob.glob(os.path.join(backupDirectory, f"{BACKUP_PREFIX}*.db.gz"))
+    archiveBackups = {
+        path
+        for path in backups
+        if path.endswith(
+            (f"{ARCHIVE_BACKUP_SUFFIX}.db", f"{ARCHIVE_BACKUP_SUFFIX}.db.gz")
+        )
+    }
+    backups = [path for path in backups if path not in archiveBackups]
+    # The timestamp in the name sorts oldest first
+    backups.sort(key=os.path.basename)
+    removed = []
+    for path in backups[:-retention]:
+        removed.append(path)
+        archivePath = archiveBackupPath(path)
+        for companion in (archivePath, archivePath + ".gz"):
+            if companion in archiveBackups:
+                removed.append(companion)
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+class BackupJob:
+    """
+    A backup queued on a BackupService. on_progress(copied, total) and
+    on_done(future) run on the main thread.
+    """
+
+    __slots__ = ("on_progress", "on_done", "future")
+
+    def __init__(
+        self,
+        on_progress: Callable[[int, int], None] = None,
+        on_done: Callable[[Future], None] = None,
+    ):
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.future: Future = Future()
+
+
+class BackupService:  # pylint: disable=too-many-instance-attributes
+    """
+    Thread running backups of a database file, one at a time, with its own
+    connection so the main connection is never held up by a backup.
+
+    Backups are run on request with requestBackup() and every interval
+    seconds while an interval is set. Each backup also backs up the archive
+    database, once it exists. After each backup all but the newest
+    retention backups are removed.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        backup_directory: str = "backups",
+        interval: float = None,
+        retention: int = 10,
+        compress: bool = False,
+        pages_per_step: int = 256,
+        step_pause: float = 0.005,
+        dispatch: Callable[[Callable[[], None]], None] = scheduleOnClock,
+        archive_path: str = None,
+    ):
+        """
+        Args:
+            interval: Seconds between scheduled backups, None to only back
+                up on request.
+            dispatch: Runs a callback on the main thread.
+            archive_path: The archive database of the database, see
+                DatabaseConnector.archive_path.
+        """
+        assert database_path != ":memory:", "Cannot back up an in-memory database"
+        assert isinstance(retention, int) and retention > 0
+        self.database_path = database_path
+        self.archive_path = archive_path
+        self.backup_directory = backup_directory
+        self.retention = retention
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.dispatch = dispatch
+        self.backups = 0
+        self.lastBackupPath: str = None
+        self.lastArchiveBackupPath: str = None
+        self._interval: float = None
+        self._nextScheduled: float = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="BackupService", daemon=True
+        )
+        self.set_interval(interval)
+        self._thread.start()
+
+    def set_interval(self, interval: float):
+        """Back up every interval seconds from now on, None or 0 to stop."""
+        assert interval is None or interval >= 0
+        self._interval = interval or None
+        self._nextScheduled = (
+            None if self._interval is None else monotonic() + self._interval
+        )
+        self._queue.put(_RESCHEDULE)
+
+    def requestBackup(
+        self,
+        on_progress: Callable[[int, int], None] = None,
+        on_done: Callable[[Future], None] = None,
+    ) -> Future:
+        """
+        Queue a backup, see BackupJob. Returns a future resolved with the
+        path of the backup.
+        """
+        assert self._thread.is_alive(), "The backup service is closed"
+        job = BackupJob(on_progress, on_done)
+        self._queue.put(job)
+        return job.future
+
+    def close(self):
+        """Finish the queued backups and stop the service thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        logger.info("Backup service closed after %d backups", self.backups)
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._nextScheduled is not None:
+                timeout = max(self._nextScheduled - monotonic(), 0)
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._nextScheduled = monotonic() + self._interval
+                job = BackupJob()
+            if job is _STOP:
+                return
+            if job is _RESCHEDULE:
+                continue
+            self._backup(job)
+
+    def _backup(self, job: BackupJob):
+        def dispatchProgress(copied, total):
+            self.dispatch(lambda: job.on_progress(copied, total))
+
+        progress = dispatchProgress if job.on_progress is not None else None
+        try:
+            path = self._backupFile(self.database_path, progress=progress)
+            if self.archive_path is not None and os.path.exists(self.archive_path):
+                self.lastArchiveBackupPath = self._backupFile(
+                    self.archive_path, backupPath=archiveBackupPath(path)
+                )
+            removed = rotateBackups(self.backup_directory, self.retention)
+        except (sqlite3.Error, OSError) as e:
+            logger.error("Database backup failed: %s", e, exc_info=True)
+            job.future.set_exception(e)
+        else:
+            self.backups += 1
+            self.lastBackupPath = path
+            logger.info(
+                "Database backup created as %s, removed %d old backups",
+                path,
+                len(removed),
+            )
+            job.future.set_result(path)
+        if job.on_done is not None:
+            self.dispatch(lambda: job.on_done(job.future))
+
+    def _backupFile(
+        self,
+        databasePath: str,
+        progress: Callable[[int, int], None] = None,
+        backupPath: str = None,
+    ) -> str:
+        source = sqlite3.connect(databasePath)
+        try:
+            return backupDatabase(
+                source,
+                self.backup_directory,
+                pagesPerStep=self.pages_per_step,
+                stepPause=self.step_pause,
+                compress=self.compress,
+                progress=progress,
+                backupPath=backupPath,
+            )
+        finally:
+            source.close()
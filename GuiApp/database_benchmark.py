@@ -0,0 +1,246 @@
+"""
+Micro-benchmarks of the DatabaseConnector hot paths at several scales.
+
+Every size is a synthetic database built by SchemaBuilder.generate and
+cached in --data-dir, so later runs only pay for building it once. Each
+benchmark runs on a fresh copy of it and reports operations per second and
+the p50 and p99 latency. With --output the results are written as JSON,
+together with the commit they were measured on, to compare runs.
+
+Runs headless, no Kivy window is opened.
+
+Run from the repository root:
+    python GuiApp/database_benchmark.py --sizes 10000 100000 --output bench.json
+"""
+
+# Kivy must not parse the command line, see kivy.config
+# pylint: disable=wrong-import-position
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable
+
+from app_types import Credits, SnackData, StorageProfile
+from database import DatabaseConnector
+from tests.SchemaBuilder import DatasetSpec, SchemaBuilder
+
+
+# Stock and credits given to every patron and snack before benchmarking, so
+# the purchase flow never runs out
+BENCHMARK_STOCK = 10**9
+BENCHMARK_CREDITS = 10**12
+
+
+def dataset_spec(transactions: int) -> DatasetSpec:
+    """The dataset of a size: one patron per 500 transactions, 200 snacks."""
+    return DatasetSpec(
+        patrons=max(50, transactions // 500), snacks=200, transactions=transactions
+    )
+
+
+def dataset_path(dataDir: str, transactions: int) -> str:
+    """Build the dataset of a size unless it is already in dataDir."""
+    path = os.path.join(dataDir, f"benchmark_{transactions}.db")
+    if not os.path.exists(path):
+        os.makedirs(dataDir, exist_ok=True)
+        print(f"Generating {path} ...", flush=True)
+        SchemaBuilder.generate(path + ".partial", "v7", dataset_spec(transactions))
+        os.replace(path + ".partial", path)
+    return path
+
+
+def measure(operation: Callable[[], object], iterations: int, warmup: int) -> dict:
+    """Time iterations calls of operation after warmup untimed ones."""
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total > 0 else float("inf"),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def benchmarks(
+    database: DatabaseConnector, spec: DatasetSpec, seed: int
+) -> dict[str, tuple[Callable[[], object], int]]:
+    """
+    The operations to measure, keyed by name, with an iteration weight:
+    cheap lookups run more often than full table reads.
+    """
+    rng = random.Random(seed)
+    snackIds = [snack.snackId for snack in database.getAllSnacks()]
+    patronIds = range(1, spec.patrons + 1)
+    # Patron 1 is the most active patron of a generated dataset
+    heaviestPatron = 1
+    fee = Credits("0.50")
+
+    def purchase():
+        # What the UI does from a card tap to a finished purchase
+        patronId = database.getPatronIdByCardId(f"{rng.choice(patronIds):08d}")
+        database.getPatronData(patronId)
+        database.getMostPurchasedSnacksByPatron(patronId)
+        snacks = database.getAllSnacks()
+        snack = rng.choice(snacks)
+        cart = [SnackData(snack.snackId, snack.snackName, 1, "", snack.pricePerItem)]
+        database.checkout(patronId, cart, snack.pricePerItem + fee, datetime.now())
+
+    return {
+        "getSnack": (lambda: database.getSnack(rng.choice(snackIds)), 10),
+        "getAllSnacks": (database.getAllSnacks, 1),
+        "getAllPatrons": (database.getAllPatrons, 1),
+        "getTransactions (random patron)": (
+            lambda: database.getTransactions(rng.choice(patronIds)),
+            1,
+        ),
+        "getTransactions (heaviest patron)": (
+            lambda: database.getTransactions(heaviestPatron),
+            1,
+        ),
+        "getMostPurchasedSnacksByPatron": (
+            lambda: database.getMostPurchasedSnacksByPatron(rng.choice(patronIds)),
+            10,
+        ),
+        "getPatronIdByCardId": (
+            lambda: database.getPatronIdByCardId(f"{rng.choice(patronIds):08d}"),
+            10,
+        ),
+        "purchase flow": (purchase, 1),
+        "getStoreStats": (database.getStoreStats, 10),
+        "rebuildStoreStats": (database.rebuildStoreStats, 0),
+    }
+
+
+def run_size(
+    dataDir: str,
+    transactions: int,
+    iterations: int,
+    storageProfile: StorageProfile,
+    seed: int,
+) -> dict:
+    """Run every benchmark on a fresh copy of the dataset of a size."""
+    spec = dataset_spec(transactions)
+    workPath = os.path.join(dataDir, f"benchmark_{transactions}_work.db")
+    shutil.copyfile(dataset_path(dataDir, transactions), workPath)
+    connection = sqlite3.connect(workPath)
+    connection.execute("UPDATE Snacks SET Quantity = ?", (BENCHMARK_STOCK,))
+    connection.execute("UPDATE Patrons SET TotalCredits = ?", (BENCHMARK_CREDITS,))
+    connection.commit()
+    connection.close()
+
+    database = DatabaseConnector(workPath, storage_profile=storageProfile)
+    results = {}
+    try:
+        for name, (operation, weight) in benchmarks(database, spec, seed).items():
+            # Whole table scans get a handful of runs however few are asked
+            count = max(iterations * weight, 5)
+            results[name] = measure(operation, count, warmup=min(count, 3))
+    finally:
+        database.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(workPath + suffix):
+                os.remove(workPath + suffix)
+    return {
+        "transactions": transactions,
+        "patrons": spec.patrons,
+        "snacks": spec.snacks,
+        "results": results,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="Transactions in each dataset (default 10000 100000)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=100,
+        help="Timed calls per benchmark, cheap lookups get 10x (default 100)",
+    )
+    parser.add_argument(
+        "--storage-profile",
+        type=StorageProfile,
+        default=StorageProfile.DURABLE,
+        choices=list(StorageProfile),
+    )
+    parser.add_argument(
+        "--data-dir",
+        default="benchmark_data",
+        help="Where the generated datasets are cached (default benchmark_data)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "storage_profile": args.storage_profile.value,
+        "sizes": [],
+    }
+    for transactions in args.sizes:
+        size = run_size(
+            args.data_dir,
+            transactions,
+            args.iterations,
+            args.storage_profile,
+            args.seed,
+        )
+        report["sizes"].append(size)
+        print(
+            f"\n{transactions} transactions, {size['patrons']} patrons, "
+            f"{size['snacks']} snacks"
+        )
+        print(f"{'benchmark':<36}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, result in size["results"].items():
+            print(
+                f"{name:<36}{result['ops_per_sec']:>12,.0f}"
+                f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
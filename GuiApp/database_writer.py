@@ -0,0 +1,258 @@
+"""
+Background writer thread for the DatabaseConnector.
+
+Provides:
+- DatabaseWriter: A thread with its own SQLite connection that runs queued
+  write jobs and group commits them.
+
+Every commit on a slow SD card can take tens of milliseconds. The writer
+takes those commits off the Kivy main thread: jobs arriving within a short
+window of each other are run in one transaction and committed together.
+Each job runs in its own SAVEPOINT, so a failing job is rolled back on its
+own without taking the rest of the batch with it.
+
+Every job has a concurrent.futures.Future, resolved on the writer thread as
+soon as the batch is committed. The job's apply and on_done callbacks run
+later on the main thread from the Kivy Clock. flush() only runs apply, so a
+caller that has to see a queued write can have the in-memory caches updated
+without a screen's on_done running in the middle of its method.
+"""
+
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future
+from time import perf_counter
+from typing import Callable
+
+from kivy.clock import Clock
+
+from app_types import StorageProfile
+from logger import get_logger
+from storage_profiles import CommitStats, apply_storage_profile
+
+
+logger = get_logger(__name__)
+
+# Queued instead of a job to stop the writer thread
+_STOP = object()
+
+
+def scheduleOnClock(callback: Callable[[], None]):
+    """Run callback on the Kivy main thread on the next frame."""
+    Clock.schedule_once(lambda dt: callback())
+
+
+class WriteJob:
+    """
+    A write queued on a DatabaseWriter.
+
+    work(cursor) runs on the writer thread, inside the batch transaction,
+    and must not commit. apply(result) and on_done(future) run on the main
+    thread once the batch is committed, apply only if work succeeded.
+    """
+
+    __slots__ = ("work", "apply", "on_done", "future", "isApplied")
+
+    def __init__(
+        self,
+        work: Callable[[sqlite3.Cursor], object],
+        apply: Callable[[object], None] = None,
+        on_done: Callable[[Future], None] = None,
+    ):
+        self.work = work
+        self.apply = apply
+        self.on_done = on_done
+        self.future: Future = Future()
+        self.isApplied = False
+
+
+class DatabaseWriter:  # pylint: disable=too-many-instance-attributes
+    """
+    Writer thread with its own connection, a bounded job queue and group
+    commit.
+
+    Jobs are committed in the order they were submitted. submit() blocks
+    when queue_size jobs are already waiting.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        storage_profile: StorageProfile,
+        group_commit_window: float = 0.005,
+        max_batch_size: int = 32,
+        queue_size: int = 64,
+        dispatch: Callable[[Callable[[], None]], None] = scheduleOnClock,
+    ):
+        assert isinstance(database_path, str)
+        assert isinstance(storage_profile, StorageProfile)
+        assert isinstance(group_commit_window, float)
+        assert isinstance(max_batch_size, int) and max_batch_size > 0
+        assert isinstance(queue_size, int) and queue_size > 0
+        self.database_path = database_path
+        self.storage_profile = storage_profile
+        self.group_commit_window = group_commit_window
+        self.max_batch_size = max_batch_size
+        self.dispatch = dispatch
+        self.commit_stats = CommitStats()
+        self.batches = 0
+        self.jobs = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Committed jobs waiting for their apply and on_done on the main thread
+        self._completed: deque[WriteJob] = deque()
+        self._connection: sqlite3.Connection = None
+        self._opened = threading.Event()
+        self._openError: BaseException = None
+        self._thread = threading.Thread(
+            target=self._run, name="DatabaseWriter", daemon=True
+        )
+        self._thread.start()
+        self._opened.wait()
+        if self._openError is not None:
+            raise self._openError
+
+    def submit(
+        self,
+        work: Callable[[sqlite3.Cursor], object],
+        apply: Callable[[object], None] = None,
+        on_done: Callable[[Future], None] = None,
+    ) -> Future:
+        """Queue work(cursor), see WriteJob. Returns the job's future."""
+        assert self._thread.is_alive(), "The database writer is closed"
+        job = WriteJob(work, apply, on_done)
+        self._queue.put(job)
+        return job.future
+
+    def hasPendingWrites(self) -> bool:
+        return self._queue.unfinished_tasks > 0 or len(self._completed) > 0
+
+    def flush(self):
+        """
+        Wait until every submitted job is committed and run their apply
+        callbacks. Their on_done callbacks are still left to the Clock. Must
+        be called from the main thread.
+        """
+        if not self.hasPendingWrites():
+            return
+        self._queue.join()
+        # Nothing is appended to _completed once the queue is joined
+        for job in list(self._completed):
+            self._apply(job)
+
+    def processCompleted(self):
+        """Run apply and on_done of the committed jobs, on the main thread."""
+        while self._completed:
+            job = self._completed.popleft()
+            self._apply(job)
+            if job.on_done is not None:
+                job.on_done(job.future)
+
+    @staticmethod
+    def _apply(job: WriteJob):
+        if job.isApplied:
+            return
+        job.isApplied = True
+        if job.apply is not None and job.future.exception() is None:
+            job.apply(job.future.result())
+
+    def close(self):
+        """
+        Commit the queued jobs and stop the writer thread. Their callbacks
+        are still run from the Clock.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        logger.info(
+            "Database writer closed after %d jobs in %d batches: %s",
+            self.jobs,
+            self.batches,
+            self.commit_stats.as_dict(),
+        )
+
+    def get_report(self) -> dict:
+        return {
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "pending": self._queue.unfinished_tasks,
+            **self.commit_stats.as_dict(),
+        }
+
+    def _run(self):
+        try:
+            # Transactions are managed explicitly with BEGIN and SAVEPOINT
+            self._connection = sqlite3.connect(self.database_path, isolation_level=None)
+            apply_storage_profile(self._connection, self.storage_profile)
+        except BaseException as e:  # pylint: disable=broad-except
+            self._openError = e
+            return
+        finally:
+            self._opened.set()
+
+        try:
+            isStopping = False
+            while not isStopping:
+                batch, isStopping = self._takeBatch()
+                if batch:
+                    self._commitBatch(batch)
+                for _ in range(len(batch) + isStopping):
+                    self._queue.task_done()
+        finally:
+            self._connection.close()
+
+    def _takeBatch(self) -> tuple[list[WriteJob], bool]:
+        """
+        Wait for a job, then keep taking the jobs arriving within
+        group_commit_window of it.
+
+        Returns:
+            The batch and whether the writer was asked to stop.
+        """
+        job = self._queue.get()
+        if job is _STOP:
+            return [], True
+        batch = [job]
+        deadline = perf_counter() + self.group_commit_window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - perf_counter()
+            try:
+                job = self._queue.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _commitBatch(self, batch: list[WriteJob]):
+        cursor = self._connection.cursor()
+        results = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                cursor.execute("SAVEPOINT job")
+                try:
+                    results.append((job.work(cursor), None))
+                except Exception as e:  # pylint: disable=broad-except
+                    cursor.execute("ROLLBACK TO job")
+                    results.append((None, e))
+                cursor.execute("RELEASE job")
+            self.commit_stats.time_commit(self._connection)
+        except sqlite3.Error as e:
+            logger.error("Database writer batch of %d failed: %s", len(batch), e)
+            if self._connection.in_transaction:
+                self._connection.rollback()
+            results = [(None, e)] * len(batch)
+
+        self.batches += 1
+        self.jobs += len(batch)
+        for job, (result, error) in zip(batch, results):
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+            self._completed.append(job)
+        self.dispatch(self.processCompleted)
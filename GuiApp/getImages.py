@@ -35,12 +35,12 @@ async def navigateScreensCoroutine():
     app.screenManager.login(patrons[0].patronId)
     app.screenManager.setSnackToEdit(snacks[0])
 
-    for screen in app.screenManager.screens:
+    for screenName in app.screenManager.getScreenNames():
         app.screenManager.export_to_png(PATH + app.screenManager.current + ".png")
         await asyncio.sleep(DELAY)
-        app.screenManager.transitionToScreen(screen.name)
+        app.screenManager.transitionToScreen(screenName)
         await asyncio.sleep(DELAY)
-        assert app.screenManager.current == screen.name
+        assert app.screenManager.current == screenName
 
 
 async def runAppCoroutine():
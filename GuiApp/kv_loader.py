@@ -0,0 +1,222 @@
+"""
+Loading of the .kv rule files, each one only when it is first needed.
+
+Provides:
+- loadKv(): Load a kv file once, from the compiled cache when it is up to
+  date.
+- kvRules(): Class decorator loading the kv files of a widget the first
+  time the widget is instantiated.
+- compileKvCache(): Parse kv files and write them to the compiled cache.
+
+Parsing a kv file and compiling its expressions takes most of the time of
+loading it. The compiled cache holds the parsed rules of every kv file,
+pickled, next to the SHA-256 of the source they were parsed from. A file
+whose source changed since the cache was built is parsed as usual, so a
+stale cache is never used. The cache is only written by the build step:
+
+    python GuiApp/kv_loader.py
+
+The cache is loaded with pickle, it must only ever be written by this
+build step.
+"""
+
+# Kivy must not parse the command line, see kivy.config
+# pylint: disable=wrong-import-position
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+import argparse
+import copyreg
+import functools
+import glob
+import hashlib
+import io
+import marshal
+import pickle
+import types
+from time import perf_counter
+
+import kivy
+import kivy.lang.builder
+from kivy.lang import Builder
+from kivy.lang.parser import Parser
+from kivy.resources import resource_find
+
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+KV_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kv")
+KV_CACHE_PATH = os.path.join(KV_DIRECTORY, "compiled.kvcache")
+
+# The kv files loaded so far, by the path they were loaded with
+_loaded: set[str] = set()
+# path -> (source hash, pickled Parser), None until first read
+_cache: dict[str, tuple[str, bytes]] = None
+
+
+def _unmarshalCode(data: bytes) -> types.CodeType:
+    return marshal.loads(data)
+
+
+class _KvPickler(pickle.Pickler):
+    """Pickles the code objects of compiled kv expressions with marshal."""
+
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[types.CodeType] = lambda code: (
+        _unmarshalCode,
+        (marshal.dumps(code),),
+    )
+
+
+def _dumps(parser: Parser) -> bytes:
+    buffer = io.BytesIO()
+    _KvPickler(buffer).dump(parser)
+    return buffer.getvalue()
+
+
+def _sourceHash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _readCache(cachePath: str) -> dict[str, tuple[str, bytes]]:
+    if not os.path.exists(cachePath):
+        return {}
+    try:
+        with open(cachePath, "rb") as file:
+            kivyVersion, entries = pickle.load(file)
+    except (
+        OSError,
+        pickle.PickleError,
+        EOFError,
+        ValueError,
+        AttributeError,
+        ImportError,
+    ) as e:
+        logger.warning("Ignoring unreadable kv cache %s: %s", cachePath, e)
+        return {}
+    # Parsed rules refer to Kivy internals, which may change between versions
+    if kivyVersion != kivy.__version__:
+        logger.info("Ignoring kv cache built with Kivy %s", kivyVersion)
+        return {}
+    return entries
+
+
+def _cachedParser(path: str, source: str) -> Parser:
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        _cache = _readCache(KV_CACHE_PATH)
+    entry = _cache.get(path)
+    if entry is None or entry[0] != _sourceHash(source):
+        return None
+    return pickle.loads(entry[1])
+
+
+def loadKv(path: str):
+    """
+    Load the rules of a kv file, unless they are already loaded. path is
+    looked up like Builder.load_file does.
+    """
+    if path in _loaded:
+        return
+    started = perf_counter()
+    filename = resource_find(path) or path
+    with open(filename, "r", encoding="utf-8") as file:
+        source = file.read()
+    parser = _cachedParser(path, source)
+    if parser is None:
+        Builder.load_string(source, filename=filename)
+    else:
+        # Builder.load_string parses with kivy.lang.builder.Parser, have it
+        # use the cached parse instead. Parser runs the directives (imports,
+        # sets) while parsing, so run them for the cached one too
+        def useCachedParser(**_kwargs):
+            parser.execute_directives()
+            return parser
+
+        kivy.lang.builder.Parser = useCachedParser
+        try:
+            Builder.load_string(source, filename=filename)
+        finally:
+            kivy.lang.builder.Parser = Parser
+    _loaded.add(path)
+    logger.debug(
+        "Loaded %s%s in %.1f ms",
+        path,
+        "" if parser is None else " from cache",
+        (perf_counter() - started) * 1000,
+    )
+
+
+def kvRules(*paths: str):
+    """
+    Class decorator loading the kv files in paths right before the first
+    instance of the class applies its rules.
+    """
+
+    def decorate(cls):
+        init = cls.__init__
+
+        @functools.wraps(init)
+        def __init__(self, *args, **kwargs):
+            for path in paths:
+                loadKv(path)
+            init(self, *args, **kwargs)
+
+        cls.__init__ = __init__
+        return cls
+
+    return decorate
+
+
+def compileKvCache(paths: list[str], cachePath: str = KV_CACHE_PATH) -> int:
+    """
+    Parse the kv files in paths and write the parsed rules to cachePath.
+
+    Returns:
+        The size of the cache in bytes.
+    """
+    entries = {}
+    for path in paths:
+        filename = resource_find(path) or path
+        with open(filename, "r", encoding="utf-8") as file:
+            source = file.read()
+        parser = Parser(content=source, filename=path)
+        entries[path] = (_sourceHash(source), _dumps(parser))
+    data = pickle.dumps((kivy.__version__, entries))
+    with open(cachePath + ".partial", "wb") as file:
+        file.write(data)
+    os.replace(cachePath + ".partial", cachePath)
+    return len(data)
+
+
+def kvFiles() -> list[str]:
+    """Every kv file of the app, as the path it is loaded with."""
+    appDirectory = os.path.dirname(KV_DIRECTORY)
+    return sorted(
+        os.path.relpath(path, appDirectory).replace(os.sep, "/")
+        for path in glob.glob(os.path.join(KV_DIRECTORY, "**", "*.kv"), recursive=True)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compile the kv files of the app into the kv cache"
+    )
+    parser.add_argument("--output", default=KV_CACHE_PATH)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(KV_DIRECTORY))
+    paths = kvFiles()
+    size = compileKvCache(paths, args.output)
+    print(f"Compiled {len(paths)} kv files into {args.output} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    # Run from the module the app imports, so the cache refers to
+    # kv_loader._unmarshalCode rather than __main__._unmarshalCode
+    import kv_loader  # pylint: disable=import-self
+
+    kv_loader.main()
@@ -1,10 +1,16 @@
 import argparse
+import importlib
 import logging
 import os
 
+# Starts the boot timeline, keep it ahead of the other imports
+from boot_profiler import bootTimeline
 from logger import get_logger, setup_logging
-from app_types import LogLevel
+from app_types import LogLevel, StorageProfile, set_record_validation
 from database import DatabaseConnector
+from database_backup import BackupService, backupDirectoryFor
+from kv_loader import loadKv
+from storage_profiles import storage_profile_from_setting
 
 # -- Kivy config MUST be set before any other Kivy imports --
 # pylint: disable=wrong-import-position,wrong-import-order,ungrouped-imports
@@ -21,7 +27,6 @@ Config.set("input", "hid_%(name)s", "probesysfs,provider=hidinput")
 
 from kivy.app import App
 from kivy.core.window import Window
-from kivy.lang import Builder
 from kivy.modules import inspector
 from kivy.resources import resource_add_path
 
@@ -39,37 +44,87 @@ import widgets.uiElements.StatsWidgets
 import widgets.uiElements.textInputs
 import widgets.uiElements.WheelOfSnacksWidget
 import widgets.uiElements.alphabetStrip  # noqa: F401; registers .kv
-from widgets.addSnackScreen import AddSnackScreen
-from widgets.adminScreen import AdminScreen
-from widgets.buyScreen import BuyScreen
-from widgets.createUserScreen import CreateUserScreen
 from widgets.customScreenManager import CustomScreenManager
-from widgets.editSnackScreen import EditSnackScreen
-from widgets.editSnacksScreen import EditSnacksScreen
-from widgets.editSystemSettingsScreen import EditSystemSettingsScreen
-from widgets.editUserScreen import EditUserScreen
-from widgets.editUsersScreen import EditUsersScreen
-from widgets.historyScreen import HistoryScreen
-from widgets.linkCardScreen import LinkCardScreen
-from widgets.loginScreen import LoginScreen
-from widgets.mainUserScreen import MainUserScreen
-from widgets.ProfileScreen import ProfileScreen
 from widgets.settingsManager import SettingName, SettingsManager
-from widgets.splashScreen import SplashScreenWidget
-from widgets.logScreen import LogScreen
-from widgets.StoreStatisticsScreen import StoreStatisticsScreen
-from widgets.topUpAmountScreen import TopUpAmountScreen
-from widgets.topUpPaymentScreen import TopUpPaymentScreen
-from widgets.UserStatisticsScreen import UserStatisticsScreen
-from widgets.wheelOfSnacksScreen import WheelOfSnacksScreen
 
 # pylint: enable=unused-import
 
 
+bootTimeline.mark("imports")
+
 resource_add_path("GuiApp")
 
+# Screen name -> module and class of the screen. Screens are built, and their
+# modules imported, the first time they are shown, see
+# CustomScreenManager.registerScreen
+SCREENS = {
+    "splashScreen": ("widgets.splashScreen", "SplashScreenWidget"),
+    "loginScreen": ("widgets.loginScreen", "LoginScreen"),
+    "mainUserPage": ("widgets.mainUserScreen", "MainUserScreen"),
+    "createUserScreen": ("widgets.createUserScreen", "CreateUserScreen"),
+    "adminScreen": ("widgets.adminScreen", "AdminScreen"),
+    "editSnacksScreen": ("widgets.editSnacksScreen", "EditSnacksScreen"),
+    "editUsersScreen": ("widgets.editUsersScreen", "EditUsersScreen"),
+    "addSnackScreen": ("widgets.addSnackScreen", "AddSnackScreen"),
+    "topUpAmountScreen": ("widgets.topUpAmountScreen", "TopUpAmountScreen"),
+    "topUpPaymentScreen": ("widgets.topUpPaymentScreen", "TopUpPaymentScreen"),
+    "buyScreen": ("widgets.buyScreen", "BuyScreen"),
+    "editUserScreen": ("widgets.editUserScreen", "EditUserScreen"),
+    "historyScreen": ("widgets.historyScreen", "HistoryScreen"),
+    "editSnackScreen": ("widgets.editSnackScreen", "EditSnackScreen"),
+    "editSystemSettingsScreen": (
+        "widgets.editSystemSettingsScreen",
+        "EditSystemSettingsScreen",
+    ),
+    "linkCardScreen": ("widgets.linkCardScreen", "LinkCardScreen"),
+    "wheelOfSnacksScreen": ("widgets.wheelOfSnacksScreen", "WheelOfSnacksScreen"),
+    "profileScreen": ("widgets.ProfileScreen", "ProfileScreen"),
+    "userStatisticsScreen": ("widgets.UserStatisticsScreen", "UserStatisticsScreen"),
+    "storeStatsScreen": ("widgets.StoreStatisticsScreen", "StoreStatisticsScreen"),
+    "logScreen": ("widgets.logScreen", "LogScreen"),
+}
+# Rules used across screens, loaded at startup. The rules of each screen and
+# popup are loaded when it is first built, see kv_loader.kvRules
+SHARED_KV_FILES = (
+    "kv/aboutPopup.kv",
+    "kv/uiElements/alphabetStrip.kv",
+    "kv/uiElements/buttons.kv",
+    "kv/uiElements/labels.kv",
+    "kv/uiElements/layouts.kv",
+    "kv/uiElements/navigationHeader.kv",
+    "kv/uiElements/ParticleEmitter.kv",
+    "kv/uiElements/StatsWidgets.kv",
+    "kv/uiElements/textInputs.kv",
+    "kv/uiElements/WheelOfSnacksWidget.kv",
+)
+# Built in the background once the first frame is shown, the screens a
+# kiosk session goes through
+PREWARM_SCREENS = ("loginScreen", "mainUserPage", "buyScreen")
+# Screen name -> method of the screen receiving the RFID cards read while it
+# is shown. Cards read on any other screen are ignored
+CARD_ROUTES = {
+    "splashScreen": "card_read_callback",
+    "loginScreen": "cardRead",
+    "createUserScreen": "cardRead",
+    "editUserScreen": "cardRead",
+}
+
+
+def screen_factory(name: str, module: str, className: str):
+    def build():
+        return getattr(importlib.import_module(module), className)(name=name)
+
+    return build
+
+
+def card_route(screenManager: CustomScreenManager, name: str, method: str):
+    def route(cardId: str):
+        getattr(screenManager.get_screen(name), method)(cardId)
+
+    return route
+
 
-class snackAttackTrackApp(App):
+class snackAttackTrackApp(App):  # pylint: disable=too-many-instance-attributes
     logger = get_logger(__name__)
 
     def __init__(
@@ -77,19 +132,29 @@ class snackAttackTrackApp(App):
         use_inspector=True,
         settings_path="settings.json",
         database_path="database.db",
+        async_database_writes=False,
+        prewarm_screens=True,
     ):
         self.title = "Snack Attack Track"
         self.settingsManager: SettingsManager = self.create_settings_manager(
             settings_path
         )
+        bootTimeline.mark("settings")
         self.database: DatabaseConnector = DatabaseConnector(
-            database_path=database_path
+            database_path=database_path,
+            storage_profile=self.load_storage_profile(),
+            async_writes=async_database_writes,
         )
+        bootTimeline.mark("database")
+        self.backupService: BackupService = self.create_backup_service(database_path)
+        bootTimeline.mark("backup service")
         self.screenManager: CustomScreenManager = CustomScreenManager(
             settingsManager=self.settingsManager, database=self.database
         )
+        bootTimeline.mark("screen manager")
 
         self.use_inspector = use_inspector
+        self.prewarm_screens = prewarm_screens
         Window.bind(on_key_down=self._on_keyboard_down)
         self.colors = {
             "background": (165 / 255, 231 / 255, 234 / 255, 1),
@@ -120,6 +185,19 @@ class snackAttackTrackApp(App):
             return True
         return False
 
+    def load_storage_profile(self) -> StorageProfile:
+        value = self.settingsManager.get_setting_value(
+            settingName=SettingName.DATABASE_STORAGE_PROFILE
+        )
+        storageProfile = storage_profile_from_setting(value)
+        if storageProfile.value != value:
+            # Save the fallback so the settings screen shows the profile in use
+            self.settingsManager.set_setting_value(
+                settingName=SettingName.DATABASE_STORAGE_PROFILE,
+                value=storageProfile.value,
+            )
+        return storageProfile
+
     def create_settings_manager(self, settings_path: str) -> SettingsManager:
         sm = SettingsManager(settings_path)
 
@@ -138,41 +216,86 @@ class snackAttackTrackApp(App):
         sm.add_bool_setting(SettingName.EXCITING_GAMBLING, True)
         sm.add_enum_setting(SettingName.LOG_LEVEL, LogLevel.INFO, LogLevel)
         sm.add_bool_setting(SettingName.DEBUG_AUTO_LOGOUT_TIMER, False)
+        sm.add_enum_setting(
+            SettingName.DATABASE_STORAGE_PROFILE,
+            StorageProfile.SD_CARD_SAFE,
+            StorageProfile,
+        )
+        # 0 turns scheduled backups off
+        sm.add_float_setting(
+            SettingName.DATABASE_BACKUP_INTERVAL_HOURS, 24.0, 0.0, 168.0
+        )
+        sm.add_bool_setting(SettingName.DATABASE_BACKUP_COMPRESS, False)
 
         return sm
 
-    def build(self):
-        Builder.load_file("kv/main.kv")
-        self.screenManager.add_widget(SplashScreenWidget(name="splashScreen"))
-        self.screenManager.add_widget(LoginScreen(name="loginScreen"))
-        self.screenManager.add_widget(MainUserScreen(name="mainUserPage"))
-        self.screenManager.add_widget(CreateUserScreen(name="createUserScreen"))
-        self.screenManager.add_widget(AdminScreen(name="adminScreen"))
-        self.screenManager.add_widget(EditSnacksScreen(name="editSnacksScreen"))
-        self.screenManager.add_widget(EditUsersScreen(name="editUsersScreen"))
-        self.screenManager.add_widget(AddSnackScreen(name="addSnackScreen"))
-        self.screenManager.add_widget(TopUpAmountScreen(name="topUpAmountScreen"))
-        self.screenManager.add_widget(TopUpPaymentScreen(name="topUpPaymentScreen"))
-        self.screenManager.add_widget(BuyScreen(name="buyScreen"))
-        self.screenManager.add_widget(EditUserScreen(name="editUserScreen"))
-        self.screenManager.add_widget(HistoryScreen(name="historyScreen"))
-        self.screenManager.add_widget(EditSnackScreen(name="editSnackScreen"))
-        self.screenManager.add_widget(
-            EditSystemSettingsScreen(name="editSystemSettingsScreen")
+    def create_backup_service(self, database_path: str) -> BackupService:
+        def hoursToSeconds(hours):
+            return hours * 3600
+
+        backupService = BackupService(
+            database_path,
+            backup_directory=backupDirectoryFor(database_path),
+            archive_path=self.database.archive_path,
+            interval=hoursToSeconds(
+                self.settingsManager.get_setting_value(
+                    settingName=SettingName.DATABASE_BACKUP_INTERVAL_HOURS
+                )
+            ),
+            compress=self.settingsManager.get_setting_value(
+                settingName=SettingName.DATABASE_BACKUP_COMPRESS
+            ),
         )
-        self.screenManager.add_widget(LinkCardScreen(name="linkCardScreen"))
-        self.screenManager.add_widget(WheelOfSnacksScreen(name="wheelOfSnacksScreen"))
-        self.screenManager.add_widget(ProfileScreen(name="profileScreen"))
-        self.screenManager.add_widget(UserStatisticsScreen(name="userStatisticsScreen"))
-        self.screenManager.add_widget(StoreStatisticsScreen(name="storeStatsScreen"))
-        self.screenManager.add_widget(LogScreen(name="logScreen"))
+        self.settingsManager.register_on_setting_change_callback(
+            SettingName.DATABASE_BACKUP_INTERVAL_HOURS,
+            lambda value: backupService.set_interval(hoursToSeconds(value)),
+        )
+
+        def setCompress(value):
+            backupService.compress = value
+
+        self.settingsManager.register_on_setting_change_callback(
+            SettingName.DATABASE_BACKUP_COMPRESS, setCompress
+        )
+        return backupService
+
+    def build(self):
+        for path in SHARED_KV_FILES:
+            loadKv(path)
+        bootTimeline.mark("kv rules")
+        for name, (module, className) in SCREENS.items():
+            self.screenManager.registerScreen(
+                name, screen_factory(name, module, className)
+            )
+        for name, method in CARD_ROUTES.items():
+            self.screenManager.RFIDReader.addRoute(
+                name, card_route(self.screenManager, name, method)
+            )
+        # The first screen shown is the only one built up front
+        self.screenManager.get_screen("splashScreen")
 
         if self.use_inspector:
             inspector.create_inspector(Window, self.screenManager)
+        bootTimeline.mark("build")
         return self.screenManager
 
+    def on_start(self):
+        def onFirstFrame(*_):
+            Window.unbind(on_flip=onFirstFrame)
+            bootTimeline.finish("first frame")
+            # Fill the snack catalog now rather than after the first card tap
+            self.screenManager.database.getAllSnacks()
+            if self.prewarm_screens:
+                self.screenManager.prewarmScreens(PREWARM_SCREENS)
+
+        Window.bind(on_flip=onFirstFrame)
+        self.screenManager.RFIDReader.start()
+
     def on_stop(self):
         self.logger.info("Application shutting down, closing database connection")
+        self.backupService.close()
+        self.screenManager.qrCodes.close()
+        self.screenManager.RFIDReader.stop()
         self.screenManager.database.close()
         return super().on_stop()
 
@@ -195,6 +318,7 @@ def main():
     setup_logging(log_level=log_level)
     logger = get_logger(__name__)
     logger.info("Snack Attack Track starting up")
+    bootTimeline.mark("logging")
 
     parser = argparse.ArgumentParser(description="Snack Attack Track Application")
     parser.add_argument(
@@ -208,19 +332,33 @@ def main():
         help="Rotate the screen by an angle between 0 and 360 degrees",
     )
     parser.add_argument("--hide-cursor", action="store_true", help="Hide the cursor")
+    parser.add_argument(
+        "--no-record-validation",
+        action="store_true",
+        help="Skip the type checks when building user, snack and history records",
+    )
+    parser.add_argument(
+        "--async-database-writes",
+        action="store_true",
+        help="Commit purchases on a background writer thread with group commit",
+    )
 
     args = parser.parse_args()
     logger.info("Command-line args: %s", vars(args))
+    bootTimeline.mark("arguments")
+
+    if args.no_record_validation:
+        set_record_validation(False)
 
     # Size of Raspberry pi touchscreen
     Window.size = (800, 480)
     Window.rotation = args.rotate_screen
     Window.show_cursor = not args.hide_cursor
 
-    if args.no_inspector:
-        app = snackAttackTrackApp(use_inspector=False)
-    else:
-        app = snackAttackTrackApp(use_inspector=True)
+    app = snackAttackTrackApp(
+        use_inspector=not args.no_inspector,
+        async_database_writes=args.async_database_writes,
+    )
 
     # Apply log level from settings (overrides env var default)
     setting_log_level = app.settingsManager.get_setting_value(
@@ -0,0 +1,36 @@
+"""
+Lightweight latency metrics.
+
+Provides:
+- LatencyStats: Running count, average, maximum and last latency of an
+  operation.
+"""
+
+
+class LatencyStats:
+    """Running latency statistics of an operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def average_seconds(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total_seconds / self.count
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.average_seconds() * 1000,
+            "max_ms": self.max_seconds * 1000,
+            "last_ms": self.last_seconds * 1000,
+        }
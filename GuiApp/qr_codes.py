@@ -0,0 +1,149 @@
+"""
+Swish payment QR codes, rendered off the main thread and kept in memory.
+
+Provides:
+- swishPaymentUrl(): The Swish payment link a top-up QR code encodes.
+- QrCodeCache: Renders QR codes on a worker thread into textures, and
+  keeps the most recently used ones.
+
+Encoding a QR code and drawing it takes tens of milliseconds on the Pi.
+The worker thread only produces the pixels, one per QR module, because
+Kivy textures must be created on the main thread. The texture is made from
+them on the next frame and handed to every caller waiting for that code.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+from kivy.graphics.texture import Texture
+from qrcode import make as makeQRCode
+
+from app_types import Credits
+from database_writer import scheduleOnClock
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def swishPaymentUrl(swishNumber: str, amount: Credits, name: str) -> str:
+    return (
+        f"https://app.swish.nu/1/p/sw/?sw={swishNumber}&amt={amount:.2f}"
+        f"&cur=SEK&msg=Snack%20Attack%20Top-up%20for%20{name}&src=qr"
+    )
+
+
+class QrCodeKey(NamedTuple):
+    swishNumber: str
+    amount: Credits
+    name: str
+
+
+class RenderedQrCode(NamedTuple):
+    width: int
+    height: int
+    # RGBA, top row first
+    pixels: bytes
+
+
+def renderQrCode(data: str) -> RenderedQrCode:
+    # One pixel per module, the texture is scaled up without smoothing
+    image = makeQRCode(data, box_size=1).get_image().convert("RGBA")
+    return RenderedQrCode(image.width, image.height, image.tobytes())
+
+
+class QrCodeCache:
+    """
+    The textures of the maxsize most recently requested Swish QR codes.
+    Codes missing from the cache are rendered on a worker thread, one
+    request at a time. Only used from the main thread.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 16,
+        dispatch: Callable[[Callable[[], None]], None] = scheduleOnClock,
+    ):
+        """
+        Args:
+            dispatch: Runs a callback on the main thread.
+        """
+        assert isinstance(maxsize, int) and maxsize > 0
+        self.maxsize = maxsize
+        self.dispatch = dispatch
+        self._textures: OrderedDict[QrCodeKey, Texture] = OrderedDict()
+        # Codes being rendered -> callbacks waiting for them
+        self._pending: dict[QrCodeKey, list[Callable[[Texture], None]]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="QrCode")
+
+    def request(
+        self,
+        swishNumber: str,
+        amount: Credits,
+        name: str,
+        on_ready: Callable[[Texture], None] = None,
+    ):
+        """
+        Get the QR code paying amount to swishNumber. on_ready(texture) is
+        called right away when the code is cached, otherwise on the main
+        thread once it is rendered. Without on_ready the code is only
+        rendered into the cache.
+        """
+        assert isinstance(amount, Credits)
+        key = QrCodeKey(swishNumber, amount, name)
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+            if on_ready is not None:
+                on_ready(texture)
+            return
+        waiting = self._pending.get(key)
+        if waiting is None:
+            waiting = self._pending[key] = []
+            future = self._executor.submit(
+                renderQrCode, swishPaymentUrl(swishNumber, amount, name)
+            )
+            future.add_done_callback(
+                lambda future: self.dispatch(lambda: self._onRendered(key, future))
+            )
+        if on_ready is not None:
+            waiting.append(on_ready)
+
+    def prefetch(self, swishNumber: str, amounts: list[Credits], name: str):
+        """Render the QR codes of amounts ahead of them being shown."""
+        for amount in amounts:
+            self.request(swishNumber, amount, name)
+
+    def __contains__(self, key: QrCodeKey) -> bool:
+        return key in self._textures
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _onRendered(self, key: QrCodeKey, future: Future):
+        waiting = self._pending.pop(key)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(
+                "Rendering the QR code of %s failed",
+                key,
+                exc_info=future.exception(),
+            )
+            return
+        rendered: RenderedQrCode = future.result()
+        texture = Texture.create(
+            size=(rendered.width, rendered.height), colorfmt="rgba"
+        )
+        texture.blit_buffer(rendered.pixels, colorfmt="rgba", bufferfmt="ubyte")
+        # Textures start at the bottom row, images at the top one
+        texture.flip_vertical()
+        # Keep the modules sharp when scaled up
+        texture.mag_filter = "nearest"
+        self._textures[key] = texture
+        self._textures.move_to_end(key)
+        while len(self._textures) > self.maxsize:
+            self._textures.popitem(last=False)
+        for on_ready in waiting:
+            on_ready(texture)
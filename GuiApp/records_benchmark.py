@@ -0,0 +1,195 @@
+"""
+Micro-benchmark of the UserData, SnackData and HistoryData record types.
+
+Compares the slotted records in app_types with the plain __dict__ classes
+they used to be, measuring the memory of one record and how many records
+per second are built by:
+- the validating constructor,
+- the constructor with record validation switched off,
+- the trusted from_row constructor DatabaseConnector uses for SQLite rows.
+
+Run from the repository root:
+    python GuiApp/records_benchmark.py
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from datetime import datetime
+
+import app_types
+from app_types import (
+    Credits,
+    HistoryData,
+    SnackData,
+    TransactionType,
+    UserData,
+    fromEpochMicroseconds,
+)
+
+
+# The baselines are copies of the old classes on purpose
+# pylint: disable=duplicate-code
+class DictUserData:
+    """The previous UserData, kept as the benchmark baseline."""
+
+    def __init__(self, patronId, firstName, lastName, employeeID, totalCredits):
+        assert isinstance(patronId, int)
+        assert isinstance(firstName, str)
+        assert isinstance(lastName, str)
+        assert isinstance(employeeID, str)
+        assert isinstance(totalCredits, Credits)
+        self.patronId: int = patronId
+        self.firstName: str = firstName
+        self.lastName: str = lastName
+        self.employeeID: str = employeeID
+        self.totalCredits: Credits = totalCredits
+
+
+class DictSnackData:
+    """The previous SnackData, kept as the benchmark baseline."""
+
+    def __init__(
+        self,
+        snackId: int,
+        snackName: str,
+        quantity: int,
+        imageID: str,
+        pricePerItem: Credits,
+    ):
+        assert isinstance(snackId, int)
+        assert isinstance(snackName, str)
+        assert isinstance(quantity, int)
+        assert isinstance(imageID, str)
+        assert isinstance(pricePerItem, Credits)
+        self.snackId: int = snackId
+        self.snackName: str = snackName
+        self.quantity: int = quantity
+        self.imageID: str = imageID
+        self.pricePerItem: Credits = pricePerItem
+
+
+class DictHistoryData:
+    """The previous HistoryData, kept as the benchmark baseline."""
+
+    def __init__(
+        self,
+        transactionId: int,
+        transactionType: TransactionType,
+        transactionDate: datetime,
+        amountBeforeTransaction: Credits,
+        amountAfterTransaction: Credits,
+        transactionItems: list,
+    ):
+        assert isinstance(transactionId, int)
+        assert isinstance(transactionType, TransactionType)
+        assert isinstance(transactionDate, datetime)
+        assert isinstance(amountBeforeTransaction, Credits)
+        assert isinstance(amountAfterTransaction, Credits)
+        assert isinstance(transactionItems, list)
+        self.transactionId: int = transactionId
+        self.transactionType: TransactionType = transactionType
+        self.transactionDate: datetime = transactionDate
+        self.amountBeforeTransaction: Credits = amountBeforeTransaction
+        self.amountAfterTransaction: Credits = amountAfterTransaction
+        self.transactionItems: list = transactionItems
+
+
+# Rows as they come out of SQLite
+PATRON_ROW = (1, "First", "Last", "123456789", 1250)
+SNACK_ROW = (1, "Snack", 42, "Image", 125)
+TRANSACTION_ROW = (1, "PURCHASE", 1767268800000000, 2000, 1450)
+
+
+def _decode_patron(row: tuple) -> tuple:
+    return (row[0], row[1], row[2], row[3], Credits.from_hundredths(row[4]))
+
+
+def _decode_snack(row: tuple) -> tuple:
+    return (row[0], row[1], row[2], row[3], Credits.from_hundredths(row[4]))
+
+
+def _decode_transaction(row: tuple) -> tuple:
+    return (
+        row[0],
+        TransactionType(row[1]),
+        fromEpochMicroseconds(row[2]),
+        Credits.from_hundredths(row[3]),
+        Credits.from_hundredths(row[4]),
+        [],
+    )
+
+
+# How DatabaseConnector builds each record from a row, before and after
+RECORDS = {
+    "UserData": (DictUserData, UserData, _decode_patron, PATRON_ROW),
+    "SnackData": (DictSnackData, SnackData, _decode_snack, SNACK_ROW),
+    "HistoryData": (
+        DictHistoryData,
+        HistoryData,
+        _decode_transaction,
+        TRANSACTION_ROW,
+    ),
+}
+
+
+def bytes_per_record(factory, count: int = 10000) -> float:
+    """Memory allocated per record, including its decoded field values."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    records = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # The list holding the records is not part of a record
+    allocated -= records.__sizeof__()
+    return allocated / count
+
+
+def records_per_second(factory, number: int) -> float:
+    seconds = min(timeit.repeat(factory, number=number, repeat=5))
+    return number / seconds
+
+
+def _variants(oldType, newType, decode, row: tuple) -> dict:
+    """Factories building a record from row, keyed by variant."""
+    return {
+        "before": lambda: oldType(*decode(row)),
+        "after": lambda: newType(*decode(row)),
+        "after, no validation": lambda: newType(*decode(row)),
+        "after, from_row": lambda: newType.from_row(row),
+    }
+
+
+def run(number: int) -> list[tuple[str, str, float, float]]:
+    """Measure every record, returns (record, variant, bytes, records/s)."""
+    results = []
+    for name, record in RECORDS.items():
+        for variant, factory in _variants(*record).items():
+            app_types.set_record_validation(variant != "after, no validation")
+            results.append(
+                (
+                    name,
+                    variant,
+                    bytes_per_record(factory),
+                    records_per_second(factory, number),
+                )
+            )
+    app_types.set_record_validation(True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--number", type=int, default=20000, help="Records per timing (default 20000)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'record':<13}{'variant':<22}{'bytes':>8}{'records/s':>14}")
+    for name, variant, recordBytes, perSecond in run(args.number):
+        print(f"{name:<13}{variant:<22}{recordBytes:>8.0f}{perSecond:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Per-session cache of what the screens of a logged in patron show.
+
+Provides:
+- SessionCache: The patron's snack ranking, statistics and latest history,
+  loaded on the database reader thread as soon as the patron logs in.
+- UserStatistics: The totals shown on the user statistics screen.
+
+The screen manager warms a SessionCache up on every login, so by the time
+the patron picks a screen its data is already in memory. The patron itself
+comes from the card resolver and the inventory from the snack catalog, both
+already in memory. The statistics are summed up in SQL when the patron
+logs in, after that the session's own writes (a purchase, a spin, a top-up)
+update them by their delta through recordWrite(). Only the snack ranking and
+the first history page are then read again in the background.
+"""
+
+from concurrent.futures import Future
+from time import perf_counter
+from typing import Callable, NamedTuple
+
+from app_types import Credits, HistoryData
+from database import DatabaseConnector
+from database_writer import scheduleOnClock
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Number of history transactions loaded at a time, enough to fill the screen
+HISTORY_PAGE_SIZE = 50
+
+
+class UserStatistics(NamedTuple):
+    totalCreditsSpent: Credits
+    totalSnacksPurchased: int
+    totalSnacksWon: int
+    favoriteSnack: str
+
+
+class SessionData(NamedTuple):
+    # Snack names, most purchased first
+    mostPurchasedSnacks: list[str]
+    statistics: UserStatistics
+    # The first page of DatabaseConnector.iterTransactionsPage
+    historyPage: list[HistoryData]
+    historyCursor: tuple
+
+
+class SessionCache:  # pylint: disable=too-many-instance-attributes
+    """
+    The data of one patron's session. Only used from the main thread.
+
+    warmUp() loads it on the database reader thread. A getter called
+    before the warm-up is done loads it right away instead, so the screens
+    never wait for the warm-up and never see data of an older warm-up.
+    """
+
+    def __init__(
+        self,
+        database: DatabaseConnector,
+        patronId: int,
+        historyPageSize: int = HISTORY_PAGE_SIZE,
+        dispatch: Callable[[Callable[[], None]], None] = scheduleOnClock,
+    ):
+        """
+        Args:
+            historyPageSize: The size of the history page loaded ahead.
+            dispatch: Runs a callback on the main thread.
+        """
+        assert isinstance(patronId, int)
+        assert isinstance(historyPageSize, int) and historyPageSize > 0
+        self.database = database
+        self.patronId = patronId
+        self.historyPageSize = historyPageSize
+        self.dispatch = dispatch
+        self._data: SessionData = None
+        # Bumped by invalidate(), warm-ups of an older generation are dropped
+        self._generation = 0
+        # The latest statistics, kept across recordWrite() reloads
+        self._statistics: UserStatistics = None
+        self.hits = 0
+        self.misses = 0
+        self.warmUpSeconds = 0.0
+
+    @property
+    def isWarm(self) -> bool:
+        return self._data is not None
+
+    def warmUp(self):
+        """Load the session's data on the database reader thread."""
+        generation = self._generation
+        statistics = self._statistics
+        started = perf_counter()
+        future = self.database.readAsync(lambda: self._load(statistics))
+        future.add_done_callback(
+            lambda future: self.dispatch(
+                lambda: self._onLoaded(generation, started, future)
+            )
+        )
+
+    def invalidate(self):
+        """Drop the session's data after it changed, and warm up again."""
+        self._statistics = None
+        self._reload()
+
+    def recordWrite(
+        self,
+        creditsSpent: Credits = Credits("0.00"),
+        snacksPurchased: int = 0,
+        snacksWon: int = 0,
+    ):
+        """
+        Account for one of the session's own writes. The statistics are
+        updated by the write's delta instead of being summed up again, only
+        the snack ranking and the first history page are read again.
+        """
+        assert isinstance(creditsSpent, Credits)
+        assert isinstance(snacksPurchased, int)
+        assert isinstance(snacksWon, int)
+        if self._statistics is not None:
+            self._statistics = self._statistics._replace(
+                totalCreditsSpent=self._statistics.totalCreditsSpent + creditsSpent,
+                totalSnacksPurchased=self._statistics.totalSnacksPurchased
+                + snacksPurchased,
+                totalSnacksWon=self._statistics.totalSnacksWon + snacksWon,
+            )
+        self._reload()
+
+    def getMostPurchasedSnacks(self) -> list[str]:
+        return list(self._get().mostPurchasedSnacks)
+
+    def getStatistics(self) -> UserStatistics:
+        return self._get().statistics
+
+    def getHistoryPage(self) -> tuple[list[HistoryData], tuple]:
+        """The first page of the history and the cursor of the next one."""
+        data = self._get()
+        return list(data.historyPage), data.historyCursor
+
+    def as_dict(self) -> dict:
+        return {
+            "warm": self.isWarm,
+            "hits": self.hits,
+            "misses": self.misses,
+            "warm_up_ms": self.warmUpSeconds * 1000,
+        }
+
+    def _get(self) -> SessionData:
+        if self._data is not None:
+            self.hits += 1
+            return self._data
+        self.misses += 1
+        logger.debug("Session of patron %s not warm yet, loading it", self.patronId)
+        self._data = self._load(self._statistics)
+        self._statistics = self._data.statistics
+        return self._data
+
+    def _reload(self):
+        self._generation += 1
+        self._data = None
+        self.warmUp()
+
+    def _load(self, statistics: UserStatistics = None) -> SessionData:
+        """
+        Load the session's data. The statistics are only summed up when
+        they are not known yet.
+        """
+        mostPurchasedSnacks = self.database.getMostPurchasedSnacksByPatron(
+            self.patronId
+        )
+        if statistics is None:
+            statistics = UserStatistics(
+                *self.database.getPatronSpending(self.patronId), favoriteSnack="N/A"
+            )
+        statistics = statistics._replace(
+            favoriteSnack=mostPurchasedSnacks[0] if mostPurchasedSnacks else "N/A"
+        )
+        historyPage, historyCursor = self.database.iterTransactionsPage(
+            patron_id=self.patronId, limit=self.historyPageSize
+        )
+        return SessionData(mostPurchasedSnacks, statistics, historyPage, historyCursor)
+
+    def _onLoaded(self, generation: int, started: float, future: Future):
+        if future.exception() is not None:
+            logger.error(
+                "Warming up the session of patron %s failed",
+                self.patronId,
+                exc_info=future.exception(),
+            )
+            return
+        if generation != self._generation or self._data is not None:
+            return
+        self._data = future.result()
+        self._statistics = self._data.statistics
+        self.warmUpSeconds = perf_counter() - started
+        logger.debug(
+            "Session of patron %s warmed up in %.1f ms",
+            self.patronId,
+            self.warmUpSeconds * 1000,
+        )
@@ -0,0 +1,109 @@
+"""
+In-process cache of the Snacks table for the DatabaseConnector.
+
+Provides:
+- SnackCatalog: The snacks keyed by ItemID with an index on ItemName, and
+  hit/miss counters.
+
+The DatabaseConnector reads through the catalog and updates it after every
+committed write to the Snacks table, so the catalog never has to be
+invalidated as a whole.
+"""
+
+from app_types import SnackData
+
+
+def copySnack(snack: SnackData) -> SnackData:
+    return SnackData(
+        snack.snackId,
+        snack.snackName,
+        snack.quantity,
+        snack.imageID,
+        snack.pricePerItem,
+    )
+
+
+class SnackCatalog:
+    """
+    SnackData keyed by ItemID, with an index from ItemName to ItemID.
+
+    The catalog stores its own SnackData objects and only hands out copies,
+    callers are free to modify what they get back.
+    """
+
+    def __init__(self):
+        self._snacksById: dict[int, SnackData] = {}
+        self._snackIdsByName: dict[str, int] = {}
+        # True once every row of the Snacks table has been loaded, a snack
+        # missing from a complete catalog does not exist
+        self.isComplete = False
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, snackId: int) -> SnackData:
+        """
+        Get a copy of a snack, or None if it is not in the catalog.
+        Check isComplete to tell a missing snack from one that is not loaded.
+        """
+        snack = self._snacksById.get(snackId)
+        if snack is None:
+            return None
+        return copySnack(snack)
+
+    def getIdByName(self, snackName: str) -> int:
+        return self._snackIdsByName.get(snackName)
+
+    def getAll(self) -> list[SnackData]:
+        return [copySnack(snack) for snack in self._snacksById.values()]
+
+    def has(self, snackId: int) -> bool:
+        return snackId in self._snacksById
+
+    def put(self, snack: SnackData):
+        self._removeFromNameIndex(snack.snackId)
+        self._snacksById[snack.snackId] = copySnack(snack)
+        self._snackIdsByName[snack.snackName] = snack.snackId
+
+    def remove(self, snackId: int):
+        self._removeFromNameIndex(snackId)
+        self._snacksById.pop(snackId, None)
+
+    def _removeFromNameIndex(self, snackId: int):
+        snack = self._snacksById.get(snackId)
+        # Snack names are not unique, the name may point to another snack
+        if snack is not None and self._snackIdsByName.get(snack.snackName) == snackId:
+            del self._snackIdsByName[snack.snackName]
+
+    def subtractQuantity(self, snackId: int, quantity: int) -> int:
+        """
+        Subtract quantity from a loaded snack.
+
+        Returns:
+            The new quantity, or None if the snack is not loaded.
+        """
+        snack = self._snacksById.get(snackId)
+        if snack is None:
+            return None
+        snack.quantity -= quantity
+        return snack.quantity
+
+    def replaceAll(self, snacks: list[SnackData]):
+        """Replace the catalog with every row of the Snacks table."""
+        self.clear()
+        for snack in snacks:
+            self.put(snack)
+        self.isComplete = True
+
+    def clear(self):
+        self._snacksById = {}
+        self._snackIdsByName = {}
+        self.isComplete = False
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "snacks": len(self._snacksById),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
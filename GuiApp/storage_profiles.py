@@ -0,0 +1,202 @@
+"""
+SQLite storage profiles for the DatabaseConnector.
+
+Provides:
+- StorageProfileConfig: The pragmas and WAL checkpoint policy of a profile.
+- STORAGE_PROFILE_CONFIGS: The config for every StorageProfile member.
+- SELECTABLE_STORAGE_PROFILES: The profiles the app can be set to use.
+- storage_profile_from_setting(): The profile a settings value asks for.
+- apply_storage_profile(): Apply a profile to an open connection.
+- read_active_pragmas(): Read back the pragmas SQLite actually uses.
+- CommitStats: Commit latency bookkeeping, used to compare profiles.
+"""
+
+import sqlite3
+import time
+
+from app_types import StorageProfile
+from logger import get_logger
+from metrics import LatencyStats
+
+
+logger = get_logger(__name__)
+
+# Pragmas reported by read_active_pragmas(), in the order they are applied
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "wal_autocheckpoint",
+)
+
+
+class StorageProfileConfig:
+    def __init__(
+        self,
+        journal_mode: str,
+        synchronous: str,
+        mmap_size: int,
+        cache_size: int,
+        temp_store: str,
+        wal_autocheckpoint: int,
+        checkpoint_on_close: bool,
+    ):
+        assert isinstance(journal_mode, str)
+        assert isinstance(synchronous, str)
+        assert isinstance(mmap_size, int)
+        assert isinstance(cache_size, int)
+        assert isinstance(temp_store, str)
+        assert isinstance(wal_autocheckpoint, int)
+        assert isinstance(checkpoint_on_close, bool)
+        self.journal_mode: str = journal_mode
+        self.synchronous: str = synchronous
+        # Bytes of the database file to memory map (0 disables mmap)
+        self.mmap_size: int = mmap_size
+        # Negative values are KiB, positive values are pages (SQLite semantics)
+        self.cache_size: int = cache_size
+        self.temp_store: str = temp_store
+        # WAL pages written before SQLite checkpoints automatically
+        self.wal_autocheckpoint: int = wal_autocheckpoint
+        # Truncate the WAL on close so the next boot starts from a clean file
+        self.checkpoint_on_close: bool = checkpoint_on_close
+
+
+STORAGE_PROFILE_CONFIGS = {
+    # WAL + synchronous=NORMAL: commits append to the WAL without an fsync, the
+    # fsync happens at checkpoint time. A power cut can lose the last commits
+    # but never corrupts the database.
+    StorageProfile.SD_CARD_SAFE: StorageProfileConfig(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-8192,
+        temp_store="MEMORY",
+        wal_autocheckpoint=1000,
+        checkpoint_on_close=True,
+    ),
+    # SQLite defaults: rollback journal with a full fsync on every commit
+    StorageProfile.DURABLE: StorageProfileConfig(
+        journal_mode="DELETE",
+        synchronous="FULL",
+        mmap_size=0,
+        cache_size=-2000,
+        temp_store="DEFAULT",
+        wal_autocheckpoint=1000,
+        checkpoint_on_close=False,
+    ),
+    # No fsyncs at all, only meant for tests and throwaway databases
+    # (pair it with database_path=":memory:" for a database without a file)
+    StorageProfile.IN_MEMORY_TEST: StorageProfileConfig(
+        journal_mode="MEMORY",
+        synchronous="OFF",
+        mmap_size=0,
+        cache_size=-8192,
+        temp_store="MEMORY",
+        wal_autocheckpoint=0,
+        checkpoint_on_close=False,
+    ),
+}
+
+# IN_MEMORY_TEST turns fsyncs off, so the settings never offer it
+SELECTABLE_STORAGE_PROFILES = (StorageProfile.SD_CARD_SAFE, StorageProfile.DURABLE)
+
+
+def storage_profile_from_setting(value: str) -> StorageProfile:
+    """
+    Look up the profile stored in the settings.
+
+    A profile that is not in SELECTABLE_STORAGE_PROFILES, e.g. a
+    settings.json edited by hand, falls back to SD_CARD_SAFE.
+    """
+    try:
+        profile = StorageProfile(value)
+    except ValueError:
+        profile = None
+    if profile not in SELECTABLE_STORAGE_PROFILES:
+        logger.warning(
+            "Storage profile '%s' cannot be used by the app, using '%s'",
+            value,
+            StorageProfile.SD_CARD_SAFE.value,
+        )
+        return StorageProfile.SD_CARD_SAFE
+    return profile
+
+
+def apply_storage_profile(
+    connection: sqlite3.Connection, profile: StorageProfile, schema: str = "main"
+) -> StorageProfileConfig:
+    """
+    Apply the pragmas of a storage profile to an open connection.
+
+    Must be called outside of a transaction, since journal_mode cannot be
+    changed while one is open. If SQLite cannot switch the journal mode the
+    rest of the profile is still applied, callers that need the journal
+    mode read it back.
+
+    Args:
+        schema: The attached database the per-database pragmas are applied
+            to. temp_store and wal_autocheckpoint apply to the whole
+            connection.
+
+    Returns:
+        The StorageProfileConfig that was applied.
+    """
+    assert isinstance(profile, StorageProfile)
+    assert isinstance(schema, str)
+    config = STORAGE_PROFILE_CONFIGS[profile]
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA {schema}.journal_mode = {config.journal_mode}")
+        journal_mode = cursor.fetchone()[0]
+    except sqlite3.OperationalError:
+        # Leaving WAL while another connection has the database open fails
+        # with "database is locked", the old journal mode stays
+        cursor.execute(f"PRAGMA {schema}.journal_mode")
+        journal_mode = cursor.fetchone()[0]
+    if journal_mode.upper() != config.journal_mode:
+        # e.g. ":memory:" databases only support MEMORY or OFF
+        logger.debug(
+            "journal_mode=%s requested by profile '%s' but SQLite uses '%s'",
+            config.journal_mode,
+            profile.value,
+            journal_mode,
+        )
+    cursor.execute(f"PRAGMA {schema}.synchronous = {config.synchronous}")
+    cursor.execute(f"PRAGMA {schema}.mmap_size = {config.mmap_size}")
+    cursor.execute(f"PRAGMA {schema}.cache_size = {config.cache_size}")
+    cursor.execute(f"PRAGMA temp_store = {config.temp_store}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint = {config.wal_autocheckpoint}")
+    cursor.close()
+    return config
+
+
+def read_active_pragmas(connection: sqlite3.Connection) -> dict:
+    """Read back the storage related pragmas SQLite is currently using."""
+    cursor = connection.cursor()
+    pragmas = {}
+    for pragma in REPORTED_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+        result = cursor.fetchone()
+        pragmas[pragma] = result[0] if result else None
+    cursor.close()
+    return pragmas
+
+
+class CommitStats(LatencyStats):
+    """Running commit latency statistics for a connection."""
+
+    def time_commit(self, connection: sqlite3.Connection):
+        start = time.perf_counter()
+        connection.commit()
+        self.record(time.perf_counter() - start)
+
+    def as_dict(self) -> dict:
+        return {
+            "commits": self.count,
+            "avg_commit_ms": self.average_seconds() * 1000,
+            "max_commit_ms": self.max_seconds * 1000,
+            "last_commit_ms": self.last_seconds * 1000,
+        }
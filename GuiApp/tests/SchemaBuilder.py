@@ -4,9 +4,21 @@ Programmatic schema factory for building test databases at specific versions.
 Each version can be built via SchemaBuilder.build(db_path, version),
 producing a database with the correct schema and seed data for that
 version of the SnackAttackTrack schema.
+
+SchemaBuilder.generate(db_path, version, DatasetSpec(...)) builds a large
+synthetic database instead, for scale and performance testing. The same
+spec and seed always produce the same database. From the command line:
+    python GuiApp/tests/SchemaBuilder.py large.db --transactions 1000000
 """
 
+import argparse
+import os
+import random
+import re
 import sqlite3
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
 
 
 # ── Schema SQL (single-line format to avoid pylint duplicate-code) ──────────
@@ -109,6 +121,49 @@ SCHEMA_V3 = (
     "LostDate TEXT NOT NULL, Quantity INTEGER NOT NULL, Value INTEGER NOT NULL);"
 )
 
+# V4: V3 plus covering indexes for the hot lookups
+SCHEMA_V4 = (
+    SCHEMA_V3.replace("'schema_version', '3'", "'schema_version', '4'") + " "
+    "CREATE INDEX IF NOT EXISTS idx_transactions_patron_date "
+    "ON Transactions (PatronID, TransactionDate); "
+    "CREATE INDEX IF NOT EXISTS idx_transaction_items_transaction "
+    "ON TransactionItems (TransactionID, ItemName, Quantity, PricePerItem); "
+    "CREATE INDEX IF NOT EXISTS idx_patrons_employee_id ON Patrons (EmployeeID);"
+)
+
+# V5: V4 plus the StoreStats table with its single row
+SCHEMA_V5 = (
+    SCHEMA_V4.replace("'schema_version', '4'", "'schema_version', '5'") + " "
+    "CREATE TABLE IF NOT EXISTS StoreStats ("
+    "StatsID INTEGER PRIMARY KEY CHECK (StatsID = 1), "
+    "SoldCount INTEGER NOT NULL DEFAULT 0, StoreRevenue INTEGER NOT NULL DEFAULT 0, "
+    "GamblingRevenue INTEGER NOT NULL DEFAULT 0, "
+    "GamblingReturns INTEGER NOT NULL DEFAULT 0, "
+    "AddedCount INTEGER NOT NULL DEFAULT 0, AddedValue INTEGER NOT NULL DEFAULT 0, "
+    "LostCount INTEGER NOT NULL DEFAULT 0, LostValue INTEGER NOT NULL DEFAULT 0); "
+    "INSERT OR IGNORE INTO StoreStats (StatsID) VALUES (1);"
+)
+
+# V6: V5 plus the PatronSnackCounts table and its ranking index
+SCHEMA_V6 = (
+    SCHEMA_V5.replace("'schema_version', '5'", "'schema_version', '6'") + " "
+    "CREATE TABLE IF NOT EXISTS PatronSnackCounts ("
+    "PatronID INTEGER NOT NULL, ItemName TEXT NOT NULL, "
+    "TotalQuantity INTEGER NOT NULL, LastPurchased TEXT NOT NULL, "
+    "PRIMARY KEY (PatronID, ItemName)); "
+    "CREATE INDEX IF NOT EXISTS idx_patron_snack_counts_rank ON PatronSnackCounts "
+    "(PatronID, TotalQuantity DESC, LastPurchased DESC, ItemName);"
+)
+
+# V7: V6 with the dates stored as INTEGER microseconds since 1970-01-01
+SCHEMA_V7 = (
+    SCHEMA_V6.replace("'schema_version', '6'", "'schema_version', '7'")
+    .replace("TransactionDate TEXT NOT NULL", "TransactionDate INTEGER NOT NULL")
+    .replace("AddedDate TEXT NOT NULL", "AddedDate INTEGER NOT NULL")
+    .replace("LostDate TEXT NOT NULL", "LostDate INTEGER NOT NULL")
+    .replace("LastPurchased TEXT NOT NULL", "LastPurchased INTEGER NOT NULL")
+)
+
 
 # ── Seed data SQL ──────────────────────────────────────────────────────────
 
@@ -274,15 +329,261 @@ _V3_SEEDS = (
 )
 
 
+# V5 seed data: V3 seeds plus the StoreStats they add up to
+_V5_SEEDS = _V3_SEEDS + (
+    " UPDATE StoreStats SET SoldCount = 7, StoreRevenue = 1676, "
+    "GamblingRevenue = 540, GamblingReturns = 133, "
+    "AddedCount = 7015, AddedValue = 890100, "
+    "LostCount = 50, LostValue = 73650 WHERE StatsID = 1;"
+)
+
+# V6 seed data: V5 seeds plus the snack counts of the seeded transactions
+_V6_SEEDS = _V5_SEEDS + (
+    " INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased) "
+    "VALUES (3, 'Apple', 1, '2026-04-29 21:00:37.649922'); "
+    "INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased) "
+    "VALUES (2, 'Pear', 2, '2026-04-29 21:00:57.733077'); "
+    "INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased) "
+    "VALUES (1, 'Apple', 1, '2026-04-29 21:01:46.745517'); "
+    "INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased) "
+    "VALUES (1, 'Orange', 1, '2026-04-29 21:01:46.745517'); "
+    "INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased) "
+    "VALUES (1, 'Pear', 3, '2026-04-29 21:01:46.745517');"
+)
+
+
+def _text_dates_to_epoch_microseconds(seed_sql: str) -> str:
+    """Replace every quoted "%Y-%m-%d %H:%M:%S.%f" date with its integer form."""
+    epoch = datetime(1970, 1, 1)
+    return re.sub(
+        r"'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6})'",
+        lambda match: str(
+            (datetime.fromisoformat(match.group(1)) - epoch)
+            // timedelta(microseconds=1)
+        ),
+        seed_sql,
+    )
+
+
+# V7 seed data: V6 seeds with integer dates
+_V7_SEEDS = _text_dates_to_epoch_microseconds(_V6_SEEDS)
+
 # ── Schema/SQL map ─────────────────────────────────────────────────────────
 
 _SCHEMA_MAP = {
     "v1": (SCHEMA_V1, _V1_SEEDS),
     "v2": (SCHEMA_V2, _V2_SEEDS),
     "v3": (SCHEMA_V3, _V3_SEEDS),
+    "v4": (SCHEMA_V4, _V3_SEEDS),
+    "v5": (SCHEMA_V5, _V5_SEEDS),
+    "v6": (SCHEMA_V6, _V6_SEEDS),
+    "v7": (SCHEMA_V7, _V7_SEEDS),
 }
 
 
+# ── Synthetic datasets ─────────────────────────────────────────────────────
+
+_EPOCH = datetime(1970, 1, 1)
+
+_TOP_UP_AMOUNTS = (5000, 10000, 20000, 50000)
+_GAMBLE_FEES = (100, 200, 500)
+
+
+class DatasetSpec:  # pylint: disable=too-many-instance-attributes
+    """
+    The shape of a synthetic dataset for SchemaBuilder.generate.
+
+    Patron activity and snack popularity follow a power law: the patron or
+    snack of rank r is picked with weight 1 / r**skew, so a few regulars
+    and favourite snacks make up most of the transactions, like in a real
+    office.
+    """
+
+    def __init__(
+        self,
+        patrons: int = 2000,
+        snacks: int = 200,
+        transactions: int = 1000000,
+        start: datetime = datetime(2022, 1, 1),
+        days: int = 3 * 365,
+        purchase_share: float = 0.8,
+        top_up_share: float = 0.15,
+        gamble_share: float = 0.05,
+        max_items_per_purchase: int = 4,
+        skew: float = 1.1,
+        seed: int = 0,
+    ):
+        assert patrons > 0 and snacks > 0 and transactions >= 0
+        assert days > 0 and max_items_per_purchase > 0
+        assert min(purchase_share, top_up_share, gamble_share) >= 0
+        assert purchase_share + top_up_share + gamble_share > 0
+        self.patrons = patrons
+        self.snacks = snacks
+        self.transactions = transactions
+        self.start = start
+        self.days = days
+        self.purchase_share = purchase_share
+        self.top_up_share = top_up_share
+        self.gamble_share = gamble_share
+        self.max_items_per_purchase = max_items_per_purchase
+        self.skew = skew
+        self.seed = seed
+
+
+def _power_law_cum_weights(count: int, skew: float) -> list:
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, count + 1):
+        total += 1 / rank**skew
+        cum_weights.append(total)
+    return cum_weights
+
+
+class _DatasetWriter:
+    """Generates the rows of a DatasetSpec in the encoding of a schema version."""
+
+    def __init__(self, version: str, spec: DatasetSpec):
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+        # v1 stores credits as REAL, v1 to v6 store dates as text
+        self.realCredits = version == "v1"
+        self.textDates = version != "v7"
+
+    def money(self, hundredths: int):
+        return hundredths / 100 if self.realCredits else hundredths
+
+    def date(self, microseconds: int):
+        if not self.textDates:
+            return microseconds
+        return (_EPOCH + timedelta(microseconds=microseconds)).strftime(
+            "%Y-%m-%d %H:%M:%S.%f"
+        )
+
+    def patrons(self) -> list:
+        return [
+            (f"Patron{i}", "Generated", f"{i:08d}", 0)
+            for i in range(1, self.spec.patrons + 1)
+        ]
+
+    def snackPrices(self) -> list:
+        return [self.random.randrange(50, 2500, 5) for _ in range(self.spec.snacks)]
+
+    def transactionDates(self) -> list:
+        start = (self.spec.start - _EPOCH) // timedelta(microseconds=1)
+        span = self.spec.days * 24 * 3600 * 1000000
+        draw = self.random.random
+        return sorted(start + int(draw() * span) for _ in range(self.spec.transactions))
+
+    def ledger(self, prices: list):
+        """
+        Generate (transactions, items, final balances, sold per snack).
+        Transactions get consecutive IDs from 1 in date order; a purchase
+        or gamble the patron cannot afford becomes a top-up instead.
+        """
+        # random.choices and randint are too slow to call a few million
+        # times, so values are drawn from draw() directly
+        # pylint: disable=too-many-locals
+        spec = self.spec
+        draw = self.random.random
+        snackNames = [f"Snack{i}" for i in range(1, spec.snacks + 1)]
+        patronWeights = _power_law_cum_weights(spec.patrons, spec.skew)
+        snackWeights = _power_law_cum_weights(spec.snacks, spec.skew)
+        patronTotal = patronWeights[-1]
+        snackTotal = snackWeights[-1]
+        shareTotal = spec.purchase_share + spec.top_up_share + spec.gamble_share
+        purchaseBelow = spec.purchase_share / shareTotal
+        topUpBelow = (spec.purchase_share + spec.top_up_share) / shareTotal
+        balances = [0] * (spec.patrons + 1)
+        sold = [0] * spec.snacks
+        transactions = []
+        items = []
+        for transactionId, date in enumerate(self.transactionDates(), start=1):
+            patronId = bisect_right(patronWeights, draw() * patronTotal) + 1
+            before = balances[patronId]
+            kindDraw = draw()
+            if kindDraw < purchaseBelow:
+                kind = "PURCHASE"
+                picked = {
+                    bisect_right(snackWeights, draw() * snackTotal)
+                    for _ in range(1 + int(draw() * spec.max_items_per_purchase))
+                }
+                cart = [(index, 1 + int(draw() * 3)) for index in sorted(picked)]
+                cost = sum(prices[index] * quantity for index, quantity in cart)
+            elif kindDraw < topUpBelow:
+                kind = "TOP_UP"
+                cost = 0
+            else:
+                kind = "GAMBLE"
+                cart = [(bisect_right(snackWeights, draw() * snackTotal), 1)]
+                cost = _GAMBLE_FEES[int(draw() * len(_GAMBLE_FEES))]
+            if kind != "TOP_UP" and cost > before:
+                kind = "TOP_UP"
+            if kind == "TOP_UP":
+                after = before + _TOP_UP_AMOUNTS[int(draw() * len(_TOP_UP_AMOUNTS))]
+            else:
+                after = before - cost
+                for index, quantity in cart:
+                    sold[index] += quantity
+                items.extend(
+                    (
+                        transactionId,
+                        snackNames[index],
+                        quantity,
+                        self.money(prices[index]),
+                    )
+                    for index, quantity in cart
+                )
+            balances[patronId] = after
+            transactions.append(
+                (
+                    transactionId,
+                    kind,
+                    patronId,
+                    self.date(date),
+                    self.money(before),
+                    self.money(after),
+                )
+            )
+        return transactions, items, balances, sold
+
+
+def _fill_derived_tables(cursor, version: str):
+    """Backfill StoreStats (v5+) and PatronSnackCounts (v6+) from the ledger."""
+    if version in ("v5", "v6", "v7"):
+        cursor.execute(
+            """
+            UPDATE StoreStats SET
+                SoldCount = (SELECT IFNULL(SUM(i.Quantity), 0)
+                    FROM TransactionItems i JOIN Transactions t
+                    ON t.TransactionID = i.TransactionID
+                    WHERE t.TransactionType = 'PURCHASE'),
+                StoreRevenue = (SELECT IFNULL(SUM(AmountBeforeTransaction
+                    - AmountAfterTransaction), 0) FROM Transactions
+                    WHERE TransactionType = 'PURCHASE'),
+                GamblingRevenue = (SELECT IFNULL(SUM(AmountBeforeTransaction
+                    - AmountAfterTransaction), 0) FROM Transactions
+                    WHERE TransactionType = 'GAMBLE'),
+                GamblingReturns = (SELECT IFNULL(SUM(i.PricePerItem), 0)
+                    FROM TransactionItems i JOIN Transactions t
+                    ON t.TransactionID = i.TransactionID
+                    WHERE t.TransactionType = 'GAMBLE'),
+                AddedCount = (SELECT IFNULL(SUM(Quantity), 0) FROM AddedSnacks),
+                AddedValue = (SELECT IFNULL(SUM(Value), 0) FROM AddedSnacks)
+            WHERE StatsID = 1
+            """
+        )
+    if version in ("v6", "v7"):
+        cursor.execute(
+            """
+            INSERT INTO PatronSnackCounts (PatronID, ItemName, TotalQuantity, LastPurchased)
+            SELECT t.PatronID, i.ItemName, SUM(i.Quantity), MAX(t.TransactionDate)
+            FROM TransactionItems i
+            JOIN Transactions t ON t.TransactionID = i.TransactionID
+            GROUP BY t.PatronID, i.ItemName
+            """
+        )
+
+
 # ── Public API ──────────────────────────────────────────────────────────────
 
 
@@ -296,7 +597,7 @@ class SchemaBuilder:
 
         Args:
             db_path: Path to the database file to create.
-            version: One of 'v1', 'v2', 'v3'.
+            version: One of 'v1' to 'v7'.
             seed: Whether to insert seed data (default: True).
 
         Returns:
@@ -321,3 +622,150 @@ class SchemaBuilder:
         conn.commit()
         conn.close()
         return db_path
+
+    @staticmethod
+    def generate(  # pylint: disable=too-many-locals
+        db_path: str, version: str = "v7", spec: DatasetSpec = None
+    ) -> str:
+        """
+        Build a database at the given schema version filled with a
+        synthetic dataset, see DatasetSpec.
+
+        Every row is bulk inserted with executemany in a single transaction,
+        with the indexes dropped until the load is done and synchronous
+        writes off, since a half built dataset is worthless anyway.
+
+        Patrons have card IDs "00000001", "00000002", ... and snacks are
+        named "Snack1", "Snack2", ... by decreasing popularity.
+
+        Returns:
+            db_path (for chaining).
+        """
+        if spec is None:
+            spec = DatasetSpec()
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        SchemaBuilder.build(db_path, version, seed=False)
+        writer = _DatasetWriter(version, spec)
+        prices = writer.snackPrices()
+        transactions, items, balances, sold = writer.ledger(prices)
+        # Every snack is restocked once, with what it sells plus what is left
+        left = [writer.random.randrange(0, 100) for _ in prices]
+        restockDate = writer.date((spec.start - _EPOCH) // timedelta(microseconds=1))
+
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA journal_mode = MEMORY")
+        # Building the indexes once after the load is much cheaper than
+        # updating them for every row
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        cursor.executemany(
+            "INSERT INTO Patrons (FirstName, LastName, EmployeeID, TotalCredits) "
+            "VALUES (?, ?, ?, ?)",
+            writer.patrons(),
+        )
+        cursor.executemany(
+            "UPDATE Patrons SET TotalCredits = ? WHERE PatronID = ?",
+            [
+                (writer.money(balances[patronId]), patronId)
+                for patronId in range(1, spec.patrons + 1)
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO Snacks (ItemName, Quantity, ImageID, PricePerItem) "
+            "VALUES (?, ?, 'None', ?)",
+            [
+                (f"Snack{i + 1}", left[i], writer.money(price))
+                for i, price in enumerate(prices)
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO AddedSnacks (SnackName, AddedDate, Quantity, Value) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (
+                    f"Snack{i + 1}",
+                    restockDate,
+                    sold[i] + left[i],
+                    writer.money(price * (sold[i] + left[i])),
+                )
+                for i, price in enumerate(prices)
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO Transactions (TransactionID, TransactionType, PatronID, "
+            "TransactionDate, AmountBeforeTransaction, AmountAfterTransaction) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            transactions,
+        )
+        cursor.executemany(
+            "INSERT INTO TransactionItems (TransactionID, ItemName, Quantity, "
+            "PricePerItem) VALUES (?, ?, ?, ?)",
+            items,
+        )
+        for _, sql in indexes:
+            cursor.execute(sql)
+        _fill_derived_tables(cursor, version)
+        conn.commit()
+        conn.close()
+        return db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic SnackAttackTrack database."
+    )
+    parser.add_argument("db_path", help="Database file to create")
+    parser.add_argument("--version", default="v7", choices=list(_SCHEMA_MAP))
+    parser.add_argument("--patrons", type=int, default=2000)
+    parser.add_argument("--snacks", type=int, default=200)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        default=datetime(2022, 1, 1),
+        help="Date of the first transaction (default 2022-01-01)",
+    )
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument(
+        "--mix",
+        type=float,
+        nargs=3,
+        default=(0.8, 0.15, 0.05),
+        metavar=("PURCHASE", "TOP_UP", "GAMBLE"),
+        help="Relative share of each transaction type (default 0.8 0.15 0.05)",
+    )
+    parser.add_argument("--max-items-per-purchase", type=int, default=4)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(
+        patrons=args.patrons,
+        snacks=args.snacks,
+        transactions=args.transactions,
+        start=args.start,
+        days=args.days,
+        purchase_share=args.mix[0],
+        top_up_share=args.mix[1],
+        gamble_share=args.mix[2],
+        max_items_per_purchase=args.max_items_per_purchase,
+        skew=args.skew,
+        seed=args.seed,
+    )
+    started = time.perf_counter()
+    SchemaBuilder.generate(args.db_path, args.version, spec)
+    print(
+        f"Generated {args.db_path} with {spec.transactions} transactions "
+        f"in {time.perf_counter() - started:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,16 @@ import asyncio
 import logging
 import os
 import time
+from datetime import datetime
 
 import pytest
 import pytest_asyncio
 from kivy.core.window import Window
 
-from app_types import Credits
+from app_types import Credits, SnackData
+from DatabaseMigrator import DatabaseMigrator
+from GuiApp.database import DatabaseConnector
+from GuiApp.DatabaseMigrator import DatabaseMigrator as GuiAppDatabaseMigrator
 from GuiApp.main import snackAttackTrackApp
 from GuiApp.widgets.editSnacksScreen import EditSnacksScreen
 from tests.SchemaBuilder import SchemaBuilder
@@ -57,13 +61,54 @@ def configured_logger(log_dir):
     root.handlers.clear()
 
 
+@pytest.fixture(autouse=True)
+def migration_backup_directory(tmp_path, monkeypatch):
+    """Write the backups taken before migrating to tmp_path, not the repo."""
+    # The app imports DatabaseMigrator, the tests GuiApp.DatabaseMigrator
+    for migrator in (DatabaseMigrator, GuiAppDatabaseMigrator):
+        monkeypatch.setattr(migrator, "MIGRATION_BACKUP_DIRECTORY", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def populated_database(tmp_path):
+    """
+    A database of its own with the patron First Last on card CARD1 with 10
+    credits, 5 Apples at 1.25 and 2 Bananas at 3.00.
+    """
+    database = DatabaseConnector(str(tmp_path / "populated_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addCredits(database.getPatronIdByCardId("CARD1"), Credits("10.00"))
+    database.addSnack("Apple", 5, "Image1", Credits("1.25"))
+    database.addSnack("Banana", 2, "Image2", Credits("3.00"))
+    yield database
+    database.close()
+
+
+def _buy(database, patronId, snackName, quantity, timestamp=None) -> Credits:
+    """Check out quantity of snackName at its price. Returns the new balance."""
+    snack = database.getSnackByName(snackName)
+    return database.checkout(
+        patron_id=patronId,
+        cart=[SnackData(snack.snackId, snackName, quantity, "", snack.pricePerItem)],
+        fee=snack.pricePerItem * quantity,
+        timestamp=datetime.now() if timestamp is None else timestamp,
+    )
+
+
+@pytest.fixture
+def buy():
+    """The checkout helper of the database tests, see _buy."""
+    return _buy
+
+
 def pytest_addoption(parser):
     """Add the --schema-version option for testing different migration paths."""
     parser.addoption(
         "--schema-version",
-        default="v3",
-        choices=["v1", "v2", "v3"],
-        help="Schema version to start from: v1, v2, or v3 (default: v3)",
+        default="v7",
+        choices=["v1", "v2", "v3", "v4", "v5", "v6", "v7"],
+        help="Schema version to start from: v1 to v7 (default: v7)",
     )
 
 
@@ -100,7 +145,7 @@ def _remove_if_exists(path, retries=3, delay=0.2):
 
 @pytest.fixture(scope="session")
 def schema_version(request):
-    """Return the --schema-version option value (v1, v2, or v3)."""
+    """Return the --schema-version option value (v1 to v7)."""
     return request.config.getoption("--schema-version")
 
 
@@ -109,9 +154,9 @@ async def app_with_nothing(schema_version):
     _remove_if_exists(TEST_DB)
     _remove_if_exists(TEST_SETTINGS)
 
-    # Build a pre-migration database if schema_version is not v3
+    # Build a pre-migration database if schema_version is not v7
     # (schema only, no seed data — fixtures add their own data)
-    if schema_version != "v3":
+    if schema_version != "v7":
         SchemaBuilder.build(TEST_DB, schema_version, seed=False)
 
     app = snackAttackTrackApp(
@@ -126,6 +171,10 @@ async def app_with_nothing(schema_version):
     try:
         yield app
     finally:
+        # The app is never stopped here, close what on_stop would
+        app.backupService.close()
+        app.screenManager.qrCodes.close()
+        app.screenManager.RFIDReader.stop()
         app.screenManager.database.close()
         await tear_down(asyncio.get_event_loop())
 
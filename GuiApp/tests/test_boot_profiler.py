@@ -0,0 +1,54 @@
+import builtins
+import pstats
+import sys
+
+import pytest
+
+from boot_profiler import BootTimeline, ImportTimer
+
+
+def test_timeline_phases_follow_each_other(tmp_path):
+    profilePath = str(tmp_path / "boot.pstats")
+    timeline = BootTimeline(profilePath=profilePath)
+    timeline.mark("settings")
+    timeline.mark("database")
+    timeline.finish("first frame")
+    timeline.mark("after the boot")
+
+    report = timeline.as_dict()
+    assert [phase["phase"] for phase in report["phases"]] == [
+        "settings",
+        "database",
+        "first frame",
+    ]
+    assert report["total_ms"] == report["phases"][-1]["at_ms"]
+    assert sum(phase["ms"] for phase in report["phases"]) == pytest.approx(
+        report["total_ms"]
+    )
+    assert "first frame" in timeline.summary()
+    assert pstats.Stats(profilePath).total_calls > 0
+    # The import timer is removed once the boot is over
+    # pylint: disable-next=protected-access
+    assert builtins.__import__ is not timeline.importTimer._import
+
+
+def test_import_timer_counts_the_outermost_import(tmp_path, monkeypatch):
+    package = tmp_path / "heavypackage"
+    package.mkdir()
+    (package / "__init__.py").write_text(
+        "import time\ntime.sleep(0.05)\nfrom heavypackage import part\n"
+    )
+    (package / "part.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    timer = ImportTimer(packages=("heavypackage",))
+
+    timer.install()
+    try:
+        import heavypackage  # pylint: disable=import-outside-toplevel,unused-import
+    finally:
+        timer.uninstall()
+        for name in ("heavypackage", "heavypackage.part"):
+            sys.modules.pop(name, None)
+
+    assert list(timer.seconds) == ["heavypackage"]
+    assert 0.1 <= timer.seconds["heavypackage"] < 1.0
@@ -0,0 +1,142 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, TransactionType
+from bulk_io import BulkImportError
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(populated_database):
+    return populated_database
+
+
+def _csv(*lines: str) -> io.StringIO:
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def test_import_patrons_upserts_on_employee_id_in_one_commit(database):
+    commitsBefore = database.get_storage_report()["commits"]
+    patrons = ["FirstName,LastName,EmployeeID,TotalCredits", "Renamed,Last,CARD1,"]
+    patrons += [f"Patron{i},Last,NEW{i},1.50" for i in range(1200)]
+
+    report = database.importPatrons(_csv(*patrons), chunk_size=500)
+
+    assert report.as_dict() == {"rows": 1201, "inserted": 1200, "updated": 1}
+    assert database.get_storage_report()["commits"] == commitsBefore + 1
+    # An empty TotalCredits keeps the balance, the card resolver is reloaded
+    assert database.resolveCard("CARD1").firstName == "Renamed"
+    assert database.resolveCard("CARD1").totalCredits == Credits("10.00")
+    assert database.resolveCard("NEW1199").totalCredits == Credits("1.50")
+    assert len(database.getAllPatrons()) == 1201
+
+
+def test_import_patrons_records_credit_changes_as_edits(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    editDate = datetime(2026, 1, 1)
+
+    database.importPatrons(
+        _csv(
+            "FirstName,LastName,EmployeeID,TotalCredits",
+            "First,Last,CARD1,7.50",
+            "New,Last,NEW1,2.00",
+            "Broke,Last,NEW2,",
+        ),
+        edit_date=editDate,
+    )
+    database.importPatrons(
+        _csv("FirstName,LastName,EmployeeID,TotalCredits", "First,Last,CARD1,7.50")
+    )
+
+    def edits(cardId):
+        return [
+            (t.transactionType, t.amountBeforeTransaction, t.amountAfterTransaction)
+            for t in database.getTransactions(database.getPatronIdByCardId(cardId))
+        ]
+
+    # An unchanged balance is not recorded again
+    assert edits("CARD1") == [(TransactionType.EDIT, Credits("10.00"), Credits("7.50"))]
+    assert edits("NEW1") == [(TransactionType.EDIT, Credits("0.00"), Credits("2.00"))]
+    assert not edits("NEW2")
+    assert database.getTransactions(patronId)[0].transactionDate == editDate
+
+
+def test_invalid_row_imports_nothing(database):
+    with pytest.raises(BulkImportError, match="Line 3: TotalCredits"):
+        database.importPatrons(
+            _csv(
+                "FirstName,LastName,EmployeeID,TotalCredits",
+                "New,Last,NEW1,1.00",
+                "Bad,Last,NEW2,lots",
+            ),
+            chunk_size=1,
+        )
+    with pytest.raises(BulkImportError, match="Missing column"):
+        database.importSnacks(_csv("ItemName", "Apple"))
+
+    assert len(database.getAllPatrons()) == 1
+    assert database.resolveCard("NEW1") is None
+
+
+def test_import_snacks_and_restocks(database):
+    database.getAllSnacks()  # Load the snack catalog
+
+    report = database.importSnacks(
+        _csv(
+            "ItemName,Quantity,ImageID,PricePerItem",
+            "Apple,10,,",
+            "Cherry,3,Image3,2.00",
+        )
+    )
+    assert report.as_dict() == {"rows": 2, "inserted": 1, "updated": 1}
+    apple = database.getSnackByName("Apple")
+    assert (apple.quantity, apple.imageID, apple.pricePerItem) == (
+        10,
+        "Image1",
+        Credits("1.25"),
+    )
+
+    report = database.importRestocks(
+        _csv(
+            "ItemName,Quantity,Value,PricePerItem",
+            "Apple,2,2.00,",
+            "Apple,3,3.00,",
+            "Date,4,4.00,1.50",
+        ),
+        added_date=datetime(2026, 1, 1),
+    )
+    assert report.as_dict() == {"rows": 3, "inserted": 1, "updated": 2}
+    assert database.getSnackByName("Apple").quantity == 15
+    assert database.getSnackByName("Date").quantity == 4
+    assert database.get_total_snacks_added() == 9
+    assert database.get_value_of_added_snacks() == Credits("9.00")
+    assert database.getStoreStats().addedCount == 9
+
+
+def test_export_round_trips_and_streams(database, buy, tmp_path):
+    patronId = database.getPatronIdByCardId("CARD1")
+    buy(database, patronId, "Apple", 2, datetime(2026, 1, 1, 12, 0, 0))
+
+    patrons = io.StringIO()
+    assert database.exportPatrons(patrons) == 1
+    transactions = io.StringIO()
+    assert database.exportTransactions(transactions, chunk_size=1) == 1
+    items = io.StringIO()
+    assert database.exportTransactionItems(items) == 1
+
+    assert patrons.getvalue().splitlines()[1] == "1,First,Last,CARD1,7.50"
+    assert transactions.getvalue().splitlines()[1] == (
+        "1,PURCHASE,1,2026-01-01 12:00:00,10.00,7.50"
+    )
+    assert items.getvalue().splitlines()[1] == "1,1,Apple,2,1.25"
+
+    other = DatabaseConnector(str(tmp_path / "bulk_io_copy.db"))
+    patrons.seek(0)
+    other.importPatrons(patrons)
+    assert other.resolveCard("CARD1").totalCredits == Credits("7.50")
+    other.close()
@@ -122,6 +122,38 @@ async def test_buy_add_two_snacks_then_regret_one(app_on_buy_screen):
     )
 
 
+@pytest.mark.asyncio
+async def test_cart_is_locked_until_the_checkout_is_done(
+    app_on_buy_screen, monkeypatch
+):
+    app = app_on_buy_screen
+    buyScreen = app.screenManager.current_screen
+    snack = app.screenManager.database.getAllSnacks()[0]
+
+    # Hold the checkout like a writer thread that has not committed yet
+    submitted = []
+    monkeypatch.setattr(
+        app.screenManager.database,
+        "checkoutAsync",
+        lambda **kwargs: submitted.append(kwargs),
+    )
+
+    buyScreen.itemClickedInInventory(snackId=snack.snackId)
+    buyScreen.ids.buyButton.dispatch("on_release")
+    buyScreen.onBuy()
+    buyScreen.itemClickedInInventory(snackId=snack.snackId)
+
+    assert len(submitted) == 1
+    assert buyScreen.ids.buyButton.disabled
+    assert buyScreen.getSnacksInShoppingCart()[0].quantity == 1
+
+    monkeypatch.undo()
+    future = app.screenManager.database.checkoutAsync(**submitted[0])
+
+    assert not buyScreen.ids.buyButton.disabled
+    assert future.result() == app.screenManager.getCurrentPatron().totalCredits
+
+
 @pytest.mark.asyncio
 async def test_moving_all_of_one_snack_to_cart_and_back(app_on_buy_screen):
     app = app_on_buy_screen
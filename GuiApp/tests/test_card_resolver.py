@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, UserData
+from card_resolver import CardResolver
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(populated_database):
+    populated_database.addPatron("Second", "Last", "CARD2")
+    return populated_database
+
+
+def _fields(patron: UserData) -> tuple:
+    return tuple(getattr(patron, name) for name in UserData.__slots__)
+
+
+def _assert_coherent(database):
+    """Every card resolves to the same patron the Patrons table has."""
+    for patron in database.getAllPatrons():
+        resolved = database.resolveCard(patron.employeeID)
+        assert _fields(resolved) == _fields(patron)
+
+
+def test_resolving_a_card_does_not_touch_sqlite(database):
+    statements = []
+    database.connection.set_trace_callback(statements.append)
+    patron = database.resolveCard("CARD2")
+    patronId = database.getPatronIdByCardId("CARD1")
+    unknown = database.resolveCard("UNKNOWN")
+    database.connection.set_trace_callback(None)
+
+    assert not statements
+    assert (patron.firstName, patron.employeeID) == ("Second", "CARD2")
+    assert patronId == database.getPatronData(patronId).patronId
+    assert unknown is None
+
+
+def test_resolver_is_loaded_on_open(database):
+    database.addCredits(database.getPatronIdByCardId("CARD1"), Credits("5.00"))
+
+    other = DatabaseConnector(database.database_path)
+    _assert_coherent(other)
+    assert other.resolveCard("CARD1").totalCredits == Credits("15.00")
+    other.close()
+
+
+def test_patron_writes_keep_resolver_coherent(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    database.addPatron("Third", "Last", "CARD3")
+    _assert_coherent(database)
+
+    database.updatePatronData(
+        patronId, UserData(patronId, "Renamed", "Last", "NEWCARD", Credits("2.00"))
+    )
+    _assert_coherent(database)
+    assert database.resolveCard("CARD1") is None
+    assert database.resolveCard("NEWCARD").firstName == "Renamed"
+
+    database.addCredits(patronId, Credits("10.00"))
+    database.subtractPatronCredits(patronId, Credits("0.50"))
+    _assert_coherent(database)
+    assert database.resolveCard("NEWCARD").totalCredits == Credits("11.50")
+
+    database.removePatron(database.getPatronIdByCardId("CARD2"))
+    _assert_coherent(database)
+    assert database.resolveCard("CARD2") is None
+
+
+def test_checkout_and_gamble_update_credits(database, buy):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    buy(database, patronId, "Apple", 2)
+    database.gamble(
+        patron_id=patronId,
+        won_snack=database.getSnackByName("Apple"),
+        fee=Credits("1.00"),
+        timestamp=datetime.now(),
+    )
+
+    _assert_coherent(database)
+    assert database.resolveCard("CARD1").totalCredits == Credits("6.50")
+
+
+def test_shared_card_resolves_to_lowest_patron_id(database):
+    database.addPatron("Duplicate", "Last", "CARD1")
+    firstId = database.getPatronIdByCardId("CARD1")
+    assert database.resolveCard("CARD1").firstName == "First"
+
+    # When the first patron is gone, the card falls through to the next one
+    database.removePatron(firstId)
+    assert database.resolveCard("CARD1").firstName == "Duplicate"
+
+
+def test_card_changes_keep_shared_cards_indexed():
+    resolver = CardResolver()
+    resolver.load(
+        [
+            UserData(2, "Second", "Last", "CARD1", Credits("0.00")),
+            UserData(1, "First", "Last", "CARD1", Credits("0.00")),
+        ]
+    )
+    assert resolver.getPatronId("CARD1") == 1
+
+    resolver.put(UserData(1, "First", "Last", "CARD2", Credits("0.00")))
+    assert (resolver.getPatronId("CARD1"), resolver.getPatronId("CARD2")) == (2, 1)
+
+    resolver.put(UserData(3, "Third", "Last", "CARD2", Credits("0.00")))
+    resolver.put(UserData(1, "First", "Last", "CARD1", Credits("0.00")))
+    assert (resolver.getPatronId("CARD1"), resolver.getPatronId("CARD2")) == (1, 3)
+
+    resolver.remove(3)
+    resolver.remove(1)
+    assert (resolver.getPatronId("CARD1"), resolver.getPatronId("CARD2")) == (2, None)
+    assert len(resolver) == 1
+
+
+def test_resolved_patrons_are_copies(database):
+    patron = database.resolveCard("CARD1")
+    patron.totalCredits = Credits("100.00")
+
+    assert database.resolveCard("CARD1").totalCredits == Credits("10.00")
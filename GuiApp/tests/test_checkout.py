@@ -0,0 +1,146 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, SnackData, TransactionType
+from GuiApp.database import (
+    DatabaseConnector,
+    InsufficientCreditsError,
+    InsufficientStockError,
+)
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "checkout_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addCredits(database.getPatronIdByCardId("CARD1"), Credits("20.00"))
+    database.addSnack("Apple", 5, "Image1", Credits("1.25"))
+    database.addSnack("Banana", 2, "Image2", Credits("3.00"))
+    yield database
+    database.close()
+
+
+def _cart_item(database, name, quantity):
+    snack = next(s for s in database.getAllSnacks() if s.snackName == name)
+    return SnackData(
+        snack.snackId, snack.snackName, quantity, snack.imageID, snack.pricePerItem
+    )
+
+
+def _snapshot(database):
+    cursor = database.connection.cursor()
+    snapshot = []
+    for table in ("Patrons", "Snacks", "Transactions", "TransactionItems"):
+        cursor.execute(f"SELECT * FROM {table}")
+        snapshot.append(cursor.fetchall())
+    return snapshot, database.getStoreStats().soldCount
+
+
+def test_checkout_writes_everything_in_one_commit(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    cart = [_cart_item(database, "Apple", 2), _cart_item(database, "Banana", 2)]
+    commitsBefore = database.get_storage_report()["commits"]
+
+    newBalance = database.checkout(
+        patron_id=patronId,
+        cart=cart,
+        fee=Credits("8.50"),
+        timestamp=datetime(2026, 1, 1, 12, 0, 0),
+    )
+
+    assert database.get_storage_report()["commits"] == commitsBefore + 1
+    assert newBalance == Credits("11.50")
+    assert database.getPatronData(patronId).totalCredits == newBalance
+
+    # Banana sold out and is removed from the inventory
+    snacks = database.getAllSnacks()
+    assert [(s.snackName, s.quantity) for s in snacks] == [("Apple", 3)]
+
+    transaction = database.getTransactions(patronId)[-1]
+    assert transaction.transactionType == TransactionType.PURCHASE
+    assert transaction.amountBeforeTransaction == Credits("20.00")
+    assert transaction.amountAfterTransaction == Credits("11.50")
+    assert sorted((i.snackName, i.quantity) for i in transaction.transactionItems) == [
+        ("Apple", 2),
+        ("Banana", 2),
+    ]
+    assert database.getStoreStats().soldCount == 4
+    assert database.getStoreStats().storeRevenue == Credits("8.50")
+
+
+def test_checkout_rolls_back_on_insufficient_stock(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    before = _snapshot(database)
+
+    with pytest.raises(InsufficientStockError):
+        database.checkout(
+            patron_id=patronId,
+            cart=[_cart_item(database, "Apple", 1), _cart_item(database, "Banana", 3)],
+            fee=Credits("10.25"),
+            timestamp=datetime.now(),
+        )
+
+    assert _snapshot(database) == before
+
+
+def test_checkout_rolls_back_on_insufficient_credits(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    before = _snapshot(database)
+
+    with pytest.raises(InsufficientCreditsError):
+        database.checkout(
+            patron_id=patronId,
+            cart=[_cart_item(database, "Apple", 1)],
+            fee=Credits("20.01"),
+            timestamp=datetime.now(),
+        )
+
+    assert _snapshot(database) == before
+
+
+def test_gamble_takes_one_snack(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    # The won snack carries the stock quantity, only one is taken
+    wonSnack = _cart_item(database, "Apple", 5)
+    commitsBefore = database.get_storage_report()["commits"]
+
+    newBalance = database.gamble(
+        patron_id=patronId,
+        won_snack=wonSnack,
+        fee=Credits("2.00"),
+        timestamp=datetime.now(),
+    )
+
+    assert database.get_storage_report()["commits"] == commitsBefore + 1
+    assert newBalance == Credits("18.00")
+    assert database.getSnack(wonSnack.snackId).quantity == 4
+
+    transaction = database.getTransactions(patronId)[-1]
+    assert transaction.transactionType == TransactionType.GAMBLE
+    assert transaction.amountBeforeTransaction == Credits("20.00")
+    assert [(i.snackName, i.quantity) for i in transaction.transactionItems] == [
+        ("Apple", 1)
+    ]
+    assert database.getStoreStats().gamblingRevenue == Credits("2.00")
+    assert database.getStoreStats().gamblingReturns == Credits("1.25")
+
+
+def test_gamble_rolls_back_when_snack_is_gone(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    wonSnack = _cart_item(database, "Banana", 1)
+    database.removeSnack(wonSnack.snackId)
+    before = _snapshot(database)
+
+    with pytest.raises(InsufficientStockError):
+        database.gamble(
+            patron_id=patronId,
+            won_snack=wonSnack,
+            fee=Credits("2.00"),
+            timestamp=datetime.now(),
+        )
+
+    assert _snapshot(database) == before
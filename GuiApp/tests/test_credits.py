@@ -1,3 +1,9 @@
+import copy
+import pickle
+from decimal import Decimal, InvalidOperation
+
+import pytest
+
 from GuiApp.app_types import Credits
 
 
@@ -75,3 +81,53 @@ def test_mod():
 def test_rmod():
     assert 10 % Credits("3.00") == Credits("1.00")
     assert isinstance(10 % Credits("3.00"), Credits)
+
+
+def test_from_hundredths_is_exact():
+    # 2**53 + 1 hundredths cannot be represented by the float hundredths / 100
+    hundredths = 2**53 + 1
+    assert Credits.from_hundredths(hundredths).to_hundredths() == hundredths
+    assert Credits.from_hundredths(None) == Credits("0.00")
+
+
+def test_formatting():
+    assert f"{Credits('1234.5'):.2f}" == "1234.50"
+    assert f"{Credits('-0.05'):.2f}" == "-0.05"
+    assert f"{Credits('7'):>8.1f}" == "     7.0"
+    assert str(Credits("3")) == "3.00"
+    assert repr(Credits("3")) == "Credits('3.00')"
+    assert str(-Credits("0.00")) == "0.00"
+
+
+def test_mixing_with_int_decimal_and_float():
+    assert Credits("1.25") * 3 == Credits("3.75")
+    assert Credits("1.25") + 1 == Credits("2.25")
+    assert 5 - Credits("1.25") == Credits("3.75")
+    assert Credits("1.25") * Credits("1.10") == Credits("1.38")
+    assert Credits("10.00") * 0.25 == Credits("2.50")
+    assert Credits("1.00") + Decimal("0.005") == Credits("1.01")
+    assert Credits("-1.25") / 2 == Credits("-0.63")
+    assert 1 / Credits("3.00") == Credits("0.33")
+
+
+def test_comparisons_and_hash():
+    assert Credits("1.00") == 1
+    assert Credits("1.50") == Decimal("1.5")
+    assert Credits("0.50") < 1
+    assert Credits("0.10") != 0.1
+    assert not Credits("0.00")
+    assert hash(Credits("2.00")) == hash(2)
+    assert hash(Credits("2.50")) == hash(Decimal("2.5"))
+    assert max(Credits("0.50"), Credits("1.00")) == Credits("1.00")
+
+
+def test_invalid_values_raise_invalid_operation():
+    for value in ("", "abc", "NaN"):
+        with pytest.raises(InvalidOperation):
+            Credits(value)
+
+
+def test_copy_and_pickle():
+    c = Credits("12.34")
+    assert copy.deepcopy(c) == c
+    assert pickle.loads(pickle.dumps(c)) == c
@@ -0,0 +1,209 @@
+import gzip
+import os
+import sqlite3
+from datetime import datetime
+from time import perf_counter
+
+from app_types import Credits
+from GuiApp import database_backup
+from GuiApp.database import DatabaseConnector
+from GuiApp.database_backup import (
+    BackupService,
+    archiveBackupPath,
+    backupDatabase,
+    rotateBackups,
+)
+
+
+def _create_database(path, patrons=200):
+    database = DatabaseConnector(str(path))
+    for i in range(patrons):
+        database.addPatron(f"First{i}", "Last", f"CARD{i}")
+    database.addSnack("Apple", 5, "Image1", Credits("1.25"))
+    database.close()
+
+
+def _patron_count(path):
+    connection = sqlite3.connect(path)
+    count = connection.execute("SELECT COUNT(*) FROM Patrons").fetchone()[0]
+    connection.close()
+    return count
+
+
+def test_backup_is_copied_in_steps(tmp_path):
+    _create_database(tmp_path / "source.db")
+    source = sqlite3.connect(tmp_path / "source.db")
+    steps = []
+
+    backupPath = backupDatabase(
+        source,
+        str(tmp_path / "backups"),
+        pagesPerStep=1,
+        stepPause=0,
+        progress=lambda copied, total: steps.append((copied, total)),
+    )
+    source.close()
+
+    assert len(steps) > 1
+    assert steps[-1][0] == steps[-1][1]
+    assert os.listdir(tmp_path / "backups") == [os.path.basename(backupPath)]
+    assert _patron_count(backupPath) == 200
+
+
+def test_backup_pauses_between_steps(tmp_path):
+    _create_database(tmp_path / "source.db")
+    source = sqlite3.connect(tmp_path / "source.db")
+    steps = []
+
+    start = perf_counter()
+    backupDatabase(
+        source,
+        str(tmp_path / "backups"),
+        pagesPerStep=1,
+        stepPause=0.02,
+        progress=lambda copied, total: steps.append(copied),
+    )
+    elapsed = perf_counter() - start
+    source.close()
+
+    # No pause after the last step
+    assert len(steps) > 2
+    assert elapsed >= 0.02 * (len(steps) - 1)
+
+
+def test_compressed_backup(tmp_path):
+    _create_database(tmp_path / "source.db")
+    source = sqlite3.connect(tmp_path / "source.db")
+
+    backupPath = backupDatabase(source, str(tmp_path), compress=True)
+    source.close()
+
+    assert backupPath.endswith(".db.gz")
+    assert not os.path.exists(backupPath[: -len(".gz")] + ".partial")
+    with gzip.open(backupPath, "rb") as compressed, open(
+        tmp_path / "restored.db", "wb"
+    ) as restored:
+        restored.write(compressed.read())
+    assert _patron_count(tmp_path / "restored.db") == 200
+
+
+def test_backups_in_the_same_second_get_their_own_file(tmp_path, monkeypatch):
+    _create_database(tmp_path / "source.db", patrons=1)
+    source = sqlite3.connect(tmp_path / "source.db")
+    monkeypatch.setattr(
+        database_backup,
+        "backupFileName",
+        lambda now: "database_backup_2025-01-01_00-00-00.db",
+    )
+
+    backupPaths = [backupDatabase(source, str(tmp_path)) for _ in range(2)]
+    backupPaths.append(backupDatabase(source, str(tmp_path), compress=True))
+    source.close()
+
+    assert [os.path.basename(path) for path in backupPaths] == [
+        "database_backup_2025-01-01_00-00-00.db",
+        "database_backup_2025-01-01_00-00-00_1.db",
+        "database_backup_2025-01-01_00-00-00_2.db.gz",
+    ]
+    # Rotation still sorts them oldest first
+    removed = rotateBackups(str(tmp_path), retention=1)
+    assert removed == backupPaths[:2]
+
+
+def test_rotation_keeps_the_newest_backups(tmp_path):
+    names = [
+        "database_backup_2025-01-01_00-00-00.db",
+        "database_backup_2025-02-01_00-00-00.db.gz",
+        "database_backup_2025-03-01_00-00-00.db",
+        "unrelated.db",
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    removed = rotateBackups(str(tmp_path), retention=2)
+
+    assert [os.path.basename(path) for path in removed] == [names[0]]
+    assert sorted(os.listdir(tmp_path)) == sorted(names[1:])
+
+
+def test_archive_backups_are_rotated_with_their_backup(tmp_path):
+    names = [
+        "database_backup_2025-01-01_00-00-00.db",
+        "database_backup_2025-01-01_00-00-00_archive.db",
+        "database_backup_2025-02-01_00-00-00.db.gz",
+        "database_backup_2025-02-01_00-00-00_archive.db.gz",
+        "database_backup_2025-03-01_00-00-00.db",
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    removed = rotateBackups(str(tmp_path), retention=1)
+
+    assert [os.path.basename(path) for path in removed] == names[:4]
+    assert os.listdir(tmp_path) == [names[4]]
+
+
+def test_service_backs_up_while_the_database_is_written(tmp_path):
+    _create_database(tmp_path / "source.db")
+    database = DatabaseConnector(str(tmp_path / "source.db"))
+    dispatched = []
+    service = BackupService(
+        database.database_path,
+        backup_directory=str(tmp_path / "backups"),
+        pages_per_step=1,
+        dispatch=dispatched.append,
+    )
+    progress = []
+
+    future = service.requestBackup(
+        on_progress=lambda copied, total: progress.append(copied)
+    )
+    database.addPatron("During", "Backup", "CARD_DURING")
+    backupPath = future.result(timeout=30)
+    service.close()
+    database.close()
+
+    for callback in dispatched:
+        callback()
+    assert progress
+    assert _patron_count(backupPath) in (200, 201)
+    assert service.lastBackupPath == backupPath
+
+
+def test_scheduled_backups_are_rotated(tmp_path):
+    _create_database(tmp_path / "source.db", patrons=1)
+    service = BackupService(
+        str(tmp_path / "source.db"),
+        backup_directory=str(tmp_path / "backups"),
+        interval=0.01,
+        retention=1,
+        dispatch=lambda callback: callback(),
+    )
+    service.requestBackup().result(timeout=30)
+    service.set_interval(None)
+    service.close()
+
+    assert service.backups >= 1
+    assert len(os.listdir(tmp_path / "backups")) == 1
+
+
+def test_service_backs_up_the_archive(tmp_path):
+    _create_database(tmp_path / "source.db", patrons=1)
+    database = DatabaseConnector(str(tmp_path / "source.db"))
+    database.archiveTransactions(datetime(2025, 1, 1))
+    database.close()
+    service = BackupService(
+        database.database_path,
+        backup_directory=str(tmp_path / "backups"),
+        compress=True,
+        dispatch=lambda callback: callback(),
+        archive_path=database.archive_path,
+    )
+    backupPath = service.requestBackup().result(timeout=30)
+    service.close()
+
+    assert service.lastArchiveBackupPath == archiveBackupPath(backupPath) + ".gz"
+    assert sorted(os.listdir(tmp_path / "backups")) == [
+        os.path.basename(backupPath),
+        os.path.basename(service.lastArchiveBackupPath),
+    ]
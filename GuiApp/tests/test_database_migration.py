@@ -3,12 +3,19 @@ import os
 import shutil
 import sqlite3
 import time
+from datetime import datetime
 
 import pytest
 
 from tests.SchemaBuilder import SchemaBuilder
 
-from GuiApp.database import DatabaseConnector, LostSnackReason, TransactionType
+from GuiApp.database import (
+    DatabaseConnector,
+    LostSnackReason,
+    TransactionType,
+    toEpochMicroseconds,
+)
+from GuiApp.database_backup import rotateBackups
 from GuiApp.DatabaseMigrator import DatabaseMigrator
 
 
@@ -16,6 +23,12 @@ from GuiApp.DatabaseMigrator import DatabaseMigrator
 # pylint: disable=too-many-locals
 # pylint: disable=too-many-statements
 # pylint: disable=duplicate-code
+# pylint: disable=too-many-lines
+
+
+def _epoch_us(text_date):
+    """The INTEGER a text date is stored as from schema v7 on."""
+    return toEpochMicroseconds(datetime.fromisoformat(text_date))
 
 
 class PatronData:
@@ -149,7 +162,9 @@ def test_needs_migration_version_1_database(version_1_database):
     assert DatabaseMigrator.needs_migration(cursor) is True
 
 
-def test_migrate_database_version_1_database(version_1_database):
+def test_migrate_database_version_1_database(
+    version_1_database, migration_backup_directory
+):
     _, cursor = version_1_database
 
     # Before migration, the database should be at version 1
@@ -360,16 +375,13 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item5_before.pricePerItem == 0.14
 
     # Perform migration
-    # Snapshot pre-existing backup files so we only clean up the new one
-    backup_files_before = set(glob.glob("database_backup_*.db"))
     DatabaseMigrator.migrate_database(*version_1_database)
 
-    # Verify a new backup file was created by the migration
-    backup_files_after = set(glob.glob("database_backup_*.db"))
-    new_backups = backup_files_after - backup_files_before
+    # Verify a backup file was created by the migration
     assert (
-        len(new_backups) >= 1
-    ), "Expected at least one new backup file to be created during migration"
+        len(glob.glob(os.path.join(migration_backup_directory, "database_backup_*.db")))
+        == 1
+    ), "Expected a backup file to be created during migration"
 
     # After migration, the database should be at the current schema version
     version_after_migration = DatabaseMigrator.get_stored_database_version(cursor)
@@ -387,21 +399,21 @@ def test_migrate_database_version_1_database(version_1_database):
     assert user1_after.lastName == user1_before.lastName
     assert user1_after.employeeId == user1_before.employeeId
     assert isinstance(user1_after.credits, int)
-    assert user1_after.credits == int(user1_before.credits * 100)
+    assert user1_after.credits == round(user1_before.credits * 100)
 
     assert user2_after.patronId == user2_before.patronId
     assert user2_after.firstName == user2_before.firstName
     assert user2_after.lastName == user2_before.lastName
     assert user2_after.employeeId == user2_before.employeeId
     assert isinstance(user2_after.credits, int)
-    assert user2_after.credits == int(user2_before.credits * 100)
+    assert user2_after.credits == round(user2_before.credits * 100)
 
     assert user3_after.patronId == user3_before.patronId
     assert user3_after.firstName == user3_before.firstName
     assert user3_after.lastName == user3_before.lastName
     assert user3_after.employeeId == user3_before.employeeId
     assert isinstance(user3_after.credits, int)
-    assert user3_after.credits == int(user3_before.credits * 100)
+    assert user3_after.credits == round(user3_before.credits * 100)
 
     cursor.execute("SELECT * FROM Snacks")
     snacks_data_after = cursor.fetchall()
@@ -414,21 +426,21 @@ def test_migrate_database_version_1_database(version_1_database):
     assert snack1_after.quantity == snack1_before.quantity
     assert snack1_after.imageID == snack1_before.imageID
     assert isinstance(snack1_after.pricePerItem, int)
-    assert snack1_after.pricePerItem == int(snack1_before.pricePerItem * 100)
+    assert snack1_after.pricePerItem == round(snack1_before.pricePerItem * 100)
 
     assert snack2_after.snackId == snack2_before.snackId
     assert snack2_after.name == snack2_before.name
     assert snack2_after.quantity == snack2_before.quantity
     assert snack2_after.imageID == snack2_before.imageID
     assert isinstance(snack2_after.pricePerItem, int)
-    assert snack2_after.pricePerItem == int(snack2_before.pricePerItem * 100)
+    assert snack2_after.pricePerItem == round(snack2_before.pricePerItem * 100)
 
     assert snack3_after.snackId == snack3_before.snackId
     assert snack3_after.name == snack3_before.name
     assert snack3_after.quantity == snack3_before.quantity
     assert snack3_after.imageID == snack3_before.imageID
     assert isinstance(snack3_after.pricePerItem, int)
-    assert snack3_after.pricePerItem == int(snack3_before.pricePerItem * 100)
+    assert snack3_after.pricePerItem == round(snack3_before.pricePerItem * 100)
 
     cursor.execute("SELECT * FROM AddedSnacks")
     added_snacks_data_after = cursor.fetchall()
@@ -438,24 +450,24 @@ def test_migrate_database_version_1_database(version_1_database):
 
     assert added_snack1_after.addedSnackId == added_snack1_before.addedSnackId
     assert added_snack1_after.name == added_snack1_before.name
-    assert added_snack1_after.dateAdded == added_snack1_before.dateAdded
+    assert added_snack1_after.dateAdded == _epoch_us(added_snack1_before.dateAdded)
     assert added_snack1_after.quantityAdded == added_snack1_before.quantityAdded
     assert isinstance(added_snack1_after.totalPrice, int)
-    assert added_snack1_after.totalPrice == int(added_snack1_before.totalPrice * 100)
+    assert added_snack1_after.totalPrice == round(added_snack1_before.totalPrice * 100)
 
     assert added_snack2_after.addedSnackId == added_snack2_before.addedSnackId
     assert added_snack2_after.name == added_snack2_before.name
-    assert added_snack2_after.dateAdded == added_snack2_before.dateAdded
+    assert added_snack2_after.dateAdded == _epoch_us(added_snack2_before.dateAdded)
     assert added_snack2_after.quantityAdded == added_snack2_before.quantityAdded
     assert isinstance(added_snack2_after.totalPrice, int)
-    assert added_snack2_after.totalPrice == int(added_snack2_before.totalPrice * 100)
+    assert added_snack2_after.totalPrice == round(added_snack2_before.totalPrice * 100)
 
     assert added_snack3_after.addedSnackId == added_snack3_before.addedSnackId
     assert added_snack3_after.name == added_snack3_before.name
-    assert added_snack3_after.dateAdded == added_snack3_before.dateAdded
+    assert added_snack3_after.dateAdded == _epoch_us(added_snack3_before.dateAdded)
     assert added_snack3_after.quantityAdded == added_snack3_before.quantityAdded
     assert isinstance(added_snack3_after.totalPrice, int)
-    assert added_snack3_after.totalPrice == int(added_snack3_before.totalPrice * 100)
+    assert added_snack3_after.totalPrice == round(added_snack3_before.totalPrice * 100)
 
     cursor.execute("SELECT * FROM LostSnacks")
     lost_snacks_data_after = cursor.fetchall()
@@ -463,10 +475,10 @@ def test_migrate_database_version_1_database(version_1_database):
     assert lost_snack1_after.lostSnackId == lost_snack1_before.lostSnackId
     assert lost_snack1_after.name == lost_snack1_before.name
     assert lost_snack1_after.reason == lost_snack1_before.reason
-    assert lost_snack1_after.dateLost == lost_snack1_before.dateLost
+    assert lost_snack1_after.dateLost == _epoch_us(lost_snack1_before.dateLost)
     assert lost_snack1_after.quantityLost == lost_snack1_before.quantityLost
     assert isinstance(lost_snack1_after.totalPrice, int)
-    assert lost_snack1_after.totalPrice == int(lost_snack1_before.totalPrice * 100)
+    assert lost_snack1_after.totalPrice == round(lost_snack1_before.totalPrice * 100)
 
     cursor.execute("SELECT * FROM Transactions")
     transactions_data_after = cursor.fetchall()
@@ -480,78 +492,90 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction1_after.transactionId == transaction1_before.transactionId
     assert transaction1_after.transactionType == transaction1_before.transactionType
     assert transaction1_after.patronId == transaction1_before.patronId
-    assert transaction1_after.transactionDate == transaction1_before.transactionDate
+    assert transaction1_after.transactionDate == _epoch_us(
+        transaction1_before.transactionDate
+    )
     assert isinstance(transaction1_after.amountBeforeTransaction, int)
-    assert transaction1_after.amountBeforeTransaction == int(
+    assert transaction1_after.amountBeforeTransaction == round(
         transaction1_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction1_after.amountAfterTransaction, int)
-    assert transaction1_after.amountAfterTransaction == int(
+    assert transaction1_after.amountAfterTransaction == round(
         transaction1_before.amountAfterTransaction * 100
     )
 
     assert transaction2_after.transactionId == transaction2_before.transactionId
     assert transaction2_after.transactionType == transaction2_before.transactionType
     assert transaction2_after.patronId == transaction2_before.patronId
-    assert transaction2_after.transactionDate == transaction2_before.transactionDate
+    assert transaction2_after.transactionDate == _epoch_us(
+        transaction2_before.transactionDate
+    )
     assert isinstance(transaction2_after.amountBeforeTransaction, int)
-    assert transaction2_after.amountBeforeTransaction == int(
+    assert transaction2_after.amountBeforeTransaction == round(
         transaction2_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction2_after.amountAfterTransaction, int)
-    assert transaction2_after.amountAfterTransaction == int(
+    assert transaction2_after.amountAfterTransaction == round(
         transaction2_before.amountAfterTransaction * 100
     )
 
     assert transaction3_after.transactionId == transaction3_before.transactionId
     assert transaction3_after.transactionType == transaction3_before.transactionType
     assert transaction3_after.patronId == transaction3_before.patronId
-    assert transaction3_after.transactionDate == transaction3_before.transactionDate
+    assert transaction3_after.transactionDate == _epoch_us(
+        transaction3_before.transactionDate
+    )
     assert isinstance(transaction3_after.amountBeforeTransaction, int)
-    assert transaction3_after.amountBeforeTransaction == int(
+    assert transaction3_after.amountBeforeTransaction == round(
         transaction3_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction3_after.amountAfterTransaction, int)
-    assert transaction3_after.amountAfterTransaction == int(
+    assert transaction3_after.amountAfterTransaction == round(
         transaction3_before.amountAfterTransaction * 100
     )
 
     assert transaction4_after.transactionId == transaction4_before.transactionId
     assert transaction4_after.transactionType == transaction4_before.transactionType
     assert transaction4_after.patronId == transaction4_before.patronId
-    assert transaction4_after.transactionDate == transaction4_before.transactionDate
+    assert transaction4_after.transactionDate == _epoch_us(
+        transaction4_before.transactionDate
+    )
     assert isinstance(transaction4_after.amountBeforeTransaction, int)
-    assert transaction4_after.amountBeforeTransaction == int(
+    assert transaction4_after.amountBeforeTransaction == round(
         transaction4_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction4_after.amountAfterTransaction, int)
-    assert transaction4_after.amountAfterTransaction == int(
+    assert transaction4_after.amountAfterTransaction == round(
         transaction4_before.amountAfterTransaction * 100
     )
 
     assert transaction5_after.transactionId == transaction5_before.transactionId
     assert transaction5_after.transactionType == transaction5_before.transactionType
     assert transaction5_after.patronId == transaction5_before.patronId
-    assert transaction5_after.transactionDate == transaction5_before.transactionDate
+    assert transaction5_after.transactionDate == _epoch_us(
+        transaction5_before.transactionDate
+    )
     assert isinstance(transaction5_after.amountBeforeTransaction, int)
-    assert transaction5_after.amountBeforeTransaction == int(
+    assert transaction5_after.amountBeforeTransaction == round(
         transaction5_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction5_after.amountAfterTransaction, int)
-    assert transaction5_after.amountAfterTransaction == int(
+    assert transaction5_after.amountAfterTransaction == round(
         transaction5_before.amountAfterTransaction * 100
     )
 
     assert transaction6_after.transactionId == transaction6_before.transactionId
     assert transaction6_after.transactionType == transaction6_before.transactionType
     assert transaction6_after.patronId == transaction6_before.patronId
-    assert transaction6_after.transactionDate == transaction6_before.transactionDate
+    assert transaction6_after.transactionDate == _epoch_us(
+        transaction6_before.transactionDate
+    )
     assert isinstance(transaction6_after.amountBeforeTransaction, int)
-    assert transaction6_after.amountBeforeTransaction == int(
+    assert transaction6_after.amountBeforeTransaction == round(
         transaction6_before.amountBeforeTransaction * 100
     )
     assert isinstance(transaction6_after.amountAfterTransaction, int)
-    assert transaction6_after.amountAfterTransaction == int(
+    assert transaction6_after.amountAfterTransaction == round(
         transaction6_before.amountAfterTransaction * 100
     )
 
@@ -573,7 +597,7 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item1_after.snackName == transaction_item1_before.snackName
     assert transaction_item1_after.quantity == transaction_item1_before.quantity
     assert isinstance(transaction_item1_after.pricePerItem, int)
-    assert transaction_item1_after.pricePerItem == int(
+    assert transaction_item1_after.pricePerItem == round(
         transaction_item1_before.pricePerItem * 100
     )
 
@@ -587,7 +611,7 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item2_after.snackName == transaction_item2_before.snackName
     assert transaction_item2_after.quantity == transaction_item2_before.quantity
     assert isinstance(transaction_item2_after.pricePerItem, int)
-    assert transaction_item2_after.pricePerItem == int(
+    assert transaction_item2_after.pricePerItem == round(
         transaction_item2_before.pricePerItem * 100
     )
 
@@ -601,7 +625,7 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item3_after.snackName == transaction_item3_before.snackName
     assert transaction_item3_after.quantity == transaction_item3_before.quantity
     assert isinstance(transaction_item3_after.pricePerItem, int)
-    assert transaction_item3_after.pricePerItem == int(
+    assert transaction_item3_after.pricePerItem == round(
         transaction_item3_before.pricePerItem * 100
     )
 
@@ -615,7 +639,7 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item4_after.snackName == transaction_item4_before.snackName
     assert transaction_item4_after.quantity == transaction_item4_before.quantity
     assert isinstance(transaction_item4_after.pricePerItem, int)
-    assert transaction_item4_after.pricePerItem == int(
+    assert transaction_item4_after.pricePerItem == round(
         transaction_item4_before.pricePerItem * 100
     )
 
@@ -629,14 +653,10 @@ def test_migrate_database_version_1_database(version_1_database):
     assert transaction_item5_after.snackName == transaction_item5_before.snackName
     assert transaction_item5_after.quantity == transaction_item5_before.quantity
     assert isinstance(transaction_item5_after.pricePerItem, int)
-    assert transaction_item5_after.pricePerItem == int(
+    assert transaction_item5_after.pricePerItem == round(
         transaction_item5_before.pricePerItem * 100
     )
 
-    # Clean up only the backup file(s) created by this test
-    for backup_path in new_backups:
-        os.remove(backup_path)
-
 
 # ── V2 → V3 migration tests ──────────────────────────────
 
@@ -682,6 +702,85 @@ def version_3_database():
     _remove_if_exists(db_path)
 
 
+@pytest.fixture
+def version_4_database():
+    """Create a temporary v4 database with the lookup indexes."""
+    db_path = "test_version_4_database.db"
+    _remove_if_exists(db_path)
+    SchemaBuilder.build(db_path, "v4")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    yield conn, cursor
+
+    cursor.close()
+    conn.close()
+    _remove_if_exists(db_path)
+
+
+@pytest.fixture
+def version_5_database():
+    """Create a temporary v5 database with the StoreStats table."""
+    db_path = "test_version_5_database.db"
+    _remove_if_exists(db_path)
+    SchemaBuilder.build(db_path, "v5")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    yield conn, cursor
+
+    cursor.close()
+    conn.close()
+    _remove_if_exists(db_path)
+
+
+@pytest.fixture
+def version_6_database():
+    """Create a temporary v6 database with the PatronSnackCounts table."""
+    db_path = "test_version_6_database.db"
+    _remove_if_exists(db_path)
+    SchemaBuilder.build(db_path, "v6")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    yield conn, cursor
+
+    cursor.close()
+    conn.close()
+    _remove_if_exists(db_path)
+
+
+@pytest.fixture
+def version_7_database():
+    """Create a temporary v7 database with integer dates."""
+    db_path = "test_version_7_database.db"
+    _remove_if_exists(db_path)
+    SchemaBuilder.build(db_path, "v7")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    yield conn, cursor
+
+    cursor.close()
+    conn.close()
+    _remove_if_exists(db_path)
+
+
+def _get_index_names(cursor):
+    """Get the names of all user created indexes."""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'"
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+EXPECTED_V4_INDEXES = {
+    "idx_transactions_patron_date",
+    "idx_transaction_items_transaction",
+    "idx_patrons_employee_id",
+}
+
+
 def test_schema_builder_v2_state(version_2_database):
     """Verify SchemaBuilder produces the expected v2 buggy schema."""
     _, cursor = version_2_database
@@ -838,3 +937,327 @@ def test_full_v1_to_v3_migration(version_1_database):
         "SELECT COUNT(*) FROM Transactions t JOIN Patrons p ON t.PatronID = p.PatronID"
     )
     assert cursor.fetchone()[0] == txn_count
+
+
+def test_schema_builder_v4_state(version_4_database):
+    """Verify SchemaBuilder produces the v4 schema with lookup indexes."""
+    _, cursor = version_4_database
+
+    assert _get_index_names(cursor) == EXPECTED_V4_INDEXES
+    assert DatabaseMigrator.get_stored_database_version(cursor) == 4
+    # V5 adds the StoreStats table
+    assert DatabaseMigrator.needs_migration(cursor) is True
+
+
+def test_migration_3_to_4_creates_indexes(version_3_database):
+    """Migrate v3→v4: verify the lookup indexes are created and data untouched."""
+    conn, cursor = version_3_database
+
+    assert _get_index_names(cursor) == set()
+    cursor.execute("SELECT * FROM Transactions ORDER BY TransactionID")
+    transactions_before = cursor.fetchall()
+
+    DatabaseMigrator.migration_4(conn, cursor)
+
+    assert _get_index_names(cursor) == EXPECTED_V4_INDEXES
+    cursor.execute("SELECT * FROM Transactions ORDER BY TransactionID")
+    assert cursor.fetchall() == transactions_before
+
+    # Running it again is a no-op
+    DatabaseMigrator.migration_4(conn, cursor)
+    assert _get_index_names(cursor) == EXPECTED_V4_INDEXES
+
+
+def test_new_database_has_v4_indexes(new_database_connector):
+    """A freshly created database gets the same indexes as a migrated one."""
+    cursor = new_database_connector.connection.cursor()
+    assert EXPECTED_V4_INDEXES <= _get_index_names(cursor)
+
+
+def _get_store_stats(cursor):
+    cursor.execute(
+        "SELECT SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns, "
+        "AddedCount, AddedValue, LostCount, LostValue FROM StoreStats"
+    )
+    return cursor.fetchall()
+
+
+# SoldCount, StoreRevenue, GamblingRevenue, GamblingReturns,
+# AddedCount, AddedValue, LostCount, LostValue of the seed data
+EXPECTED_SEED_STORE_STATS = [(7, 1676, 540, 133, 7015, 890100, 50, 73650)]
+
+
+def test_schema_builder_v5_state(version_5_database):
+    """Verify SchemaBuilder produces the v5 schema with filled in StoreStats."""
+    _, cursor = version_5_database
+
+    assert _get_store_stats(cursor) == EXPECTED_SEED_STORE_STATS
+    assert DatabaseMigrator.get_stored_database_version(cursor) == 5
+    # V6 adds the PatronSnackCounts table
+    assert DatabaseMigrator.needs_migration(cursor) is True
+
+
+def test_migration_4_to_5_backfills_store_stats(version_4_database):
+    """Migrate v4→v5: StoreStats is created and backfilled from the raw tables."""
+    conn, cursor = version_4_database
+
+    DatabaseMigrator.migration_5(conn, cursor)
+
+    assert _get_store_stats(cursor) == EXPECTED_SEED_STORE_STATS
+
+    # Running it again recomputes the same single row
+    DatabaseMigrator.migration_5(conn, cursor)
+    assert _get_store_stats(cursor) == EXPECTED_SEED_STORE_STATS
+
+
+def test_new_database_has_empty_store_stats(new_database_connector):
+    """A freshly created database starts with a single zeroed StoreStats row."""
+    cursor = new_database_connector.connection.cursor()
+    assert _get_store_stats(cursor) == [(0, 0, 0, 0, 0, 0, 0, 0)]
+
+
+def _get_patron_snack_counts(cursor):
+    cursor.execute(
+        "SELECT PatronID, ItemName, TotalQuantity, LastPurchased "
+        "FROM PatronSnackCounts ORDER BY PatronID, ItemName"
+    )
+    return cursor.fetchall()
+
+
+def test_schema_builder_v6_state(version_6_database):
+    """Verify SchemaBuilder produces the v6 schema with filled in snack counts."""
+    _, cursor = version_6_database
+
+    assert len(_get_patron_snack_counts(cursor)) == 5
+    assert "idx_patron_snack_counts_rank" in _get_index_names(cursor)
+    assert DatabaseMigrator.get_stored_database_version(cursor) == 6
+    # V7 stores dates as integers
+    assert DatabaseMigrator.needs_migration(cursor) is True
+
+
+def test_migration_5_to_6_backfills_snack_counts(version_5_database):
+    """Migrate v5→v6: PatronSnackCounts is backfilled from the transactions."""
+    conn, cursor = version_5_database
+
+    DatabaseMigrator.migration_6(conn, cursor)
+
+    assert _get_patron_snack_counts(cursor) == [
+        (1, "Apple", 1, "2026-04-29 21:01:46.745517"),
+        (1, "Orange", 1, "2026-04-29 21:01:46.745517"),
+        (1, "Pear", 3, "2026-04-29 21:01:46.745517"),
+        (2, "Pear", 2, "2026-04-29 21:00:57.733077"),
+        (3, "Apple", 1, "2026-04-29 21:00:37.649922"),
+    ]
+    assert "idx_patron_snack_counts_rank" in _get_index_names(cursor)
+
+    # Running it again recomputes the same rows
+    rows = _get_patron_snack_counts(cursor)
+    DatabaseMigrator.migration_6(conn, cursor)
+    assert _get_patron_snack_counts(cursor) == rows
+
+
+DATE_COLUMNS = {
+    "Transactions": "TransactionDate",
+    "AddedSnacks": "AddedDate",
+    "LostSnacks": "LostDate",
+    "PatronSnackCounts": "LastPurchased",
+}
+DATE_COLUMN_POSITIONS = {
+    "Transactions": 3,
+    "AddedSnacks": 2,
+    "LostSnacks": 3,
+    "PatronSnackCounts": 3,
+}
+
+
+def _get_column_type(cursor, table, column):
+    """Get the declared type of a column via PRAGMA table_info."""
+    cursor.execute(f"PRAGMA table_info('{table}')")
+    for col in cursor.fetchall():
+        if col[1] == column:
+            return col[2]
+    return None
+
+
+def _get_all_rows(cursor):
+    rows = {}
+    for table in DATE_COLUMNS:
+        cursor.execute(f"SELECT * FROM {table} ORDER BY rowid")
+        rows[table] = cursor.fetchall()
+    return rows
+
+
+def test_schema_builder_v7_state(version_7_database):
+    """Verify SchemaBuilder produces the v7 schema with integer dates."""
+    _, cursor = version_7_database
+
+    for table, column in DATE_COLUMNS.items():
+        assert _get_column_type(cursor, table, column) == "INTEGER"
+    cursor.execute("SELECT TransactionDate FROM Transactions WHERE TransactionID = 1")
+    assert cursor.fetchone()[0] == _epoch_us("2026-04-29 20:59:19.980700")
+    assert DatabaseMigrator.get_stored_database_version(cursor) == 7
+    assert DatabaseMigrator.needs_migration(cursor) is False
+
+
+def test_migration_6_to_7_converts_dates(version_6_database, monkeypatch):
+    """Migrate v6→v7 in small batches: every date becomes its integer form."""
+    conn, cursor = version_6_database
+    # Force several batches for the 6 seeded transactions
+    monkeypatch.setattr(DatabaseMigrator, "MIGRATION_BATCH_SIZE", 4)
+    rows_before = _get_all_rows(cursor)
+    indexes_before = _get_index_names(cursor)
+
+    DatabaseMigrator.migration_7(conn, cursor)
+
+    for table, column in DATE_COLUMNS.items():
+        assert _get_column_type(cursor, table, column) == "INTEGER"
+
+    # Only the date columns changed, they now hold the integer form
+    rows_after = _get_all_rows(cursor)
+    for table, rows in rows_before.items():
+        position = DATE_COLUMN_POSITIONS[table]
+        expected = [
+            row[:position] + (_epoch_us(row[position]),) + row[position + 1 :]
+            for row in rows
+        ]
+        assert rows_after[table] == expected
+
+    assert _get_index_names(cursor) == indexes_before
+    cursor.execute("PRAGMA foreign_key_check")
+    assert cursor.fetchall() == []
+
+    # New transactions continue after the copied ones
+    cursor.execute(
+        "INSERT INTO Transactions (TransactionType, PatronID, TransactionDate, "
+        "AmountBeforeTransaction, AmountAfterTransaction) VALUES ('TOP_UP', 1, 0, 0, 0)"
+    )
+    assert cursor.lastrowid == 7
+
+    # Running it again leaves the integer dates alone
+    rows_after = _get_all_rows(cursor)
+    DatabaseMigrator.migration_7(conn, cursor)
+    assert _get_all_rows(cursor) == rows_after
+
+
+def test_full_migration_reads_dates_back(version_1_database):
+    """Dates written as text by v1 read back unchanged through DatabaseConnector."""
+    conn, cursor = version_1_database
+    DatabaseMigrator.migrate_database(conn, cursor)
+    conn.commit()
+
+    database = DatabaseConnector("GuiApp/tests/test_version_1_database.db")
+    transactions = database.getTransactions(1)
+    database.close()
+
+    assert [t.transactionDate for t in transactions] == [
+        datetime(2026, 4, 29, 20, 59, 19, 980700),
+        datetime(2026, 4, 29, 21, 1, 46, 745517),
+    ]
+
+
+def test_schema_version_is_stored_in_user_version(version_1_database):
+    """migrate_database stores the version in PRAGMA user_version."""
+    conn, cursor = version_1_database
+    assert cursor.execute("PRAGMA user_version").fetchone()[0] == 0
+
+    DatabaseMigrator.migrate_database(conn, cursor)
+
+    assert (
+        cursor.execute("PRAGMA user_version").fetchone()[0]
+        == DatabaseMigrator.CURRENT_SCHEMA_VERSION
+    )
+    assert DatabaseMigrator.needs_migration(cursor) is False
+    # Older versions of the app still find it in the settings table
+    cursor.execute("SELECT value FROM settings WHERE name = 'schema_version'")
+    assert int(cursor.fetchone()[0]) == DatabaseMigrator.CURRENT_SCHEMA_VERSION
+
+
+def test_migration_reports_progress(version_1_database, monkeypatch):
+    """The progress callback sees every migration and every copied batch."""
+    conn, cursor = version_1_database
+    monkeypatch.setattr(DatabaseMigrator, "MIGRATION_BATCH_SIZE", 1)
+    cursor.execute("SELECT COUNT(*) FROM Transactions")
+    transaction_count = cursor.fetchone()[0]
+    reports = []
+
+    DatabaseMigrator.migrate_database(
+        conn, cursor, progress=lambda *report: reports.append(report)
+    )
+
+    started = [version for version, table, _, _ in reports if table is None]
+    assert started == list(range(2, DatabaseMigrator.CURRENT_SCHEMA_VERSION + 1))
+    for version in (2, 7):
+        copied = [
+            (copied, total)
+            for report_version, table, copied, total in reports
+            if report_version == version and table == "Transactions"
+        ]
+        assert copied == [
+            (i, transaction_count) for i in range(1, transaction_count + 1)
+        ]
+
+
+def test_interrupted_rebuild_resumes_from_checkpoint(version_6_database, monkeypatch):
+    """A rebuild that fails after some batches continues after the last one."""
+    conn, cursor = version_6_database
+    monkeypatch.setattr(DatabaseMigrator, "MIGRATION_BATCH_SIZE", 2)
+    rows_before = _get_all_rows(cursor)
+
+    def fail_after_first_batch(table, copied, _total):
+        if table == "Transactions" and copied == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        DatabaseMigrator.migration_7(conn, cursor, progress=fail_after_first_batch)
+    conn.rollback()
+    cursor.execute("SELECT COUNT(*) FROM Transactions_new")
+    assert cursor.fetchone()[0] == 2
+
+    resumed = []
+    DatabaseMigrator.migration_7(
+        conn, cursor, progress=lambda *report: resumed.append(report)
+    )
+
+    assert [r for r in resumed if r[0] == "Transactions"] == [
+        ("Transactions", 4, 6),
+        ("Transactions", 6, 6),
+    ]
+    rows_after = _get_all_rows(cursor)
+    position = DATE_COLUMN_POSITIONS["Transactions"]
+    assert rows_after["Transactions"] == [
+        row[:position] + (_epoch_us(row[position]),) + row[position + 1 :]
+        for row in rows_before["Transactions"]
+    ]
+    cursor.execute("SELECT COUNT(*) FROM MigrationCheckpoints")
+    assert cursor.fetchone()[0] == 0
+
+
+def test_migration_2_rounds_credits_to_hundreths(version_1_database):
+    """REAL credits just below a hundreth, like 0.29, are rounded, not truncated."""
+    conn, cursor = version_1_database
+    # 0.29 * 100 is 28.999999999999996 as a REAL
+    cursor.execute("UPDATE Patrons SET TotalCredits = 0.29")
+    cursor.execute("UPDATE Snacks SET PricePerItem = 0.29")
+    conn.commit()
+
+    DatabaseMigrator.migration_2(conn, cursor)
+
+    cursor.execute("SELECT DISTINCT TotalCredits FROM Patrons")
+    assert cursor.fetchall() == [(29,)]
+    cursor.execute("SELECT DISTINCT PricePerItem FROM Snacks")
+    assert cursor.fetchall() == [(29,)]
+
+
+def test_migration_backup_is_rotated_with_the_other_backups(tmp_path, monkeypatch):
+    monkeypatch.setattr(DatabaseMigrator, "MIGRATION_BACKUP_DIRECTORY", None)
+    shutil.copy("GuiApp/tests/database_test_version_1.db", tmp_path / "v1.db")
+
+    conn = sqlite3.connect(tmp_path / "v1.db")
+    DatabaseMigrator.migrate_database(conn, conn.cursor())
+    conn.close()
+
+    backups = glob.glob(str(tmp_path / "backups" / "database_backup_*.db"))
+    assert len(backups) == 1
+    # A newer scheduled backup rotates it away
+    (tmp_path / "backups" / "database_backup_9999-01-01_00-00-00.db").write_bytes(b"")
+    assert rotateBackups(str(tmp_path / "backups"), retention=1) == backups
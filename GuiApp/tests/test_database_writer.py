@@ -0,0 +1,165 @@
+from datetime import datetime
+
+import pytest
+from kivy.clock import Clock
+
+from app_types import Credits, SnackData, StorageProfile
+from GuiApp.database import DatabaseConnector, InsufficientCreditsError
+from GuiApp.database_writer import DatabaseWriter
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(
+        str(tmp_path / "writer_test.db"),
+        storage_profile=StorageProfile.SD_CARD_SAFE,
+        async_writes=True,
+    )
+    database.addPatron("First", "Last", "CARD1")
+    database.addCredits(database.getPatronIdByCardId("CARD1"), Credits("10.00"))
+    database.addSnack("Apple", 5, "Image1", Credits("1.25"))
+    yield database
+    database.close()
+
+
+def _apple_cart(database, quantity):
+    apple = database.getSnackByName("Apple")
+    return [SnackData(apple.snackId, "Apple", quantity, "", apple.pricePerItem)]
+
+
+def test_jobs_in_the_window_are_group_committed(tmp_path):
+    DatabaseConnector(str(tmp_path / "writer_test.db")).close()
+    dispatched = []
+    writer = DatabaseWriter(
+        str(tmp_path / "writer_test.db"),
+        StorageProfile.SD_CARD_SAFE,
+        group_commit_window=0.5,
+        dispatch=dispatched.append,
+    )
+
+    def addSnack(name):
+        return lambda cursor: cursor.execute(
+            "INSERT INTO Snacks (ItemName, Quantity, ImageID, PricePerItem) "
+            "VALUES (?, 1, '', 100)",
+            (name,),
+        ).lastrowid
+
+    def fail(cursor):
+        addSnack("Rolled back")(cursor)
+        raise ValueError("job failed")
+
+    futures = [
+        writer.submit(addSnack("Apple")),
+        writer.submit(fail),
+        writer.submit(addSnack("Banana")),
+    ]
+    writer.flush()
+    report = writer.get_report()
+    writer.close()
+
+    assert (report["jobs"], report["batches"], report["commits"]) == (3, 1, 1)
+    assert len(dispatched) == 1
+    assert isinstance(futures[1].exception(), ValueError)
+    other = DatabaseConnector(str(tmp_path / "writer_test.db"))
+    assert [s.snackName for s in other.getAllSnacks()] == ["Apple", "Banana"]
+    assert [s.snackId for s in other.getAllSnacks()] == [
+        futures[0].result(),
+        futures[2].result(),
+    ]
+    other.close()
+
+
+def test_reads_right_after_a_checkout_see_it(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    done = []
+
+    future = database.checkoutAsync(
+        patron_id=patronId,
+        cart=_apple_cart(database, 2),
+        fee=Credits("2.50"),
+        timestamp=datetime.now(),
+        on_done=done.append,
+    )
+
+    assert database.resolveCard("CARD1").totalCredits == Credits("7.50")
+    assert database.getPatronData(patronId).totalCredits == Credits("7.50")
+    assert database.getSnackByName("Apple").quantity == 3
+    assert len(database.getTransactions(patronId)) == 1
+    assert future.result() == Credits("7.50")
+    # Reads only wait for the caches to be updated, on_done is only ever
+    # called from the Clock
+    assert not done
+
+    Clock.tick()
+
+    assert done == [future]
+    assert database.get_storage_report()["writer"]["jobs"] == 1
+
+
+def test_read_modify_write_sees_queued_writes(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    database.checkoutAsync(
+        patron_id=patronId,
+        cart=_apple_cart(database, 1),
+        fee=Credits("1.25"),
+        timestamp=datetime.now(),
+    )
+    database.addCredits(patronId, Credits("5.00"))
+
+    assert database.getPatronData(patronId).totalCredits == Credits("13.75")
+    assert database.resolveCard("CARD1").totalCredits == Credits("13.75")
+
+
+def test_failed_async_checkout_writes_nothing(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    future = database.checkoutAsync(
+        patron_id=patronId,
+        cart=_apple_cart(database, 1),
+        fee=Credits("100.00"),
+        timestamp=datetime.now(),
+    )
+
+    with pytest.raises(InsufficientCreditsError):
+        future.result()
+    assert database.resolveCard("CARD1").totalCredits == Credits("10.00")
+    assert database.getSnackByName("Apple").quantity == 5
+    assert not database.getTransactions(patronId)
+
+
+def test_without_async_writes_on_done_runs_before_returning(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "writer_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addSnack("Apple", 5, "Image1", Credits("0.00"))
+    done = []
+
+    future = database.checkoutAsync(
+        patron_id=database.getPatronIdByCardId("CARD1"),
+        cart=_apple_cart(database, 1),
+        fee=Credits("0.00"),
+        timestamp=datetime.now(),
+        on_done=done.append,
+    )
+
+    assert done == [future]
+    assert database.getSnackByName("Apple").quantity == 4
+    database.close()
+
+
+def test_async_gamble_is_read_back_right_away(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    future = database.gambleAsync(
+        patron_id=patronId,
+        won_snack=database.getSnackByName("Apple"),
+        fee=Credits("2.00"),
+        timestamp=datetime.now(),
+    )
+
+    assert database.resolveCard("CARD1").totalCredits == Credits("8.00")
+    assert database.getSnackByName("Apple").quantity == 4
+    assert future.result() == Credits("8.00")
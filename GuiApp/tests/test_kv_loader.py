@@ -0,0 +1,56 @@
+import pytest
+from kivy.uix.label import Label
+
+import kv_loader
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+class KvLoaderTestLabel(Label):
+    pass
+
+
+@pytest.fixture
+def kv_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(kv_loader, "KV_CACHE_PATH", str(tmp_path / "test.kvcache"))
+    monkeypatch.setattr(kv_loader, "_cache", None)
+    monkeypatch.setattr(kv_loader, "_loaded", set())
+    path = tmp_path / "testLabel.kv"
+    path.write_text('<KvLoaderTestLabel>:\n    text: "from " + "cache"\n')
+    yield str(path)
+    kv_loader.Builder.unload_file(str(path))
+
+
+def test_kv_is_loaded_from_the_cache(kv_file, monkeypatch):
+    kv_loader.compileKvCache([kv_file], kv_loader.KV_CACHE_PATH)
+
+    def parse(**_kwargs):
+        raise AssertionError("The cached rules should not be parsed")
+
+    monkeypatch.setattr(kv_loader.kivy.lang.builder, "Parser", parse)
+    # loadKv restores the Parser it imported once it is done
+    monkeypatch.setattr(kv_loader, "Parser", parse)
+    kv_loader.loadKv(kv_file)
+
+    assert KvLoaderTestLabel().text == "from cache"
+
+
+def test_changed_kv_is_parsed_again(kv_file):
+    kv_loader.compileKvCache([kv_file], kv_loader.KV_CACHE_PATH)
+    with open(kv_file, "w", encoding="utf-8") as file:
+        file.write('<KvLoaderTestLabel>:\n    text: "changed"\n')
+
+    kv_loader.loadKv(kv_file)
+
+    assert KvLoaderTestLabel().text == "changed"
+
+
+def test_kv_rules_are_loaded_on_first_instance(kv_file):
+    @kv_loader.kvRules(kv_file)
+    class LazyLabel(KvLoaderTestLabel):
+        pass
+
+    assert kv_file not in kv_loader._loaded  # pylint: disable=protected-access
+    assert LazyLabel().text == "from cache"
+    assert kv_file in kv_loader._loaded  # pylint: disable=protected-access
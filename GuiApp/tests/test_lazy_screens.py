@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from GuiApp.main import PREWARM_SCREENS, SCREENS
+
+
+@pytest.mark.asyncio
+async def test_screens_are_built_on_first_use(app):
+    screenManager = app.screenManager
+    assert screenManager.isScreenBuilt("splashScreen")
+    assert not screenManager.isScreenBuilt("logScreen")
+    assert sorted(screenManager.getScreenNames()) == sorted(SCREENS)
+    assert screenManager.has_screen("logScreen")
+
+    screenManager.transitionToScreen("logScreen")
+
+    assert screenManager.isScreenBuilt("logScreen")
+    assert screenManager.current_screen.name == "logScreen"
+    assert screenManager.get_screen("logScreen") is screenManager.current_screen
+
+
+@pytest.mark.asyncio
+async def test_likely_screens_are_prewarmed(app):
+    # One screen is built per frame after the first frame
+    await asyncio.sleep(0.5)
+
+    for name in PREWARM_SCREENS:
+        assert app.screenManager.isScreenBuilt(name)
+    assert not app.screenManager.isScreenBuilt("editSystemSettingsScreen")
@@ -45,6 +45,20 @@ async def test_login_from_splash_screen_with_card(app_with_only_users):
     )
 
 
+@pytest.mark.asyncio
+async def test_card_login_records_tap_to_screen_latency(app_with_only_users):
+    screenManager = app_with_only_users.screenManager
+    assert screenManager.getTapToScreenReport()["count"] == 0
+
+    screenManager.RFIDReader.triggerFakeRead(card_id="555555555")
+    # Wait for the transition to the main user page to finish
+    await asyncio.sleep(1.0)
+
+    report = screenManager.getTapToScreenReport()
+    assert report["count"] == 1
+    assert report["last_ms"] > 0
+
+
 @pytest.mark.asyncio
 async def test_login_from_login_screen_with_card(app_with_only_users):
     assert app_with_only_users.screenManager.current == "splashScreen"
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, SnackData
+from GuiApp.database import DatabaseConnector, toEpochMicroseconds
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "patron_snack_counts_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addPatron("Second", "Last", "CARD2")
+    yield database
+    database.close()
+
+
+def _purchase(database, patronId, items, day):
+    database.addPurchaseTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("0.00"),
+        amountAfterTransaction=Credits("0.00"),
+        transactionDate=datetime(2026, 1, day, 12, 0, 0),
+        transactionItems=[
+            SnackData(-1, name, quantity, "", Credits("1.00"))
+            for name, quantity in items
+        ],
+    )
+
+
+def _gamble(database, patronId, name, day):
+    database.addGambleTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("0.00"),
+        amountAfterTransaction=Credits("0.00"),
+        transactionDate=datetime(2026, 1, day, 12, 0, 0),
+        transactionItem=SnackData(-1, name, 1, "", Credits("1.00")),
+    )
+
+
+def _get_counts(database, patronId):
+    database.cursor.execute(
+        "SELECT ItemName, TotalQuantity, LastPurchased FROM PatronSnackCounts "
+        "WHERE PatronID = ? ORDER BY ItemName",
+        (patronId,),
+    )
+    return database.cursor.fetchall()
+
+
+def test_purchases_and_gambles_update_counts(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    _purchase(database, patronId, [("Apple", 2), ("Banana", 1)], day=1)
+    _purchase(database, patronId, [("Banana", 3)], day=2)
+    _gamble(database, patronId, "Apple", day=3)
+
+    assert _get_counts(database, patronId) == [
+        ("Apple", 3, toEpochMicroseconds(datetime(2026, 1, 3, 12, 0, 0))),
+        ("Banana", 4, toEpochMicroseconds(datetime(2026, 1, 2, 12, 0, 0))),
+    ]
+    assert _get_counts(database, database.getPatronIdByCardId("CARD2")) == []
+
+
+def test_most_purchased_ranking(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    _purchase(database, patronId, [("Apple", 2), ("Banana", 5)], day=1)
+    _purchase(database, patronId, [("Cherry", 2)], day=2)
+    _gamble(database, database.getPatronIdByCardId("CARD2"), "Apple", day=3)
+
+    # Apple and Cherry are tied, Cherry was purchased last
+    assert database.getMostPurchasedSnacksByPatron(patronId) == [
+        "Banana",
+        "Cherry",
+        "Apple",
+    ]
+    assert database.getMostPurchasedSnacksByPatron(patronId, limit=1) == ["Banana"]
+    assert database.getMostPurchasedSnacksByPatron(
+        database.getPatronIdByCardId("CARD2")
+    ) == ["Apple"]
+
+
+def test_ranking_matches_transaction_history(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    _purchase(database, patronId, [("Apple", 1), ("Banana", 2)], day=1)
+    _purchase(database, patronId, [("Apple", 4)], day=2)
+    _gamble(database, patronId, "Banana", day=3)
+
+    totals = {}
+    for transaction in database.getTransactions(patronId):
+        for item in transaction.transactionItems:
+            totals[item.snackName] = totals.get(item.snackName, 0) + item.quantity
+
+    assert database.getMostPurchasedSnacksByPatron(patronId) == sorted(
+        totals, key=totals.get, reverse=True
+    )
+
+
+def test_removing_history_removes_counts(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    otherPatronId = database.getPatronIdByCardId("CARD2")
+    _purchase(database, patronId, [("Apple", 1)], day=1)
+    _purchase(database, otherPatronId, [("Banana", 1)], day=1)
+
+    database.removePatron(otherPatronId)
+    assert database.getMostPurchasedSnacksByPatron(otherPatronId) == []
+    assert database.getMostPurchasedSnacksByPatron(patronId) == ["Apple"]
+
+    database.clear_transactions()
+    assert database.getMostPurchasedSnacksByPatron(patronId) == []
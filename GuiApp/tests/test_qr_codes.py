@@ -0,0 +1,80 @@
+import threading
+
+from app_types import Credits
+from qr_codes import QrCodeCache, QrCodeKey, renderQrCode, swishPaymentUrl
+
+
+class ManualDispatch:
+    """Collects the callbacks meant for the main thread until run() is called."""
+
+    def __init__(self):
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.dispatched = threading.Event()
+
+    def __call__(self, callback):
+        with self.lock:
+            self.callbacks.append(callback)
+        self.dispatched.set()
+
+    def run(self, expected=1):
+        while True:
+            with self.lock:
+                if len(self.callbacks) >= expected:
+                    callbacks, self.callbacks = self.callbacks, []
+                    break
+            assert self.dispatched.wait(timeout=10)
+            self.dispatched.clear()
+        for callback in callbacks:
+            callback()
+
+
+def test_qr_code_is_rendered_into_a_texture():
+    dispatch = ManualDispatch()
+    cache = QrCodeCache(dispatch=dispatch)
+    textures = []
+
+    cache.request("1234567890", Credits("50.00"), "Test", on_ready=textures.append)
+    assert not textures
+    dispatch.run()
+
+    rendered = renderQrCode(swishPaymentUrl("1234567890", Credits("50.00"), "Test"))
+    assert len(textures) == 1
+    assert textures[0].size == (rendered.width, rendered.height)
+    assert QrCodeKey("1234567890", Credits("50.00"), "Test") in cache
+
+    # Cached codes are handed over right away
+    cache.request("1234567890", Credits("50.00"), "Test", on_ready=textures.append)
+    assert textures == [textures[0], textures[0]]
+    cache.close()
+
+
+def test_concurrent_requests_share_one_render():
+    dispatch = ManualDispatch()
+    cache = QrCodeCache(dispatch=dispatch)
+    textures = []
+
+    cache.prefetch("1234567890", [Credits("100.00")], "Test")
+    cache.request("1234567890", Credits("100.00"), "Test", on_ready=textures.append)
+    cache.request("1234567890", Credits("100.00"), "Test", on_ready=textures.append)
+    dispatch.run()
+
+    assert len(textures) == 2 and textures[0] is textures[1]
+    assert not dispatch.callbacks
+    cache.close()
+
+
+def test_least_recently_used_qr_code_is_evicted():
+    dispatch = ManualDispatch()
+    cache = QrCodeCache(maxsize=2, dispatch=dispatch)
+
+    cache.prefetch("1234567890", [Credits("1.00"), Credits("2.00")], "Test")
+    dispatch.run(expected=2)
+    cache.request("1234567890", Credits("1.00"), "Test")
+    cache.request("1234567890", Credits("3.00"), "Test")
+    dispatch.run()
+
+    assert QrCodeKey("1234567890", Credits("1.00"), "Test") in cache
+    assert QrCodeKey("1234567890", Credits("2.00"), "Test") not in cache
+    assert QrCodeKey("1234567890", Credits("3.00"), "Test") in cache
+    cache.close()
@@ -0,0 +1,179 @@
+"""
+EXPLAIN QUERY PLAN checks for the DatabaseConnector.
+
+Every statement the connector sends to SQLite is captured with a trace
+callback while the lookup methods are exercised. Statements that filter
+with a WHERE clause must be answered through the primary key or an index,
+never by scanning the whole table. Statements without a WHERE clause
+(getAllSnacks, getAllPatrons, the SUM aggregates, ...) read every row by
+design and are not checked.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, LostSnackReason, SnackData, UserData
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+@pytest.fixture
+def traced_database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "query_plan_test.db"))
+    statements = []
+    database.connection.set_trace_callback(statements.append)
+    yield database, statements
+    database.connection.set_trace_callback(None)
+    database.close()
+
+
+def _exercise_database(database: DatabaseConnector):
+    """Call every DatabaseConnector method that looks up rows by a key."""
+    database.addPatron("First", "Last", "CARD1")
+    database.addPatron("Second", "Last", "CARD2")
+    patron_id = database.getPatronIdByCardId("CARD1")
+    other_patron_id = database.getPatronIdByCardId("CARD2")
+    database.addCredits(patron_id, Credits("50.00"))
+
+    database.addSnack("Snack1", 10, "Image1", Credits("2.00"))
+    database.addSnack("Snack2", 1, "Image2", Credits("3.00"))
+    snacks = database.getAllSnacks()
+    snack = database.getSnack(snacks[0].snackId)
+    database.subtractSnackQuantity(snack.snackId, 1)
+    database.updateSnackData(
+        snack.snackId,
+        SnackData(snack.snackId, "Snack1", 9, "Image1", Credits("2.50")),
+    )
+
+    purchased = SnackData(snack.snackId, snack.snackName, 2, "", Credits("2.50"))
+    database.addPurchaseTransaction(
+        patronID=patron_id,
+        amountBeforeTransaction=Credits("50.00"),
+        amountAfterTransaction=Credits("45.00"),
+        transactionDate=datetime.now(),
+        transactionItems=[purchased],
+    )
+    database.subtractPatronCredits(patron_id, Credits("5.00"))
+    database.addGambleTransaction(
+        patronID=patron_id,
+        amountBeforeTransaction=Credits("45.00"),
+        amountAfterTransaction=Credits("42.50"),
+        transactionDate=datetime.now(),
+        transactionItem=purchased,
+    )
+    database.addTopUpTransaction(
+        patronID=patron_id,
+        amountBeforeTransaction=Credits("42.50"),
+        amountAfterTransaction=Credits("52.50"),
+        transactionDate=datetime.now(),
+    )
+    database.addEditTransaction(
+        patronID=other_patron_id,
+        amountBeforeTransaction=Credits("0.00"),
+        amountAfterTransaction=Credits("1.00"),
+        transactionDate=datetime.now(),
+    )
+    newBalance = database.checkout(
+        patron_id=patron_id,
+        cart=[SnackData(snack.snackId, snack.snackName, 1, "", Credits("2.50"))],
+        fee=Credits("2.50"),
+        timestamp=datetime.now(),
+    )
+    database.gamble(
+        patron_id=patron_id,
+        won_snack=SnackData(snack.snackId, snack.snackName, 1, "", Credits("2.50")),
+        fee=Credits("2.00"),
+        timestamp=datetime.now(),
+    )
+    database.add_added_snack("Snack1", 5, Credits("10.00"))
+    database.add_lost_snack("Snack1", LostSnackReason.EXPIRED, 1, Credits("2.50"))
+
+    transactions = database.getTransactions(patron_id)
+    database.getTransaction(transactions[0].transactionId)
+    database.getTransactionsBetween(
+        patron_id, datetime(2026, 1, 1), datetime(2026, 2, 1)
+    )
+    _, cursor = database.iterTransactionsPage(patron_id=patron_id, limit=1)
+    database.iterTransactionsPage(patron_id=patron_id, before_cursor=cursor, limit=1)
+    database.getTransactionIds(patron_id)
+    database.getMostPurchasedSnacksByPatron(patron_id)
+    database.getPatronData(patron_id)
+    database.updatePatronData(
+        patron_id, UserData(patron_id, "First", "Last", "CARD1", newBalance)
+    )
+
+    database.removeSnack(snacks[1].snackId)
+    database.removePatron(other_patron_id)
+
+
+def _is_checked(statement: str) -> bool:
+    normalized = " ".join(statement.split()).upper()
+    return normalized.startswith(CHECKED_STATEMENTS) and " WHERE " in normalized
+
+
+def test_keyed_queries_do_not_scan(traced_database):
+    database, statements = traced_database
+
+    _exercise_database(database)
+    database.connection.set_trace_callback(None)
+
+    checked_statements = [s for s in statements if _is_checked(s)]
+    assert len(checked_statements) > 0
+
+    cursor = database.connection.cursor()
+    scans = []
+    for statement in checked_statements:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}")
+        for row in cursor.fetchall():
+            detail = row[3]
+            if detail.startswith("SCAN"):
+                scans.append((" ".join(statement.split()), detail))
+
+    assert not scans, "Queries falling back to a full table scan:\n" + "\n".join(
+        f"{statement}\n    -> {detail}" for statement, detail in scans
+    )
+
+
+def test_card_lookup_uses_covering_index(traced_database):
+    database, _ = traced_database
+    database.addPatron("First", "Last", "CARD1")
+
+    cursor = database.connection.cursor()
+    cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT PatronID FROM Patrons WHERE EmployeeID = 'CARD1'"
+    )
+    details = [row[3] for row in cursor.fetchall()]
+    assert any("COVERING INDEX idx_patrons_employee_id" in d for d in details)
+
+
+def test_most_purchased_ranking_reads_index_in_order(traced_database):
+    database, _ = traced_database
+
+    cursor = database.connection.cursor()
+    cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT ItemName FROM PatronSnackCounts WHERE PatronID = 1 "
+        "ORDER BY TotalQuantity DESC, LastPurchased DESC LIMIT 5"
+    )
+    details = [row[3] for row in cursor.fetchall()]
+    assert any("COVERING INDEX idx_patron_snack_counts_rank" in d for d in details)
+    # The rows come out of the index already ranked, no sorting step
+    assert not any("TEMP B-TREE" in d for d in details)
+
+
+def test_transaction_pages_read_index_in_order(traced_database):
+    database, _ = traced_database
+
+    cursor = database.connection.cursor()
+    cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT TransactionID FROM Transactions "
+        "WHERE PatronID = 1 AND (TransactionDate, TransactionID) < (5, 5) "
+        "ORDER BY TransactionDate DESC, TransactionID DESC LIMIT 51"
+    )
+    details = [row[3] for row in cursor.fetchall()]
+    assert any("INDEX idx_transactions_patron_date" in d for d in details)
+    assert not any("TEMP B-TREE" in d for d in details)
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+import app_types
+from app_types import (
+    Credits,
+    HistoryData,
+    SnackData,
+    TransactionType,
+    UserData,
+    toEpochMicroseconds,
+)
+
+
+def _fields(record) -> tuple:
+    return tuple(getattr(record, name) for name in type(record).__slots__)
+
+
+def test_records_are_slotted():
+    patron = UserData(1, "First", "Last", "CARD1", Credits("1.00"))
+    snack = SnackData(1, "Apple", 2, "Image", Credits("1.25"))
+    transaction = HistoryData(
+        1, TransactionType.TOP_UP, datetime.now(), Credits(0), Credits(1), []
+    )
+
+    for record in (patron, snack, transaction):
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.unknownAttribute = 1
+
+
+def test_from_row_matches_constructor():
+    date = datetime(2026, 1, 2, 3, 4, 5, 6)
+
+    assert _fields(UserData.from_row((1, "First", "Last", "CARD1", 1250))) == _fields(
+        UserData(1, "First", "Last", "CARD1", Credits("12.50"))
+    )
+    assert _fields(SnackData.from_row((2, "Apple", 3, "Image", 125))) == _fields(
+        SnackData(2, "Apple", 3, "Image", Credits("1.25"))
+    )
+    transaction = HistoryData.from_row(
+        (3, "PURCHASE", toEpochMicroseconds(date), 2000, 1875)
+    )
+    assert _fields(transaction) == _fields(
+        HistoryData(
+            3, TransactionType.PURCHASE, date, Credits("20.00"), Credits("18.75"), []
+        )
+    )
+
+
+def test_record_validation_can_be_turned_off():
+    with pytest.raises(AssertionError):
+        SnackData(1, "Apple", 2, "Image", 1.25)
+
+    app_types.set_record_validation(False)
+    try:
+        snack = SnackData(1, "Apple", 2, "Image", 1.25)
+    finally:
+        app_types.set_record_validation(True)
+
+    assert snack.pricePerItem == 1.25
+    assert app_types.is_record_validation_enabled()
@@ -0,0 +1,108 @@
+import queue
+
+from RFIDReader import AdaptivePollInterval, MockCardReader, RFIDReader, mock_gpio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def start_reader(irqPin=None):
+    dispatched = queue.SimpleQueue()
+    backend = MockCardReader(irqPin=irqPin)
+    reader = RFIDReader(
+        backend=backend,
+        pollInterval=AdaptivePollInterval(fast=0.01, slow=0.02),
+        dispatch=dispatched.put,
+    )
+    reader.start()
+    return reader, backend, dispatched
+
+
+def test_cards_go_to_the_active_route():
+    reader, backend, dispatched = start_reader()
+    splashCards, loginCards = [], []
+    reader.addRoute("splashScreen", splashCards.append)
+    reader.addRoute("loginScreen", loginCards.append)
+    try:
+        reader.setActiveRoute("splashScreen")
+        backend.present("123")
+        dispatched.get(timeout=5)()
+
+        reader.setActiveRoute("loginScreen")
+        backend.present("456")
+        dispatched.get(timeout=5)()
+    finally:
+        reader.stop()
+
+    assert splashCards == ["123"]
+    assert loginCards == ["456"]
+    stats = reader.getStats()
+    assert stats["mode"] == "polling"
+    assert stats["read_to_callback"]["count"] == 2
+
+
+def test_card_is_handed_over_once_per_route():
+    reader, backend, dispatched = start_reader(irqPin=18)
+    cards = []
+    reader.addRoute("splashScreen", cards.append)
+    try:
+        reader.setActiveRoute("splashScreen")
+        backend.present("123")
+        dispatched.get(timeout=5)()
+        backend.present("123")
+        reader.triggerFakeRead(card_id="123")
+
+        # Shown again, the same card logs in again
+        reader.setActiveRoute("mainUserPage")
+        reader.setActiveRoute("splashScreen")
+        backend.present("123")
+        dispatched.get(timeout=5)()
+    finally:
+        reader.stop()
+
+    assert cards == ["123", "123"]
+    assert reader.getStats()["mode"] == "irq"
+
+
+def test_cards_without_a_route_are_ignored():
+    reader = RFIDReader(backend=MockCardReader())
+    reader.addRoute("splashScreen", lambda cardId: None)
+    reader.setActiveRoute("buyScreen")
+
+    reader.triggerFakeRead(card_id="123")
+
+    assert reader.callback is None
+    assert reader.last_read_id is None
+
+
+def test_poll_interval_backs_off_when_idle():
+    clock = FakeClock()
+    interval = AdaptivePollInterval(
+        fast=0.05, slow=0.2, fastFor=10.0, backoff=2.0, clock=clock
+    )
+
+    assert interval.next() == 0.05
+    clock.now = 10.0
+    assert [interval.next() for _ in range(3)] == [0.1, 0.2, 0.2]
+
+    interval.activity()
+    assert interval.next() == 0.05
+
+
+def test_mock_reader_is_chosen_from_the_environment(monkeypatch):
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.delenv("GITHUB_ACTIONS", raising=False)
+
+    for value, expected in [("1", True), ("Yes", True), ("TRUE", True), ("0", False)]:
+        monkeypatch.setenv("MOCK_RFID_READER", value)
+        assert mock_gpio() == expected
+    monkeypatch.delenv("MOCK_RFID_READER")
+    assert not mock_gpio()
+
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    assert mock_gpio()
@@ -0,0 +1,120 @@
+import queue
+import threading
+
+import pytest
+
+from app_types import Credits
+from session_cache import SessionCache
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(populated_database):
+    return populated_database
+
+
+def test_warm_session_does_not_touch_sqlite(database, buy):
+    patronId = database.getPatronIdByCardId("CARD1")
+    buy(database, patronId, "Banana", 1)
+    buy(database, patronId, "Apple", 2)
+    dispatched = queue.SimpleQueue()
+    session = SessionCache(database, patronId, dispatch=dispatched.put)
+
+    session.warmUp()
+    dispatched.get(timeout=5)()
+
+    statements = []
+    database.connection.set_trace_callback(statements.append)
+    mostPurchasedSnacks = session.getMostPurchasedSnacks()
+    statistics = session.getStatistics()
+    historyPage, historyCursor = session.getHistoryPage()
+    database.connection.set_trace_callback(None)
+
+    assert not statements
+    assert mostPurchasedSnacks == ["Apple", "Banana"]
+    assert statistics.favoriteSnack == "Apple"
+    assert statistics.totalSnacksPurchased == 2
+    assert statistics.totalCreditsSpent == Credits("5.50")
+    assert len(historyPage) == 2 and historyCursor is None
+    assert session.as_dict()["hits"] == 3
+
+
+def test_session_is_loaded_on_the_reader_thread(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    threads = []
+    load = SessionCache._load  # pylint: disable=protected-access
+
+    def recordingLoad(session, statistics):
+        threads.append(threading.current_thread())
+        return load(session, statistics)
+
+    dispatched = queue.SimpleQueue()
+    session = SessionCache(database, patronId, dispatch=dispatched.put)
+    # pylint: disable-next=protected-access
+    session._load = lambda statistics: recordingLoad(session, statistics)
+    session.warmUp()
+    dispatched.get(timeout=5)()
+
+    assert session.isWarm
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_own_write_invalidates_the_session(database, buy):
+    patronId = database.getPatronIdByCardId("CARD1")
+    dispatched = queue.SimpleQueue()
+    session = SessionCache(database, patronId, dispatch=dispatched.put)
+    session.warmUp()
+    staleWarmUp = dispatched.get(timeout=5)
+
+    buy(database, patronId, "Banana", 1)
+    session.invalidate()
+    # The warm-up from before the purchase is dropped
+    staleWarmUp()
+    assert not session.isWarm
+    dispatched.get(timeout=5)()
+
+    assert session.isWarm
+    assert session.getMostPurchasedSnacks() == ["Banana"]
+    assert session.getStatistics().totalSnacksPurchased == 1
+
+
+def test_own_write_updates_the_statistics_by_its_delta(database, buy):
+    patronId = database.getPatronIdByCardId("CARD1")
+    buy(database, patronId, "Apple", 2)
+    dispatched = queue.SimpleQueue()
+    session = SessionCache(database, patronId, dispatch=dispatched.put)
+    session.warmUp()
+    dispatched.get(timeout=5)()
+
+    buy(database, patronId, "Banana", 2)
+    getPatronSpending = database.getPatronSpending
+    database.getPatronSpending = lambda patronId: pytest.fail("summed up again")
+    session.recordWrite(creditsSpent=Credits("6.00"), snacksPurchased=1)
+    dispatched.get(timeout=5)()
+    database.getPatronSpending = getPatronSpending
+
+    statistics = session.getStatistics()
+    assert statistics.totalCreditsSpent == Credits("8.50")
+    assert statistics.totalSnacksPurchased == 2
+    assert statistics.favoriteSnack == "Banana"
+    assert len(session.getHistoryPage()[0]) == 2
+    assert session.getStatistics() == SessionCache(database, patronId).getStatistics()
+
+
+def test_cold_session_loads_on_demand(database, buy):
+    patronId = database.getPatronIdByCardId("CARD1")
+    buy(database, patronId, "Apple", 1)
+    session = SessionCache(database, patronId, dispatch=lambda callback: None)
+
+    assert session.getMostPurchasedSnacks() == ["Apple"]
+    assert session.as_dict()["misses"] == 1
+
+
+def test_in_memory_database_reads_synchronously():
+    database = DatabaseConnector(":memory:")
+    future = database.readAsync(threading.current_thread)
+    assert future.result() is threading.main_thread()
+    database.close()
@@ -0,0 +1,148 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, SnackData
+from GuiApp.database import DatabaseConnector, InsufficientCreditsError
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(populated_database):
+    return populated_database
+
+
+def _snack_tuples(snacks):
+    return [
+        (s.snackId, s.snackName, s.quantity, s.imageID, s.pricePerItem) for s in snacks
+    ]
+
+
+def _table_rows(database):
+    """Read the Snacks table without going through the catalog."""
+    cursor = database.connection.cursor()
+    cursor.execute("SELECT * FROM Snacks ORDER BY ItemID")
+    return [
+        (row[0], row[1], row[2], row[3], Credits.from_hundredths(row[4]))
+        for row in cursor.fetchall()
+    ]
+
+
+def _assert_coherent(database):
+    assert _snack_tuples(database.getAllSnacks()) == _table_rows(database)
+
+
+def test_lookups_after_loading_do_not_touch_sqlite(database):
+    snacks = database.getAllSnacks()
+    missesBefore = database.get_snack_catalog_report()["misses"]
+
+    statements = []
+    database.connection.set_trace_callback(statements.append)
+    for snack in snacks:
+        database.getSnack(snack.snackId)
+    database.getSnack(9999)
+    database.getSnackByName("Banana")
+    database.getAllSnacks()
+    database.connection.set_trace_callback(None)
+
+    assert not statements
+    report = database.get_snack_catalog_report()
+    assert report["misses"] == missesBefore
+    assert report["hits"] == 5
+    assert report["snacks"] == 2
+
+
+def test_miss_reads_through(database):
+    appleId = database.getSnackByName("Apple").snackId
+
+    # A second connector starts with an empty catalog
+    other = DatabaseConnector(database.database_path)
+    apple = other.getSnack(appleId)
+    assert (apple.snackName, apple.quantity) == ("Apple", 5)
+    assert other.getSnack(9999) is None
+    assert other.get_snack_catalog_report()["misses"] == 2
+
+    other.getSnack(appleId)
+    assert other.get_snack_catalog_report()["hits"] == 1
+    other.close()
+
+
+def test_handed_out_snacks_are_copies(database):
+    snack = database.getSnackByName("Apple")
+    snack.quantity = 1
+    snack.snackName = "Changed"
+
+    assert database.getSnack(snack.snackId).quantity == 5
+    assert database.getSnackByName("Apple") is not None
+    assert database.getSnackByName("Changed") is None
+
+
+def test_writes_keep_catalog_coherent(database):
+    database.getAllSnacks()
+    apple = database.getSnackByName("Apple")
+    banana = database.getSnackByName("Banana")
+
+    database.addSnack("Cherry", 7, "Image3", Credits("0.50"))
+    _assert_coherent(database)
+
+    database.updateSnackData(
+        apple.snackId,
+        SnackData(apple.snackId, "Green Apple", 4, "Image1", Credits("1.50")),
+    )
+    _assert_coherent(database)
+    assert database.getSnackByName("Apple") is None
+    assert database.getSnackByName("Green Apple").quantity == 4
+
+    database.subtractSnackQuantity(apple.snackId, 3)
+    _assert_coherent(database)
+
+    database.removeSnack(banana.snackId)
+    _assert_coherent(database)
+    assert database.getSnack(banana.snackId) is None
+    assert database.getSnackByName("Banana") is None
+
+
+def test_checkout_and_gamble_update_catalog(database):
+    database.getAllSnacks()
+    patronId = database.getPatronIdByCardId("CARD1")
+    apple = database.getSnackByName("Apple")
+    banana = database.getSnackByName("Banana")
+
+    database.checkout(
+        patron_id=patronId,
+        cart=[
+            SnackData(apple.snackId, "Apple", 2, "", apple.pricePerItem),
+            SnackData(banana.snackId, "Banana", 1, "", banana.pricePerItem),
+        ],
+        fee=Credits("5.50"),
+        timestamp=datetime.now(),
+    )
+    _assert_coherent(database)
+
+    # Winning the last banana removes it from the inventory
+    database.gamble(
+        patron_id=patronId,
+        won_snack=database.getSnack(banana.snackId),
+        fee=Credits("1.00"),
+        timestamp=datetime.now(),
+    )
+    _assert_coherent(database)
+    assert database.getSnack(banana.snackId) is None
+
+
+def test_rolled_back_checkout_leaves_catalog_alone(database):
+    database.getAllSnacks()
+    apple = database.getSnackByName("Apple")
+
+    with pytest.raises(InsufficientCreditsError):
+        database.checkout(
+            patron_id=database.getPatronIdByCardId("CARD1"),
+            cart=[SnackData(apple.snackId, "Apple", 1, "", apple.pricePerItem)],
+            fee=Credits("100.00"),
+            timestamp=datetime.now(),
+        )
+
+    _assert_coherent(database)
+    assert database.getSnack(apple.snackId).quantity == 5
@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+from app_types import Credits
+from GuiApp.database import DatabaseConnector, StorageProfile
+from GuiApp.storage_profiles import storage_profile_from_setting
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / "storage_profile_test.db")
+
+
+def test_default_profile_is_durable(database_path):
+    database = DatabaseConnector(database_path)
+    report = database.get_storage_report()
+    database.close()
+
+    assert report["profile"] == "durable"
+    assert report["pragmas"]["journal_mode"] == "delete"
+    # synchronous=FULL is reported as 2
+    assert report["pragmas"]["synchronous"] == 2
+
+
+def test_sd_card_safe_profile_uses_wal(database_path):
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE
+    )
+    report = database.get_storage_report()
+    database.close()
+
+    assert report["profile"] == "sd-card-safe"
+    assert report["pragmas"]["journal_mode"] == "wal"
+    # synchronous=NORMAL is reported as 1
+    assert report["pragmas"]["synchronous"] == 1
+    # temp_store=MEMORY is reported as 2
+    assert report["pragmas"]["temp_store"] == 2
+    assert report["pragmas"]["cache_size"] == -8192
+    assert report["pragmas"]["wal_autocheckpoint"] == 1000
+
+
+def test_in_memory_test_profile():
+    database = DatabaseConnector(
+        ":memory:", storage_profile=StorageProfile.IN_MEMORY_TEST
+    )
+    database.addPatron("First", "Last", "123")
+    report = database.get_storage_report()
+    database.close()
+
+    assert report["profile"] == "in-memory-test"
+    assert report["pragmas"]["journal_mode"] == "memory"
+    # synchronous=OFF is reported as 0
+    assert report["pragmas"]["synchronous"] == 0
+
+
+def test_commit_latency_is_reported(database_path):
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE
+    )
+    commits_before = database.get_storage_report()["commits"]
+
+    database.addPatron("First", "Last", "123")
+    database.addCredits(database.getPatronIdByCardId("123"), Credits("5.00"))
+
+    report = database.get_storage_report()
+    database.close()
+
+    assert report["commits"] == commits_before + 2
+    assert report["last_commit_ms"] >= 0.0
+    assert report["max_commit_ms"] >= report["last_commit_ms"]
+    assert report["avg_commit_ms"] >= 0.0
+
+
+def test_set_storage_profile_on_open_connection(database_path):
+    database = DatabaseConnector(database_path)
+    database.addPatron("First", "Last", "123")
+
+    database.set_storage_profile(StorageProfile.SD_CARD_SAFE)
+    report = database.get_storage_report()
+
+    assert report["pragmas"]["journal_mode"] == "wal"
+    assert report["commits"] == 0
+    assert database.getPatronIdByCardId("123") is not None
+
+    database.set_storage_profile(StorageProfile.DURABLE)
+    assert database.get_storage_report()["pragmas"]["journal_mode"] == "delete"
+    database.close()
+
+
+def test_leaving_wal_closes_the_reader_and_writer_connections(database_path):
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE, async_writes=True
+    )
+    database.readAsync(database.getAllPatrons).result()
+
+    assert database.set_storage_profile(StorageProfile.DURABLE)
+    assert database.get_storage_report()["pragmas"]["journal_mode"] == "delete"
+    assert database.readAsync(database.getAllPatrons).result() == []
+    database.close()
+
+
+def test_failed_switch_out_of_wal_is_reported(database_path):
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE
+    )
+    # Another program with the database open keeps it in WAL
+    other = sqlite3.connect(database_path)
+    other.execute("SELECT * FROM Patrons").fetchall()
+    database.connection.execute("PRAGMA busy_timeout = 0")
+
+    assert not database.set_storage_profile(StorageProfile.DURABLE)
+    report = database.get_storage_report()
+    assert report["pragmas"]["journal_mode"] == "wal"
+    # The rest of the profile is applied
+    assert report["pragmas"]["synchronous"] == 2
+
+    other.close()
+    assert database.set_storage_profile(StorageProfile.DURABLE)
+    database.close()
+
+
+def test_profile_survives_reopen(database_path):
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE
+    )
+    database.addSnack("Snack1", 3, "Image", Credits("1.50"))
+    database.close()
+
+    database = DatabaseConnector(
+        database_path, storage_profile=StorageProfile.SD_CARD_SAFE
+    )
+    snacks = database.getAllSnacks()
+    database.close()
+
+    assert len(snacks) == 1
+    assert snacks[0].pricePerItem == Credits("1.50")
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("durable", StorageProfile.DURABLE),
+        ("sd-card-safe", StorageProfile.SD_CARD_SAFE),
+        ("in-memory-test", StorageProfile.SD_CARD_SAFE),
+        ("unknown", StorageProfile.SD_CARD_SAFE),
+    ],
+)
+def test_settings_cannot_select_the_test_profile(value, expected):
+    assert storage_profile_from_setting(value) == expected
@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, LostSnackReason, SnackData
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "store_stats_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addPatron("Second", "Last", "CARD2")
+    yield database
+    database.close()
+
+
+def _add_history(database, patronId):
+    database.addTopUpTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("0.00"),
+        amountAfterTransaction=Credits("20.00"),
+        transactionDate=datetime.now(),
+    )
+    database.addPurchaseTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("20.00"),
+        amountAfterTransaction=Credits("14.50"),
+        transactionDate=datetime.now(),
+        transactionItems=[
+            SnackData(1, "Apple", 2, "", Credits("1.25")),
+            SnackData(2, "Banana", 1, "", Credits("3.00")),
+        ],
+    )
+    database.addGambleTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("14.50"),
+        amountAfterTransaction=Credits("12.50"),
+        transactionDate=datetime.now(),
+        transactionItem=SnackData(2, "Banana", 1, "", Credits("3.00")),
+    )
+
+
+def _stats_tuple(stats):
+    return (
+        stats.soldCount,
+        stats.storeRevenue,
+        stats.gamblingRevenue,
+        stats.gamblingReturns,
+        stats.addedCount,
+        stats.addedValue,
+        stats.lostCount,
+        stats.lostValue,
+    )
+
+
+def test_new_database_has_zero_stats(database):
+    stats = database.getStoreStats()
+
+    assert stats.soldCount == 0
+    assert stats.storeRevenue == Credits("0.00")
+    assert stats.gamblingRevenue == Credits("0.00")
+    assert stats.gamblingReturns == Credits("0.00")
+    assert stats.addedCount == 0
+    assert stats.addedValue == Credits("0.00")
+    assert stats.lostCount == 0
+    assert stats.lostValue == Credits("0.00")
+
+
+def test_transactions_update_stats(database):
+    _add_history(database, database.getPatronIdByCardId("CARD1"))
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+
+    stats = database.getStoreStats()
+
+    assert stats.soldCount == 6
+    assert stats.storeRevenue == Credits("11.00")
+    assert stats.gamblingRevenue == Credits("4.00")
+    assert stats.gamblingReturns == Credits("6.00")
+
+
+def test_added_and_lost_snacks_update_stats(database):
+    database.add_added_snack("Apple", 10, Credits("12.50"))
+    database.add_added_snack("Banana", 5, Credits("15.00"))
+    database.add_lost_snack("Apple", LostSnackReason.EXPIRED, 2, Credits("2.50"))
+
+    stats = database.getStoreStats()
+
+    assert stats.addedCount == database.get_total_snacks_added() == 15
+    assert stats.addedValue == database.get_value_of_added_snacks()
+    assert stats.addedValue == Credits("27.50")
+    assert stats.lostCount == database.get_total_snacks_lost() == 2
+    assert stats.lostValue == database.get_value_of_lost_snacks()
+    assert stats.lostValue == Credits("2.50")
+
+
+def test_clears_reset_their_stats(database):
+    _add_history(database, database.getPatronIdByCardId("CARD1"))
+    database.add_added_snack("Apple", 10, Credits("12.50"))
+    database.add_lost_snack("Apple", LostSnackReason.STOLEN, 1, Credits("1.25"))
+
+    database.clear_transactions()
+    stats = database.getStoreStats()
+    assert stats.soldCount == 0
+    assert stats.storeRevenue == Credits("0.00")
+    assert stats.addedCount == 10
+
+    database.clear_added_snacks()
+    assert database.getStoreStats().addedCount == 0
+    assert database.getStoreStats().lostCount == 1
+
+    database.clear_lost_snacks()
+    assert _stats_tuple(database.getStoreStats()) == (0,) * 8
+
+
+def test_remove_patron_subtracts_their_transactions(database):
+    _add_history(database, database.getPatronIdByCardId("CARD1"))
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+
+    database.removePatron(database.getPatronIdByCardId("CARD2"))
+    stats = database.getStoreStats()
+
+    assert stats.soldCount == 3
+    assert stats.storeRevenue == Credits("5.50")
+    assert stats.gamblingRevenue == Credits("2.00")
+    assert stats.gamblingReturns == Credits("3.00")
+
+
+def test_rebuild_matches_incremental_stats(database):
+    _add_history(database, database.getPatronIdByCardId("CARD1"))
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+    database.add_added_snack("Apple", 10, Credits("12.50"))
+    database.add_lost_snack("Apple", LostSnackReason.DAMAGED, 3, Credits("3.75"))
+    database.removePatron(database.getPatronIdByCardId("CARD1"))
+    incremental = _stats_tuple(database.getStoreStats())
+
+    # Throw the counters off, a rebuild recomputes them from the raw tables
+    database.cursor.execute("UPDATE StoreStats SET SoldCount = 999, LostValue = 1")
+    database.connection.commit()
+    database.rebuildStoreStats()
+
+    assert _stats_tuple(database.getStoreStats()) == incremental
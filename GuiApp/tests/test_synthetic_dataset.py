@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from tests.SchemaBuilder import DatasetSpec, SchemaBuilder
+
+from GuiApp.database import DatabaseConnector
+from GuiApp.DatabaseMigrator import DatabaseMigrator
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+SMALL_SPEC = DatasetSpec(patrons=50, snacks=20, transactions=5000, days=90, seed=7)
+LEDGER_TABLES = ("Patrons", "Snacks", "AddedSnacks", "Transactions", "TransactionItems")
+
+
+@pytest.fixture
+def synthetic_database(tmp_path):
+    return SchemaBuilder.generate(str(tmp_path / "synthetic.db"), "v7", SMALL_SPEC)
+
+
+def _dump(db_path):
+    conn = sqlite3.connect(db_path)
+    tables = {}
+    for table in LEDGER_TABLES:
+        tables[table] = conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+    conn.close()
+    return tables
+
+
+def test_same_seed_builds_the_same_database(synthetic_database, tmp_path):
+    again = SchemaBuilder.generate(str(tmp_path / "again.db"), "v7", SMALL_SPEC)
+
+    assert _dump(again) == _dump(synthetic_database)
+
+
+def test_ledger_is_consistent(synthetic_database):
+    conn = sqlite3.connect(synthetic_database)
+    assert conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 5000
+    # Every transaction starts from the balance the previous one left
+    rows = conn.execute(
+        "SELECT PatronID, AmountBeforeTransaction, AmountAfterTransaction "
+        "FROM Transactions ORDER BY TransactionID"
+    ).fetchall()
+    balances = {}
+    for patronId, before, after in rows:
+        assert balances.get(patronId, 0) == before
+        assert after >= 0
+        balances[patronId] = after
+    for patronId, totalCredits in conn.execute(
+        "SELECT PatronID, TotalCredits FROM Patrons"
+    ):
+        assert balances.get(patronId, 0) == totalCredits
+    # Stock left is what was added minus what was sold
+    wrongStock = conn.execute(
+        """
+        SELECT COUNT(*) FROM Snacks s
+        WHERE s.Quantity != (SELECT SUM(Quantity) FROM AddedSnacks
+                WHERE SnackName = s.ItemName)
+            - (SELECT IFNULL(SUM(Quantity), 0) FROM TransactionItems
+                WHERE ItemName = s.ItemName)
+        """
+    ).fetchone()[0]
+    assert wrongStock == 0
+    # Popularity is skewed towards the first snacks
+    ranking = conn.execute(
+        "SELECT ItemName FROM TransactionItems GROUP BY ItemName "
+        "ORDER BY SUM(Quantity) DESC LIMIT 1"
+    ).fetchone()[0]
+    assert ranking == "Snack1"
+    conn.close()
+
+
+def test_derived_tables_match_the_ledger(synthetic_database):
+    database = DatabaseConnector(synthetic_database)
+    generated = vars(database.getStoreStats())
+    database.rebuildStoreStats()
+
+    assert vars(database.getStoreStats()) == generated
+    assert generated["soldCount"] > 0
+    database.close()
+
+
+def test_generated_v1_database_migrates(tmp_path):
+    spec = DatasetSpec(patrons=20, snacks=10, transactions=2000, seed=3)
+    v1 = SchemaBuilder.generate(str(tmp_path / "v1.db"), "v1", spec)
+    v7 = SchemaBuilder.generate(str(tmp_path / "v7.db"), "v7", spec)
+
+    conn = sqlite3.connect(v1)
+    DatabaseMigrator.migrate_database(conn, conn.cursor())
+    conn.close()
+
+    assert _dump(v1) == _dump(v7)
@@ -233,6 +233,25 @@ async def test_return_from_payment_with_back_button(app_with_only_users):
     assert app_with_only_users.screenManager.current == "topUpAmountScreen"
 
 
+@pytest.mark.asyncio
+async def test_payment_qr_code_is_rendered_ahead(app_with_only_users):
+    screenManager = app_with_only_users.screenManager
+    screenManager.RFIDReader.triggerFakeRead(card_id="123456789")
+    screenManager.current_screen.ids.topUpOption.dispatch("on_release")
+
+    assert screenManager.current == "topUpAmountScreen"
+
+    screenManager.current_screen.ids.creditsToAdd.text = "100.00"
+
+    # Rendered on the worker thread while the amount screen is shown
+    await asyncio.sleep(0.5)
+
+    screenManager.current_screen.ids.continueButton.dispatch("on_release")
+
+    assert screenManager.current == "topUpPaymentScreen"
+    assert screenManager.current_screen.ids.qrCodeImage.texture is not None
+
+
 @pytest.mark.asyncio
 async def test_return_from_payment_with_cancel_button(app_with_only_users):
 
@@ -0,0 +1,159 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from app_types import (
+    Credits,
+    SnackData,
+    StorageProfile,
+    TransactionType,
+    toEpochMicroseconds,
+)
+from GuiApp.database import DatabaseConnector
+from GuiApp.transaction_archive import copyTransactionsToArchive
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "archive_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addPatron("Second", "Last", "CARD2")
+    database.addSnack("Apple", 50, "Image1", Credits("1.25"))
+    for cardId in ("CARD1", "CARD2"):
+        database.addCredits(database.getPatronIdByCardId(cardId), Credits("20.00"))
+    for month in (1, 2, 3, 4):
+        _buy(database, "CARD1", datetime(2025, month, 1))
+    _buy(database, "CARD2", datetime(2025, 1, 15))
+    yield database
+    database.close()
+
+
+def _buy(database, cardId, timestamp):
+    apple = database.getSnackByName("Apple")
+    database.checkout(
+        patron_id=database.getPatronIdByCardId(cardId),
+        cart=[SnackData(apple.snackId, "Apple", 2, "", apple.pricePerItem)],
+        fee=Credits("2.50"),
+        timestamp=timestamp,
+    )
+
+
+def _history(transactions):
+    return [
+        (
+            t.transactionId,
+            t.transactionType,
+            t.transactionDate,
+            t.amountBeforeTransaction,
+            t.amountAfterTransaction,
+            [(i.snackName, i.quantity) for i in t.transactionItems],
+        )
+        for t in transactions
+    ]
+
+
+def test_archive_leaves_a_carry_forward_transaction(database, tmp_path):
+    patronId = database.getPatronIdByCardId("CARD1")
+
+    report = database.archiveTransactions(datetime(2025, 3, 1))
+
+    assert report.as_dict() == {
+        "transactions": 3,
+        "transaction_items": 3,
+        "patrons": 2,
+    }
+    assert os.path.exists(tmp_path / "archive_test_archive.db")
+    hot = database.getTransactions(patronId)
+    assert [t.transactionType for t in hot] == [
+        TransactionType.PURCHASE,
+        TransactionType.PURCHASE,
+        TransactionType.CARRY_FORWARD,
+    ]
+    carryForward = hot[-1]
+    assert carryForward.amountBeforeTransaction == Credits("20.00")
+    assert carryForward.amountAfterTransaction == Credits("15.00")
+    assert carryForward.transactionDate == datetime(2025, 2, 1)
+    assert not carryForward.transactionItems
+
+
+def test_full_history_and_stats_are_unchanged(database):
+    patronIds = [database.getPatronIdByCardId(c) for c in ("CARD1", "CARD2")]
+    histories = [_history(database.getTransactions(p)) for p in patronIds]
+    spending = [database.getPatronSpending(p) for p in patronIds]
+    database.rebuildStoreStats()
+    stats = vars(database.getStoreStats())
+
+    database.archiveTransactions(datetime(2025, 3, 1))
+    # Archiving again only folds the carry forward rows into new ones
+    database.archiveTransactions(datetime(2025, 3, 1))
+
+    assert [
+        _history(database.getTransactions(p, include_archive=True)) for p in patronIds
+    ] == histories
+    assert len(database.getTransactions(patronIds[0])) == 3
+    assert [database.getPatronSpending(p) for p in patronIds] == spending
+    assert spending[0] == (Credits("10.00"), 4, 0)
+    database.rebuildStoreStats()
+    assert vars(database.getStoreStats()) == stats
+
+
+def test_archive_is_attached_when_reopened(database):
+    database.archiveTransactions(datetime(2025, 3, 1))
+    database.close()
+
+    reopened = DatabaseConnector(database.database_path)
+    patronId = reopened.getPatronIdByCardId("CARD1")
+    assert len(reopened.getTransactions(patronId, include_archive=True)) == 4
+
+    reopened.removePatron(patronId)
+    reopened.cursor.execute("SELECT COUNT(*) FROM archive.Transactions")
+    assert reopened.cursor.fetchone()[0] == 1
+    reopened.close()
+
+
+def test_archiving_again_after_a_crash_between_the_commits(database):
+    patronIds = [database.getPatronIdByCardId(c) for c in ("CARD1", "CARD2")]
+    histories = [_history(database.getTransactions(p)) for p in patronIds]
+    beforeMicroseconds = toEpochMicroseconds(datetime(2025, 3, 1))
+
+    # Power cut after the archive copy was committed, the hot tables are
+    # still untouched
+    database.archiveTransactions(datetime(2025, 1, 1))
+    copyTransactionsToArchive(database.cursor, beforeMicroseconds)
+    database.connection.commit()
+    database.close()
+
+    reopened = DatabaseConnector(database.database_path)
+    assert len(reopened.getTransactions(patronIds[0])) == 4
+    report = reopened.archiveTransactions(datetime(2025, 3, 1))
+
+    assert report.as_dict() == {
+        "transactions": 3,
+        "transaction_items": 3,
+        "patrons": 2,
+    }
+    assert [
+        _history(reopened.getTransactions(p, include_archive=True)) for p in patronIds
+    ] == histories
+    reopened.cursor.execute("SELECT COUNT(*) FROM archive.Transactions")
+    assert reopened.cursor.fetchone()[0] == 3
+    reopened.close()
+
+
+def test_archive_uses_the_storage_profile(tmp_path):
+    database = DatabaseConnector(
+        str(tmp_path / "archive_test.db"),
+        storage_profile=StorageProfile.SD_CARD_SAFE,
+    )
+    database.archiveTransactions(datetime(2025, 3, 1))
+
+    database.cursor.execute("PRAGMA archive.journal_mode")
+    assert database.cursor.fetchone()[0] == "wal"
+    database.cursor.execute("PRAGMA archive.synchronous")
+    # NORMAL
+    assert database.cursor.fetchone()[0] == 1
+    database.close()
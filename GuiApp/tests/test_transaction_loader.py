@@ -0,0 +1,161 @@
+from datetime import datetime
+
+import pytest
+
+from app_types import Credits, SnackData, TransactionType
+from GuiApp.database import DatabaseConnector
+
+# Fixtures are counted as redefine-outer-name
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DatabaseConnector(str(tmp_path / "transaction_loader_test.db"))
+    database.addPatron("First", "Last", "CARD1")
+    database.addPatron("Second", "Last", "CARD2")
+    yield database
+    database.close()
+
+
+def _add_history(database, patronId):
+    database.addTopUpTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("0.00"),
+        amountAfterTransaction=Credits("20.00"),
+        transactionDate=datetime(2026, 1, 1, 12, 0, 0, 0),
+    )
+    database.addPurchaseTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("20.00"),
+        amountAfterTransaction=Credits("14.50"),
+        transactionDate=datetime(2026, 1, 2, 12, 0, 0, 123456),
+        transactionItems=[
+            SnackData(1, "Apple", 2, "", Credits("1.25")),
+            SnackData(2, "Banana", 1, "", Credits("3.00")),
+        ],
+    )
+    database.addGambleTransaction(
+        patronID=patronId,
+        amountBeforeTransaction=Credits("14.50"),
+        amountAfterTransaction=Credits("12.50"),
+        transactionDate=datetime(2026, 1, 3, 12, 0, 0, 1),
+        transactionItem=SnackData(2, "Banana", 1, "", Credits("3.00")),
+    )
+
+
+def test_get_transactions_groups_items(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    _add_history(database, patronId)
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+
+    transactions = database.getTransactions(patronId)
+
+    assert [t.transactionType for t in transactions] == [
+        TransactionType.TOP_UP,
+        TransactionType.PURCHASE,
+        TransactionType.GAMBLE,
+    ]
+    topUp, purchase, gamble = transactions
+
+    assert topUp.transactionItems == []
+    # Dates with a microsecond of 0 round trip as well
+    assert topUp.transactionDate == datetime(2026, 1, 1, 12, 0, 0, 0)
+    assert topUp.amountAfterTransaction == Credits("20.00")
+
+    assert purchase.transactionDate == datetime(2026, 1, 2, 12, 0, 0, 123456)
+    assert sorted(
+        (i.snackName, i.quantity, i.pricePerItem) for i in purchase.transactionItems
+    ) == [("Apple", 2, Credits("1.25")), ("Banana", 1, Credits("3.00"))]
+
+    assert [i.snackName for i in gamble.transactionItems] == ["Banana"]
+
+
+def test_get_transactions_is_a_single_query(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    for _ in range(5):
+        _add_history(database, patronId)
+
+    statements = []
+    database.connection.set_trace_callback(statements.append)
+    transactions = database.getTransactions(patronId)
+    database.connection.set_trace_callback(None)
+
+    assert len(transactions) == 15
+    assert len(statements) == 1
+
+
+def test_get_transaction_uses_same_loader(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    _add_history(database, patronId)
+    purchase = database.getTransactions(patronId)[1]
+
+    transaction = database.getTransaction(purchase.transactionId)
+
+    assert transaction.transactionId == purchase.transactionId
+    assert transaction.transactionType == TransactionType.PURCHASE
+    assert len(transaction.transactionItems) == 2
+    assert database.getTransaction(9999) is None
+
+
+def test_get_transactions_between(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    _add_history(database, patronId)
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+
+    transactions = database.getTransactionsBetween(
+        patronId, datetime(2026, 1, 2), datetime(2026, 1, 3, 12, 0, 0, 1)
+    )
+
+    # The end date is exclusive
+    assert [t.transactionType for t in transactions] == [TransactionType.PURCHASE]
+    assert len(transactions[0].transactionItems) == 2
+
+
+def test_transaction_pages_walk_history_newest_first(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    for _ in range(3):
+        _add_history(database, patronId)
+    _add_history(database, database.getPatronIdByCardId("CARD2"))
+
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = database.iterTransactionsPage(
+            patron_id=patronId, before_cursor=cursor, limit=4
+        )
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [4, 4, 1]
+    transactions = [t for page in pages for t in page]
+
+    # Transactions sharing a date are ordered by their ID
+    expected = sorted(
+        database.getTransactions(patronId),
+        key=lambda t: (t.transactionDate, t.transactionId),
+        reverse=True,
+    )
+    assert [t.transactionId for t in transactions] == [
+        t.transactionId for t in expected
+    ]
+    # Only the headers are loaded
+    assert all(t.transactionItems == [] for t in transactions)
+    assert transactions[0].transactionType == TransactionType.GAMBLE
+    assert transactions[0].amountAfterTransaction == Credits("12.50")
+
+
+def test_last_transaction_page_has_no_cursor(database):
+    patronId = database.getPatronIdByCardId("CARD1")
+    _add_history(database, patronId)
+
+    page, cursor = database.iterTransactionsPage(patron_id=patronId, limit=3)
+    assert len(page) == 3
+    assert cursor is None
+
+    page, cursor = database.iterTransactionsPage(
+        patron_id=database.getPatronIdByCardId("CARD2")
+    )
+    assert page == []
+    assert cursor is None
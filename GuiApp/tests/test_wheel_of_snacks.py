@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app_types import Credits, TransactionType
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_gamble_does_not_spin_the_wheel(app):
+    app.screenManager.RFIDReader.triggerFakeRead(card_id="555555555")
+    await asyncio.sleep(0.5)
+    assert app.screenManager.current == "mainUserPage"
+
+    database = app.screenManager.database
+    user = app.screenManager.getCurrentPatron()
+    database.addCredits(user.patronId, Credits("10.00"))
+    app.screenManager.refreshCurrentPatron()
+
+    app.screenManager.current_screen.ids.gambleOption.dispatch("on_release")
+    await asyncio.sleep(0.5)
+    assert app.screenManager.current == "wheelOfSnacksScreen"
+    wheelScreen = app.screenManager.current_screen
+    for snack in database.getAllSnacks()[:2]:
+        if snack.snackId not in wheelScreen.ids.win_table.getSelectedEntries():
+            wheelScreen.item_clicked(snackId=snack.snackId)
+    assert not wheelScreen.ids.spin_button.disabled
+    await asyncio.sleep(0.3)
+    wheelAngle = wheelScreen.ids.wheel_widget.wheel_angle
+
+    # The credits are spent somewhere else while the wheel is shown
+    database.cursor.execute(
+        "UPDATE Patrons SET TotalCredits = 0 WHERE PatronID = ?", (user.patronId,)
+    )
+    database.connection.commit()
+    wheelScreen.ids.spin_button.dispatch("on_release")
+    await asyncio.sleep(0.5)
+
+    assert not wheelScreen.isSpinning
+    assert not wheelScreen.ids.spin_button.disabled
+    assert wheelScreen.ids.wheel_widget.wheel_angle == wheelAngle
+    assert app.screenManager.getCurrentPatron().totalCredits == Credits("0.00")
+    assert TransactionType.GAMBLE not in [
+        t.transactionType for t in database.getTransactions(user.patronId)
+    ]
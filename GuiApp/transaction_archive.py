@@ -0,0 +1,241 @@
+"""
+Cold storage of old transactions in an ATTACHed archive database.
+
+Provides:
+- ARCHIVE_SCHEMA: The name the archive database is attached as.
+- attachArchive(): Attach an archive database and create its tables.
+- copyTransactionsToArchive(): Copy the transactions before a date to the
+  archive, without committing.
+- replaceWithCarryForwards(): Replace the transactions before a date in the
+  hot tables with carry forward transactions, without committing.
+- transactionSources(): The Transactions and TransactionItems sources of
+  the hot tables or of the full history.
+- removeArchivedTransactions(), clearArchive(): Delete archived rows.
+- ArchiveReport: What an archive run moved.
+
+Archived transactions keep their TransactionID and TransactionItemId, the
+hot tables use AUTOINCREMENT so the IDs never collide. In the hot tables
+every patron with archived transactions is left with one CARRY_FORWARD
+transaction going from the balance before their first archived
+transaction to the balance after their last one. The full history
+leaves the carry forward rows out, since the archive holds what they
+summarize.
+"""
+
+import sqlite3
+
+from app_types import TransactionType
+
+
+ARCHIVE_SCHEMA = "archive"
+
+TRANSACTION_COLUMNS = (
+    "TransactionID, TransactionType, PatronID, TransactionDate, "
+    "AmountBeforeTransaction, AmountAfterTransaction"
+)
+TRANSACTION_ITEM_COLUMNS = (
+    "TransactionItemId, TransactionID, ItemName, Quantity, PricePerItem"
+)
+
+ARCHIVE_TABLES = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.Transactions (
+        TransactionID INTEGER PRIMARY KEY,
+        TransactionType TEXT NOT NULL,
+        PatronID INTEGER NOT NULL,
+        TransactionDate INTEGER NOT NULL,
+        AmountBeforeTransaction INTEGER NOT NULL,
+        AmountAfterTransaction INTEGER NOT NULL
+    );
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.TransactionItems (
+        TransactionItemId INTEGER PRIMARY KEY,
+        TransactionID INTEGER NOT NULL,
+        ItemName TEXT NOT NULL,
+        Quantity INTEGER NOT NULL,
+        PricePerItem INTEGER NOT NULL
+    );
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_transactions_patron_date
+    ON Transactions (PatronID, TransactionDate);
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_items_transaction
+    ON TransactionItems (TransactionID);
+    """,
+)
+
+_CARRY_FORWARD = TransactionType.CARRY_FORWARD.value
+
+
+class ArchiveReport:
+    def __init__(self, transactions: int, transactionItems: int, patrons: int):
+        self.transactions: int = transactions
+        self.transactionItems: int = transactionItems
+        self.patrons: int = patrons
+
+    def as_dict(self) -> dict:
+        return {
+            "transactions": self.transactions,
+            "transaction_items": self.transactionItems,
+            "patrons": self.patrons,
+        }
+
+
+def attachArchive(cursor: sqlite3.Cursor, archivePath: str):
+    """
+    Attach archivePath as ARCHIVE_SCHEMA, creating it if needed. Must be
+    called outside of a transaction.
+    """
+    cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archivePath,))
+    for statement in ARCHIVE_TABLES:
+        cursor.execute(statement)
+
+
+def transactionSources(includeArchive: bool) -> tuple[str, str]:
+    """
+    The (Transactions, TransactionItems) sources to select from. With
+    includeArchive they are the UNION ALL of the hot and the archived rows,
+    without the carry forward rows.
+    """
+    if not includeArchive:
+        return "Transactions", "TransactionItems"
+    return (
+        f"""(
+            SELECT {TRANSACTION_COLUMNS} FROM main.Transactions
+            WHERE TransactionType != '{_CARRY_FORWARD}'
+            UNION ALL
+            SELECT {TRANSACTION_COLUMNS} FROM {ARCHIVE_SCHEMA}.Transactions
+        )""",
+        f"""(
+            SELECT {TRANSACTION_ITEM_COLUMNS} FROM main.TransactionItems
+            UNION ALL
+            SELECT {TRANSACTION_ITEM_COLUMNS} FROM {ARCHIVE_SCHEMA}.TransactionItems
+        )""",
+    )
+
+
+def copyTransactionsToArchive(
+    cursor: sqlite3.Cursor, beforeMicroseconds: int
+) -> tuple[int, int]:
+    """
+    Copy every transaction before beforeMicroseconds, and its items, from
+    the hot tables to the archive. Does not commit.
+
+    Rows are copied with INSERT OR REPLACE, so copying them again after a
+    crash before replaceWithCarryForwards was committed does not fail on
+    the rows that already made it to the archive.
+
+    Returns:
+        The number of transactions and of transaction items copied.
+    """
+    cursor.execute(
+        f"""
+        INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.Transactions ({TRANSACTION_COLUMNS})
+        SELECT {TRANSACTION_COLUMNS} FROM main.Transactions
+        WHERE TransactionDate < ? AND TransactionType != '{_CARRY_FORWARD}'
+        """,
+        (beforeMicroseconds,),
+    )
+    transactionCount = cursor.rowcount
+    cursor.execute(
+        f"""
+        INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.TransactionItems
+            ({TRANSACTION_ITEM_COLUMNS})
+        SELECT {TRANSACTION_ITEM_COLUMNS} FROM main.TransactionItems
+        WHERE TransactionID IN (
+            SELECT TransactionID FROM main.Transactions WHERE TransactionDate < ?
+        )
+        """,
+        (beforeMicroseconds,),
+    )
+    return transactionCount, cursor.rowcount
+
+
+def replaceWithCarryForwards(cursor: sqlite3.Cursor, beforeMicroseconds: int) -> int:
+    """
+    Delete every transaction before beforeMicroseconds, and its items, from
+    the hot tables and leave a carry forward transaction per patron. Earlier
+    carry forward rows before the date are folded into the new ones. Does
+    not commit.
+
+    Must only run once copyTransactionsToArchive is committed. In WAL mode
+    SQLite does not commit a transaction spanning the main and an ATTACHed
+    database atomically, so the copy and the delete are two transactions.
+
+    Returns:
+        The number of patrons given a carry forward transaction.
+    """
+    # (PatronID, balance before the first and after the last transaction,
+    # date of the last transaction) for every patron with old transactions
+    cursor.execute(
+        """
+        SELECT p.PatronID,
+            (SELECT AmountBeforeTransaction FROM main.Transactions
+                WHERE PatronID = p.PatronID AND TransactionDate < ?1
+                ORDER BY TransactionDate, TransactionID LIMIT 1),
+            (SELECT AmountAfterTransaction FROM main.Transactions
+                WHERE PatronID = p.PatronID AND TransactionDate < ?1
+                ORDER BY TransactionDate DESC, TransactionID DESC LIMIT 1),
+            p.LastDate
+        FROM (
+            SELECT PatronID, MAX(TransactionDate) AS LastDate
+            FROM main.Transactions
+            WHERE TransactionDate < ?1
+            GROUP BY PatronID
+        ) p
+        """,
+        (beforeMicroseconds,),
+    )
+    carryForwards = cursor.fetchall()
+
+    cursor.execute(
+        """
+        DELETE FROM main.TransactionItems
+        WHERE TransactionID IN (
+            SELECT TransactionID FROM main.Transactions WHERE TransactionDate < ?
+        )
+        """,
+        (beforeMicroseconds,),
+    )
+    cursor.execute(
+        "DELETE FROM main.Transactions WHERE TransactionDate < ?",
+        (beforeMicroseconds,),
+    )
+    cursor.executemany(
+        """
+        INSERT INTO main.Transactions (TransactionType, PatronID, TransactionDate,
+            AmountBeforeTransaction, AmountAfterTransaction)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (_CARRY_FORWARD, patronId, lastDate, amountBefore, amountAfter)
+            for patronId, amountBefore, amountAfter, lastDate in carryForwards
+        ],
+    )
+    return len(carryForwards)
+
+
+def removeArchivedTransactions(cursor: sqlite3.Cursor, patronId: int):
+    """Remove a patron's archived transactions and items, without committing."""
+    cursor.execute(
+        f"""
+        DELETE FROM {ARCHIVE_SCHEMA}.TransactionItems
+        WHERE TransactionID IN (
+            SELECT TransactionID FROM {ARCHIVE_SCHEMA}.Transactions
+            WHERE PatronID = ?
+        )
+        """,
+        (patronId,),
+    )
+    cursor.execute(
+        f"DELETE FROM {ARCHIVE_SCHEMA}.Transactions WHERE PatronID = ?", (patronId,)
+    )
+
+
+def clearArchive(cursor: sqlite3.Cursor):
+    """Remove every archived transaction, without committing."""
+    cursor.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.TransactionItems")
+    cursor.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.Transactions")
@@ -1,3 +1,4 @@
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.uiElements.buttons import ImageAndTextButton
 
@@ -10,6 +11,7 @@ class StatisticsOption(ImageAndTextButton):
     pass
 
 
+@kvRules("kv/ProfileScreen.kv")
 class ProfileScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1,7 +1,8 @@
-from app_types import TransactionType, Credits
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 
 
+@kvRules("kv/StoreStatisticsScreen.kv")
 class StoreStatisticsScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -12,13 +13,12 @@ class StoreStatisticsScreen(GridLayoutScreen):
 
     def on_pre_enter(self, *args):
         # Update the statistics displayed on the screen
+        # Sold, gambling, added and lost figures are maintained by the database
+        # on every write, so they are a single row read
+        store_stats = self.manager.database.getStoreStats()
 
-        value_of_snacks_added = self.manager.database.get_value_of_added_snacks()
-
-        self.ids.added_stats.stat_value_1 = (
-            f"{self.manager.database.get_total_snacks_added()} Snacks"
-        )
-        self.ids.added_stats.stat_value_2 = f"{value_of_snacks_added:.2f} Credits"
+        self.ids.added_stats.stat_value_1 = f"{store_stats.addedCount} Snacks"
+        self.ids.added_stats.stat_value_2 = f"{store_stats.addedValue:.2f} Credits"
 
         snacks_in_inventory = self.manager.database.getAllSnacks()
         number_of_snacks_in_inventory = sum(
@@ -35,44 +35,24 @@ class StoreStatisticsScreen(GridLayoutScreen):
             f"{value_of_snacks_in_inventory:.2f} Credits"
         )
 
-        number_of_sold_snacks = 0
-        store_revenue = Credits("0.00")
-        gambling_revenue = Credits("0.00")
-        gambling_returns = Credits("0.00")
-        users = self.manager.database.getAllPatrons()
-        for user in users:
-            transactions = self.manager.database.getTransactions(user.patronId)
-            for transaction in transactions:
-                if transaction.transactionType == TransactionType.PURCHASE:
-                    for transactionItem in transaction.transactionItems:
-                        number_of_sold_snacks += transactionItem.quantity
-                    store_revenue += (
-                        transaction.amountBeforeTransaction
-                        - transaction.amountAfterTransaction
-                    )
-                elif transaction.transactionType == TransactionType.GAMBLE:
-                    for transactionItem in transaction.transactionItems:
-                        gambling_returns += transactionItem.pricePerItem
-                    gambling_revenue += (
-                        transaction.amountBeforeTransaction
-                        - transaction.amountAfterTransaction
-                    )
+        self.ids.sold_stats.stat_value_1 = f"{store_stats.soldCount} Snacks"
+        self.ids.sold_stats.stat_value_2 = f"{store_stats.storeRevenue:.2f} Credits"
 
-        self.ids.sold_stats.stat_value_1 = f"{number_of_sold_snacks} Snacks"
-        self.ids.sold_stats.stat_value_2 = f"{store_revenue:.2f} Credits"
+        self.ids.lost_stats.stat_value_1 = f"{store_stats.lostCount} Snacks"
+        self.ids.lost_stats.stat_value_2 = f"{store_stats.lostValue:.2f} Credits"
 
-        self.ids.lost_stats.stat_value_1 = (
-            f"{self.manager.database.get_total_snacks_lost()} Snacks"
+        self.ids.gambling_stats.stat_value_1 = (
+            f"{store_stats.gamblingRevenue:.2f} Credits"
         )
-        self.ids.lost_stats.stat_value_2 = (
-            f"{self.manager.database.get_value_of_lost_snacks():.2f} Credits"
+        self.ids.gambling_stats.stat_value_2 = (
+            f"{store_stats.gamblingReturns:.2f} Credits"
         )
 
-        self.ids.gambling_stats.stat_value_1 = f"{gambling_revenue:.2f} Credits"
-        self.ids.gambling_stats.stat_value_2 = f"{gambling_returns:.2f} Credits"
-
-        self.ids.profit_stat.stat_value = (
-            f"{(store_revenue + gambling_revenue)-value_of_snacks_added:.2f} Credits"
+        profit = (
+            store_stats.storeRevenue
+            + store_stats.gamblingRevenue
+            - store_stats.addedValue
         )
+        self.ids.profit_stat.stat_value = f"{profit:.2f} Credits"
 
         return super().on_pre_enter(*args)
@@ -1,18 +1,17 @@
-from app_types import TransactionType, Credits
-from kivy.app import App
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 
 
+@kvRules("kv/UserStatisticsScreen.kv")
 class UserStatisticsScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.ids.header.bind(on_back_button_pressed=self.onBackButtonPressed)
 
-    def on_kv_post(self, _):
-        app = App.get_running_app()
-        app.screenManager.bind(
-            logged_in_user=lambda instance, value: self.updateStatistics(value)
-        )
+    def on_pre_enter(self, *args):
+        # Built on first use, so the screen may not exist when the patron
+        # logs in; read the statistics of whoever is logged in on entry
+        self.updateStatistics(self.manager.logged_in_user)
 
     def onBackButtonPressed(self, *largs):
         self.manager.transitionToScreen("profileScreen", transitionDirection="right")
@@ -23,33 +22,11 @@ class UserStatisticsScreen(GridLayoutScreen):
         if logged_in_user is None:
             return
 
-        transactions = self.manager.database.getTransactions(logged_in_user.patronId)
-
-        total_credits_spent = Credits("0.00")
-        total_snacks_purchased = 0
-        total_snacks_won = 0
-        favorite_snack = "N/A"
-        for transaction in transactions:
-            if transaction.transactionType == TransactionType.PURCHASE:
-                total_credits_spent += (
-                    transaction.amountBeforeTransaction
-                    - transaction.amountAfterTransaction
-                )
-                total_snacks_purchased += len(transaction.transactionItems)
-            if transaction.transactionType == TransactionType.GAMBLE:
-                total_snacks_won += 1
-                total_credits_spent += (
-                    transaction.amountBeforeTransaction
-                    - transaction.amountAfterTransaction
-                )
-
-        most_purchased_snacks = self.manager.database.getMostPurchasedSnacksByPatron(
-            logged_in_user.patronId
-        )
-        if most_purchased_snacks:
-            favorite_snack = most_purchased_snacks[0]
+        statistics = self.manager.session.getStatistics()
 
-        self.ids.total_credits_spent.stat_value = f"{total_credits_spent:.2f}"
-        self.ids.favorite_snack.stat_value = favorite_snack
-        self.ids.total_snacks_purchased.stat_value = f"{total_snacks_purchased}"
-        self.ids.total_snacks_won.stat_value = f"{total_snacks_won}"
+        self.ids.total_credits_spent.stat_value = f"{statistics.totalCreditsSpent:.2f}"
+        self.ids.favorite_snack.stat_value = statistics.favoriteSnack
+        self.ids.total_snacks_purchased.stat_value = (
+            f"{statistics.totalSnacksPurchased}"
+        )
+        self.ids.total_snacks_won.stat_value = f"{statistics.totalSnacksWon}"
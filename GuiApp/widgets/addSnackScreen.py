@@ -1,5 +1,6 @@
 import decimal
 
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
@@ -10,6 +11,7 @@ from app_types import Credits
 logger = get_logger(__name__)
 
 
+@kvRules("kv/addSnackScreen.kv")
 class AddSnackScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1,3 +1,4 @@
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.uiElements.buttons import ImageAndTextButton
 
@@ -22,6 +23,7 @@ class LogOption(ImageAndTextButton):
     pass
 
 
+@kvRules("kv/adminScreen.kv")
 class AdminScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1,7 +1,11 @@
+from concurrent.futures import Future
 from datetime import datetime
 from enum import Enum
+from functools import partial
 
-from app_types import SnackData, Credits
+from app_types import SnackData, Credits, UserData
+from database import CheckoutError
+from kv_loader import kvRules
 from logger import get_logger
 from snackReorderer import SnackReorderer
 from widgets.GridLayoutScreen import GridLayoutScreen
@@ -19,6 +23,7 @@ class ItemLocation(Enum):
     SHOPPINGCART = 1
 
 
+@kvRules("kv/buyScreen.kv")
 class BuyScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -26,6 +31,8 @@ class BuyScreen(GridLayoutScreen):
         self.snackStash = {}
         self.ids.header.bind(on_back_button_pressed=self.on_back_button_pressed)
         self.insufficient_funds_popup = None
+        # Set from onBuy until onCheckoutDone, the cart is locked meanwhile
+        self.isCheckoutPending = False
 
     def on_back_button_pressed(self, *args):
         self.manager.transitionToScreen("mainUserPage", transitionDirection="right")
@@ -60,11 +67,18 @@ class BuyScreen(GridLayoutScreen):
         return super().on_pre_leave(*args)
 
     def on_pre_enter(self, *args):
+        self.setCheckoutPending(False)
         self.initInventory()
         self.updateTotalPrice()
         return super().on_pre_enter(*args)
 
+    def setCheckoutPending(self, isCheckoutPending: bool):
+        self.isCheckoutPending = isCheckoutPending
+        self.ids.buyButton.disabled = isCheckoutPending
+
     def itemClickedInInventory(self, snackId: int):
+        if self.isCheckoutPending:
+            return
         self.snackDict[snackId][ItemLocation.INVENTORY] -= 1
         self.snackDict[snackId][ItemLocation.SHOPPINGCART] += 1
         self.updateSnackInLists(snackId=snackId)
@@ -73,6 +87,8 @@ class BuyScreen(GridLayoutScreen):
         logger.debug("Item added to cart: snack='%s' (ID=%s)", snack.snackName, snackId)
 
     def itemClickedInShoppingCart(self, snackId: int):
+        if self.isCheckoutPending:
+            return
         self.snackDict[snackId][ItemLocation.SHOPPINGCART] -= 1
         self.snackDict[snackId][ItemLocation.INVENTORY] += 1
         self.updateSnackInLists(snackId=snackId)
@@ -134,9 +150,7 @@ class BuyScreen(GridLayoutScreen):
         if self.manager.settingsManager.get_setting_value(
             settingName=SettingName.ORDER_INVENTORY_BY_MOST_PURCHASED
         ):
-            mostPurchasedSnacks = self.manager.database.getMostPurchasedSnacksByPatron(
-                patronId=self.manager.getCurrentPatron().patronId
-            )
+            mostPurchasedSnacks = self.manager.session.getMostPurchasedSnacks()
 
             SnackReorderer.reorder_snacks_based_on_guide_list(
                 snacks_to_reorder=snacks, snack_guide_list=mostPurchasedSnacks
@@ -209,6 +223,9 @@ class BuyScreen(GridLayoutScreen):
         return totalPrice
 
     def onBuy(self):
+        if self.isCheckoutPending:
+            return
+
         if self.isShoppingCartEmpty():
             popup = ErrorMessagePopup(errorMessage="Shopping cart is empty")
             popup.open()
@@ -241,35 +258,56 @@ class BuyScreen(GridLayoutScreen):
         # Purchase validation passed
         #
 
-        creditsBeforePurchase = currentPatron.totalCredits
-        creditsAfterPurchase = creditsBeforePurchase - totalPrice
+        # Stock, ledger and credits are written in a single transaction. With
+        # async database writes the commit happens on the writer thread and
+        # onCheckoutDone is called from the Clock once it is done. Until then
+        # the cart is locked so a second tap cannot submit it again.
+        self.setCheckoutPending(True)
+        self.manager.database.checkoutAsync(
+            patron_id=currentPatron.patronId,
+            cart=snacksInShoppingCart,
+            fee=totalPrice,
+            timestamp=datetime.now(),
+            on_done=partial(
+                self.onCheckoutDone,
+                currentPatron,
+                snacksInShoppingCart,
+                totalPrice,
+            ),
+        )
 
-        # Update snack database
-        for snack in snacksInShoppingCart:
-            if snack.quantity == self.manager.database.getSnack(snack.snackId).quantity:
-                self.manager.database.removeSnack(snackId=snack.snackId)
-            else:
-                self.manager.database.subtractSnackQuantity(
-                    snackId=snack.snackId, quantity=snack.quantity
-                )
+    def onCheckoutDone(
+        self,
+        currentPatron: UserData,
+        snacksInShoppingCart: list[SnackData],
+        totalPrice: Credits,
+        future: Future,
+    ):
+        self.setCheckoutPending(False)
+        creditsBeforePurchase = currentPatron.totalCredits
 
-        # Update transaction database
-        self.manager.database.addPurchaseTransaction(
-            patronID=currentPatron.patronId,
-            amountBeforeTransaction=creditsBeforePurchase,
-            amountAfterTransaction=creditsAfterPurchase,
-            transactionDate=datetime.now(),
-            transactionItems=snacksInShoppingCart,
-        )
+        try:
+            creditsAfterPurchase = future.result()
+        except CheckoutError as e:
+            logger.warning(
+                "Purchase rolled back: patronId=%s reason=%s",
+                currentPatron.patronId,
+                e,
+            )
+            ErrorMessagePopup(
+                errorMessage="Purchase failed, nothing was charged"
+            ).open()
+            self.manager.refreshCurrentPatron()
+            self.initInventory()
+            return
 
-        # Update patron credits
-        self.manager.database.subtractPatronCredits(
-            patronID=currentPatron.patronId, creditsToSubtract=totalPrice
+        # Update current patron with the new balance
+        self.manager.setCurrentPatronCredits(
+            creditsAfterPurchase,
+            creditsSpent=totalPrice,
+            snacksPurchased=len(snacksInShoppingCart),
         )
 
-        # Update current patron with new data
-        self.manager.refreshCurrentPatron()
-
         items_detail = ", ".join(
             f"{s.snackName}x{s.quantity}" for s in snacksInShoppingCart
         )
@@ -6,8 +6,13 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kv_loader import kvRules
 from widgets.uiElements.labels import AutoScrollingLabel
 
+# How close to the bottom (0.0) the table must be scrolled before
+# onScrolledNearEnd is called
+NEAR_END_SCROLL_Y = 0.2
+
 
 def get_str_pixel_width(string: str, **kwargs) -> int:
     return kivy.core.text.Label(**kwargs).get_extents(string)[0]
@@ -86,6 +91,7 @@ class ClickableTableEntry(RecycleDataViewBehavior, BoxLayoutButton):
         self.opacity = 1 if value else 0.5
 
 
+@kvRules("kv/clickableTable.kv")
 class ClickableTable(GridLayout):
     """
     A table that can have clickable entries
@@ -111,6 +117,7 @@ class ClickableTable(GridLayout):
         self.columnProportions = []
         self.is_kv_posted = False
         self.entries_to_add_after_kv_post = []
+        self.isWaitingForLayout = False
 
     def _setup_columns(self):
         if self.columnExamples:
@@ -141,6 +148,7 @@ class ClickableTable(GridLayout):
         self.is_kv_posted = True
 
         self._setup_columns()
+        self.ids["rw"].bind(scroll_y=self._onScroll)
 
         for entryContents, entryIdentifier in self.entries_to_add_after_kv_post:
             self.addEntry(entryContents, entryIdentifier)
@@ -173,6 +181,52 @@ class ClickableTable(GridLayout):
             }
         )
 
+    def addEntries(self, entries: list[tuple[list[str], object]]):
+        """
+        Add several entries to the end of the table at once
+
+        entries: list[tuple[list[str], any]]
+            (entryContents, entryIdentifier) pairs, see addEntry
+
+        The rows already in the table stay where they are on screen, so
+        entries can be appended while the user is scrolling
+        """
+        if not self.is_kv_posted:
+            self.entries_to_add_after_kv_post.extend(entries)
+            return
+
+        if not entries:
+            return
+
+        recycleView = self.ids["rw"]
+        layout = recycleView.layout_manager
+        # The scroll position is a fraction of the scrollable height, remember
+        # it in pixels so it can be restored once the layout has grown
+        scrolledPixels = (1 - recycleView.scroll_y) * max(
+            layout.height - recycleView.height, 0
+        )
+
+        def restoreScrollPosition(_, height):
+            layout.unbind(height=restoreScrollPosition)
+            self.isWaitingForLayout = False
+            scrollableHeight = height - recycleView.height
+            if scrollableHeight > 0:
+                recycleView.scroll_y = 1 - scrolledPixels / scrollableHeight
+
+        self.isWaitingForLayout = True
+        layout.bind(height=restoreScrollPosition)
+
+        recycleView.data.extend(
+            {
+                "clickableTable": self,
+                "entryContents": entryContents,
+                "columnProportions": self.columnProportions,
+                "entryIdentifier": entryIdentifier,
+                "selected": True,
+            }
+            for entryContents, entryIdentifier in entries
+        )
+
     def hasEntry(self, entryIdentifier):
         """
         Check if an entry with the given entryIdentifier exists in the table
@@ -344,3 +398,17 @@ class ClickableTable(GridLayout):
         Call the onEntryPressedCallback with the entryIdentifier of the pressed entry
         if the onEntryPressedCallback is not provided, print a default message
         """
+
+    def _onScroll(self, _, scrollY):
+        # Appended entries are not laid out yet, the table is not really
+        # near its end
+        if self.isWaitingForLayout:
+            return
+        if scrollY <= NEAR_END_SCROLL_Y and self.ids["rw"].data:
+            self.onScrolledNearEnd()
+
+    def onScrolledNearEnd(self, *largs):
+        """
+        Called when the table is scrolled close to its last entry, override it
+        to load more entries on demand
+        """
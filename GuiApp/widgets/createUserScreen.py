@@ -1,4 +1,5 @@
 from kivy.uix.screenmanager import Screen
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
 
@@ -6,6 +7,7 @@ from widgets.popups.errorMessagePopup import ErrorMessagePopup
 logger = get_logger(__name__)
 
 
+@kvRules("kv/createUserScreen.kv")
 class CreateUserScreen(Screen):
     def __init__(self, **kwargs):
         self.cardId = None
@@ -47,14 +49,6 @@ class CreateUserScreen(Screen):
     def cardRead(self, cardId, *args):
         self.ids.cardIdInput.setText(str(cardId))
 
-    def on_enter(self, *args):
-        self.manager.RFIDReader.start(self.cardRead)
-        return super().on_enter(*args)
-
-    def on_pre_leave(self, *args):
-        self.manager.RFIDReader.stop()
-        return super().on_pre_leave(*args)
-
     def on_leave(self, *args):
         self.ids.firstNameInput.clearText()
         self.ids.lastNameInput.clearText()
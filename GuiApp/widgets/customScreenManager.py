@@ -1,6 +1,8 @@
 from time import monotonic as time_monotonic
+from time import perf_counter
+from typing import Callable, Iterable
 
-from app_types import UserData
+from app_types import Credits, UserData
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.properties import NumericProperty, ObjectProperty, StringProperty
@@ -12,6 +14,9 @@ from kivy.uix.screenmanager import (
 )
 from RFIDReader import RFIDReader
 from logger import get_logger
+from metrics import LatencyStats
+from qr_codes import QrCodeCache
+from session_cache import SessionCache
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.settingsManager import SettingName, SettingsManager
 
@@ -70,6 +75,8 @@ def _install_touch_dedup():
         if _screen_manager_ref is not None:
             # pylint: disable-next=protected-access
             _screen_manager_ref._reset_idle_timer()
+            # Someone at the kiosk may be about to tap a card
+            _screen_manager_ref.RFIDReader.activity()
         return original(touch)
 
     Window.on_touch_down = _dedup_on_touch_down
@@ -93,6 +100,8 @@ class CustomScreenManager(ScreenManager):
         self.transition: ObjectProperty
         self.database = database
         self.RFIDReader = RFIDReader()
+        # Swish QR codes of the top-up payment screen
+        self.qrCodes = QrCodeCache()
         global _screen_manager_ref  # pylint: disable=global-statement
         if _screen_manager_ref is None:
             _screen_manager_ref = self
@@ -100,6 +109,14 @@ class CustomScreenManager(ScreenManager):
         self.log_out_timer = None
         self._logout_deadline = 0
         self._idle_display_event = None
+        # From an RFID card being read to the main user page being shown
+        self.tapToScreenStats = LatencyStats()
+        # The logged in patron's session, warmed up on login
+        self.session: SessionCache = None
+        self._onTapToScreenShown = None
+        # Screens registered with registerScreen and not built yet
+        self._screenFactories: dict[str, Callable[[], Screen]] = {}
+        self._prewarmEvent = None
         self.settingsManager.register_on_setting_change_callback(
             SettingName.DEBUG_AUTO_LOGOUT_TIMER,
             self._on_debug_timer_setting_changed,
@@ -179,7 +196,55 @@ class CustomScreenManager(ScreenManager):
         if patron is None:
             logger.warning("Login failed: no patron found for ID %s", patronId)
             return
+        self._loginPatron(patron)
+
+    def loginWithCard(self, cardId: str) -> bool:
+        """
+        Log in the patron a card belongs to and show the main user page.
+        The card is resolved in memory, no SQL runs between the card being
+        read and the transition starting.
+
+        Returns:
+            False if the card does not belong to a patron.
+        """
+        tapTime = perf_counter()
+        patron = self.database.resolveCard(cardId)
+        if patron is None:
+            return False
+
+        self._loginPatron(patron)
+        self._measureTapToScreen(tapTime)
+        self.transitionToScreen("mainUserPage")
+        return True
+
+    def _measureTapToScreen(self, tapTime: float):
+        screen = self.get_screen("mainUserPage")
+        # A previous card login may not have reached the screen
+        if self._onTapToScreenShown is not None:
+            screen.unbind(on_enter=self._onTapToScreenShown)
+
+        def onShown(*_):
+            screen.unbind(on_enter=onShown)
+            self._onTapToScreenShown = None
+            self.tapToScreenStats.record(perf_counter() - tapTime)
+            logger.info(
+                "Card tap to main user page: %.1f ms",
+                self.tapToScreenStats.last_seconds * 1000,
+            )
+
+        self._onTapToScreenShown = onShown
+        screen.bind(on_enter=onShown)
+
+    def getTapToScreenReport(self) -> dict:
+        """Report the card tap to main user page latency of card logins."""
+        return self.tapToScreenStats.as_dict()
+
+    def _loginPatron(self, patron: UserData):
         self._currentPatron = patron
+        # Load what the screens of the session show while the main user
+        # page slides in
+        self.session = SessionCache(self.database, patron.patronId)
+        self.session.warmUp()
         self.logged_in_user = self._currentPatron
         logger.info(
             "User logged in: %s %s (ID: %s)",
@@ -210,10 +275,11 @@ class CustomScreenManager(ScreenManager):
                 self._currentPatron.patronId,
             )
         self._currentPatron = None
+        self.session = None
         self.logged_in_user = None
 
         # If the user was topping up from the buy screen, clear the stashed snacks
-        if self.top_up_requestee == "buyScreen":
+        if self.top_up_requestee == "buyScreen" and self.isScreenBuilt("buyScreen"):
             self.get_screen("buyScreen").snackStash = {}
 
         self.top_up_requestee = None
@@ -226,11 +292,48 @@ class CustomScreenManager(ScreenManager):
         return self._currentPatron
 
     def refreshCurrentPatron(self):
+        """
+        Read the current patron back after the session changed it in a way
+        that does not count in the statistics (e.g. a top-up).
+        """
         self._currentPatron = self.database.getPatronData(
             patronID=self._currentPatron.patronId
         )
+        self._recordSessionWrite()
         self.logged_in_user = self._currentPatron
 
+    def setCurrentPatronCredits(
+        self,
+        totalCredits: Credits,
+        creditsSpent: Credits = Credits("0.00"),
+        snacksPurchased: int = 0,
+        snacksWon: int = 0,
+    ):
+        """
+        Update the current patron's credits with a balance the database already
+        returned (e.g. from checkout), without reading the patron back.
+
+        Args:
+            creditsSpent, snacksPurchased, snacksWon: What the write adds to
+                the patron's statistics.
+        """
+        assert isinstance(totalCredits, Credits)
+        patron = self._currentPatron
+        self._currentPatron = UserData(
+            patronId=patron.patronId,
+            firstName=patron.firstName,
+            lastName=patron.lastName,
+            employeeID=patron.employeeID,
+            totalCredits=totalCredits,
+        )
+        self._recordSessionWrite(creditsSpent, snacksPurchased, snacksWon)
+        self.logged_in_user = self._currentPatron
+
+    def _recordSessionWrite(self, *delta):
+        # Only called after the session's own writes
+        if self.session is not None:
+            self.session.recordWrite(*delta)
+
     def transitionToScreen(self, screenName, transitionDirection: str = "left"):
         old_screen = (
             self.current if hasattr(self, "current") and self.current else "(none)"
@@ -251,6 +354,64 @@ class CustomScreenManager(ScreenManager):
         else:
             self.transitionToScreen("mainUserPage", transitionDirection="right")
 
+    def registerScreen(self, name: str, factory: Callable[[], Screen]):
+        """
+        Register a screen to be built by factory the first time it is
+        requested, by get_screen or by switching to it. Building every
+        screen up front applies all their kv rules before the first frame.
+        """
+        assert callable(factory)
+        if name in self._screenFactories or self.isScreenBuilt(name):
+            raise ScreenManagerException(f"Screen {name} is already registered")
+        self._screenFactories[name] = factory
+
+    def isScreenBuilt(self, name: str) -> bool:
+        return any(screen.name == name for screen in self.screens)
+
+    def getScreenNames(self) -> list[str]:
+        """The names of all screens, built or only registered."""
+        return [screen.name for screen in self.screens] + list(self._screenFactories)
+
+    def get_screen(self, name):
+        factory = self._screenFactories.pop(name, None)
+        if factory is not None:
+            started = perf_counter()
+            screen = factory()
+            assert screen.name == name, f"Factory of {name} built {screen.name}"
+            self.add_widget(screen)
+            logger.debug(
+                "Built screen %s in %.1f ms", name, (perf_counter() - started) * 1000
+            )
+        return super().get_screen(name)
+
+    def on_current(self, instance, value):
+        super().on_current(instance, value)
+        self.RFIDReader.setActiveRoute(value)
+
+    def has_screen(self, name):
+        return name in self._screenFactories or super().has_screen(name)
+
+    def prewarmScreens(self, names: Iterable[str]):
+        """
+        Build the registered screens in names in the background, one per
+        frame so no single frame stalls, before they are first shown.
+        """
+        pending = [name for name in names if name in self._screenFactories]
+        if self._prewarmEvent is not None:
+            self._prewarmEvent.cancel()
+
+        def buildNext(_dt):
+            # A screen may have been shown, and built, in the meantime
+            while pending and pending[0] not in self._screenFactories:
+                pending.pop(0)
+            if not pending:
+                self._prewarmEvent = None
+                return
+            self.get_screen(pending.pop(0))
+            self._prewarmEvent = Clock.schedule_once(buildNext, 0)
+
+        self._prewarmEvent = Clock.schedule_once(buildNext, 0)
+
     def add_widget(self, widget, *args, **kwargs):
         """
         .. versionchanged:: 2.1.0
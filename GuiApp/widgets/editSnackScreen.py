@@ -2,6 +2,7 @@ from decimal import InvalidOperation
 from kivy.properties import ObjectProperty
 
 from app_types import LostSnackReason, SnackData, Credits
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.addedSnackPricePopup import AddedSnackPricePopup
@@ -13,6 +14,7 @@ from widgets.popups.removeConfirmationPopup import RemoveConfirmationPopup
 logger = get_logger(__name__)
 
 
+@kvRules("kv/editSnackScreen.kv")
 class EditSnackScreen(GridLayoutScreen):
     snack_to_edit = ObjectProperty(None, allownone=True)
 
@@ -1,6 +1,8 @@
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 
 
+@kvRules("kv/editSnacksScreen.kv")
 class EditSnacksScreen(GridLayoutScreen):
     ADD_SNACK_ENTRY_IDENTIFIER = -1
 
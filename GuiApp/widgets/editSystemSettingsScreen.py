@@ -1,12 +1,16 @@
 import logging
+from datetime import datetime, timedelta
 
-from app_types import LogLevel
+from app_types import LogLevel, StorageProfile
+from kivy.app import App
 from kivy.clock import Clock
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.spinner import SpinnerOption
+from kv_loader import kvRules
 from logger import get_logger
+from storage_profiles import SELECTABLE_STORAGE_PROFILES
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
 from widgets.popups.removeConfirmationPopup import RemoveConfirmationPopup
@@ -169,8 +173,9 @@ class EnumSettingOption(SpinnerOption):
 class EnumSettingRow(GridLayout):
     """A setting row with a dropdown (Spinner) to pick from enum options.
 
-    The spinner is populated with the display names of all enum members.
-    Selecting an item saves the corresponding enum value to the setting.
+    The spinner is populated with the display names of the enum members,
+    all of them unless members is given. Selecting an item saves the
+    corresponding enum value to the setting.
     """
 
     def __init__(
@@ -178,16 +183,18 @@ class EnumSettingRow(GridLayout):
         settingName: SettingName,
         settingManager: SettingsManager,
         enum_type: type,
+        members: tuple = None,
         **kwargs,
     ):
         super().__init__(**kwargs)
         self.settingManager: SettingsManager = settingManager
         self.settingName: SettingName = settingName
         self.enum_type = enum_type
+        self.members = tuple(enum_type) if members is None else members
         self.ids["settingName"].text = get_presentable_setting_name(self.settingName)
 
-        # Populate the spinner with display names of all enum options
-        self.ids.spinner.values = [m.display_name() for m in list(self.enum_type)]
+        # Populate the spinner with display names of the enum options
+        self.ids.spinner.values = [m.display_name() for m in self.members]
         self.ids.spinner.bind(text=self._on_spinner_text)
 
         self._update_display()
@@ -201,7 +208,7 @@ class EnumSettingRow(GridLayout):
 
     def _on_spinner_text(self, spinner, text):
         """Called when the spinner selection changes."""
-        for member in list(self.enum_type):
+        for member in self.members:
             if member.display_name() == text:
                 self.settingManager.set_setting_value(
                     settingName=self.settingName, value=member.value
@@ -218,6 +225,7 @@ class SettingsSection(GridLayout):
 logger = get_logger(__name__)
 
 
+@kvRules("kv/editSystemSettingsScreen.kv")
 class EditSystemSettingsScreen(GridLayoutScreen):
     # pylint: disable=too-many-locals,too-many-statements
     def __init__(self, **kwargs):
@@ -356,6 +364,16 @@ class EditSystemSettingsScreen(GridLayoutScreen):
 
         historySection.ids["sectionContent"].add_widget(clearHistoryOption)
 
+        archiveHistoryOption = ButtonOptionRow(
+            optionName="Archive transactions older than a year",
+            buttonText="Archive",
+            settingManager=self.manager.settingsManager,
+        )
+        archiveHistoryOption.bind(
+            on_option_button_released=lambda x: self.archive_old_transactions()
+        )
+        historySection.ids["sectionContent"].add_widget(archiveHistoryOption)
+
         # Logging settings
         loggingSection = SettingsSection(sectionName="Logging")
         logLevelRow = EnumSettingRow(
@@ -380,6 +398,52 @@ class EditSystemSettingsScreen(GridLayoutScreen):
             _update_log_level,
         )
 
+        # Database settings
+        databaseSection = SettingsSection(sectionName="Database")
+        storageProfileRow = EnumSettingRow(
+            settingName=SettingName.DATABASE_STORAGE_PROFILE,
+            settingManager=self.manager.settingsManager,
+            enum_type=StorageProfile,
+            members=SELECTABLE_STORAGE_PROFILES,
+        )
+        databaseSection.ids["sectionContent"].add_widget(storageProfileRow)
+
+        rebuildStoreStatsOption = ButtonOptionRow(
+            optionName="Rebuild store statistics",
+            buttonText="Rebuild",
+            settingManager=self.manager.settingsManager,
+        )
+        rebuildStoreStatsOption.bind(
+            on_option_button_released=lambda x: self.rebuild_store_stats()
+        )
+        databaseSection.ids["sectionContent"].add_widget(rebuildStoreStatsOption)
+
+        backupIntervalRow = FloatSettingRow(
+            settingName=SettingName.DATABASE_BACKUP_INTERVAL_HOURS,
+            settingManager=self.manager.settingsManager,
+        )
+        databaseSection.ids["sectionContent"].add_widget(backupIntervalRow)
+
+        backupCompressRow = BoolSettingRow(
+            settingName=SettingName.DATABASE_BACKUP_COMPRESS,
+            settingManager=self.manager.settingsManager,
+        )
+        databaseSection.ids["sectionContent"].add_widget(backupCompressRow)
+
+        backupNowOption = ButtonOptionRow(
+            optionName="Back up database",
+            buttonText="Back up",
+            settingManager=self.manager.settingsManager,
+        )
+        backupNowOption.bind(on_option_button_released=lambda x: self.backup_now())
+        databaseSection.ids["sectionContent"].add_widget(backupNowOption)
+
+        # Apply a new storage profile to the open connection right away
+        self.manager.settingsManager.register_on_setting_change_callback(
+            SettingName.DATABASE_STORAGE_PROFILE,
+            lambda value: self.set_storage_profile(StorageProfile(value)),
+        )
+
         # Debug settings
         debugSection = SettingsSection(sectionName="Debug")
         debugAutoLogoutTimer = BoolSettingRow(
@@ -395,10 +459,43 @@ class EditSystemSettingsScreen(GridLayoutScreen):
         self.ids["settingsLayout"].add_widget(gamblingSection)
         self.ids["settingsLayout"].add_widget(historySection)
         self.ids["settingsLayout"].add_widget(loggingSection)
+        self.ids["settingsLayout"].add_widget(databaseSection)
         self.ids["settingsLayout"].add_widget(debugSection)
 
     # pylint: enable=too-many-locals
 
+    def set_storage_profile(self, storage_profile: StorageProfile):
+        if not self.manager.database.set_storage_profile(storage_profile):
+            ErrorMessagePopup(
+                errorMessage="The database is in use, the journal mode of the "
+                f"'{storage_profile.value}' storage profile applies after a restart"
+            ).open()
+
+    def rebuild_store_stats(self):
+        self.manager.database.rebuildStoreStats()
+
+    def backup_now(self):
+        def on_done(future):
+            if future.exception() is not None:
+                ErrorMessagePopup(
+                    errorMessage=f"Database backup failed: {future.exception()}"
+                ).open()
+
+        App.get_running_app().backupService.requestBackup(on_done=on_done)
+
+    def archive_old_transactions(self):
+        def on_archive_callback(*args):
+            self.manager.database.archiveTransactions(
+                datetime.now() - timedelta(days=365)
+            )
+
+        popup = RemoveConfirmationPopup(
+            question_text="Are you sure you want to move all transactions older than a year to the archive?",
+            custom_remove_button_text="Archive",
+        )
+        popup.bind(on_removed=on_archive_callback)
+        popup.open()
+
     def clear_history(self):
         def on_removed_callback(*args):
             self.manager.database.clear_added_snacks()
@@ -3,6 +3,7 @@ from decimal import InvalidOperation
 
 from app_types import UserData, Credits
 from kivy.properties import ObjectProperty
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
@@ -12,6 +13,7 @@ from widgets.popups.removeConfirmationPopup import RemoveConfirmationPopup
 logger = get_logger(__name__)
 
 
+@kvRules("kv/editUserScreen.kv")
 class EditUserScreen(GridLayoutScreen):
     user_to_edit = ObjectProperty(None, allownone=True)
 
@@ -26,14 +28,6 @@ class EditUserScreen(GridLayoutScreen):
     def on_pre_enter(self, *args):
         super().on_pre_enter(*args)
 
-    def on_enter(self, *args):
-        self.manager.RFIDReader.start(self.cardRead)
-        return super().on_enter(*args)
-
-    def on_pre_leave(self, *args):
-        self.manager.RFIDReader.stop()
-        return super().on_pre_leave(*args)
-
     def on_leave(self, *args):
         self.user_to_edit = None
         super().on_leave(*args)
@@ -1,6 +1,8 @@
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 
 
+@kvRules("kv/editUsersScreen.kv")
 class EditUsersScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
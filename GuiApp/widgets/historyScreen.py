@@ -1,43 +1,69 @@
 from app_types import TransactionType, transactionTypeToPresentableString
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.editSummaryPopup import EditSummaryPopup
 from widgets.popups.gambleSummaryPopup import GambleSummaryPopup
 from widgets.popups.purchaseSummaryPopup import PurchaseSummaryPopup
 from widgets.popups.topUpSummaryPopup import TopUpSummaryPopup
 from logger import get_logger
+from session_cache import HISTORY_PAGE_SIZE
 
 
 logger = get_logger(__name__)
 
 
+@kvRules("kv/historyScreen.kv")
 class HistoryScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.ids.header.bind(on_back_button_pressed=self.on_back_button_pressed)
+        self.historyCursor = None
+        self.isHistoryExhausted = False
 
     def on_back_button_pressed(self, *args):
         self.manager.transitionToScreen("profileScreen", transitionDirection="right")
 
     def on_pre_enter(self, *args):
-        currentPatron = self.manager.getCurrentPatron()
-        transactions = self.manager.database.getTransactions(currentPatron.patronId)
+        self.historyCursor = None
+        self.isHistoryExhausted = False
+        self.loadNextHistoryPage()
+        return super().on_pre_enter(*args)
 
-        # Redorder transactions so that the most recent transactions are at the top
-        transactions = sorted(
-            transactions, key=lambda x: x.transactionDate, reverse=True
-        )
+    def loadNextHistoryPage(self, *args):
+        """
+        Append the next page of the patron's history to the table, the most
+        recent transactions are loaded first
+        """
+        if self.isHistoryExhausted:
+            return
 
-        for transaction in transactions:
-            self.ids.historyTable.addEntry(
-                entryContents=[
-                    transaction.transactionDate.strftime("%Y-%m-%d %H:%M:%S"),
-                    f"{transaction.amountBeforeTransaction:.2f}",
-                    f"{transaction.amountAfterTransaction:.2f}",
-                    transactionTypeToPresentableString(transaction.transactionType),
-                ],
-                entryIdentifier=transaction.transactionId,
+        if self.historyCursor is None:
+            # The first page was loaded ahead by the session
+            transactions, self.historyCursor = self.manager.session.getHistoryPage()
+        else:
+            currentPatron = self.manager.getCurrentPatron()
+            page = self.manager.database.iterTransactionsPage(
+                patron_id=currentPatron.patronId,
+                before_cursor=self.historyCursor,
+                limit=HISTORY_PAGE_SIZE,
             )
-        return super().on_pre_enter(*args)
+            transactions, self.historyCursor = page
+        self.isHistoryExhausted = self.historyCursor is None
+
+        self.ids.historyTable.addEntries(
+            [
+                (
+                    [
+                        transaction.transactionDate.strftime("%Y-%m-%d %H:%M:%S"),
+                        f"{transaction.amountBeforeTransaction:.2f}",
+                        f"{transaction.amountAfterTransaction:.2f}",
+                        transactionTypeToPresentableString(transaction.transactionType),
+                    ],
+                    transaction.transactionId,
+                )
+                for transaction in transactions
+            ]
+        )
 
     def on_leave(self, *args):
         self.ids.historyTable.clearEntries()
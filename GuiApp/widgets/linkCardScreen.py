@@ -1,8 +1,10 @@
 from kivy.uix.screenmanager import Screen
+from kv_loader import kvRules
 from widgets.popups.linkCardConfirmationPopup import LinkCardConfirmationPopup
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
 
 
+@kvRules("kv/linkCardScreen.kv")
 class LinkCardScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
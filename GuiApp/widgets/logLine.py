@@ -7,8 +7,10 @@ eliminating the GPU texture overflow issue on Raspberry Pi.
 from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kv_loader import kvRules
 
 
+@kvRules("kv/logLine.kv")
 class LogLine(RecycleDataViewBehavior, BoxLayout):
     """One log line rendered in the RecycleView.
 
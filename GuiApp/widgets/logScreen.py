@@ -8,6 +8,7 @@ with typed exceptions caught here and shown via ErrorMessagePopup.
 
 import logging
 import os
+from kv_loader import kvRules
 import logger as app_logger
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
@@ -17,6 +18,7 @@ from widgets.popups.removeConfirmationPopup import RemoveConfirmationPopup
 logger = get_logger(__name__)
 
 
+@kvRules("kv/logScreen.kv")
 class LogScreen(GridLayoutScreen):
     """Screen that displays application and crash logs."""
 
@@ -4,6 +4,7 @@ from kivy.clock import Clock
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.screenmanager import Screen
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.customScreenManager import CustomScreenManager
 from widgets.popups.createUserOrLinkCardPopup import CreateUserOrLinkCardPopup
@@ -42,6 +43,7 @@ class LoginScreenUserWidget(ButtonBehavior, BoxLayout):
         self.screenManager.transitionToScreen("mainUserPage")
 
 
+@kvRules("kv/loginScreen.kv")
 class LoginScreen(Screen):
     # Minimum horizontal drag distance (in pixels) before we consider the
     # user to have intentionally scrolled rather than tapped.
@@ -74,14 +76,9 @@ class LoginScreen(Screen):
 
         return super().on_pre_enter(*args)
 
-    def on_enter(self, *args):
-        self.manager.RFIDReader.start(self.cardRead)
-        return super().on_enter(*args)
-
     def on_pre_leave(self, *args):
         if self.create_or_link_card_popup is not None:
             self.create_or_link_card_popup = None
-        self.manager.RFIDReader.stop()
         return super().on_pre_leave(*args)
 
     def on_leave(self, *args):
@@ -93,16 +90,11 @@ class LoginScreen(Screen):
         return super().on_leave(*args)
 
     def cardRead(self, cardId, *args):
-        patronId = self.manager.database.getPatronIdByCardId(cardId=cardId)
-        if patronId is None:
+        if not self.manager.loginWithCard(cardId):
             self.create_or_link_card_popup = CreateUserOrLinkCardPopup(
                 screenManager=self.manager, readCard=cardId
             )
             self.create_or_link_card_popup.open()
-            return
-
-        self.manager.login(patronId)
-        self.manager.transitionToScreen("mainUserPage")
 
     def goToSplashScreen(self, *args):
         self.manager.transitionToScreen("splashScreen", transitionDirection="right")
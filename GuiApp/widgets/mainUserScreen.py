@@ -1,3 +1,4 @@
+from kv_loader import kvRules
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
 from widgets.settingsManager import SettingName
@@ -20,6 +21,7 @@ class ProfileOption(ImageAndTextButton):
     pass
 
 
+@kvRules("kv/mainUserScreen.kv")
 class MainUserScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
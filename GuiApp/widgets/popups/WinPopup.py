@@ -1,7 +1,9 @@
 from kivy.animation import Animation
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/WinPopup.kv")
 class WinPopup(ModalView):
     def __init__(self, won_item, size=(400, 200), **kwargs):
         super().__init__(**kwargs)
@@ -2,9 +2,11 @@ from decimal import InvalidOperation
 from kivy.uix.modalview import ModalView
 
 from app_types import Credits
+from kv_loader import kvRules
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
 
 
+@kvRules("kv/addedSnackPricePopup.kv")
 class AddedSnackPricePopup(ModalView):
     __events__ = ("on_selection", "on_canceled")
 
@@ -1,6 +1,8 @@
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/createUserOrLinkCardPopup.kv")
 class CreateUserOrLinkCardPopup(ModalView):
     def __init__(self, screenManager, readCard, **kwargs):
         super().__init__(**kwargs)
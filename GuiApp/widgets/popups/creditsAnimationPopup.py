@@ -5,8 +5,10 @@ from kivy.animation import AnimationTransition
 from kivy.clock import Clock
 
 from app_types import Credits
+from kv_loader import kvRules
 
 
+@kvRules("kv/creditsAnimationPopup.kv")
 class CreditsAnimationPopup(ModalView):
     def __init__(
         self, title: str, creditsBefore: Credits, creditsAfter: Credits, **kwargs
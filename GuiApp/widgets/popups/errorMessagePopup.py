@@ -1,10 +1,12 @@
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 from logger import get_logger
 
 
 logger = get_logger(__name__)
 
 
+@kvRules("kv/errorMessagePopup.kv")
 class ErrorMessagePopup(ModalView):
     def __init__(self, errorMessage: str, **kwargs):
         super().__init__(**kwargs)
@@ -1,8 +1,10 @@
 from app_types import HistoryData
 from kivy.clock import Clock
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/gambleSummaryPopup.kv")
 class GambleSummaryPopup(ModalView):
     def __init__(self, historyData: HistoryData, **kwargs):
         super().__init__(**kwargs)
@@ -1,7 +1,9 @@
 from app_types import Credits
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/insufficientFundsPopup.kv")
 class InsufficientFundsPopup(ModalView):
     __events__ = ("on_close_pressed", "on_top_up_pressed")
 
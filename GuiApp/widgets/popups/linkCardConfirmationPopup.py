@@ -1,7 +1,9 @@
 from kivy.uix.modalview import ModalView
 from app_types import UserData
+from kv_loader import kvRules
 
 
+@kvRules("kv/linkCardConfirmationPopup.kv")
 class LinkCardConfirmationPopup(ModalView):
     NEW_CARD = 0
     EXISTING_CARD = 1
@@ -1,7 +1,9 @@
 from app_types import LostSnackReason
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/removalReasonPopup.kv")
 class RemovalReasonPopup(ModalView):
     __events__ = ("on_selection", "on_canceled")
 
@@ -1,6 +1,8 @@
 from kivy.uix.modalview import ModalView
+from kv_loader import kvRules
 
 
+@kvRules("kv/removeConfirmationPopup.kv")
 class RemoveConfirmationPopup(ModalView):
     __events__ = ("on_removed", "on_canceled")
 
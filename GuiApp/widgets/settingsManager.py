@@ -23,6 +23,9 @@ class SettingName(Enum):
     EXCITING_GAMBLING = "exciting_gambling"
     LOG_LEVEL = "log_level"
     DEBUG_AUTO_LOGOUT_TIMER = "debug_auto_logout_timer"
+    DATABASE_STORAGE_PROFILE = "database_storage_profile"
+    DATABASE_BACKUP_INTERVAL_HOURS = "database_backup_interval_hours"
+    DATABASE_BACKUP_COMPRESS = "database_backup_compress"
 
 
 def get_presentable_setting_name(settingName: SettingName):
@@ -1,14 +1,23 @@
 from decimal import InvalidOperation
 from app_types import Credits
+from kivy.clock import Clock
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.errorMessagePopup import ErrorMessagePopup
+from widgets.settingsManager import SettingName
 from widgets.uiElements.textInputs import TextInputPopup
 
 
 logger = get_logger(__name__)
 
+# Amounts whose QR codes are rendered as soon as the screen is shown
+COMMON_TOP_UP_AMOUNTS = (Credits("50.00"), Credits("100.00"), Credits("200.00"))
+# Typing pause after which the QR code of the typed amount is rendered
+TYPED_AMOUNT_PREFETCH_DELAY = 0.3
 
+
+@kvRules("kv/topUpAmountScreen.kv")
 class TopUpAmountScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -16,15 +25,22 @@ class TopUpAmountScreen(GridLayoutScreen):
         self.ids.creditsToAdd.bind(text=self.updateCreditsAfterwards)
         self.ids.creditsToAdd.bind(focus=self.on_focus)
         self.ids.header.bind(on_back_button_pressed=self.on_back)
+        self._prefetchTypedAmount = Clock.create_trigger(
+            lambda _dt: self.prefetchQrCode(self.typedAmount()),
+            TYPED_AMOUNT_PREFETCH_DELAY,
+        )
 
     def on_pre_enter(self, *args):
         userData = self.manager.getCurrentPatron()
         self.ids.creditsCurrent.text = f"{userData.totalCredits:.2f}"
         self.ids.creditsAfterwards.text = f"{userData.totalCredits:.2f}"
         self.ids.creditsToAdd.text = ""
+        for amount in COMMON_TOP_UP_AMOUNTS:
+            self.prefetchQrCode(amount)
         return super().on_pre_enter(*args)
 
     def on_pre_leave(self, *args):
+        self._prefetchTypedAmount.cancel()
         if self.credit_input_popup:
             self.credit_input_popup.dismiss()
             self.credit_input_popup = None
@@ -51,16 +67,30 @@ class TopUpAmountScreen(GridLayoutScreen):
     def set_amount_to_add(self, amount: Credits):
         self.ids.creditsToAdd.text = f"{amount:.2f}"
 
+    def typedAmount(self) -> Credits:
+        try:
+            return Credits(self.ids.creditsToAdd.text)
+        except InvalidOperation:
+            return Credits("0.00")
+
+    def prefetchQrCode(self, amount: Credits):
+        """Render the payment QR code of amount for the current patron."""
+        patron = self.manager.getCurrentPatron()
+        if patron is None or amount < Credits("1.00"):
+            return
+        swishNumber = self.manager.settingsManager.get_setting_value(
+            settingName=SettingName.PAYMENT_SWISH_NUMBER
+        )
+        self.manager.qrCodes.request(swishNumber, amount, patron.firstName)
+
     def updateCreditsAfterwards(self, instance, text):
         userData = self.manager.getCurrentPatron()
         currentCredits = userData.totalCredits
-        try:
-            creditsToAdd = Credits(self.ids.creditsToAdd.text)
-        except InvalidOperation:
-            creditsToAdd = Credits("0.00")
+        creditsToAdd = self.typedAmount()
 
         newTotal = currentCredits + creditsToAdd
         self.ids.creditsAfterwards.text = f"{newTotal:.2f}"
+        self._prefetchTypedAmount()
 
     def onContinue(self, *largs):
 
@@ -84,6 +114,7 @@ class TopUpAmountScreen(GridLayoutScreen):
             creditsToAdd,
             self.manager.getCurrentPatron().totalCredits,
         )
+        self.prefetchQrCode(creditsToAdd)
         self.manager.get_screen("topUpPaymentScreen").setAmountToBePayed(creditsToAdd)
         self.manager.transitionToScreen("topUpPaymentScreen")
 
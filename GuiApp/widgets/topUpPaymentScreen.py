@@ -1,8 +1,9 @@
 from datetime import datetime
 
 from app_types import UserData, Credits
+from kv_loader import kvRules
 from logger import get_logger
-from qrcode import make as makeQRCode
+from qr_codes import QrCodeKey
 from widgets.GridLayoutScreen import GridLayoutScreen
 from widgets.popups.creditsAnimationPopup import CreditsAnimationPopup
 from widgets.settingsManager import SettingName
@@ -11,11 +12,14 @@ from widgets.settingsManager import SettingName
 logger = get_logger(__name__)
 
 
+@kvRules("kv/topUpPaymentScreen.kv")
 class TopUpPaymentScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.userData: UserData = None
         self.amount_to_be_payed: Credits = None
+        # The QR code shown, callbacks for any other code are stale
+        self._qrCodeKey: QrCodeKey = None
         self.ids.header.bind(on_back_button_pressed=self.on_back)
 
     def on_back(self, _):
@@ -32,15 +36,21 @@ class TopUpPaymentScreen(GridLayoutScreen):
         swishNumber = self.manager.settingsManager.get_setting_value(
             settingName=SettingName.PAYMENT_SWISH_NUMBER
         )
-        self.createQrCode(
-            amount=self.amount_to_be_payed,
-            name=self.userData.firstName,
-            swishNumber=swishNumber,
+        self._qrCodeKey = QrCodeKey(
+            swishNumber, self.amount_to_be_payed, self.userData.firstName
+        )
+        # Usually rendered while the amount was chosen, and shown right away
+        self.ids.qrCodeImage.texture = None
+        self.manager.qrCodes.request(
+            *self._qrCodeKey,
+            on_ready=lambda texture, key=self._qrCodeKey: self.showQrCode(key, texture),
         )
-        self.ids["qrCodeImage"].source = "qr.png"
-        self.ids["qrCodeImage"].reload()
         return super().on_pre_enter(*args)
 
+    def showQrCode(self, key: QrCodeKey, texture):
+        if key == self._qrCodeKey:
+            self.ids.qrCodeImage.texture = texture
+
     def onConfirm(self, *largs):
         credits_before = self.userData.totalCredits
         credits_after = credits_before + self.amount_to_be_payed
@@ -75,9 +85,3 @@ class TopUpPaymentScreen(GridLayoutScreen):
 
     def onCancel(self, *largs):
         self.manager.transition_back_from_top_up()
-
-    def createQrCode(self, amount: float, name: str, swishNumber: str):
-        qrCode = makeQRCode(
-            f"https://app.swish.nu/1/p/sw/?sw={swishNumber}&amt={amount:.2f}&cur=SEK&msg=Snack%20Attack%20Top-up%20for%20{name}&src=qr"
-        )
-        qrCode.save("qr.png")
@@ -455,17 +455,23 @@ class WheelOfSnacksWidget(AnchorLayout):
 
         return new_angle
 
-    def spin(self, exciting=False) -> SnackData:
+    def pick_spin(self, exciting=False) -> tuple[float, SnackData]:
+        """
+        Pick where the next spin stops without spinning the wheel.
+
+        Returns:
+            The angle to pass to spin_to and the snack the wheel stops at.
+        """
         new_angle = self.get_random_new_angle(exciting=exciting)
+        return new_angle, self.predict_snack_at_angle(
+            read_angle=self.pointer_angle, total_rotation=new_angle
+        )
 
+    def spin_to(self, new_angle):
         anim = Animation(wheel_angle=new_angle, duration=8, t="out_quint")
         anim.bind(on_complete=self.on_wheel_animation_complete)
         anim.start(self)
 
-        return self.predict_snack_at_angle(
-            read_angle=self.pointer_angle, total_rotation=new_angle
-        )
-
     def on_wheel_animation_complete(self, *args):
         current_snack = self.get_current_snack_at_angle(read_angle=self.pointer_angle)
         self.dispatch("on_spin_complete", current_snack)
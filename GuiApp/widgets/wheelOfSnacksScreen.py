@@ -1,8 +1,14 @@
+import sqlite3
+from concurrent.futures import Future
 from datetime import datetime
+from functools import partial
 
-from app_types import Credits
+from app_types import Credits, SnackData, UserData
+from database import CheckoutError
+from kv_loader import kvRules
 from logger import get_logger
 from widgets.GridLayoutScreen import GridLayoutScreen
+from widgets.popups.errorMessagePopup import ErrorMessagePopup
 from widgets.popups.insufficientFundsPopup import InsufficientFundsPopup
 from widgets.popups.WinPopup import WinPopup
 from widgets.settingsManager import SettingName
@@ -11,6 +17,7 @@ from widgets.settingsManager import SettingName
 logger = get_logger(__name__)
 
 
+@kvRules("kv/wheelOfSnacksScreen.kv")
 class WheelOfSnacksScreen(GridLayoutScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -200,6 +207,8 @@ class WheelOfSnacksScreen(GridLayoutScreen):
         self.selected_snacks_stash = self.ids.win_table.getSelectedEntries()
 
     def onSpinButtonPressed(self, *largs):
+        if self.isSpinning:
+            return
 
         selected_snacks = self.get_selected_snacks()
 
@@ -233,47 +242,65 @@ class WheelOfSnacksScreen(GridLayoutScreen):
             cost_to_spin,
         )
 
-        self.isSpinning = True
-
         exciting = self.manager.settingsManager.get_setting_value(
             settingName=SettingName.EXCITING_GAMBLING
         )
+        new_angle, won_snack = self.ids.wheel_widget.pick_spin(exciting)
 
+        # Credits, stock and ledger are written in a single transaction.
+        # onGambleDone starts the wheel once it is committed, so a rolled back
+        # gamble never starts it. Until then the spin is locked.
+        self.isSpinning = True
         self.ids.spin_button.disabled = True
-        won_snack = self.ids.wheel_widget.spin(exciting)
-        logger.info(
-            "Gamble result predetermined: patronId=%s will_win='%s' (waiting for animation)",
-            currentPatron.patronId,
-            won_snack.snackName,
+        self.manager.database.gambleAsync(
+            patron_id=currentPatron.patronId,
+            won_snack=won_snack,
+            fee=cost_to_spin,
+            timestamp=datetime.now(),
+            on_done=partial(
+                self.onGambleDone, currentPatron, won_snack, new_angle, cost_to_spin
+            ),
         )
 
-        self.manager.database.subtractPatronCredits(
-            patronID=currentPatron.patronId, creditsToSubtract=cost_to_spin
-        )
+    def onGambleDone(
+        self,
+        currentPatron: UserData,
+        won_snack: SnackData,
+        new_angle: float,
+        cost_to_spin: Credits,
+        future: Future,
+    ):
+        try:
+            newBalance = future.result()
+        except (CheckoutError, sqlite3.Error) as e:
+            logger.warning(
+                "Gamble rolled back: patronId=%s reason=%s",
+                currentPatron.patronId,
+                e,
+            )
+            ErrorMessagePopup(errorMessage="Spin failed, nothing was charged").open()
+            self.manager.refreshCurrentPatron()
+            self.isSpinning = False
+            self.ids.spin_button.disabled = len(self.get_selected_snacks()) < 2
+            return
         logger.info(
             "Gamble bet deducted: patronId=%s amount=%.2f",
             currentPatron.patronId,
             cost_to_spin,
         )
 
-        if won_snack.quantity == 1:
-            self.manager.database.removeSnack(snackId=won_snack.snackId)
-        else:
-            self.manager.database.subtractSnackQuantity(
-                snackId=won_snack.snackId, quantity=1
-            )
+        self.ids.wheel_widget.spin_to(new_angle)
+        logger.info(
+            "Gamble result predetermined: patronId=%s will_win='%s' (waiting for animation)",
+            currentPatron.patronId,
+            won_snack.snackName,
+        )
 
         won_snack.quantity = 1  # Assuming one snack is won per spin
 
-        self.manager.database.addGambleTransaction(
-            patronID=currentPatron.patronId,
-            amountBeforeTransaction=currentPatron.totalCredits,
-            amountAfterTransaction=currentPatron.totalCredits - cost_to_spin,
-            transactionDate=datetime.now(),
-            transactionItem=won_snack,
+        # Update current patron with the new balance
+        self.manager.setCurrentPatronCredits(
+            newBalance, creditsSpent=cost_to_spin, snacksWon=1
         )
 
-        # Update current patron with new data
-        self.manager.refreshCurrentPatron()
-
         self.enable_navigation_header_buttons(False)
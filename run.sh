@@ -21,4 +21,4 @@ then
 fi
 
 # Run GUI with Pi production settings
-python GuiApp/main.py -- --no-inspector --rotate-screen 180 --hide-cursor
+python GuiApp/main.py -- --no-inspector --rotate-screen 180 --hide-cursor --no-record-validation --async-database-writes
@@ -36,5 +36,8 @@ fi
 # Install Pi requirements in venv (includes RFID reader module)
 ./venv/bin/python -m pip install -r requirements-raspberry-pi.txt
 
+# Precompile the kv files for a faster startup, rerun after changing them
+./venv/bin/python GuiApp/kv_loader.py
+
 echo "Setup complete"
 echo "To run the GUI, run the command: 'bash run.sh'"